@@ -6,6 +6,7 @@ import os
 import requests
 from typing import Dict, Any
 import pickle
+import tempfile
 import pytz
 import re
 import time
@@ -13,14 +14,22 @@ import time
 
 # 커스텀 모듈 import
 from classify_issue import IssueClassifier
-from scenario_db import ScenarioDB
+from scenario_store import get_scenario_store
+from scenario_engine import build_ai_result, hinted_conditions
+from response_parser import parse_response, get_parsed_response
 from vector_search import VectorSearchWrapper
 from openai_handler import OpenAIHandler
 from gemini_handler import GeminiHandler
 from database import HistoryDB
 from multi_user_database import MultiUserHistoryDB
 from mongodb_handler import MongoDBHandler
-from solapi_handler import SOLAPIHandler
+from solapi_handler import SOLAPIHandler, get_solapi_handler
+from sms_queue import get_sms_queue, idempotency_key
+from write_behind import get_write_behind_queue
+from storage_router import get_storage_router
+from render_cache import get_render_cache
+from history_row import HistoryRow
+from history_feed import start_history_feed, matches_query
 from config import get_secret, validate_config, GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, GOOGLE_API_KEY, GEMINI_API_KEY, MONGODB_URI, SOLAPI_API_KEY, SOLAPI_API_SECRET, OPENAI_API_KEY
 
 # 페이지 설정
@@ -357,13 +366,6 @@ def init_mongodb_connection():
         if connection_test.get('success'):
             st.session_state.mongodb_connected = True
             st.session_state.mongo_handler = mongo_handler
-            
-            # 피드백 컬렉션 초기화
-            try:
-                mongo_handler._initialize_feedback_collection()
-            except Exception as e:
-                pass
-            
             return True
         else:
             st.session_state.mongodb_connected = False
@@ -398,7 +400,7 @@ def show_feedback_buttons(analysis_id):
     with col2:
         if st.button("👍 좋아요", key=f"like_{analysis_id}", use_container_width=True, type="primary"):
             try:
-                feedback_result = components['multi_user_db'].save_feedback(
+                feedback_result = components['storage'].save_feedback(
                     analysis_id, "like", user_name, user_role
                 )
                 
@@ -418,7 +420,7 @@ def enhance_ai_prompt_with_feedback(base_prompt: str, issue_type: str) -> str:
     """좋아요를 받은 응답을 참고하여 프롬프트 개선"""
     try:
         # 좋아요를 받은 응답들 조회
-        liked_responses = components['multi_user_db'].get_liked_responses(issue_type, limit=2)
+        liked_responses = components['storage'].get_liked_responses(issue_type, limit=2)
         
         if liked_responses:
             feedback_examples = []
@@ -450,7 +452,7 @@ def apply_feedback_learning(ai_result: dict, issue_type: str) -> dict:
     """AI 응답에 피드백 학습 적용"""
     try:
         # 좋아요를 받은 응답들 조회
-        liked_responses = components['multi_user_db'].get_liked_responses(issue_type, limit=1)
+        liked_responses = components['storage'].get_liked_responses(issue_type, limit=1)
         
         if not liked_responses or not ai_result.get('success'):
             return ai_result
@@ -458,10 +460,14 @@ def apply_feedback_learning(ai_result: dict, issue_type: str) -> dict:
         # 좋아요를 받은 응답의 스타일을 참고하여 현재 응답 개선
         liked_response = liked_responses[0]
         
-        # Gemini 응답인 경우
+        # Gemini 응답은 gemini_result, GPT 응답은 ai_result에 파싱 결과가 있음
+        # (원문은 JSON일 수 있으므로 원문 대신 파싱 결과에 참고 문구 추가)
         if 'gemini_result' in ai_result and 'parsed_response' in ai_result['gemini_result']:
             parsed = ai_result['gemini_result']['parsed_response']
-            
+        else:
+            parsed = ai_result.get('parsed_response')
+        
+        if isinstance(parsed, dict):
             # 좋아요를 받은 응답의 스타일을 참고하여 개선
             if liked_response.get('summary') and parsed.get('summary'):
                 # 좋아요를 받은 응답의 요약 스타일을 참고
@@ -471,12 +477,6 @@ def apply_feedback_learning(ai_result: dict, issue_type: str) -> dict:
                 # 좋아요를 받은 응답의 조치 흐름 스타일을 참고
                 parsed['action_flow'] = f"{parsed['action_flow']}\n\n※ 추가 권장사항: 검증된 효과적인 대응 방식을 참고하여 작성되었습니다."
         
-        # GPT 응답인 경우
-        elif 'response' in ai_result:
-            # GPT 응답에 피드백 학습 메시지 추가
-            feedback_note = "\n\n※ 참고: 유사한 사례에서 효과적이었던 접근 방식을 참고하여 응답을 생성했습니다."
-            ai_result['response'] = ai_result['response'] + feedback_note
-        
         return ai_result
         
     except Exception as e:
@@ -538,29 +538,9 @@ def show_ai_analysis(selected_row):
         if st.session_state.get('analysis_result'):
             analysis_data = st.session_state.analysis_result
             
-            # 이력관리와 동일한 방식으로 이메일 추출
-            # 1. 파싱된 email_draft 사용 (우선순위 1) - DB에 저장된 정확한 이메일 초안
-            email_draft = analysis_data.get('email_draft', '')
-            if email_draft and len(email_draft.strip()) > 20:
-                email_content = email_draft
-            
-            # 2. original_ai_response에서 이메일 초안 추출 (우선순위 2) - 이력 관리와 동일
-            if not email_content and analysis_data.get('original_ai_response'):
-                email_content = extract_email_from_original_response(analysis_data['original_ai_response'])
-            
-            # 3. full_analysis_result에서 이메일 초안 추출 (우선순위 3) - 이력 관리와 동일
-            if not email_content and analysis_data.get('full_analysis_result'):
-                email_content = extract_email_from_analysis_result(analysis_data['full_analysis_result'])
-            
-            # 4. ai_result에서 직접 추출 (이력관리와 동일한 추가 로직)
-            if not email_content and analysis_data.get('ai_result'):
-                ai_result = analysis_data['ai_result']
-                if 'gemini_result' in ai_result and 'raw_response' in ai_result['gemini_result']:
-                    email_content = extract_email_from_original_response(ai_result['gemini_result']['raw_response'])
-                elif 'response' in ai_result:
-                    email_content = extract_email_from_original_response(ai_result['response'])
-                elif 'gpt_result' in ai_result and 'raw_response' in ai_result['gpt_result']:
-                    email_content = extract_email_from_original_response(ai_result['gpt_result']['raw_response'])
+            # 분석 단계에서 파싱한 이메일 초안 사용 (구조화 출력이면 JSON 필드 그대로)
+            parsed = analysis_data.get('parsed_response') or get_parsed_response(analysis_data.get('ai_result')) or {}
+            email_content = parsed.get('email_draft') or analysis_data.get('email_draft')
         
         # 5. 기본 이메일 템플릿 (최후 수단) - 이력 관리와 동일
         if not email_content:
@@ -623,175 +603,67 @@ def show_ai_analysis(selected_row):
             st.info("📊 이력 관리 탭으로 이동하세요.")
 
 def show_ai_analysis_modal(selected_row):
-    """선택된 행의 AI 분석 결과를 모달 형태로 표시"""
+    """선택된 행의 AI 분석 결과를 모달 형태로 표시 (저장 시 만들어 둔 렌더 조각 사용)"""
     with st.container():
         st.markdown("## 🤖 AI 분석 결과")
         
-        # 선택된 데이터 정보 표시
-        with st.expander("📋 입력된 문의 정보", expanded=True):
-            col1, col2 = st.columns(2)
-            with col1:
-                customer_name = selected_row.get('고객사명', '')
-                st.write(f"**고객사명:** {customer_name if customer_name else ''}")
-                st.write(f"**고객 담당자:** {selected_row.get('고객담당자', '')}")
-                st.write(f"**문의 내용:** {selected_row.get('문의내용', 'N/A')}")
-                st.write(f"**우선순위:** {selected_row.get('우선순위', 'N/A')}")
-                st.write(f"**계약 유형:** {selected_row.get('계약유형', 'N/A')}")
-            with col2:
-                st.write(f"**담당자:** {selected_row.get('담당자', 'N/A')} ({selected_row.get('역할', 'N/A')})")
-                st.write(f"**시스템 버전:** {selected_row.get('시스템버전', '')}")
-                st.write(f"**브라우저:** {selected_row.get('브라우저', '')}")
-                st.write(f"**운영체제:** {selected_row.get('운영체제', '')}")
-                st.write(f"**날짜:** {selected_row.get('날짜', 'N/A')}")
-        
         # 실제 분석 결과 조회 시도
         try:
-            # MongoDB에서 실제 분석 결과 조회 시도
-            actual_analysis = None
+            fragments = None
             
-            # MongoDB 연결이 되어 있는 경우 우선 시도
-            if st.session_state.get('mongodb_connected') and st.session_state.get('mongo_handler'):
-                try:
-                    # 고객사명과 날짜를 기준으로 MongoDB에서 조회
-                    customer_name = selected_row.get('고객사명', '')
-                    inquiry_date = selected_row.get('날짜', '')
-                    user_name = selected_row.get('담당자', '')
-                    issue_type = selected_row.get('문의유형', '')
-                    
-                    # 날짜 형식 변환 (YYYY-MM-DD HH:MM:SS -> YYYY-MM-DD)
-                    if inquiry_date and ' ' in inquiry_date:
-                        inquiry_date = inquiry_date.split(' ')[0]
-                    
-                    # MongoDB에서 해당 문의의 실제 분석 결과 조회
-                    mongo_result = st.session_state.mongo_handler.get_analysis_by_criteria(
-                        customer_name=customer_name,
-                        issue_type=issue_type,
-                        user_name=user_name,
-                        date=inquiry_date
-                    )
-                    
-                    if mongo_result and mongo_result.get('success'):
-                        actual_analysis = mongo_result
-                        
-                except Exception as mongo_error:
-                    pass
+            # components가 초기화되었는지 확인
+            storage = (st.session_state.get('components') or {}).get('storage')
+            if storage is not None:
+                # 날짜 형식 변환 (YYYY-MM-DD HH:MM:SS -> YYYY-MM-DD)
+                inquiry_date = selected_row.get('날짜', '')
+                if inquiry_date and ' ' in inquiry_date:
+                    inquiry_date = inquiry_date.split(' ')[0]
+                
+                # 분석 ID로 렌더 캐시/문서 조회 (분석 ID가 없는 행만 고객사명/문의유형/담당자/날짜로 조회)
+                fragments = storage.get_analysis_fragments(
+                    analysis_id=selected_row.get('analysis_id'),
+                    customer_name=selected_row.get('고객사명', ''),
+                    issue_type=selected_row.get('문의유형', ''),
+                    user_name=selected_row.get('담당자', ''),
+                    date=inquiry_date
+                )
             
-            # MongoDB에서 조회 실패한 경우 로컬 데이터베이스로 폴백
-            if not actual_analysis:
-                try:
-                    # components가 초기화되었는지 확인
-                    if 'components' in st.session_state and 'multi_user_db' in st.session_state.components:
-                        # 고객사명과 날짜를 기준으로 실제 분석 결과 조회
-                        customer_name = selected_row.get('고객사명', '')
-                        inquiry_date = selected_row.get('날짜', '')
-                        
-                        # 날짜 형식 변환 (YYYY-MM-DD HH:MM:SS -> YYYY-MM-DD)
-                        if inquiry_date and ' ' in inquiry_date:
-                            inquiry_date = inquiry_date.split(' ')[0]
-                        
-                        # 실제 분석 결과 조회
-                        actual_analysis = st.session_state.components['multi_user_db'].get_analysis_by_customer_and_date(
-                            customer_name, inquiry_date
-                        )
-                        
-                except Exception as local_error:
-                    pass
+            # 선택된 데이터 정보 표시
+            with st.expander("📋 입력된 문의 정보", expanded=True):
+                col1, col2 = st.columns(2)
+                if fragments:
+                    col1.markdown(fragments['inquiry_left'])
+                    col2.markdown(fragments['inquiry_right'])
+                else:
+                    with col1:
+                        st.write(f"**고객사명:** {selected_row.get('고객사명', '')}")
+                        st.write(f"**우선순위:** {selected_row.get('우선순위', 'N/A')}")
+                    with col2:
+                        st.write(f"**담당자:** {selected_row.get('담당자', 'N/A')} ({selected_row.get('역할', 'N/A')})")
+                        st.write(f"**날짜:** {selected_row.get('날짜', 'N/A')}")
             
             # AI 분석 결과 표시 (실제 데이터가 있든 없든 기본 정보는 표시)
             st.markdown("---")
             
-            # 문제 유형 분류와 시나리오 매칭 섹션 삭제
-            
-            if actual_analysis:
-                # MongoDB에서 가져온 데이터인지 로컬 데이터베이스에서 가져온 데이터인지 확인
-                if actual_analysis.get('source') == 'mongodb':
-                    # MongoDB에서 가져온 데이터
-                    analysis_data = actual_analysis.get('data', {})
-                    # full_analysis_result에서 전체 AI 분석 데이터 추출
-                    full_result = analysis_data.get('full_analysis_result', {})
-                else:
-                    # 로컬 데이터베이스에서 가져온 데이터
-                    analysis_data = actual_analysis.get('data', {})
-                    full_result = analysis_data.get('full_analysis_result', {})
+            if fragments:
+                col5, col6 = st.columns(2)
                 
-                # 데이터가 성공적으로 로드되었는지 확인
-                if analysis_data:
-                    
-                    col5, col6 = st.columns(2)
-                    
-                    with col5:
-                        st.markdown("#### 📝 요약")
-                        summary = analysis_data.get('summary', '')
-                        if summary:
-                            st.write(summary)
-                        else:
-                            st.write("해당 문의에 대한 AI 분석 요약이 없습니다.")
-                        
-                        st.markdown("#### 🔧 조치 흐름")
-                        action_flow = analysis_data.get('action_flow', '')
-                        if action_flow:
-                            # 조치 흐름에 줄바꿈 적용 (더 효과적인 줄바꿈 처리)
-                            action_flow_content = action_flow
-                            # 연속된 공백을 하나로 통일
-                            action_flow_content = ' '.join(action_flow_content.split())
-                            # 번호가 있는 항목을 줄바꿈으로 구분 (더 정교한 처리)
-                            action_flow_content = re.sub(r'(\d+\.)', r'\n\1', action_flow_content)
-                            # 첫 번째 줄바꿈 제거
-                            action_flow_content = action_flow_content.lstrip('\n')
-                            st.write(action_flow_content)
-                        else:
-                            st.warning("⚠️ 조치 흐름 정보가 없습니다.")
+                with col5:
+                    st.markdown("#### 📝 요약")
+                    st.write(fragments['summary'] or "해당 문의에 대한 AI 분석 요약이 없습니다.")
                     
-                    with col6:
-                        st.markdown("#### 📧 이메일 초안")
-                        
-                        # original_ai_response에서 이메일 초안을 직접 추출하여 표시
-                        email_content = None
-                        
-                        # 1. 파싱된 email_draft 사용 (우선순위 1) - DB에 저장된 정확한 이메일 초안
-                        email_draft = analysis_data.get('email_draft', '')
-                        if email_draft and len(email_draft.strip()) > 20:
-                            email_content = email_draft
-                        
-                        # 2. original_ai_response에서 이메일 초안 추출 (우선순위 2)
-                        if not email_content and analysis_data.get('original_ai_response'):
-                            email_content = extract_email_from_original_response(analysis_data['original_ai_response'])
-                        
-                        # 3. full_analysis_result에서 이메일 초안 추출 (우선순위 3)
-                        if not email_content and analysis_data.get('full_analysis_result'):
-                            email_content = extract_email_from_analysis_result(analysis_data['full_analysis_result'])
-                        
-                        # 4. 기본 이메일 템플릿 (최후 수단)
-                        if not email_content:
-                            email_content = f"""제목: {selected_row.get('문의유형', '문의')} 답변
-
-                            고객님 안녕하세요.
-
-                            {selected_row.get('문의유형', '문의')}에 대한 문의 주셔서 감사합니다.
-
-                            현재 상황을 분석한 결과, 추가 정보가 필요한 상황입니다.
-
-                            **필요한 정보:**
-                            1. 구체적인 오류 메시지
-                            2. 발생 시점 및 빈도
-                            3. 사용 환경 정보
-
-                            자세한 내용은 담당 엔지니어가 확인 후 답변 드리겠습니다.
-
-                            추가 문의사항이 있으시면 언제든 연락 주세요.
-
-                            감사합니다."""
-                        
-                        # 이메일 초안을 Streamlit 기본 스타일로 표시
-                        st.markdown("**이메일 내용**")
-                        email_content = (analysis_data.get('email_draft') or '').replace('\n', '\n\n')
-                        st.text_area("이메일 내용", email_content, height=350, key="email_content_modal")
-                        
-
+                    st.markdown("#### 🔧 조치 흐름")
+                    if fragments['action_flow']:
+                        st.write(fragments['action_flow'])
+                    else:
+                        st.warning("⚠️ 조치 흐름 정보가 없습니다.")
+                
+                with col6:
+                    st.markdown("#### 📧 이메일 초안")
                     
-                else:
-                    # 데이터가 비어있는 경우
-                    st.warning("⚠️ 분석 데이터가 비어있습니다.")
+                    # 이메일 초안을 Streamlit 기본 스타일로 표시
+                    st.markdown("**이메일 내용**")
+                    st.text_area("이메일 내용", fragments['email'], height=350, key="email_content_modal")
             else:
                 # 실제 분석 결과가 없는 경우에도 기본 정보 표시
                 st.warning("⚠️ 해당 문의의 실제 AI 분석 결과를 찾을 수 없습니다.")
@@ -907,6 +779,19 @@ def init_session_state():
         st.session_state.current_page = 1
     if 'items_per_page' not in st.session_state:
         st.session_state.items_per_page = 5  # 고정값 5개
+    # 커서 기반 이력 조회 상태 (검색 조건, 다음 페이지 커서)
+    if 'history_query' not in st.session_state:
+        st.session_state.history_query = None
+    if 'history_next_cursor' not in st.session_state:
+        st.session_state.history_next_cursor = None
+    if 'history_has_more' not in st.session_state:
+        st.session_state.history_has_more = False
+    if 'history_source' not in st.session_state:
+        st.session_state.history_source = None
+    if 'history_rows' not in st.session_state:
+        st.session_state.history_rows = None
+    if 'history_feed_version' not in st.session_state:
+        st.session_state.history_feed_version = None
 
     if 'system_prompt' not in st.session_state:
         st.session_state.system_prompt = """[고객 문의 내용]
@@ -958,13 +843,102 @@ def get_paginated_data(df, page, items_per_page):
     
     return df.iloc[start_idx:end_idx], total_pages, total_items
 
-def render_pagination_controls(current_page, total_pages, total_items, items_per_page, prefix=""):
-    """페이지네이션 컨트롤을 렌더링하는 함수"""
-    if total_pages <= 1:
+HISTORY_BATCH_SIZE = 50  # 이력 조회 1회당 불러오는 건수
+HISTORY_HIDDEN_COLUMNS = {"analysis_id": None}  # 상세보기 조회용 키 (표에는 표시하지 않음)
+
+def fetch_history_page(query, cursor=None, source=None):
+    """
+    이력 한 페이지 조회 (저장소 라우터: MongoDB 우선, 장애 시 로컬 데이터베이스) - data는 HistoryRow 목록
+    첫 페이지는 최근 이력 피드(버퍼/조건별 캐시)로 구성할 수 있으면 저장소를 조회하지 않음
+    다음 페이지(cursor)는 첫 페이지를 조회한 저장소(source)에서 이어서 조회
+    """
+    components = st.session_state.get('components') or {}
+    storage = components.get('storage')
+    if storage is None:
+        return {"success": False, "data": [], "next_cursor": None, "has_more": False, "source": 'local'}
+    
+    feed = components.get('history_feed')
+    if cursor is None and feed is not None and feed.source == ('mongodb' if storage.mongo_available() else 'local'):
+        result = feed.page(query, HISTORY_BATCH_SIZE)
+        if result:
+            # 지연 저장 중인 최근 분석도 바로 보이도록
+            return storage.merge_recent_writes(query, result)
+    
+    result = storage.get_history_page(query, cursor=cursor, source=source, page_size=HISTORY_BATCH_SIZE)
+    if cursor is None and feed is not None and result.get('success'):
+        feed.remember_page(query, HISTORY_BATCH_SIZE, result)
+    return result
+
+def history_entries_to_rows(history_data, start_number=1):
+    """이력 항목(HistoryRow)을 데이터프레임 행으로 변환"""
+    return [HistoryRow.from_entry(entry).to_table_row(i) for i, entry in enumerate(history_data, start_number)]
+
+def load_more_history():
+    """다음 커서 페이지를 불러와 현재 검색 결과 뒤에 이어붙임"""
+    query = st.session_state.get('history_query')
+    cursor = st.session_state.get('history_next_cursor')
+    if query is None or not cursor:
+        return False
+    
+    result = fetch_history_page(query, cursor, source=st.session_state.get('history_source'))
+    # 조회 중 저장소가 바뀌면 커서가 맞지 않으므로 이어서 조회하지 않음
+    if result.get('source') != st.session_state.get('history_source'):
+        result = {"success": False}
+    if not result.get('success') or not result.get('data'):
+        st.session_state.history_has_more = False
+        return False
+    
+    df = st.session_state.history_search_results
+    start_number = len(df) + 1 if df is not None else 1
+    new_df = pd.DataFrame(history_entries_to_rows(result['data'], start_number))
+    st.session_state.history_search_results = new_df if df is None else pd.concat([df, new_df], ignore_index=True)
+    st.session_state.history_rows = (st.session_state.get('history_rows') or []) + list(result['data'])
+    st.session_state.history_next_cursor = result.get('next_cursor')
+    st.session_state.history_has_more = result.get('has_more', False)
+    return True
+
+def refresh_history_from_feed():
+    """검색 이후 최근 이력 피드에 들어온 변경을 현재 결과에 반영 (저장소 조회 없음, 반영된 새 이력 수 반환)"""
+    components = st.session_state.get('components') or {}
+    feed = components.get('history_feed')
+    since = st.session_state.get('history_feed_version')
+    query = st.session_state.get('history_query')
+    rows = st.session_state.get('history_rows')
+    if feed is None or since is None or query is None or rows is None or feed.version == since:
+        return 0
+    if feed.source != st.session_state.get('history_source'):
+        return 0
+    
+    changes = feed.changes_since(since)
+    if changes is None:
+        # 피드가 다시 채워져 변경 내역을 알 수 없음 - 다음 검색 때 반영
+        return 0
+    
+    added = []
+    for op, value in changes:
+        if op == 'insert' and matches_query(query, value):
+            rows = [row for row in rows if row.id != value.id]
+            added.append(value)
+        elif op == 'delete':
+            rows = [row for row in rows if row.id != value]
+        elif op == 'clear':
+            rows, added = [], []
+    
+    # 새 이력은 최신순으로 앞에 추가
+    rows = sorted(added, key=lambda row: row.timestamp, reverse=True) + rows
+    st.session_state.history_rows = rows
+    st.session_state.history_search_results = pd.DataFrame(history_entries_to_rows(rows)) if rows else None
+    st.session_state.history_feed_version = feed.version
+    return len(added)
+
+def render_pagination_controls(current_page, total_pages, total_items, items_per_page, prefix="", has_more=False):
+    """페이지네이션 컨트롤을 렌더링하는 함수 (has_more면 마지막 페이지에서 다음 이력을 이어서 조회)"""
+    if total_pages <= 1 and not has_more:
         return
     
     st.markdown("---")
-    st.markdown(f"**📄 페이지 {current_page} / {total_pages} (총 {total_items}건, 페이지당 {items_per_page}건)**")
+    total_label = f"{total_items}건 이상" if has_more else f"{total_items}건"
+    st.markdown(f"**📄 페이지 {current_page} / {total_pages} (총 {total_label}, 페이지당 {items_per_page}건)**")
     
     # 페이지 번호 범위 계산
     start_page = max(1, current_page - 2)
@@ -1000,10 +974,11 @@ def render_pagination_controls(current_page, total_pages, total_items, items_per
                 st.rerun()
         page_col_idx += 1
     
-    # 다음 페이지 버튼
+    # 다음 페이지 버튼 (불러온 마지막 페이지면 커서로 다음 이력 조회)
     with cols[page_col_idx]:
-        if st.button("▶", key=f"{prefix}next_page", disabled=current_page == total_pages):
-            st.session_state.current_page = current_page + 1
+        if st.button("▶", key=f"{prefix}next_page", disabled=current_page == total_pages and not has_more):
+            if current_page < total_pages or load_more_history():
+                st.session_state.current_page = current_page + 1
             st.rerun()
     
     # 마지막 페이지 버튼
@@ -1071,496 +1046,6 @@ def format_ai_response(ai_response: str) -> str:
     
     return formatted
 
-def extract_email_from_gpt_response(original_response: str) -> str:
-    """GPT 응답에서 이메일 초안을 추출 (GPT 전용)"""
-    if not original_response:
-        return ""
-    
-    try:
-        import re
-        
-        
-        # GPT 응답 패턴 1: "- 이메일 초안:" 다음에 ```로 감싸진 내용
-        gpt_pattern1 = r'- 이메일\s*초안[:\s]*\n```\n(.*?)\n```'
-        match = re.search(gpt_pattern1, original_response, re.DOTALL)
-        if match:
-            email_content = match.group(1).strip()
-            if len(email_content) > 50:
-                return email_content
-        
-        # GPT 응답 패턴 2: "- 이메일 초안:" 다음에 이메일 내용 (``` 없이, 더 포괄적)
-        gpt_pattern2 = r'- 이메일\s*초안[:\s]*\n(.*?)(?=\n\n|\n- |\n\[|\n※|\Z)'
-        match = re.search(gpt_pattern2, original_response, re.DOTALL)
-        if match:
-            email_content = match.group(1).strip()
-            if len(email_content) > 50 and ('감사합니다' in email_content or '안녕하세요' in email_content):
-                return email_content
-        
-        # GPT 응답 패턴 3: "- 이메일 초안:" 다음에 이메일 내용 (더 유연한 종료 조건)
-        gpt_pattern3 = r'- 이메일\s*초안[:\s]*\n(.*?)(?=\n\n- |\n\[|\n※|\Z)'
-        match = re.search(gpt_pattern3, original_response, re.DOTALL)
-        if match:
-            email_content = match.group(1).strip()
-            if len(email_content) > 50 and ('감사합니다' in email_content or '안녕하세요' in email_content):
-                return email_content
-        
-        # GPT 응답 패턴 4: "- 이메일 초안:" 다음에 이메일 내용 (가장 포괄적)
-        gpt_pattern4 = r'- 이메일\s*초안[:\s]*\n(.*?)(?=\n- |\n\[|\n※|\Z)'
-        match = re.search(gpt_pattern4, original_response, re.DOTALL)
-        if match:
-            email_content = match.group(1).strip()
-            if len(email_content) > 50 and ('감사합니다' in email_content or '안녕하세요' in email_content):
-                return email_content
-        
-        return ""
-        
-    except Exception as e:
-        print(f"GPT 이메일 추출 오류: {e}")
-        return ""
-
-def extract_email_from_gemini_response(original_response: str) -> str:
-    """GEMINI 응답에서 이메일 초안을 추출 (GEMINI 전용)"""
-    if not original_response:
-        return ""
-    
-    try:
-        import re
-        
-        
-        # GEMINI 응답 패턴: "이메일 초안:" 다음에 이메일 내용
-        gemini_pattern = r'이메일\s*초안[:\s]*\n\n(.*?)(?=\n\n|\n- |\n\[|\n※|\Z)'
-        match = re.search(gemini_pattern, original_response, re.DOTALL)
-        if match:
-            email_content = match.group(1).strip()
-            if len(email_content) > 50 and ('감사합니다' in email_content or '안녕하세요' in email_content):
-                return email_content
-        
-        # GEMINI 응답 패턴 2: "이메일 초안:" 다음에 이메일 내용 (빈 줄 없이)
-        gemini_pattern2 = r'이메일\s*초안[:\s]*\n(.*?)(?=\n\n|\n- |\n\[|\n※|\Z)'
-        match = re.search(gemini_pattern2, original_response, re.DOTALL)
-        if match:
-            email_content = match.group(1).strip()
-            if len(email_content) > 50 and ('감사합니다' in email_content or '안녕하세요' in email_content):
-                return email_content
-        
-        return ""
-        
-    except Exception as e:
-        print(f"GEMINI 이메일 추출 오류: {e}")
-        return ""
-
-def extract_email_from_original_response(original_response: str) -> str:
-    """원본 AI 응답에서 이메일 초안을 추출 (GPT/GEMINI 자동 감지)"""
-    if not original_response:
-        return ""
-    
-    try:
-        import re
-        
-        # GPT 응답인지 GEMINI 응답인지 감지
-        if '- 이메일 초안:' in original_response:
-            return extract_email_from_gpt_response(original_response)
-        elif '이메일 초안:' in original_response:
-            return extract_email_from_gemini_response(original_response)
-        else:
-            return ""
-        
-    except Exception as e:
-        print(f"이메일 추출 오류: {e}")
-        return ""
-
-def extract_email_from_analysis_result(analysis_result: dict) -> str:
-    """분석 결과에서 이메일 초안을 추출 (GPT/GEMINI 구분 처리)"""
-    try:
-        # ai_result에서 raw_response 추출
-        if 'ai_result' in analysis_result:
-            ai_result = analysis_result['ai_result']
-            
-            # GEMINI 결과에서 추출
-            if 'gemini_result' in ai_result and 'raw_response' in ai_result['gemini_result']:
-                return extract_email_from_gemini_response(ai_result['gemini_result']['raw_response'])
-            
-            # GPT 결과에서 추출 (openai_handler는 'response' 키 사용)
-            if 'response' in ai_result:
-                return extract_email_from_gpt_response(ai_result['response'])
-            
-            # 기존 gpt_result 형태도 지원
-            if 'gpt_result' in ai_result and 'raw_response' in ai_result['gpt_result']:
-                return extract_email_from_gpt_response(ai_result['gpt_result']['raw_response'])
-        
-        # 직접 gemini_result나 gpt_result가 있는 경우
-        if 'gemini_result' in analysis_result and 'raw_response' in analysis_result['gemini_result']:
-            return extract_email_from_gemini_response(analysis_result['gemini_result']['raw_response'])
-        
-        # GPT 응답이 직접 있는 경우 (openai_handler는 'response' 키 사용)
-        if 'response' in analysis_result:
-            return extract_email_from_gpt_response(analysis_result['response'])
-        
-        # 기존 gpt_result 형태도 지원
-        if 'gpt_result' in analysis_result and 'raw_response' in analysis_result['gpt_result']:
-            return extract_email_from_gpt_response(analysis_result['gpt_result']['raw_response'])
-        
-        return ""
-        
-    except Exception as e:
-        print(f"분석 결과에서 이메일 추출 오류: {e}")
-        return ""
-
-def _parse_gpt_response(response_text: str) -> dict:
-    """GPT API 응답을 파싱하여 구조화된 데이터로 변환"""
-    try:
-        parsed = {
-            'response_type': '해결안',
-            'summary': '',
-            'action_flow': '',
-            'email_draft': '',
-            'question': ''
-        }
-        
-        # 응답 텍스트를 줄 단위로 분리
-        lines = response_text.split('\n')
-        current_section = None
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line:
-                continue
-                
-            # 섹션 헤더 확인
-            if '[대응유형]' in line:
-                response_type = line.replace('[대응유형]', '').strip()
-                if response_type in ['해결안', '질문', '출동']:
-                    parsed['response_type'] = response_type
-            elif '[응답내용]' in line:
-                current_section = 'content'
-            elif '- 요약:' in line:
-                current_section = 'summary'
-                # 요약 내용이 같은 줄에 있는 경우
-                summary_content = line.replace('- 요약:', '').strip()
-                if summary_content:
-                    parsed['summary'] = summary_content
-                # 다음 줄에 요약 내용이 있는지 확인
-                if i + 1 < len(lines):
-                    next_line = lines[i + 1].strip()
-                    if next_line and not any(keyword in next_line for keyword in ['- 조치 흐름:', '- 이메일 초안:', '[응답내용]', '[대응유형]']):
-                        if parsed['summary']:
-                            parsed['summary'] += ' ' + next_line
-                        else:
-                            parsed['summary'] = next_line
-            elif '- 조치 흐름:' in line:
-                current_section = 'action_flow'
-            elif '- 이메일 초안:' in line:
-                current_section = 'email_draft'
-                # 이메일 초안 헤더 제거하고 내용이 있으면 바로 추가
-                email_content = line.replace('- 이메일 초안:', '').strip()
-                if email_content:
-                    parsed['email_draft'] += email_content + '\n'
-                # ```로 시작하는 경우 다음 줄부터 이메일 내용으로 처리
-                if i + 1 < len(lines):
-                    next_line = lines[i + 1].strip()
-                    if next_line.startswith('```'):
-                        # ``` 다음 줄부터 이메일 내용 시작
-                        for j in range(i + 2, len(lines)):
-                            content_line = lines[j].strip()
-                            if content_line == '```':
-                                break
-                            parsed['email_draft'] += content_line + '\n'
-            elif line.startswith('1.') or line.startswith('2.') or line.startswith('3.') or line.startswith('4.') or line.startswith('5.'):
-                # 조치 흐름 항목
-                if current_section == 'action_flow':
-                    parsed['action_flow'] += line + '\n'
-            elif current_section == 'summary':
-                if parsed['summary']:  # 이미 내용이 있으면 공백 추가
-                    parsed['summary'] += ' ' + line
-                else:
-                    parsed['summary'] = line
-            elif current_section == 'action_flow':
-                # 조치 흐름에서 불필요한 텍스트 제거
-                if not any(unwanted in line for unwanted in [
-                    '[응답내용]', '[대응유형]', '- 요약:', '- 조치 흐름:', '- 이메일 초안:',
-                    '아래 형식을 참고하여', '실무자가 이해하기 쉽도록', '자연스럽고 정확하게 응답을 생성하십시오'
-                ]):
-                    parsed['action_flow'] += line + '\n'
-            elif current_section == 'email_draft':
-                # 이메일 초안 내용 추가 (불필요한 텍스트만 제거)
-                if not any(unwanted in line for unwanted in [
-                    '[응답내용]', '[대응유형]', '- 요약:', '- 조치 흐름:', '- 이메일 초안:',
-                    '아래 형식을 참고하여', '실무자가 이해하기 쉽도록', '자연스럽고 정확하게 응답을 생성하십시오'
-                ]):
-                    # 이메일 초안 내용을 그대로 추가
-                    parsed['email_draft'] += line + '\n'
-        
-        # 요약에서 "- 요약:" 제거 (혹시 남아있을 경우)
-        parsed['summary'] = parsed['summary'].replace('- 요약:', '').strip()
-        
-        # 이메일 초안을 GPT 전용 함수로 다시 추출하여 정확성 보장
-        # 항상 원본 응답에서 이메일 초안을 다시 추출 (기존 파싱 결과 무시)
-        extracted_email = extract_email_from_gpt_response(response_text)
-        if extracted_email:
-            parsed['email_draft'] = extracted_email
-            print(f"✅ GPT 파싱 - 이메일 초안 재추출 성공: {len(extracted_email)}자")
-        else:
-            print("⚠️ GPT 파싱 - 이메일 초안 재추출 실패, 기존 파싱 결과 사용")
-        
-        # 디버깅을 위한 로그 추가
-        print(f"GPT 파싱 결과 - 요약: {parsed['summary'][:50]}...")
-        print(f"GPT 파싱 결과 - 조치 흐름: {parsed['action_flow'][:50]}...")
-        print(f"GPT 파싱 결과 - 이메일 초안: {parsed['email_draft'][:50]}...")
-        
-        return parsed
-        
-    except Exception as e:
-        print(f"GPT 응답 파싱 오류: {e}")
-        return {
-            'response_type': '해결안',
-            'summary': '응답 파싱 중 오류가 발생했습니다.',
-            'action_flow': '응답을 확인해주세요.',
-            'email_draft': '응답을 확인해주세요.',
-            'question': ''
-        }
-
-def _parse_gemini_response(response_text: str) -> dict:
-    """GEMINI API 응답을 파싱하여 구조화된 데이터로 변환"""
-    try:
-        parsed = {
-            'response_type': '해결안',
-            'summary': '',
-            'action_flow': '',
-            'email_draft': '',
-            'question': ''
-        }
-        
-        # 응답 텍스트를 줄 단위로 분리
-        lines = response_text.split('\n')
-        current_section = None
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line:
-                continue
-                
-            # 섹션 헤더 확인 (GEMINI 형식)
-            if '[대응유형]' in line:
-                response_type = line.replace('[대응유형]', '').strip()
-                if response_type in ['해결안', '질문', '출동']:
-                    parsed['response_type'] = response_type
-            elif '[응답내용]' in line:
-                current_section = 'content'
-            elif '요약:' in line:
-                current_section = 'summary'
-                # 요약 내용이 같은 줄에 있는 경우
-                summary_content = line.replace('요약:', '').strip()
-                if summary_content:
-                    parsed['summary'] = summary_content
-                # 다음 줄에 요약 내용이 있는지 확인
-                if i + 1 < len(lines):
-                    next_line = lines[i + 1].strip()
-                    if next_line and not any(keyword in next_line for keyword in ['조치 흐름:', '이메일 초안:', '[응답내용]', '[대응유형]']):
-                        if parsed['summary']:
-                            parsed['summary'] += ' ' + next_line
-                        else:
-                            parsed['summary'] = next_line
-            elif '조치 흐름:' in line:
-                current_section = 'action_flow'
-            elif '이메일 초안:' in line:
-                current_section = 'email_draft'
-                # 이메일 초안 헤더 제거하고 내용이 있으면 바로 추가
-                email_content = line.replace('이메일 초안:', '').strip()
-                if email_content:
-                    parsed['email_draft'] += email_content + '\n'
-            elif line.startswith('1.') or line.startswith('2.') or line.startswith('3.') or line.startswith('4.') or line.startswith('5.'):
-                # 조치 흐름 항목
-                if current_section == 'action_flow':
-                    parsed['action_flow'] += line + '\n'
-            elif current_section == 'summary':
-                if parsed['summary']:  # 이미 내용이 있으면 공백 추가
-                    parsed['summary'] += ' ' + line
-                else:
-                    parsed['summary'] = line
-            elif current_section == 'action_flow':
-                # 조치 흐름에서 불필요한 텍스트 제거
-                if not any(unwanted in line for unwanted in [
-                    '[응답내용]', '[대응유형]', '요약:', '조치 흐름:', '이메일 초안:',
-                    '아래 형식을 참고하여', '실무자가 이해하기 쉽도록', '자연스럽고 정확하게 응답을 생성하십시오'
-                ]):
-                    parsed['action_flow'] += line + '\n'
-            elif current_section == 'email_draft':
-                # 이메일 초안 내용 추가 (불필요한 텍스트만 제거)
-                if not any(unwanted in line for unwanted in [
-                    '[응답내용]', '[대응유형]', '요약:', '조치 흐름:', '이메일 초안:',
-                    '아래 형식을 참고하여', '실무자가 이해하기 쉽도록', '자연스럽고 정확하게 응답을 생성하십시오'
-                ]):
-                    # 이메일 초안 내용을 그대로 추가
-                    parsed['email_draft'] += line + '\n'
-        
-        # 요약에서 "요약:" 제거 (혹시 남아있을 경우)
-        parsed['summary'] = parsed['summary'].replace('요약:', '').strip()
-        
-        # 이메일 초안을 GEMINI 전용 함수로 다시 추출하여 정확성 보장
-        # GEMINI 파싱에서는 이미 파싱된 email_draft를 그대로 사용 (재추출 불필요)
-        print(f"✅ GEMINI 파싱 - 파싱된 email_draft 사용: {len(parsed['email_draft'])}자")
-        
-        # 디버깅을 위한 로그 추가
-        print(f"GEMINI 파싱 결과 - 요약: {parsed['summary'][:50]}...")
-        print(f"GEMINI 파싱 결과 - 조치 흐름: {parsed['action_flow'][:50]}...")
-        print(f"GEMINI 파싱 결과 - 이메일 초안: {parsed['email_draft'][:50]}...")
-        
-        return parsed
-        
-    except Exception as e:
-        print(f"GEMINI 응답 파싱 오류: {e}")
-        return {
-            'response_type': '해결안',
-            'summary': '응답 파싱 중 오류가 발생했습니다.',
-            'action_flow': '응답을 확인해주세요.',
-            'email_draft': '응답을 확인해주세요.',
-            'question': ''
-        }
-
-def _format_email_content(email_content: str) -> str:
-    """이메일 내용을 자연스러운 형태로 포맷팅"""
-    try:
-        # 제목 분리
-        if '제목:' in email_content:
-            parts = email_content.split('제목:', 1)
-            if len(parts) == 2:
-                title_and_body = parts[1].strip()
-                
-                # 제목과 본문 분리 - "고객님 안녕하세요"를 찾아서 분리
-                if '고객님 안녕하세요' in title_and_body:
-                    title_part = title_and_body.split('고객님 안녕하세요')[0].strip()
-                    body_part = '고객님 안녕하세요' + title_and_body.split('고객님 안녕하세요')[1]
-                    
-                    # 자연스러운 단락 구분을 위한 키워드 기반 줄바꿈
-                    formatted_body = _format_email_body(body_part)
-                    
-                    # 최종 이메일 형식
-                    formatted_email = f"제목: {title_part}\n\n{formatted_body}\n\n감사합니다."
-                    return formatted_email
-                else:
-                    # 첫 번째 문장이 제목 (기존 로직)
-                    sentences = title_and_body.split('. ')
-                    if len(sentences) > 0:
-                        title = sentences[0].strip()
-                        body_sentences = sentences[1:] if len(sentences) > 1 else []
-                        
-                        # 본문 재구성
-                        body = '. '.join(body_sentences).strip()
-                        
-                        # 자연스러운 단락 구분을 위한 키워드 기반 줄바꿈
-                        formatted_body = _format_email_body(body)
-                        
-                        # 최종 이메일 형식
-                        formatted_email = f"제목: {title}\n\n고객님 안녕하세요.\n\n{formatted_body}\n\n감사합니다."
-                        return formatted_email
-        
-        # 제목이 없는 경우 기본 처리
-        return _format_email_body(email_content)
-        
-    except Exception as e:
-        print(f"이메일 포맷팅 오류: {e}")
-        # 기본 문장 단위 줄바꿈으로 폴백
-        return email_content.replace('. ', '.\n')
-
-def _format_email_body(body_text: str) -> str:
-    """이메일 본문을 자연스러운 단락으로 구분"""
-    # 특정 패턴을 기준으로 단락 구분
-    paragraph_patterns = [
-        ('먼저', '먼저'),
-        ('만약', '만약'),
-        ('비밀번호가 다를 경우', '비밀번호 변경 후'),
-        ('비밀번호 변경 후', '문제가 지속될 경우'),
-        ('문제가 해결되지', '문제가 해결되지')
-    ]
-    
-    # 각 패턴에 따라 단락 구분
-    result = body_text
-    
-    # "먼저"로 시작하는 부분을 첫 번째 단락으로
-    if '먼저' in result:
-        before_first = result.split('먼저')[0].strip()
-        after_first = '먼저' + result.split('먼저')[1]
-        
-        # "비밀번호 변경 후" 또는 "만약"으로 두 번째 단락 구분
-        if '비밀번호 변경 후' in after_first:
-            first_para = after_first.split('비밀번호 변경 후')[0].strip()
-            second_para_start = '비밀번호 변경 후' + after_first.split('비밀번호 변경 후')[1]
-            
-            # "문제가 해결되지"로 세 번째 단락 구분
-            if '문제가 해결되지' in second_para_start:
-                second_para = second_para_start.split('문제가 해결되지')[0].strip()
-                third_para = '문제가 해결되지' + second_para_start.split('문제가 해결되지')[1].strip()
-                
-                # 감사합니다 제거 (별도로 추가됨)
-                third_para = third_para.replace('감사합니다.', '').strip()
-                
-                result = f"{before_first}\n\n{first_para}\n\n{second_para}\n\n{third_para}"
-            else:
-                result = f"{before_first}\n\n{first_para}\n\n{second_para_start}"
-        elif '만약' in after_first:
-            first_para = after_first.split('만약')[0].strip()
-            second_para_start = '만약' + after_first.split('만약')[1]
-            
-            # "문제가 해결되지"로 세 번째 단락 구분
-            if '문제가 해결되지' in second_para_start:
-                second_para = second_para_start.split('문제가 해결되지')[0].strip()
-                third_para = '문제가 해결되지' + second_para_start.split('문제가 해결되지')[1].strip()
-                
-                # 감사합니다 제거 (별도로 추가됨)
-                third_para = third_para.replace('감사합니다.', '').strip()
-                # 띄어쓰기 수정
-                third_para = third_para.replace('문제가 해결되지않을', '문제가 해결되지 않을')
-                
-                result = f"{before_first}\n\n{first_para}\n\n{second_para}\n\n{third_para}"
-            else:
-                result = f"{before_first}\n\n{first_para}\n\n{second_para_start}"
-    
-    # 감사합니다 제거 및 띄어쓰기 정리
-    result = result.replace('감사합니다.', '').strip()
-    result = result.replace('문제가 해결되지않을', '문제가 해결되지 않을')
-    
-    return result
-
-def _add_natural_line_breaks(text: str) -> str:
-    """텍스트에 자연스러운 줄바꿈 추가"""
-    # 키워드 기반 단락 구분 (더 구체적으로)
-    paragraph_keywords = [
-        '먼저', '만약', '만일', '비밀번호 변경 후', '위 조치 후', '문제가 해결되지'
-    ]
-    
-    # 문장별로 분리
-    sentences = text.split('. ')
-    formatted_sentences = []
-    
-    for i, sentence in enumerate(sentences):
-        sentence = sentence.strip()
-        if not sentence:
-            continue
-            
-        # 마지막 문장이 아니면 마침표 추가
-        if i < len(sentences) - 1 and not sentence.endswith('.'):
-            sentence += '.'
-            
-        # 단락 시작 키워드 확인
-        should_add_paragraph = any(sentence.startswith(keyword) for keyword in paragraph_keywords)
-        
-        if should_add_paragraph and formatted_sentences:
-            # 이전 문장 끝에 추가 줄바꿈 (두 줄바꿈으로 단락 구분)
-            formatted_sentences.append('\n\n' + sentence)
-        else:
-            formatted_sentences.append(sentence)
-    
-    # 문장들을 연결
-    result = ' '.join(formatted_sentences)
-    
-    # 연속된 공백 정리
-    result = ' '.join(result.split())
-    
-    # 단락 구분 줄바꿈 복원
-    result = result.replace(' \n\n', '\n\n')
-    
-    return result
-
 # 컴포넌트 초기화
 def init_components():
     """컴포넌트 초기화"""
@@ -1615,7 +1100,8 @@ def init_components():
             print(f"⚠️ FAISS 벡터 분류기 초기화 실패, 기본 분류기 사용: {e}")
             classifier = IssueClassifier(api_key=api_key)
         
-        scenario_db = ScenarioDB()
+        # 시나리오 저장소 (프로세스 공용, 원본 파일이 바뀌면 백그라운드에서 다시 읽어 교체)
+        scenario_store = get_scenario_store()
         vector_search = VectorSearchWrapper()
         
         # Gemini 핸들러들 초기화
@@ -1661,13 +1147,35 @@ def init_components():
         history_db = HistoryDB()
         multi_user_db = MultiUserHistoryDB()
         
-        # MongoDB 핸들러를 multi_user_db에 연결
-        if st.session_state.get('mongo_handler') and st.session_state.mongo_handler.is_connected():
-            multi_user_db.set_mongo_handler(st.session_state.mongo_handler)
+        mongo_handler = None
+        if st.session_state.get('mongodb_connected') and st.session_state.get('mongo_handler'):
+            mongo_handler = st.session_state.mongo_handler
+        
+        # 저장소 라우터 (MongoDB 우선, 장애 시 로컬 저장 후 복구되면 반영 - 프로세스 공용)
+        spool_dir = tempfile.gettempdir() if multi_user_db.is_cloud else multi_user_db.data_dir
+        storage = get_storage_router(os.path.join(spool_dir, "storage_reconcile.jsonl"))
+        # 이력 상세보기 렌더 캐시 (저장 시 만든 표시 조각을 분석 ID로 조회)
+        render_cache = get_render_cache(os.path.join(spool_dir, "render_cache.sqlite3"))
+        storage.attach(mongo_handler=mongo_handler, local_db=multi_user_db, render_cache=render_cache)
+        
+        # 분석 결과 지연 저장 큐 (프로세스 공용 워커)
+        write_behind = get_write_behind_queue(os.path.join(spool_dir, "analysis_spool.jsonl"))
+        write_behind.attach(storage)
+        
+        # SMS 발송 큐 (프로세스 공용 디스패처, 발송 핸들러는 API 키가 있을 때 연결 - 메시지는 요청한 계정으로만 발송)
+        sms_queue = get_sms_queue(os.path.join(spool_dir, "sms_queue.sqlite3"))
+        if solapi_handler.api_key and solapi_handler.api_secret:
+            sms_queue.attach(get_solapi_handler(solapi_handler.api_key, solapi_handler.api_secret), default=True)
+        
+        # 최근 이력 피드 (프로세스 공용, MongoDB 변경 스트림 또는 로컬 이력 저널 구독)
+        history_feed = start_history_feed(
+            mongo_handler=mongo_handler, local_db=multi_user_db,
+            capacity=int(get_secret("HISTORY_FEED_CAPACITY", 500))
+        )
         
         return {
             'classifier': classifier,
-            'scenario_db': scenario_db,
+            'scenario_store': scenario_store,
             'vector_search': vector_search,
             'gemini_1_5_pro': gemini_1_5_pro,
             'gemini_1_5_flash': gemini_1_5_flash,
@@ -1675,8 +1183,12 @@ def init_components():
             'gemini_2_0_flash': gemini_2_0_flash,
             'openai_handler': openai_handler,
             'solapi_handler': solapi_handler,
+            'sms_queue': sms_queue,
             'history_db': history_db,
-            'multi_user_db': multi_user_db
+            'multi_user_db': multi_user_db,
+            'storage': storage,
+            'write_behind': write_behind,
+            'history_feed': history_feed
         }
     except Exception as e:
         st.error(f"❌ 컴포넌트 초기화 실패: {str(e)}")
@@ -1848,9 +1360,17 @@ with tab1:
                     
                     # 2. 시나리오 조회
                     with st.spinner("2단계: 시나리오 조회 중..."):
-                        scenarios = components['scenario_db'].get_scenarios_by_issue_type(issue_type)
-                        best_scenario = components['scenario_db'].find_best_scenario(issue_type, inquiry_content)
+                        # 분석 도중 시나리오가 갱신되어도 한 버전만 사용
+                        scenario_db = components['scenario_store'].current()
+                        scenarios = scenario_db.get_scenarios_by_issue_type(issue_type)
+                        best_scenario = scenario_db.find_best_scenario(issue_type, inquiry_content)
+                        # 결정 그래프로 조건 평가 (해결책이 하나로 정해지면 그 시나리오 사용)
+                        decision = scenario_db.route(issue_type, inquiry_content)
+                        if decision['decided']:
+                            best_scenario = scenarios[decision['solution']['position']]
                         st.success(f"✅ 시나리오 조회 완료: {len(scenarios)}개 시나리오 발견")
+                        if decision['next_question']:
+                            st.info(f"💡 추가 확인 질문: {decision['next_question']['text']}")
                     
                     # 3. 유사 사례 검색
                     with st.spinner("3단계: 유사 사례 검색 중..."):
@@ -1859,7 +1379,7 @@ with tab1:
                     
                     # 4. 매뉴얼 참조 조회
                     with st.spinner("4단계: 매뉴얼 참조 조회 중..."):
-                        manual_ref = components['scenario_db'].get_manual_reference(issue_type)
+                        manual_ref = scenario_db.get_manual_reference(issue_type)
                         st.success("✅ 매뉴얼 참조 조회 완료")
                     
                     # 5. AI 응답 생성 (피드백 기반 프롬프트 개선)
@@ -1879,7 +1399,14 @@ with tab1:
                         ai_result = None
                         selected_model = st.session_state.get('ai_model', 'Gemini 1.5 Pro')
                         
-                        if 'GPT' in selected_model:
+                        # 결정 그래프 평가 결과는 AI 프롬프트의 조건에 힌트로 표시
+                        condition_1, condition_2 = hinted_conditions(decision, best_scenario)
+                        
+                        if decision['deterministic'] and str(get_secret("DETERMINISTIC_ROUTING", "false")).lower() == "true":
+                            # 시나리오 조건으로 해결책이 정해진 경우 AI 호출 없이 응답 구성
+                            ai_result = build_ai_result(decision, inquiry_content, manual_ref)
+                            st.success(f"✅ 시나리오 결정 그래프로 응답 생성 완료 (AI 호출 생략) ({time.time() - start_time:.2f}초)")
+                        elif 'GPT' in selected_model:
                             # GPT API 사용
                             api_key_available = get_secret("OPENAI_API_KEY")
                             if api_key_available:
@@ -1906,10 +1433,13 @@ with tab1:
                                 ai_result = components['openai_handler'].generate_response(
                                     customer_input=inquiry_content,
                                     issue_type=issue_type,
-                                    condition_1=best_scenario.get('condition_1', '') if best_scenario else '',
-                                    condition_2=best_scenario.get('condition_2', '') if best_scenario else '',
+                                    condition_1=condition_1,
+                                    condition_2=condition_2,
                                     model=gpt_model
                                 )
+                                if ai_result.get('response') and 'parsed_response' not in ai_result:
+                                    # 텍스트 형식 응답은 여기서 한 번만 파싱 (구조화 출력은 핸들러에서 파싱됨)
+                                    ai_result['parsed_response'] = parse_response(ai_result['response'])
                                 
                                 elapsed_time = time.time() - start_time
                                 if ai_result["success"]:
@@ -1963,8 +1493,8 @@ with tab1:
                                 ai_result = gemini_handler.generate_complete_response(
                                     customer_input=inquiry_content,
                                     issue_type=issue_type,
-                                    condition_1=best_scenario.get('condition_1', '') if best_scenario else '',
-                                    condition_2=best_scenario.get('condition_2', '') if best_scenario else ''
+                                    condition_1=condition_1,
+                                    condition_2=condition_2
                                 )
                                 
                                 elapsed_time = time.time() - start_time
@@ -1995,8 +1525,13 @@ with tab1:
                         'issue_type': issue_type,
                         'scenarios': scenarios,
                         'best_scenario': best_scenario,
+                        'scenario_version': scenario_db.version,
+                        'routing': decision,
                         'similar_cases': similar_cases,
                         'ai_result': ai_result,
+                        # 응답은 여기까지 한 번만 파싱하고 저장/표시에서는 이 결과를 그대로 사용
+                        # (파싱 결과가 없으면 빈 응답의 기본 안내 문구)
+                        'parsed_response': get_parsed_response(ai_result) or parse_response(''),
                         'timestamp': get_safe_timestamp()
                     }
                     
@@ -2038,71 +1573,27 @@ with tab1:
                         inquiry_data_with_user = st.session_state.inquiry_data.copy()
                         inquiry_data_with_user['user_email'] = f"{st.session_state.contact_name}_{st.session_state.role}@privkeeper.com"
                         
-                        # MongoDB 연결 상태 확인
-                        if st.session_state.get('mongodb_connected') and st.session_state.get('mongo_handler'):
-                            # MongoDB에 저장하기 전에 데이터 구조 확인 및 정리
-                            # analysis_result에서 파싱된 데이터 추출
-                            parsed_data = None
-                            if 'ai_result' in analysis_result:
-                                ai_result = analysis_result['ai_result']
-                                
-                            if 'gemini_result' in ai_result and 'parsed_response' in ai_result['gemini_result']:
-                                # GEMINI 응답인 경우
-                                parsed_data = ai_result['gemini_result']['parsed_response']
-                            elif 'gemini_result' in ai_result and 'raw_response' in ai_result['gemini_result']:
-                                # GEMINI raw_response인 경우 파싱
-                                parsed_data = _parse_gemini_response(ai_result['gemini_result']['raw_response'])
-                            elif 'parsed_response' in ai_result:
-                                # 기존 파싱된 응답
-                                parsed_data = ai_result['parsed_response']
-                            elif 'response' in ai_result:
-                                # GPT API 응답인 경우 파싱
-                                parsed_data = _parse_gpt_response(ai_result['response'])
-                            
-                            # 파싱된 데이터를 analysis_result에 명시적으로 포함
-                            if parsed_data:
-                                analysis_result['parsed_response'] = parsed_data
-                            else:
-                                # 파싱된 데이터가 없는 경우 기본값 설정
-                                analysis_result['parsed_response'] = {
-                                    'response_type': '해결안',
-                                    'summary': 'AI 분석 결과를 파싱할 수 없습니다.',
-                                    'action_flow': 'AI 분석 결과를 파싱할 수 없습니다.',
-                                    'email_draft': 'AI 분석 결과를 파싱할 수 없습니다.'
-                                }
-                            
-                            # result 변수 초기화
-                            result = {'success': True, 'ai_result': analysis_result}
-                            
-                            # MongoDB에 저장
-                            mongo_result = st.session_state.mongo_handler.save_analysis(analysis_result, inquiry_data_with_user)
-                            
-                            if mongo_result.get('success'):
-                                # MongoDB 저장 성공 - ID를 result에 설정
-                                result['id'] = mongo_result.get('id')
-                                print(f"✅ MongoDB 저장 성공 - Analysis ID: {result['id']}")
-                            else:
-                                st.warning(f"⚠️ MongoDB 저장 실패: {mongo_result.get('error', '알 수 없는 오류')}")
-                                # 로컬 백업 저장 시도
-                                save_result = components['multi_user_db'].save_analysis(analysis_result, inquiry_data_with_user)
-                                if save_result.get('success'):
-                                    result['id'] = save_result.get('id')
-                                    st.info("📋 로컬 백업 저장소에 저장되었습니다.")
-                                    print(f"✅ 로컬 백업 저장 성공 - Analysis ID: {result['id']}")
-                                else:
-                                    st.error("❌ 로컬 백업 저장도 실패했습니다.")
-                        else:
-                            # result 변수 초기화
-                            result = {'success': True, 'ai_result': analysis_result}
-                            
+                        # MongoDB 연결 상태 확인 (장애 중이면 서킷이 열려 있어 바로 로컬로 저장)
+                        if not components['storage'].mongo_available():
                             # MongoDB 연결 실패 시 로컬 저장
                             st.warning("⚠️ MongoDB 연결 실패 - 로컬 저장소에 저장합니다.")
-                            save_result = components['multi_user_db'].save_analysis(analysis_result, inquiry_data_with_user)
-                            
+                        
+                        # result 변수 초기화
+                        result = {'success': True, 'ai_result': analysis_result}
+                        
+                        # 저장은 백그라운드 큐에서 처리 (스풀에 기록 후 바로 결과 표시)
+                        queue_result = components['write_behind'].enqueue(analysis_result, inquiry_data_with_user)
+                        
+                        if queue_result.get('success'):
+                            result['id'] = queue_result['id']
+                            print(f"✅ 분석 결과 저장 예약 - Analysis ID: {result['id']}")
+                        else:
+                            # 스풀 기록 실패 시 저장소에 직접 저장
+                            save_result = components['storage'].save_analysis(analysis_result, inquiry_data_with_user)
                             if save_result.get('success'):
                                 result['id'] = save_result.get('id')
-                                st.success(f"✅ 로컬 저장소에 분석 결과가 저장되었습니다. (사용자: {save_result.get('user_name', 'Unknown')}, ID: {save_result.get('user_id', 'Unknown')})")
-                                print(f"✅ 로컬 저장 성공 - Analysis ID: {result['id']}")
+                                st.info("📋 로컬 백업 저장소에 저장되었습니다.")
+                                print(f"✅ 로컬 백업 저장 성공 - Analysis ID: {result['id']}")
                             else:
                                 error_msg = save_result.get('error', '알 수 없는 오류')
                                 st.error(f"❌ 로컬 저장도 실패했습니다: {error_msg}")
@@ -2180,19 +1671,9 @@ with tab2:
         if 'ai_result' in result and result['ai_result']['success']:
             ai_result = result['ai_result']
             
-            # GEMINI 응답인 경우 gemini_result에서 parsed_response 추출
-            if 'gemini_result' in ai_result:
-                # GEMINI 응답인 경우 GEMINI 전용 파싱 사용
-                if 'raw_response' in ai_result['gemini_result']:
-                    parsed = _parse_gemini_response(ai_result['gemini_result']['raw_response'])
-                else:
-                    parsed = ai_result['gemini_result']['parsed_response']
-            elif 'parsed_response' in ai_result:
-                parsed = ai_result['parsed_response']
-            elif 'response' in ai_result:
-                # GPT API 응답인 경우 GPT 전용 파싱 사용
-                parsed = _parse_gpt_response(ai_result['response'])
-            else:
+            # 분석 단계에서 파싱해 둔 결과 사용 (이전 세션 결과처럼 없으면 원문 파싱, 캐시 사용)
+            parsed = result.get('parsed_response') or get_parsed_response(ai_result)
+            if not parsed:
                 st.error("❌ AI 응답 데이터가 올바르지 않습니다.")
                 st.stop()
             
@@ -2234,56 +1715,8 @@ with tab2:
             with col10:
                 st.markdown("#### 📧 이메일 초안")
                 
-                # 이력 관리와 완전히 동일한 방식으로 이메일 초안 추출
-                email_content = None
-                
-                # 1. 파싱된 email_draft 사용 (우선순위 1) - DB에 저장된 정확한 이메일 초안
-                email_draft = result.get('email_draft', '')
-                if email_draft and len(email_draft.strip()) > 20:
-                    email_content = email_draft
-                    print(f"✅ AI 분석 결과 탭 - email_draft 사용: {len(email_content)}자")
-                
-                # 2. original_ai_response에서 이메일 초안 추출 (우선순위 2) - 이력 관리와 동일
-                if not email_content and result.get('original_ai_response'):
-                    email_content = extract_email_from_original_response(result['original_ai_response'])
-                    print(f"🔍 AI 분석 결과 탭 - original_ai_response에서 추출: {len(email_content) if email_content else 0}자")
-                elif not email_content and result.get('ai_result'):
-                    ai_result = result['ai_result']
-                    if 'gemini_result' in ai_result and 'raw_response' in ai_result['gemini_result']:
-                        email_content = extract_email_from_original_response(ai_result['gemini_result']['raw_response'])
-                        print(f"🔍 AI 분석 결과 탭 - gemini_result에서 추출: {len(email_content) if email_content else 0}자")
-                    elif 'response' in ai_result:
-                        email_content = extract_email_from_original_response(ai_result['response'])
-                        print(f"🔍 AI 분석 결과 탭 - ai_result response에서 추출: {len(email_content) if email_content else 0}자")
-                    elif 'gpt_result' in ai_result and 'raw_response' in ai_result['gpt_result']:
-                        email_content = extract_email_from_original_response(ai_result['gpt_result']['raw_response'])
-                        print(f"🔍 AI 분석 결과 탭 - gpt_result에서 추출: {len(email_content) if email_content else 0}자")
-                
-                # 3. full_analysis_result에서 이메일 초안 추출 (우선순위 3) - 이력 관리와 동일
-                if not email_content and result.get('full_analysis_result'):
-                    email_content = extract_email_from_analysis_result(result['full_analysis_result'])
-                    print(f"🔍 AI 분석 결과 탭 - full_analysis_result에서 추출: {len(email_content) if email_content else 0}자")
-                
-                # 4. 기본 이메일 템플릿 (최후 수단) - 이력 관리와 동일
-                if not email_content:
-                    email_content = f"""제목: {result.get('issue_type', '문의')} 답변
-
-고객님 안녕하세요.
-
-{result.get('issue_type', '문의')}에 대한 문의 주셔서 감사합니다.
-
-현재 상황을 분석한 결과, 추가 정보가 필요한 상황입니다.
-
-**필요한 정보:**
-1. 구체적인 오류 메시지
-2. 발생 시점 및 빈도
-3. 사용 환경 정보
-
-자세한 내용은 담당 엔지니어가 확인 후 답변 드리겠습니다.
-
-추가 문의사항이 있으시면 언제든 연락 주세요.
-
-감사합니다."""
+                # 분석 단계에서 파싱한 이메일 초안 (구조화 출력이면 JSON 필드 그대로)
+                email_content = parsed.get('email_draft', '')
                 
                 if email_content:
                     # 이력 관리와 동일한 방식으로 이메일 초안 표시
@@ -2307,6 +1740,7 @@ with tab2:
                 recipient_phone = st.text_input(
                     "수신자 전화번호",
                     placeholder="01012345678",
+                    help="여러 명에게 보낼 때는 쉼표로 구분합니다 (한 번의 요청으로 일괄 발송)",
                     key="sms_recipient_phone"
                 )
                 sender_phone = st.text_input(
@@ -2346,23 +1780,34 @@ with tab2:
                             sender_phone = sender_phone
                             
                             if api_key and api_secret:
-                                # SOLAPI 핸들러 생성
-                                sms_handler = SOLAPIHandler(api_key, api_secret)
-                                sms_handler.set_sender(sender_phone)
+                                # 발송 큐에 기록 후 바로 반환 (백그라운드에서 묶어 발송, 실패 시 재시도)
+                                sms_queue = components['sms_queue']
+                                # 이 세션의 API 키로만 발송되도록 발송 계정을 메시지에 기록
+                                account = sms_queue.attach(get_solapi_handler(api_key, api_secret))
+                                phone_numbers = [phone.strip() for phone in recipient_phone.split(',') if phone.strip()]
                                 
-                                # SMS 발송
-                                sms_result = sms_handler.send_sms(
-                                    phone_number=recipient_phone,
-                                    message=sms_message,
-                                    recipient_name=recipient_name
-                                )
+                                # 같은 분석·수신자·내용은 버튼을 다시 눌러도 한 번만 발송
+                                queued = [
+                                    sms_queue.enqueue(
+                                        phone, sms_message, recipient_name=recipient_name, sender=sender_phone,
+                                        key=idempotency_key(result.get('id', ''), phone, sender_phone, sms_message),
+                                        account=account
+                                    )
+                                    for phone in phone_numbers
+                                ]
+                                new_count = sum(1 for item in queued if item.get('success') and not item.get('duplicate'))
+                                failed_count = sum(1 for item in queued if not item.get('success'))
                                 
-                                if sms_result["success"]:
-                                    st.success(f"✅ SMS가 성공적으로 발송되었습니다!")
-                                    st.info(f"수신자: {recipient_name} ({recipient_phone})")
-                                    st.info(f"메시지 ID: {sms_result.get('message_id', 'N/A')}")
-                                else:
-                                    st.error(f"❌ SMS 발송 실패: {sms_result.get('error', '알 수 없는 오류')}")
+                                if new_count:
+                                    requeued_count = sum(1 for item in queued if item.get('requeued'))
+                                    st.success(f"✅ SMS {new_count}건 발송을 예약했습니다. 잠시 후 발송됩니다."
+                                               + (f" (실패했던 {requeued_count}건 재발송)" if requeued_count else ""))
+                                    st.info(f"수신자: {recipient_name} ({', '.join(phone_numbers)})")
+                                for item in queued:
+                                    if item.get('duplicate'):
+                                        st.info(f"ℹ️ 이미 요청된 SMS입니다 ({item['phone_number']}, 상태: {item['status']})")
+                                if failed_count:
+                                    st.error(f"❌ SMS 발송 예약 실패 {failed_count}건: {queued[0].get('error', '알 수 없는 오류') if len(queued) == 1 else '로그를 확인해주세요'}")
                             else:
                                 st.error("❌ SOLAPI API 키가 설정되지 않았습니다.")
                                 st.info("Streamlit Secrets에서 SOLAPI API 키를 설정해주세요.")
@@ -2389,12 +1834,9 @@ with tab2:
             if 'ai_result' in result:
                 ai_result = result['ai_result']
                 
-                # Gemini 응답인 경우 gemini_result에서 parsed_response 추출
-                if 'gemini_result' in ai_result:
-                    parsed = ai_result['gemini_result']['parsed_response']
-                elif 'parsed_response' in ai_result:
-                    parsed = ai_result['parsed_response']
-                else:
+                # 분석 단계에서 정리해 둔 기본 응답 사용
+                parsed = result.get('parsed_response') or get_parsed_response(ai_result)
+                if not parsed:
                     st.error("❌ 기본 응답 데이터가 올바르지 않습니다.")
                     st.stop()
                 
@@ -2426,56 +1868,8 @@ with tab2:
                 with col10:
                     st.markdown("#### 📧 이메일 초안")
                     
-                    # 이력 관리 탭과 완전히 동일한 방식으로 이메일 초안 추출
-                    email_content = None
-                    
-                    # 1. 파싱된 email_draft 사용 (우선순위 1) - DB에 저장된 정확한 이메일 초안
-                    email_draft = result.get('email_draft', '')
-                    if email_draft and len(email_draft.strip()) > 20:
-                        email_content = email_draft
-                        print(f"✅ 이력 조회 탭 - email_draft 사용: {len(email_content)}자")
-                    
-                    # 2. original_ai_response에서 이메일 초안 추출 (우선순위 2) - 이력 관리와 동일
-                    if not email_content and result.get('original_ai_response'):
-                        email_content = extract_email_from_original_response(result['original_ai_response'])
-                        print(f"🔍 이력 조회 탭 - original_ai_response에서 추출: {len(email_content) if email_content else 0}자")
-                    elif not email_content and result.get('ai_result'):
-                        ai_result = result['ai_result']
-                        if 'gemini_result' in ai_result and 'raw_response' in ai_result['gemini_result']:
-                            email_content = extract_email_from_original_response(ai_result['gemini_result']['raw_response'])
-                            print(f"🔍 이력 조회 탭 - gemini_result에서 추출: {len(email_content) if email_content else 0}자")
-                        elif 'response' in ai_result:
-                            email_content = extract_email_from_original_response(ai_result['response'])
-                            print(f"🔍 이력 조회 탭 - ai_result response에서 추출: {len(email_content) if email_content else 0}자")
-                        elif 'gpt_result' in ai_result and 'raw_response' in ai_result['gpt_result']:
-                            email_content = extract_email_from_original_response(ai_result['gpt_result']['raw_response'])
-                            print(f"🔍 이력 조회 탭 - gpt_result에서 추출: {len(email_content) if email_content else 0}자")
-                    
-                    # 3. full_analysis_result에서 이메일 초안 추출 (우선순위 3) - 이력 관리와 동일
-                    if not email_content and result.get('full_analysis_result'):
-                        email_content = extract_email_from_analysis_result(result['full_analysis_result'])
-                        print(f"🔍 이력 조회 탭 - full_analysis_result에서 추출: {len(email_content) if email_content else 0}자")
-                    
-                    # 4. 기본 이메일 템플릿 (최후 수단) - 이력 관리와 동일
-                    if not email_content:
-                        email_content = f"""제목: {result.get('issue_type', '문의')} 답변
-
-고객님 안녕하세요.
-
-{result.get('issue_type', '문의')}에 대한 문의 주셔서 감사합니다.
-
-현재 상황을 분석한 결과, 추가 정보가 필요한 상황입니다.
-
-**필요한 정보:**
-1. 구체적인 오류 메시지
-2. 발생 시점 및 빈도
-3. 사용 환경 정보
-
-자세한 내용은 담당 엔지니어가 확인 후 답변 드리겠습니다.
-
-추가 문의사항이 있으시면 언제든 연락 주세요.
-
-감사합니다."""
+                    # 기본 응답의 이메일 초안
+                    email_content = parsed.get('email_draft', '')
                     
                 if email_content:
                     # 이메일 초안을 Streamlit 기본 스타일로 표시
@@ -2571,93 +1965,37 @@ with tab3:
                     next_day = filter_date_to + timedelta(days=1)
                     date_to_with_time = next_day.isoformat()
                 
-                # MongoDB 우선 이력 조회 시도
-                history_result = None
+                # 검색 조건 (다음 페이지 조회 시 재사용)
+                history_query = {
+                    'date_from': filter_date_from.isoformat() if filter_date_from else None,
+                    'date_to': date_to_with_time,
+                    'issue_type': filter_type if filter_type != "전체" else None,
+                    'user_name': filter_user if filter_user else None
+                }
                 
-                if st.session_state.get('mongodb_connected') and st.session_state.get('mongo_handler'):
-                    try:
-                        # MongoDB에서 이력 조회 (날짜 필터링 지원)
-                        history_data = st.session_state.mongo_handler.get_history(
-                            limit=50,
-                            date_from=filter_date_from.isoformat() if filter_date_from else None,
-                            date_to=date_to_with_time,
-                            issue_type=filter_type if filter_type != "전체" else None,
-                            user_id=filter_user if filter_user else None
-                        )
-                        
-                        history_result = {
-                            'success': True,
-                            'data': history_data,
-                            'source': 'mongodb'
-                        }
-                        
-                    except Exception as e:
-                        st.warning(f"⚠️ MongoDB 조회 실패: {e}")
-                        # 로컬 데이터베이스로 폴백
-                        history_result = components['multi_user_db'].get_global_history(
-                            limit=50,
-                            issue_type=filter_type if filter_type != "전체" else None,
-                            date_from=filter_date_from.isoformat() if filter_date_from else None,
-                            date_to=date_to_with_time,
-                            user_name=filter_user if filter_user else None
-                        )
+                # 조회 전 피드 버전 (이후 들어오는 변경은 결과 화면에 자동 반영)
+                history_feed = (st.session_state.get('components') or {}).get('history_feed')
+                st.session_state.history_feed_version = history_feed.version if history_feed else None
+                
+                # 최근 이력 피드 → MongoDB → 로컬 데이터베이스 순으로 조회
+                history_result = fetch_history_page(history_query)
+                if history_result.get('source') == 'local':
+                    if components['storage'].mongo_handler is not None:
+                        st.warning("⚠️ MongoDB 응답 없음 - 로컬 데이터베이스에서 조회했습니다.")
+                    else:
                         st.info("📋 로컬 데이터베이스에서 이력을 조회했습니다.")
-                else:
-                    # MongoDB 연결 실패 시 로컬 데이터베이스 사용
-                    st.warning("⚠️ MongoDB 연결 실패 - 로컬 데이터베이스를 사용합니다.")
-                    history_result = components['multi_user_db'].get_global_history(
-                        limit=50,
-                        issue_type=filter_type if filter_type != "전체" else None,
-                        date_from=filter_date_from.isoformat() if filter_date_from else None,
-                        date_to=date_to_with_time,
-                        user_name=filter_user if filter_user else None
-                    )
+                
+                st.session_state.history_query = history_query
+                st.session_state.history_source = history_result.get('source')
+                st.session_state.history_next_cursor = history_result.get('next_cursor')
+                st.session_state.history_has_more = history_result.get('has_more', False)
                 
                 if history_result.get('success') and history_result.get('data'):
                     history_data = history_result['data']
+                    st.session_state.history_rows = list(history_data)
                     
                     # 데이터프레임 생성
-                    df_data = []
-                    for i, entry in enumerate(history_data, 1):
-                        # 날짜를 초단위까지 표시하고 최신순으로 정렬
-                        timestamp = entry.get('timestamp', '').strip()
-                        if timestamp:
-                            formatted_date = ""
-                            try:
-                                # ISO 형식의 타임스탬프를 파싱하여 원하는 형식으로 변환
-                                dt = datetime.fromisoformat(timestamp)
-                                formatted_date = dt.strftime('%Y-%m-%d %H:%M:%S')
-                            except:
-                                try:
-                                    # 'T'를 공백으로 대체하여 파싱 시도
-                                    timestamp_with_space = timestamp.replace('T', ' ')
-                                    dt = datetime.strptime(timestamp_with_space, '%Y-%m-%d %H:%M:%S')
-                                    formatted_date = dt.strftime('%Y-%m-%d %H:%M:%S')
-                                except:
-                                    try:
-                                        # 마이크로초가 포함된 경우 처리
-                                        dt = datetime.strptime(timestamp_with_space, '%Y-%m-%d %H:%M:%S.%f')
-                                        formatted_date = dt.strftime('%Y-%m-%d %H:%M:%S')
-                                    except:
-                                        # 모든 파싱이 실패한 경우 원본 문자열에서 슬라이싱
-                                        if 'T' in timestamp:
-                                            # ISO 형식에서 'T' 제거하고 슬라이싱
-                                            clean_timestamp = timestamp.replace('T', ' ')
-                                            formatted_date = clean_timestamp[:19] if len(clean_timestamp) >= 19 else clean_timestamp
-                                        else:
-                                            formatted_date = timestamp[:19] if len(timestamp) >= 19 else timestamp
-                        else:
-                            formatted_date = ""
-                        
-                        df_data.append({
-                            "번호": i,
-                            "날짜": formatted_date,
-                            "고객사명": entry.get('customer_name', ''),
-                            "문의유형": entry.get('issue_type', ''),
-                            "우선순위": entry.get('priority', ''),
-                            "담당자": entry.get('user_name', ''),
-                            "역할": entry.get('user_role', '')
-                        })
+                    df_data = history_entries_to_rows(history_data)
                     
                     df = pd.DataFrame(df_data)
                     # 세션 상태에 결과 저장
@@ -2666,14 +2004,17 @@ with tab3:
                     # 새로운 검색 시 페이지를 1로 리셋
                     st.session_state.current_page = 1
                     
-                    st.success(f"✅ {len(history_data)}건의 이력이 조회되었습니다.")
+                    if st.session_state.history_has_more:
+                        st.success(f"✅ {len(history_data)}건의 이력이 조회되었습니다. (마지막 페이지에서 ▶ 버튼으로 이어서 조회)")
+                    else:
+                        st.success(f"✅ {len(history_data)}건의 이력이 조회되었습니다.")
                     
                     # 이력 조회 결과 표시 (기본 데이터프레임 + 커스텀 테이블 모두 표시)
                     st.markdown("### 📊 이력 조회 결과")
                     
                     # 1. 기본 st.dataframe 표시 (위쪽)
                     # st.markdown("#### 📋 기본 데이터프레임")
-                    st.dataframe(df, use_container_width=True, hide_index=True)
+                    st.dataframe(df, use_container_width=True, hide_index=True, column_config=HISTORY_HIDDEN_COLUMNS)
                     
                     # 0) 모달을 위쪽에서 먼저 그리기(있다면)
                     if st.session_state.get('show_detail_modal', False) and st.session_state.get('selected_row_for_detail'):
@@ -2755,7 +2096,8 @@ with tab3:
                         total_pages, 
                         total_items, 
                         st.session_state.items_per_page,
-                        "new_"
+                        "new_",
+                        has_more=st.session_state.history_has_more
                     )
                     
 
@@ -2767,45 +2109,13 @@ with tab3:
                                          # 디버깅 정보 제거
                     
                     # 사용자 수 계산
-                    users = set()
-                    for entry in history_data:
-                        user_name = entry.get('user_name', '')
-                        user_role = entry.get('user_role', '')
-                        if user_name and user_role:
-                            users.add(f"{user_name}_{user_role}")
+                    users = {f"{row.user_name}_{row.user_role}" for row in history_data if row.user_name and row.user_role}
                     
                     # 문제 유형 수 계산
-                    issue_types = set()
-                    for entry in history_data:
-                        issue_type = entry.get('issue_type', '')
-                        if issue_type:
-                            issue_types.add(issue_type)
+                    issue_types = {row.issue_type for row in history_data if row.issue_type}
                     
-                    # 응답 유형 수 계산
-                    response_types = set()
-                    for entry in history_data:
-                        # 직접 response_type 필드 확인
-                        response_type = entry.get('response_type', '')
-                        if response_type:
-                            response_types.add(response_type)
-                        
-                        # full_analysis_result에서 response_type 추출
-                        full_result = entry.get('full_analysis_result', {})
-                        if full_result:
-                            ai_result = full_result.get('ai_result', {})
-                            if ai_result:
-                                if 'parsed_response' in ai_result:
-                                    parsed_response = ai_result.get('parsed_response', {})
-                                    if parsed_response:
-                                        response_type = parsed_response.get('response_type', '')
-                                        if response_type:
-                                            response_types.add(response_type)
-                                elif 'response' in ai_result:
-                                    # GPT API 응답인 경우 파싱
-                                    parsed_response = _parse_gpt_response(ai_result['response'])
-                                    response_type = parsed_response.get('response_type', '')
-                                    if response_type:
-                                        response_types.add(response_type)
+                    # 응답 유형 수 계산 (저장 시 기록된 response_type 필드 사용)
+                    response_types = {row.response_type for row in history_data if row.response_type}
                     
                     col19, col20, col21, col22 = st.columns(4)
                     
@@ -2827,7 +2137,7 @@ with tab3:
                         issue_data = []
                         for issue_type in issue_types:
                             if issue_type:  # 빈 문자열 제외
-                                count = len([entry for entry in history_data if entry.get('issue_type') == issue_type])
+                                count = len([row for row in history_data if row.issue_type == issue_type])
                                 issue_data.append({"문제 유형": issue_type, "건수": count})
                         
                         if issue_data:
@@ -2837,11 +2147,18 @@ with tab3:
                 else:
                     st.info("검색 조건에 맞는 이력이 없습니다.")
                     st.session_state.history_search_results = None
+                    st.session_state.history_rows = []
                     st.session_state.history_search_performed = True
                     
             except Exception as e:
                 st.error(f"이력 조회 중 오류가 발생했습니다: {e}")
     
+    # 이전 검색 이후 저장된 이력을 결과에 반영 (검색 버튼을 다시 누르지 않아도 됨)
+    if not search_clicked and st.session_state.history_search_performed:
+        new_count = refresh_history_from_feed()
+        if new_count:
+            st.info(f"🔄 새 이력 {new_count}건이 결과에 반영되었습니다.")
+    
     # 이전 검색 결과가 있으면 표시 (검색 버튼을 클릭하지 않았을 때)
     if not search_clicked and st.session_state.history_search_performed and st.session_state.history_search_results is not None:
         st.markdown("### 📊 이력 조회 결과")
@@ -2851,7 +2168,7 @@ with tab3:
         
         # 1. 기본 st.dataframe 표시 (위쪽)
         #st.markdown("#### 📋 기본 데이터프레임")
-        st.dataframe(df_previous, use_container_width=True, hide_index=True)
+        st.dataframe(df_previous, use_container_width=True, hide_index=True, column_config=HISTORY_HIDDEN_COLUMNS)
         
 
 
@@ -2922,7 +2239,8 @@ with tab3:
             total_pages_prev, 
             total_items_prev, 
             st.session_state.items_per_page,
-            "prev_"
+            "prev_",
+            has_more=st.session_state.history_has_more
         )
 
         if st.session_state.get('show_detail_modal', False) and st.session_state.get('selected_row_for_detail'):
@@ -0,0 +1,115 @@
+"""
+SOLAPI 발송 요청 오버헤드 측정 도구
+로컬 테스트 서버(solapi_stub.py)를 띄우고 메시지 한 건짜리 발송 요청을 연속으로 보내
+메시지당 지연 시간(p50/p99)을 비교합니다.
+
+    legacy  : 요청마다 새 연결 + 요청마다 HMAC 키 계산 (이전 방식)
+    client  : 공용 SolapiClient (연결 재사용, 예열, HMAC 키 상태 재사용)
+    sign    : 인증 헤더 생성만 (이전 방식 / HmacSigner)
+
+사용법:
+    python benchmark_solapi.py                          # RTT 5ms 흉내, 200건
+    python benchmark_solapi.py --rtt 20 --messages 500 --json solapi_bench.json
+
+--rtt는 요청마다 1 RTT, 새 연결마다 2 RTT(TCP + TLS 핸드셰이크)의 지연을 서버에 추가합니다.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import secrets
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Any
+
+import requests
+
+from benchmark_storage import run_operation
+from solapi_client import SolapiClient, HmacSigner
+from solapi_handler import SEND_MANY_PATH
+from solapi_stub import SolapiStub
+
+API_KEY = "benchmark"
+API_SECRET = "benchmark-secret"
+
+
+def legacy_headers(api_key: str, api_secret: str) -> Dict[str, str]:
+    """이전 방식 인증 헤더 (요청마다 HMAC 키 계산)"""
+    date = datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+    salt = secrets.token_hex(16)
+    signature = hmac.new(api_secret.encode('utf-8'), (date + salt).encode('utf-8'), hashlib.sha256).hexdigest()
+    return {
+        "Content-Type": "application/json",
+        "Authorization": f"HMAC-SHA256 apiKey={api_key}, date={date}, salt={salt}, signature={signature}"
+    }
+
+
+def payload(index: int) -> Dict[str, Any]:
+    return {"messages": [{"to": f"010{index:08d}", "from": "01012345678", "text": "[CoreTrust]\n장애 알림 테스트"}]}
+
+
+def print_report(rtt_ms: float, reports: List[Dict]):
+    print(f"\n📊 SOLAPI 발송 요청 측정 결과 (RTT {rtt_ms}ms 흉내)")
+    print(f"{'방식':<10}{'횟수':>8}{'오류':>6}{'평균(ms)':>11}{'p50(ms)':>10}{'p99(ms)':>10}{'최대(ms)':>11}{'연결':>7}")
+    for report in reports:
+        print(f"{report['operation']:<10}{report['count']:>8}{report['errors']:>6}{report['mean_ms']:>11}"
+              f"{report['p50_ms']:>10}{report['p99_ms']:>10}{report['max_ms']:>11}{report.get('connections', '-'):>7}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="SOLAPI 발송 요청 메시지당 오버헤드 측정 (로컬 테스트 서버)")
+    parser.add_argument("--messages", type=int, default=200, help="방식별 발송 요청 수")
+    parser.add_argument("--rtt", type=float, default=5.0, help="흉내 낼 왕복 지연 (ms)")
+    parser.add_argument("--signs", type=int, default=20000, help="인증 헤더 생성 측정 횟수")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장")
+    args = parser.parse_args(argv)
+
+    rtt = args.rtt / 1000
+    stub = SolapiStub(API_KEY, API_SECRET, latency=rtt, connect_latency=2 * rtt).start()
+    reports = []
+    try:
+        # 이전 방식: 요청마다 새 세션(새 연결)
+        def legacy_send(index):
+            with requests.Session() as session:
+                response = session.post(f"{stub.base_url}{SEND_MANY_PATH}", json=payload(index),
+                                        headers=legacy_headers(API_KEY, API_SECRET), timeout=30)
+            return response.status_code == 200
+
+        before = stub.stats["connections"]
+        report = run_operation("legacy", legacy_send, list(range(args.messages)), 1)
+        report["connections"] = stub.stats["connections"] - before
+        reports.append(report)
+
+        # 공용 클라이언트: 예열 후 연결 재사용
+        client = SolapiClient(API_KEY, API_SECRET, stub.base_url)
+        before = stub.stats["connections"]
+        warm_up = client.warm_up()
+
+        def client_send(index):
+            return client.post(SEND_MANY_PATH, json=payload(index)).status_code == 200
+
+        report = run_operation("client", client_send, list(range(args.messages)), 1)
+        report["connections"] = stub.stats["connections"] - before
+        report["transport"] = client.transport
+        report["http2"] = client.http2
+        report["warm_up_ms"] = warm_up.get("elapsed_ms")
+        reports.append(report)
+        client.close()
+
+        # 인증 헤더 생성 비용만
+        signer = HmacSigner(API_KEY, API_SECRET)
+        reports.append(run_operation("sign-old", lambda: bool(legacy_headers(API_KEY, API_SECRET)), [None] * args.signs, 1))
+        reports.append(run_operation("sign-new", lambda: bool(signer.authorization()), [None] * args.signs, 1))
+    finally:
+        stub.stop()
+
+    print_report(args.rtt, reports)
+    print(f"\nclient 전송 방식: {reports[1]['transport']} (HTTP/2: {reports[1]['http2']}), 예열 {reports[1]['warm_up_ms']}ms")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"rtt_ms": args.rtt, "messages": args.messages, "results": reports}, f, ensure_ascii=False, indent=2)
+    return 0 if all(report["errors"] == 0 for report in reports) else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+이력 저장소 부하 측정 도구
+저장 / 이력 검색 / 통계 조회를 반복 실행해 연산별 p50/p99 지연 시간을 보고합니다.
+
+사용법:
+    python benchmark_storage.py --backend memory                  # 인메모리 MongoDB (오프라인)
+    python benchmark_storage.py --backend local --records 2000    # 로컬 JSON 저장소 (임시 디렉토리)
+    python benchmark_storage.py --backend mongodb --uri "mongodb+srv://..." --threads 8
+
+mongodb 백엔드는 실제 데이터베이스에 기록하므로 측정 후 저장한 문서를 삭제합니다 (--keep-data로 유지).
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Callable
+
+import pytz
+
+ISSUE_TYPES = [
+    "현재 비밀번호가 맞지 않습니다", "VMS와의 통신에 실패했습니다", "Ping 테스트에 실패했습니다",
+    "Onvif 응답이 없습니다", "로그인 차단 상태입니다", "비밀번호 변경에 실패했습니다",
+    "PK P 계정 로그인 안됨", "PK P 웹 접속 안됨", "기타"
+]
+USERS = [("김담당", "기술지원"), ("이담당", "영업"), ("박담당", "기술지원"), ("최담당", "관리자")]
+PAGE_SIZE = 50
+
+
+def make_sample(index: int, days: int) -> Dict[str, Dict]:
+    """합성 분석 결과/문의 정보 (최근 days일 사이 임의 시각)"""
+    kst = pytz.timezone('Asia/Seoul')
+    timestamp = datetime.now(kst) - timedelta(seconds=random.randint(0, days * 86400))
+    issue_type = random.choice(ISSUE_TYPES)
+    user_name, user_role = random.choice(USERS)
+    summary = f"{issue_type} 문의에 대한 조치 요약입니다. " * 4
+    analysis_result = {
+        "issue_type": issue_type,
+        "classification": {"method": "benchmark", "confidence": "high"},
+        "gemini_result": {
+            "parsed_response": {
+                "response_type": random.choice(["해결안", "추가 정보 요청", "에스컬레이션"]),
+                "summary": summary,
+                "action_flow": "1. 설정 확인\n2. 재시도\n3. 로그 전달\n" * 3,
+                "email_draft": f"안녕하세요, {index}번 문의 관련 안내드립니다.\n" * 5
+            },
+            "raw_response": summary * 3
+        }
+    }
+    inquiry_data = {
+        "timestamp": timestamp.isoformat(),
+        "customer_name": f"BENCH-고객사{index % 200}",
+        "inquiry_content": f"{issue_type} 현상이 발생합니다. " * 5,
+        "user_name": user_name,
+        "user_role": user_role,
+        "priority": random.choice(["높음", "보통", "낮음"]),
+        "contract_type": "유지보수"
+    }
+    return {"analysis_result": analysis_result, "inquiry_data": inquiry_data}
+
+
+def make_query(days: int) -> Dict[str, Any]:
+    """이력 탭과 같은 형태의 검색 조건 (기간 + 선택적으로 문제 유형/담당자)"""
+    today = datetime.now(pytz.timezone('Asia/Seoul')).date()
+    span = random.choice([7, 30, days])
+    return {
+        "date_from": (today - timedelta(days=span)).isoformat(),
+        "date_to": (today + timedelta(days=1)).isoformat(),
+        "issue_type": random.choice([None, None] + ISSUE_TYPES),
+        "user_name": random.choice([None, None, None] + [user for user, _ in USERS])
+    }
+
+
+class MongoBackend:
+    """MongoDBHandler 기반 (memory:// 또는 실제 MongoDB)"""
+
+    def __init__(self, connection_string: str):
+        from mongodb_handler import MongoDBHandler
+        self.handler = MongoDBHandler(connection_string=connection_string)
+        self.saved_ids = []
+
+    def save(self, sample: Dict) -> bool:
+        result = self.handler.save_analysis(sample["analysis_result"], sample["inquiry_data"])
+        if result.get('success'):
+            self.saved_ids.append(result['object_id'])
+        return result.get('success', False)
+
+    def search(self, query: Dict) -> bool:
+        result = self.handler.get_history_page(
+            page_size=PAGE_SIZE, table_only=True, date_from=query["date_from"], date_to=query["date_to"],
+            issue_type=query["issue_type"], user_id=query["user_name"]
+        )
+        return result.get('success', False)
+
+    def stats(self) -> bool:
+        return bool(self.handler.get_statistics())
+
+    def cleanup(self):
+        """측정 중 저장한 문서 삭제 후 일별 집계 재구성"""
+        if self.saved_ids:
+            deleted = self.handler.history_collection.delete_many({"_id": {"$in": self.saved_ids}}).deleted_count
+            print(f"🧹 측정용 문서 {deleted}건 삭제")
+            if self.handler.use_daily_rollup:
+                self.handler.rebuild_daily_rollup()
+
+
+class LocalBackend:
+    """MultiUserHistoryDB 기반 로컬 JSON 저장소"""
+
+    def __init__(self, data_dir: str):
+        from multi_user_database import MultiUserHistoryDB
+        self.data_dir = data_dir
+        self.db = MultiUserHistoryDB(data_dir=data_dir)
+
+    def save(self, sample: Dict) -> bool:
+        return self.db.save_analysis(sample["analysis_result"], sample["inquiry_data"]).get('success', False)
+
+    def search(self, query: Dict) -> bool:
+        result = self.db.get_history_page(
+            page_size=PAGE_SIZE, date_from=query["date_from"], date_to=query["date_to"],
+            issue_type=query["issue_type"], user_name=query["user_name"]
+        )
+        return result.get('success', False)
+
+    def stats(self) -> bool:
+        return self.db.get_statistics().get('success', False)
+
+    def cleanup(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    """최근접 순위 백분위수"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(percent / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_operation(name: str, operation: Callable, inputs: List, threads: int) -> Dict[str, Any]:
+    """연산을 inputs 수만큼 실행하고 지연 시간 집계"""
+    def timed(item):
+        started = time.perf_counter()
+        try:
+            ok = operation(item) if item is not None else operation()
+        except Exception as e:
+            print(f"❌ {name} 실패: {e}")
+            ok = False
+        return (time.perf_counter() - started) * 1000, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(timed, inputs))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        "operation": name,
+        "count": len(results),
+        "errors": sum(1 for _, ok in results if not ok),
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3) if latencies else 0.0,
+        "ops_per_sec": round(len(results) / elapsed, 1) if elapsed > 0 else 0.0
+    }
+
+
+def print_report(backend: str, reports: List[Dict]):
+    print(f"\n📊 {backend} 저장소 측정 결과")
+    print(f"{'연산':<8}{'횟수':>8}{'오류':>6}{'평균(ms)':>11}{'p50(ms)':>10}{'p99(ms)':>10}{'최대(ms)':>11}{'초당':>9}")
+    for report in reports:
+        print(f"{report['operation']:<8}{report['count']:>8}{report['errors']:>6}{report['mean_ms']:>11}"
+              f"{report['p50_ms']:>10}{report['p99_ms']:>10}{report['max_ms']:>11}{report['ops_per_sec']:>9}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="이력 저장소 저장/검색/통계 지연 시간 측정")
+    parser.add_argument("--backend", choices=["memory", "local", "mongodb"], default="memory")
+    parser.add_argument("--uri", default=os.getenv("MONGODB_URI"), help="mongodb 백엔드 연결 문자열")
+    parser.add_argument("--data-dir", help="local 백엔드 데이터 디렉토리 (기본값: 임시 디렉토리)")
+    parser.add_argument("--records", type=int, default=1000, help="저장 횟수")
+    parser.add_argument("--searches", type=int, default=200, help="이력 검색 횟수")
+    parser.add_argument("--stats", type=int, default=50, help="통계 조회 횟수")
+    parser.add_argument("--threads", type=int, default=4, help="동시 실행 스레드 수")
+    parser.add_argument("--days", type=int, default=90, help="합성 이력의 기간(일)")
+    parser.add_argument("--seed", type=int, default=42, help="난수 시드")
+    parser.add_argument("--keep-data", action="store_true", help="측정 후 저장한 데이터를 지우지 않음")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장")
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    if args.backend == "memory":
+        backend = MongoBackend(f"memory://benchmark-{os.getpid()}")
+    elif args.backend == "mongodb":
+        if not args.uri:
+            print("❌ MongoDB 연결 문자열이 없습니다. --uri 또는 환경변수 MONGODB_URI를 지정하세요.")
+            return 1
+        backend = MongoBackend(args.uri)
+    else:
+        backend = LocalBackend(args.data_dir or tempfile.mkdtemp(prefix="history_benchmark_"))
+
+    samples = [make_sample(i, args.days) for i in range(args.records)]
+    queries = [make_query(args.days) for _ in range(args.searches)]
+
+    reports = []
+    try:
+        # 로컬 저장소는 파일 전체를 다시 쓰므로 저장은 한 스레드로 측정
+        save_threads = 1 if args.backend == "local" else args.threads
+        reports.append(run_operation("save", backend.save, samples, save_threads))
+        reports.append(run_operation("search", backend.search, queries, args.threads))
+        reports.append(run_operation("stats", backend.stats, [None] * args.stats, args.threads))
+    finally:
+        if not args.keep_data:
+            backend.cleanup()
+
+    print_report(args.backend, reports)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"backend": args.backend, "records": args.records, "threads": args.threads,
+                       "results": reports}, f, ensure_ascii=False, indent=2)
+    return 0 if all(report["errors"] == 0 for report in reports) else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
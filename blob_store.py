@@ -0,0 +1,414 @@
+"""
+AI 프롬프트/응답 원문 압축 저장 모듈
+이력 문서의 prompt_used, raw_response 등 대용량 원문 필드를 압축 blob으로 변환합니다.
+- 프롬프트 템플릿은 내용 해시로 한 번만 저장하고 압축 사전으로 참조합니다.
+- AI 응답은 과거 응답으로 학습한 공유 사전으로 압축합니다 (zstd, 미설치 시 zlib).
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+import zlib
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+try:
+    import zstandard as zstd
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstd = None
+    ZSTD_AVAILABLE = False
+    print("⚠️ zstandard를 사용할 수 없습니다. zlib 압축으로 대체합니다.")
+
+# 압축 blob 표시 키
+BLOB_MARKER = "$blob"
+
+# 필드 이름별 압축 방식 (template: 프롬프트 템플릿 사전, response: 학습된 응답 사전)
+PROMPT_FIELDS = {"prompt_used"}
+RESPONSE_FIELDS = {"raw_response", "response", "original_ai_response", "full_response"}
+
+# 앱 화면에서 복원에 실패한 원문 자리에 표시하는 값
+DECODE_ERROR_TEXT = "[원문 복원 실패]"
+
+# 이 길이(바이트)보다 짧은 문자열은 압축하지 않음
+MIN_BLOB_SIZE = 256
+
+# 응답 사전 학습 설정
+TRAIN_MIN_SAMPLES = 32
+TRAIN_SAMPLE_LIMIT = 256
+RETRAIN_INTERVAL = 500
+DICT_SIZE = 16 * 1024
+ZLIB_MAX_DICT_SIZE = 32 * 1024
+
+
+class BlobDecodeError(ValueError):
+    """압축 blob 복원 실패 (사전 누락, 지원하지 않는 코덱, 손상된 데이터)"""
+
+
+def _hash_bytes(data: bytes) -> str:
+    """내용 해시 기반 ID 생성"""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def is_blob(value: Any) -> bool:
+    """압축 blob 여부 확인"""
+    return isinstance(value, dict) and BLOB_MARKER in value
+
+
+class BlobStore:
+    """압축 사전 관리 및 blob 인코딩/디코딩"""
+
+    def __init__(self, dict_dir: str = None, collection=None, binary: bool = False,
+                 template_path: str = "프롬프트.txt"):
+        """
+        dict_dir: 사전을 파일로 저장할 디렉토리 (로컬 JSON 저장소)
+        collection: 사전을 저장할 MongoDB 컬렉션 (MongoDB 저장소)
+        binary: True이면 압축 데이터를 bytes로 저장 (MongoDB), False이면 base64 문자열 (JSON)
+        """
+        self.dict_dir = dict_dir
+        self.collection = collection
+        self.binary = binary
+        self.codec = "zstd" if ZSTD_AVAILABLE else "zlib"
+
+        self._lock = threading.Lock()
+        self._dicts: Dict[str, bytes] = {}
+        self._zstd_dicts: Dict[str, Any] = {}
+        self._samples: List[bytes] = []
+        self._encoded_since_train = 0
+        self._stats = {"blobs": 0, "raw_bytes": 0, "stored_bytes": 0}
+
+        if self.dict_dir:
+            os.makedirs(self.dict_dir, exist_ok=True)
+
+        meta = self._load_meta()
+        self.template_dict_id = meta.get("template_dict_id")
+        self.response_dict_id = meta.get("response_dict_id")
+
+        template = self._read_template(template_path)
+        if template:
+            self.register_template(template)
+
+    # ------------------------------------------------------------------
+    # 사전 저장소
+    # ------------------------------------------------------------------
+    def _read_template(self, template_path: str) -> str:
+        """프롬프트 템플릿 로딩"""
+        try:
+            with open(template_path, "r", encoding="utf-8") as f:
+                return f.read()
+        except Exception:
+            return ""
+
+    def _load_meta(self) -> Dict[str, Any]:
+        """활성 사전 정보 로드"""
+        try:
+            if self.collection is not None:
+                meta = self.collection.find_one({"_id": "meta"})
+                return meta or {}
+            if self.dict_dir:
+                meta_path = os.path.join(self.dict_dir, "meta.json")
+                if os.path.exists(meta_path):
+                    with open(meta_path, "r", encoding="utf-8") as f:
+                        return json.load(f)
+        except Exception as e:
+            print(f"⚠️ blob 사전 메타데이터 로드 실패: {e}")
+        return {}
+
+    def _save_meta(self):
+        """활성 사전 정보 저장"""
+        meta = {
+            "template_dict_id": self.template_dict_id,
+            "response_dict_id": self.response_dict_id,
+            "codec": self.codec,
+            "updated_at": datetime.now().isoformat()
+        }
+        try:
+            if self.collection is not None:
+                self.collection.update_one({"_id": "meta"}, {"$set": meta}, upsert=True)
+            elif self.dict_dir:
+                meta_path = os.path.join(self.dict_dir, "meta.json")
+                temp_path = meta_path + ".tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(meta, f, ensure_ascii=False, indent=2)
+                os.replace(temp_path, meta_path)
+        except Exception as e:
+            print(f"⚠️ blob 사전 메타데이터 저장 실패: {e}")
+
+    def _store_dict(self, data: bytes, kind: str) -> str:
+        """사전을 내용 해시로 저장 (이미 있으면 재사용)"""
+        dict_id = _hash_bytes(data)
+        if dict_id in self._dicts:
+            return dict_id
+
+        try:
+            if self.collection is not None:
+                self.collection.update_one(
+                    {"_id": dict_id},
+                    {"$setOnInsert": {"kind": kind, "data": data, "created_at": datetime.now()}},
+                    upsert=True
+                )
+            elif self.dict_dir:
+                dict_path = os.path.join(self.dict_dir, f"{dict_id}.dict")
+                if not os.path.exists(dict_path):
+                    with open(dict_path, "wb") as f:
+                        f.write(data)
+        except Exception as e:
+            print(f"⚠️ blob 사전 저장 실패 ({kind}): {e}")
+
+        self._dicts[dict_id] = data
+        return dict_id
+
+    def _get_dict(self, dict_id: str) -> Optional[bytes]:
+        """사전 조회 (메모리 캐시 우선)"""
+        if not dict_id:
+            return None
+        if dict_id in self._dicts:
+            return self._dicts[dict_id]
+
+        data = None
+        try:
+            if self.collection is not None:
+                doc = self.collection.find_one({"_id": dict_id})
+                if doc:
+                    data = bytes(doc["data"])
+            elif self.dict_dir:
+                dict_path = os.path.join(self.dict_dir, f"{dict_id}.dict")
+                if os.path.exists(dict_path):
+                    with open(dict_path, "rb") as f:
+                        data = f.read()
+        except Exception as e:
+            print(f"⚠️ blob 사전 로드 실패 ({dict_id}): {e}")
+
+        if data is not None:
+            self._dicts[dict_id] = data
+        return data
+
+    def _get_zstd_dict(self, dict_id: str):
+        """zstd 압축 사전 객체 조회"""
+        if dict_id in self._zstd_dicts:
+            return self._zstd_dicts[dict_id]
+        data = self._get_dict(dict_id)
+        if data is None:
+            return None
+        # 학습된 사전은 zstd 사전 형식, 템플릿은 원문(raw content) 사전으로 자동 인식
+        zstd_dict = zstd.ZstdCompressionDict(data, dict_type=zstd.DICT_TYPE_AUTO)
+        self._zstd_dicts[dict_id] = zstd_dict
+        return zstd_dict
+
+    # ------------------------------------------------------------------
+    # 사전 등록/학습
+    # ------------------------------------------------------------------
+    def register_template(self, template: str) -> str:
+        """프롬프트 템플릿을 내용 해시로 등록하고 프롬프트 압축 사전으로 사용"""
+        data = template.encode("utf-8")
+        with self._lock:
+            if _hash_bytes(data) == self.template_dict_id:
+                # 이미 등록된 템플릿이면 저장소 쓰기 없이 메모리에만 적재
+                self._dicts[self.template_dict_id] = data
+                return self.template_dict_id
+            dict_id = self._store_dict(data, "template")
+            if dict_id != self.template_dict_id:
+                self.template_dict_id = dict_id
+                self._save_meta()
+            return dict_id
+
+    def train_response_dictionary(self, samples: List[str]) -> Optional[str]:
+        """과거 AI 응답으로 공유 압축 사전 학습"""
+        encoded = [s.encode("utf-8") for s in samples if s]
+        if len(encoded) < TRAIN_MIN_SAMPLES:
+            return None
+
+        with self._lock:
+            return self._train_locked(encoded)
+
+    def _train_locked(self, samples: List[bytes]) -> Optional[str]:
+        """사전 학습 (잠금 상태에서 호출)"""
+        try:
+            if ZSTD_AVAILABLE:
+                trained = zstd.train_dictionary(DICT_SIZE, samples)
+                data = trained.as_bytes()
+            else:
+                # zlib은 32KB 윈도우 내의 미리 정의된 사전만 사용 가능
+                data = b"".join(samples)[-ZLIB_MAX_DICT_SIZE:]
+        except Exception as e:
+            print(f"⚠️ 응답 압축 사전 학습 실패: {e}")
+            return None
+
+        dict_id = self._store_dict(data, "responses")
+        self.response_dict_id = dict_id
+        self._encoded_since_train = 0
+        self._save_meta()
+        print(f"✅ 응답 압축 사전 학습 완료 (샘플 {len(samples)}개, ID: {dict_id})")
+        return dict_id
+
+    def _observe_response(self, data: bytes):
+        """응답 샘플 수집 및 필요 시 사전 재학습"""
+        self._samples.append(data)
+        if len(self._samples) > TRAIN_SAMPLE_LIMIT:
+            self._samples = self._samples[-TRAIN_SAMPLE_LIMIT:]
+        self._encoded_since_train += 1
+
+        needs_first_dict = self.response_dict_id is None and len(self._samples) >= TRAIN_MIN_SAMPLES
+        needs_retrain = self._encoded_since_train >= RETRAIN_INTERVAL
+        if needs_first_dict or needs_retrain:
+            self._train_locked(list(self._samples))
+
+    # ------------------------------------------------------------------
+    # 인코딩/디코딩
+    # ------------------------------------------------------------------
+    def _compress(self, data: bytes, dict_id: Optional[str]) -> bytes:
+        """사전을 사용한 압축"""
+        dict_data = self._get_dict(dict_id) if dict_id else None
+        if ZSTD_AVAILABLE:
+            zstd_dict = self._get_zstd_dict(dict_id) if dict_data is not None else None
+            compressor = zstd.ZstdCompressor(level=10, dict_data=zstd_dict) if zstd_dict else zstd.ZstdCompressor(level=10)
+            return compressor.compress(data)
+        if dict_data is not None:
+            compressor = zlib.compressobj(9, zdict=dict_data[-ZLIB_MAX_DICT_SIZE:])
+        else:
+            compressor = zlib.compressobj(9)
+        return compressor.compress(data) + compressor.flush()
+
+    def _decompress(self, payload: bytes, codec: str, dict_id: Optional[str]) -> bytes:
+        """blob 압축 해제"""
+        if codec == "raw":
+            return payload
+        dict_data = self._get_dict(dict_id) if dict_id else None
+        if dict_id and dict_data is None:
+            raise ValueError(f"압축 사전을 찾을 수 없습니다: {dict_id}")
+        if codec == "zstd":
+            if not ZSTD_AVAILABLE:
+                raise ValueError("zstd로 압축된 데이터를 해제하려면 zstandard 패키지가 필요합니다.")
+            zstd_dict = self._get_zstd_dict(dict_id) if dict_data is not None else None
+            decompressor = zstd.ZstdDecompressor(dict_data=zstd_dict) if zstd_dict else zstd.ZstdDecompressor()
+            return decompressor.decompress(payload)
+        if dict_data is not None:
+            decompressor = zlib.decompressobj(zdict=dict_data[-ZLIB_MAX_DICT_SIZE:])
+        else:
+            decompressor = zlib.decompressobj()
+        return decompressor.decompress(payload) + decompressor.flush()
+
+    def encode(self, text: str, kind: str = "response") -> Any:
+        """문자열을 압축 blob으로 변환 (짧은 문자열은 그대로 반환)"""
+        if not isinstance(text, str):
+            return text
+        data = text.encode("utf-8")
+        if len(data) < MIN_BLOB_SIZE:
+            return text
+
+        with self._lock:
+            if kind == "template":
+                dict_id = self.template_dict_id
+            else:
+                self._observe_response(data)
+                dict_id = self.response_dict_id
+
+            try:
+                payload = self._compress(data, dict_id)
+                codec = self.codec
+            except Exception as e:
+                print(f"⚠️ blob 압축 실패, 원문 저장: {e}")
+                payload, codec, dict_id = data, "raw", None
+
+            self._stats["blobs"] += 1
+            self._stats["raw_bytes"] += len(data)
+            self._stats["stored_bytes"] += len(payload)
+
+        return {
+            BLOB_MARKER: 1,
+            "codec": codec,
+            "dict": dict_id or "",
+            "size": len(data),
+            "data": payload if self.binary else base64.b64encode(payload).decode("ascii")
+        }
+
+    def decode(self, blob: Any) -> Any:
+        """압축 blob을 문자열로 복원 (blob이 아니면 그대로 반환, 실패 시 BlobDecodeError)"""
+        if not is_blob(blob):
+            return blob
+        try:
+            payload = blob.get("data", b"")
+            if isinstance(payload, str):
+                payload = base64.b64decode(payload)
+            data = self._decompress(bytes(payload), blob.get("codec", "raw"), blob.get("dict") or None)
+            return data.decode("utf-8")
+        except Exception as e:
+            raise BlobDecodeError(f"blob 복원 실패 (codec: {blob.get('codec')}, dict: {blob.get('dict')}): {e}") from e
+
+    # ------------------------------------------------------------------
+    # 문서 단위 처리
+    # ------------------------------------------------------------------
+    def pack(self, value: Any) -> Any:
+        """문서 내 원문 필드를 압축 blob으로 변환한 사본 반환 (원본은 변경하지 않음)"""
+        if isinstance(value, dict):
+            packed = {}
+            for key, item in value.items():
+                if isinstance(item, str) and key in PROMPT_FIELDS:
+                    packed[key] = self.encode(item, kind="template")
+                elif isinstance(item, str) and key in RESPONSE_FIELDS:
+                    packed[key] = self.encode(item, kind="response")
+                else:
+                    packed[key] = self.pack(item)
+            return packed
+        if isinstance(value, list):
+            return [self.pack(item) for item in value]
+        return value
+
+    def unpack(self, value: Any, strict: bool = False) -> Any:
+        """
+        문서 내 압축 blob을 원문으로 복원
+        strict: True이면 복원 실패 시 BlobDecodeError, False이면 DECODE_ERROR_TEXT로 표시 (화면 조회용)
+        """
+        if is_blob(value):
+            try:
+                return self.decode(value)
+            except BlobDecodeError as e:
+                if strict:
+                    raise
+                print(f"❌ {e}")
+                return DECODE_ERROR_TEXT
+        if isinstance(value, dict):
+            return {key: self.unpack(item, strict) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.unpack(item, strict) for item in value]
+        return value
+
+    def get_stats(self) -> Dict[str, Any]:
+        """현재 프로세스에서 압축한 blob 통계"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["compression_ratio"] = (
+            stats["raw_bytes"] / stats["stored_bytes"] if stats["stored_bytes"] else 0.0
+        )
+        stats["codec"] = self.codec
+        stats["template_dict_id"] = self.template_dict_id
+        stats["response_dict_id"] = self.response_dict_id
+        return stats
+
+
+def compression_report(documents: List[Any]) -> Dict[str, Any]:
+    """저장된 문서들의 blob 압축률 집계"""
+    report = {"blobs": 0, "raw_bytes": 0, "stored_bytes": 0}
+
+    def _walk(value):
+        if is_blob(value):
+            payload = value.get("data", b"")
+            stored = len(payload) * 3 // 4 if isinstance(payload, str) else len(payload)
+            report["blobs"] += 1
+            report["raw_bytes"] += value.get("size", 0)
+            report["stored_bytes"] += stored
+        elif isinstance(value, dict):
+            for item in value.values():
+                _walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                _walk(item)
+
+    for document in documents:
+        _walk(document)
+
+    report["compression_ratio"] = (
+        report["raw_bytes"] / report["stored_bytes"] if report["stored_bytes"] else 0.0
+    )
+    return report
@@ -1,13 +1,24 @@
 import json
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Any, Optional
+from blob_store import BlobStore
+from history_cursor import keyset_page
+from history_stats import get_history_stats
+from response_parser import get_parsed_response
 
 class HistoryDB:
     def __init__(self, history_file: str = "analysis_history.json"):
         """JSON 기반 이력 저장소 초기화"""
         self.history_file = history_file
         self._ensure_history_file()
+        
+        # 프롬프트/응답 원문 압축 저장소
+        blob_dir = os.path.join(os.path.dirname(os.path.abspath(history_file)), "blobs")
+        self.blob_store = BlobStore(dict_dir=blob_dir)
+        
+        # 통계 카운터 (이력 파일 옆에 저장)
+        self.stats = get_history_stats(os.path.splitext(os.path.abspath(history_file))[0] + "_stats.json")
     
     def _ensure_history_file(self):
         """히스토리 파일이 존재하는지 확인하고 없으면 생성"""
@@ -63,6 +74,13 @@ class HistoryDB:
             # 현재 이력 로드
             history = self._load_history()
             
+            # 통계 카운터가 이력과 어긋나 있으면 먼저 재집계
+            if not self.stats.is_ready() or self.stats.total != len(history):
+                self.stats.rebuild(history)
+            
+            # 분석 단계에서 파싱한 결과 (원문만 있는 예전 구조는 공용 파서로 파싱)
+            parsed = get_parsed_response(analysis_result) or get_parsed_response(analysis_result.get('ai_result')) or {}
+            
             # 새로운 분석 결과 생성
             new_entry = {
                 'id': len(history) + 1,
@@ -74,10 +92,10 @@ class HistoryDB:
                 'issue_type': analysis_result.get('issue_type', ''),
                 'classification_method': analysis_result.get('classification', {}).get('method', ''),
                 'confidence': analysis_result.get('classification', {}).get('confidence', ''),
-                'response_type': analysis_result.get('gemini_result', {}).get('parsed_response', {}).get('response_type', ''),
-                'summary': analysis_result.get('gemini_result', {}).get('parsed_response', {}).get('summary', ''),
-                'action_flow': analysis_result.get('gemini_result', {}).get('parsed_response', {}).get('action_flow', ''),
-                'email_draft': analysis_result.get('gemini_result', {}).get('parsed_response', {}).get('email_draft', ''),
+                'response_type': parsed.get('response_type', ''),
+                'summary': parsed.get('summary', ''),
+                'action_flow': parsed.get('action_flow', ''),
+                'email_draft': parsed.get('email_draft', ''),
                 'user_name': inquiry_data.get('user_name', ''),
                 'user_role': inquiry_data.get('user_role', ''),
                 'system_version': inquiry_data.get('system_version', ''),
@@ -86,7 +104,7 @@ class HistoryDB:
                 'error_code': inquiry_data.get('error_code', ''),
                 'priority': inquiry_data.get('priority', ''),
                 'contract_type': inquiry_data.get('contract_type', ''),
-                'full_analysis_result': analysis_result
+                'full_analysis_result': self.blob_store.pack(analysis_result)
             }
             
             # 이력에 추가
@@ -94,6 +112,7 @@ class HistoryDB:
             
             # 저장
             if self._save_history(history):
+                self.stats.record(new_entry)
                 print("✅ 분석 결과가 JSON 파일에 저장되었습니다.")
                 return {"success": True, "database": "json"}
             else:
@@ -112,31 +131,7 @@ class HistoryDB:
             history = self._load_history()
             
             # 필터링
-            filtered_history = []
-            for entry in history:
-                # 문제 유형 필터
-                if issue_type and entry.get('issue_type') != issue_type:
-                    continue
-                
-                # 날짜 필터
-                if date_from and entry.get('timestamp', '') < date_from:
-                    continue
-                if date_to:
-                    # 종료 날짜를 포함하도록 수정 (시간까지 고려)
-                    if entry.get('timestamp', '') > date_to:
-                        continue
-                
-                # 키워드 필터
-                if keyword:
-                    content = entry.get('inquiry_content', '') + ' ' + entry.get('summary', '')
-                    if keyword.lower() not in content.lower():
-                        continue
-                
-                # 사용자 필터
-                if user_name and entry.get('user_name', '') != user_name:
-                    continue
-                
-                filtered_history.append(entry)
+            filtered_history = list(self._iter_filtered_history(history, issue_type, date_from, date_to, keyword, user_name))
             
             # 정렬 (최신순)
             filtered_history.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
@@ -171,7 +166,7 @@ class HistoryDB:
                     entry.get('error_code'),
                     entry.get('priority'),
                     entry.get('contract_type'),
-                    json.dumps(entry.get('full_analysis_result', {}), ensure_ascii=False)
+                    json.dumps(self.blob_store.unpack(entry.get('full_analysis_result', {})), ensure_ascii=False)
                 ))
             
             return tuples
@@ -180,37 +175,67 @@ class HistoryDB:
             print(f"❌ JSON 조회 실패: {e}")
             return []
     
-    def get_statistics(self):
-        """통계 정보 조회"""
-        try:
-            history = self._load_history()
+    def _iter_filtered_history(self, history: List[Dict], issue_type: str = None,
+                               date_from: str = None, date_to: str = None,
+                               keyword: str = None, user_name: str = None):
+        """이력 필터링 (정렬하지 않고 순회)"""
+        for entry in history:
+            # 문제 유형 필터
+            if issue_type and entry.get('issue_type') != issue_type:
+                continue
+            
+            # 날짜 필터
+            if date_from and entry.get('timestamp', '') < date_from:
+                continue
+            if date_to:
+                # 종료 날짜를 포함하도록 수정 (시간까지 고려)
+                if entry.get('timestamp', '') > date_to:
+                    continue
             
-            # 총 건수
-            total_count = len(history)
+            # 키워드 필터
+            if keyword:
+                content = entry.get('inquiry_content', '') + ' ' + entry.get('summary', '')
+                if keyword.lower() not in content.lower():
+                    continue
             
-            # 최근 30일 건수
-            thirty_days_ago = (datetime.now() - timedelta(days=30)).isoformat()
-            recent_count = len([entry for entry in history if entry.get('timestamp', '') >= thirty_days_ago])
+            # 사용자 필터
+            if user_name and entry.get('user_name', '') != user_name:
+                continue
             
-            # 문제 유형별 분포
-            issue_type_distribution = {}
-            for entry in history:
-                issue_type = entry.get('issue_type', '')
-                if issue_type:
-                    issue_type_distribution[issue_type] = issue_type_distribution.get(issue_type, 0) + 1
+            yield entry
+    
+    def get_history_page(self, cursor: str = None, page_size: int = 50,
+                         issue_type: str = None, date_from: str = None,
+                         date_to: str = None, keyword: str = None,
+                         user_name: str = None):
+        """커서 기반 이력 페이지 조회 ((timestamp, id) 키셋)"""
+        try:
+            history = self._load_history()
+            filtered = self._iter_filtered_history(history, issue_type, date_from, date_to, keyword, user_name)
+            page = keyset_page(filtered, cursor, page_size, id_field='id')
+            page['data'] = self.blob_store.unpack(page['data'])
+            return page
             
-            # 사용자별 분포
-            user_distribution = {}
-            for entry in history:
-                user_name = entry.get('user_name', '')
-                if user_name:
-                    user_distribution[user_name] = user_distribution.get(user_name, 0) + 1
+        except Exception as e:
+            print(f"❌ JSON 페이지 조회 실패: {e}")
+            return {"success": False, "error": str(e), "data": [], "next_cursor": None, "has_more": False}
+    
+    def rebuild_statistics(self):
+        """통계 카운터 재집계"""
+        return self.stats.rebuild(self._load_history())
+    
+    def get_statistics(self):
+        """통계 정보 조회 (저장 시점에 집계된 카운터 사용)"""
+        try:
+            if not self.stats.is_ready():
+                self.rebuild_statistics()
+            counters = self.stats.counters
             
             return {
-                'total_count': total_count,
-                'recent_count': recent_count,
-                'issue_type_distribution': issue_type_distribution,
-                'user_distribution': user_distribution
+                'total_count': counters['total'],
+                'recent_count': self.stats.recent_count(30),
+                'issue_type_distribution': dict(counters['issue_types']),
+                'user_distribution': dict(counters['user_names'])
             }
             
         except Exception as e:
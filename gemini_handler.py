@@ -5,6 +5,10 @@ from typing import Dict, Any, Optional
 import json
 import re
 import time
+from response_parser import (
+    parse_response, parse_structured_response, build_structured_prompt, gemini_response_schema,
+    structured_output_enabled
+)
 
 class GeminiHandler:
     def __init__(self, api_key: str = None, model_name: str = "gemini-1.5-pro"):
@@ -148,20 +152,35 @@ class GeminiHandler:
                                  condition_2: str = "") -> Dict[str, Any]:
         """완전한 응답 생성 프로세스"""
         try:
-            # 프롬프트 조립
-            prompt = self.build_prompt(
-                customer_input=customer_input,
-                issue_type=issue_type,
-                condition_1=condition_1,
-                condition_2=condition_2
-            )
+            structured = structured_output_enabled()
+            
+            # 프롬프트 조립 (구조화 출력은 형식 예시 없이 스키마로 응답 형식 지정)
+            if structured:
+                prompt = build_structured_prompt(customer_input, issue_type, condition_1, condition_2)
+                generation_config = {"response_mime_type": "application/json", "response_schema": gemini_response_schema()}
+            else:
+                prompt = self.build_prompt(
+                    customer_input=customer_input,
+                    issue_type=issue_type,
+                    condition_1=condition_1,
+                    condition_2=condition_2
+                )
+                generation_config = None
             
             # Gemini API 호출
-            api_response = self.generate_response(prompt)
+            api_response = self.generate_response(prompt, generation_config)
+            
+            if api_response["success"] and structured:
+                # 스키마로 강제된 JSON이므로 json.loads 한 번으로 파싱 (검증 실패 시 기본 응답)
+                try:
+                    parsed_response = parse_structured_response(api_response["response"])
+                except ValueError as e:
+                    api_response = dict(api_response, success=False, error=f"Gemini 구조화 응답 검증 실패: {e}")
             
             if api_response["success"]:
-                # 응답 파싱
-                parsed_response = self.parse_response(api_response["response"])
+                if not structured:
+                    # 응답 파싱
+                    parsed_response = self.parse_response(api_response["response"])
                 
                 # 파싱 결과 검증
                 if not parsed_response or not isinstance(parsed_response, dict):
@@ -214,126 +233,6 @@ class GeminiHandler:
                 }
             }
     
-    def _parse_response(self, response_text: str) -> Dict[str, Any]:
-        """Gemini 응답을 파싱하여 구조화된 데이터로 변환 - 간단하고 안정적인 방식"""
-        try:
-            import re
-            
-            # 기본 구조
-            parsed = {
-                'response_type': '해결안',
-                'summary': '',
-                'action_flow': '',
-                'email_draft': ''
-            }
-            
-            # 응답 유형 추출
-            if '질문' in response_text:
-                parsed['response_type'] = '질문'
-            elif '출동' in response_text:
-                parsed['response_type'] = '출동'
-            
-            # 간단한 섹션별 파싱
-            lines = response_text.split('\n')
-            current_section = ""
-            section_content = {"summary": [], "action": [], "email": []}
-            
-            for i, line in enumerate(lines):
-                line_original = line  # 원본 줄 보존
-                line_clean = line.strip()
-                
-                # 섹션 시작점 감지
-                if "요약" in line_clean.lower() and ":" in line_clean:
-                    current_section = "summary"
-                    # 같은 줄에 내용이 있는 경우
-                    if ":" in line_clean:
-                        content = line_clean.split(":", 1)[1].strip()
-                        if content:
-                            section_content["summary"].append(content)
-                elif "조치" in line_clean.lower() and "흐름" in line_clean.lower() and ":" in line_clean:
-                    current_section = "action"
-                    # 같은 줄에 내용이 있는 경우
-                    if ":" in line_clean:
-                        content = line_clean.split(":", 1)[1].strip()
-                        if content:
-                            section_content["action"].append(content)
-                elif "이메일" in line_clean.lower() and "초안" in line_clean.lower() and ":" in line_clean:
-                    current_section = "email"
-                    # 같은 줄에 내용이 있는 경우
-                    if ":" in line_clean:
-                        content = line_clean.split(":", 1)[1].strip()
-                        if content:
-                            section_content["email"].append(content)
-                elif line_clean == "```" and current_section == "email":
-                    # 이메일 초안의 ``` 구분자 시작/끝
-                    continue
-                elif line_clean == "---" and current_section == "email":
-                    # 이메일 초안의 --- 구분자 시작/끝
-                    continue
-                elif "[예외 처리 기준]" in line_clean:
-                    # 예외 처리 기준 섹션 시작 - 이메일 섹션 종료
-                    if current_section == "email":
-                        current_section = ""
-                elif current_section == "email" and not line_clean:
-                    # 이메일 섹션에서 빈 줄 처리
-                    # "감사합니다." 다음의 빈 줄인지 확인
-                    if section_content["email"] and "감사합니다" in section_content["email"][-1]:
-                        # 감사합니다 다음의 빈 줄이면 이메일 섹션 종료
-                        current_section = ""
-                    else:
-                        # 그 외의 빈 줄은 보존
-                        section_content["email"].append("")
-                elif current_section and line_clean:
-                    # 현재 섹션에 내용 추가 (불필요한 지시사항 제외)
-                    if not any(unwanted in line_clean.lower() for unwanted in [
-                        "[응답내용]", "[대응유형]", "아래 형식을", "실무자가 이해하기", 
-                        "자연스럽고 정확하게", "※ 각 단계는", "짧고 명확하게"
-                    ]):
-                        if current_section == "email":
-                            # 이메일은 원본 줄바꿈 보존
-                            section_content["email"].append(line_original.rstrip())
-                        else:
-                            # 요약과 조치는 정리된 형태로
-                            section_content[current_section].append(line_clean)
-            
-            # 결과 조립
-            parsed['summary'] = "\n".join(section_content["summary"]).strip()
-            parsed['action_flow'] = "\n".join(section_content["action"]).strip()
-            parsed['email_draft'] = "\n".join(section_content["email"]).strip()
-            
-            # [예외 처리 기준] 이후 내용 제거 (이메일 초안만)
-            if '[예외 처리 기준]' in parsed['email_draft']:
-                parsed['email_draft'] = parsed['email_draft'].split('[예외 처리 기준]')[0].strip()
-            
-            # GEMINI 파싱에서는 이미 파싱된 email_draft를 그대로 사용 (재파싱 불필요)
-            print(f"Gemini: 파싱된 email_draft 사용 - 길이: {len(parsed['email_draft'])}")
-            
-            # 빈 값 체크 및 기본값 설정
-            if not parsed['summary'] or len(parsed['summary']) < 5:
-                parsed['summary'] = "AI 분석 결과를 파싱할 수 없습니다. 고객 문의 내용을 확인해주세요."
-            if not parsed['action_flow'] or len(parsed['action_flow']) < 10:
-                parsed['action_flow'] = "AI 분석 결과를 파싱할 수 없습니다. 단계별 조치 사항을 확인해주세요."
-            if not parsed['email_draft'] or len(parsed['email_draft']) < 20:
-                parsed['email_draft'] = "AI 분석 결과를 파싱할 수 없습니다. 이메일 초안을 확인해주세요."
-            
-            # 디버깅을 위한 로그 추가
-            print(f"Gemini 파싱 결과 - 이메일 초안 길이: {len(parsed['email_draft'])}")
-            print(f"Gemini 파싱 결과 - 이메일 초안 (처음 200자): {parsed['email_draft'][:200]}")
-            print(f"Gemini 파싱 결과 - 이메일 초안 줄바꿈 개수: {parsed['email_draft'].count(chr(10))}")
-            print(f"Gemini 파싱 결과 - 이메일 초안 전체 내용:")
-            print(repr(parsed['email_draft']))
-            
-            return parsed
-            
-        except Exception as e:
-            print(f"Gemini 응답 파싱 오류: {e}")
-            return {
-                'response_type': '해결안',
-                'summary': response_text[:500] + "..." if len(response_text) > 500 else response_text,
-                'action_flow': "응답 파싱에 실패했습니다.",
-                'email_draft': "응답 파싱에 실패했습니다."
-            }
-    
     def _generate_default_response(self,
                                  customer_input: str,
                                  issue_type: str,
@@ -347,8 +246,8 @@ class GeminiHandler:
             'email_draft': f"고객님께서 문의하신 {customer_input} 내용을 확인했습니다. 현재 상황을 파악하여 적절한 해결책을 제시하겠습니다."
         }
     
-    def generate_response(self, prompt: str) -> Dict[str, Any]:
-        """Gemini API를 호출하여 응답 생성"""
+    def generate_response(self, prompt: str, generation_config: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Gemini API를 호출하여 응답 생성 (generation_config는 모델 기본 설정에 덧붙여 적용)"""
         try:
             if not self.model:
                 return {
@@ -358,13 +257,22 @@ class GeminiHandler:
                 }
             
             # API 호출
-            response = self.model.generate_content(prompt)
+            if generation_config:
+                response = self.model.generate_content(prompt, generation_config=generation_config)
+            else:
+                response = self.model.generate_content(prompt)
             
             if response and response.text:
+                usage = getattr(response, "usage_metadata", None)
                 return {
                     "success": True,
                     "response": response.text,
-                    "model": self.model_name
+                    "model": self.model_name,
+                    "usage": {
+                        "prompt_tokens": getattr(usage, "prompt_token_count", 0),
+                        "completion_tokens": getattr(usage, "candidates_token_count", 0),
+                        "total_tokens": getattr(usage, "total_token_count", 0)
+                    }
                 }
             else:
                 return {
@@ -382,5 +290,5 @@ class GeminiHandler:
             }
     
     def parse_response(self, response_text: str) -> Dict[str, Any]:
-        """응답 파싱 (외부에서 호출 가능한 메서드)"""
-        return self._parse_response(response_text)
+        """응답 파싱 (외부에서 호출 가능한 메서드, 공용 파서 사용)"""
+        return parse_response(response_text)
@@ -5,6 +5,11 @@ from typing import Dict, Any, Optional
 import json
 import re
 import time
+from response_parser import (
+    parse_response, parse_structured_response, build_structured_prompt, openai_response_format,
+    structured_output_enabled
+)
+from openai_handler import supports_structured_output
 
 class GPTHandler:
     def __init__(self, api_key: str = None):
@@ -147,8 +152,8 @@ class GPTHandler:
         )
         return prompt
     
-    def generate_response(self, prompt: str, model: str = "gpt-4o") -> Dict[str, Any]:
-        """OpenAI GPT API를 사용한 응답 생성"""
+    def generate_response(self, prompt: str, model: str = "gpt-4o", response_format: Dict[str, Any] = None) -> Dict[str, Any]:
+        """OpenAI GPT API를 사용한 응답 생성 (response_format 지정 시 구조화 출력)"""
         if not self.client:
             return {
                 "success": False,
@@ -168,7 +173,8 @@ class GPTHandler:
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=2000,
-                temperature=0.1
+                temperature=0.1,
+                **({"response_format": response_format} if response_format else {})
             )
             
             elapsed_time = time.time() - start_time
@@ -221,163 +227,10 @@ class GPTHandler:
             }
     
     def parse_response(self, response_text: str) -> Dict[str, Any]:
-        """응답 텍스트를 구조화된 형태로 파싱 - 간단하고 안정적인 방식"""
-        try:
-            import re
-            
-            # 기본값 설정
-            response_type = "해결안"
-            summary = ""
-            action_flow = ""
-            email_draft = ""
-            
-            # 응답 유형 결정
-            response_text_lower = response_text.lower()
-            if "질문" in response_text_lower and "출동" not in response_text_lower:
-                response_type = "질문"
-            elif "출동" in response_text_lower and "질문" not in response_text_lower:
-                response_type = "출동"
-            elif "해결안" in response_text_lower:
-                response_type = "해결안"
-            
-            # 간단한 섹션별 파싱
-            lines = response_text.split('\n')
-            current_section = ""
-            section_content = {"summary": [], "action": [], "email": []}
-            
-            for i, line in enumerate(lines):
-                line_original = line  # 원본 줄 보존
-                line_clean = line.strip()
-                
-                # 섹션 시작점 감지
-                if "요약" in line_clean.lower() and ":" in line_clean:
-                    current_section = "summary"
-                    # 같은 줄에 내용이 있는 경우
-                    if ":" in line_clean:
-                        content = line_clean.split(":", 1)[1].strip()
-                        if content:
-                            section_content["summary"].append(content)
-                elif "조치" in line_clean.lower() and "흐름" in line_clean.lower() and ":" in line_clean:
-                    current_section = "action"
-                    # 같은 줄에 내용이 있는 경우
-                    if ":" in line_clean:
-                        content = line_clean.split(":", 1)[1].strip()
-                        if content:
-                            section_content["action"].append(content)
-                elif "이메일" in line_clean.lower() and "초안" in line_clean.lower() and ":" in line_clean:
-                    current_section = "email"
-                    # 같은 줄에 내용이 있는 경우
-                    if ":" in line_clean:
-                        content = line_clean.split(":", 1)[1].strip()
-                        if content:
-                            section_content["email"].append(content)
-                elif line_clean == "```" and current_section == "email":
-                    # 이메일 초안의 ``` 구분자 시작/끝
-                    continue
-                elif line_clean == "---" and current_section == "email":
-                    # 이메일 초안의 --- 구분자 시작/끝
-                    continue
-                elif "[예외 처리 기준]" in line_clean:
-                    # 예외 처리 기준 섹션 시작 - 이메일 섹션 종료
-                    if current_section == "email":
-                        current_section = ""
-                elif current_section == "email" and not line_clean:
-                    # 이메일 섹션에서 빈 줄 처리
-                    # "감사합니다." 다음의 빈 줄인지 확인
-                    if section_content["email"] and "감사합니다" in section_content["email"][-1]:
-                        # 감사합니다 다음의 빈 줄이면 이메일 섹션 종료
-                        current_section = ""
-                    else:
-                        # 그 외의 빈 줄은 보존
-                        section_content["email"].append("")
-                elif current_section and line_clean:
-                    # 현재 섹션에 내용 추가 (불필요한 지시사항 제외)
-                    if not any(unwanted in line_clean.lower() for unwanted in [
-                        "[응답내용]", "[대응유형]", "아래 형식을", "실무자가 이해하기", 
-                        "자연스럽고 정확하게", "※ 각 단계는", "짧고 명확하게"
-                    ]):
-                        if current_section == "email":
-                            # 이메일은 원본 줄바꿈 보존
-                            section_content["email"].append(line_original.rstrip())
-                        else:
-                            # 요약과 조치는 정리된 형태로
-                            section_content[current_section].append(line_clean)
-            
-            # 결과 조립
-            summary = "\n".join(section_content["summary"]).strip()
-            action_flow = "\n".join(section_content["action"]).strip()
-            email_draft = "\n".join(section_content["email"]).strip()
-            
-            # [예외 처리 기준] 이후 내용 제거 (이메일 초안만)
-            if '[예외 처리 기준]' in email_draft:
-                email_draft = email_draft.split('[예외 처리 기준]')[0].strip()
-            
-            # 이메일 초안이 너무 짧거나 구체적인 단계가 없는 경우 정규식으로 재파싱
-            if len(email_draft) < 100 or "1." not in email_draft:
-                print("GPT: 이메일 초안이 짧거나 단계가 없어 정규식으로 재파싱 시도")
-                
-                # 패턴 1: ```로 둘러싸인 이메일 초안 추출
-                email_pattern1 = r'이메일\s*초안[:\s]*\n```\n(.*?)\n```'
-                email_match1 = re.search(email_pattern1, response_text, re.DOTALL)
-                if email_match1:
-                    email_draft = email_match1.group(1).strip()
-                    print(f"GPT: 정규식으로 재파싱 성공 (패턴1) - 길이: {len(email_draft)}")
-                else:
-                    # 패턴 2: "감사합니다."로 끝나는 이메일 초안 추출 (빈 줄 포함)
-                    email_pattern2 = r'이메일\s*초안[:\s]*\n(.*?감사합니다\.\s*\n?\s*)(?=\n\s*$)'
-                    email_match2 = re.search(email_pattern2, response_text, re.DOTALL)
-                    if email_match2:
-                        email_draft = email_match2.group(1).strip()
-                        print(f"GPT: 정규식으로 재파싱 성공 (패턴2) - 길이: {len(email_draft)}")
-                    else:
-                        # 패턴 3: [예외 처리 기준] 전까지의 이메일 초안 추출
-                        email_pattern3 = r'이메일\s*초안[:\s]*\n(.*?)(?=\n\s*\[예외\s*처리\s*기준\])'
-                        email_match3 = re.search(email_pattern3, response_text, re.DOTALL)
-                        if email_match3:
-                            email_draft = email_match3.group(1).strip()
-                            print(f"GPT: 정규식으로 재파싱 성공 (패턴3) - 길이: {len(email_draft)}")
-                        else:
-                            # 패턴 4: 응답 끝까지의 이메일 초안 추출
-                            email_pattern4 = r'이메일\s*초안[:\s]*\n(.*?)(?=\n\s*$)'
-                            email_match4 = re.search(email_pattern4, response_text, re.DOTALL)
-                            if email_match4:
-                                email_draft = email_match4.group(1).strip()
-                                print(f"GPT: 정규식으로 재파싱 성공 (패턴4) - 길이: {len(email_draft)}")
-            
-            # 디버깅을 위한 로그 추가
-            print(f"GPT 파싱 결과 - 이메일 초안 길이: {len(email_draft)}")
-            print(f"GPT 파싱 결과 - 이메일 초안 (처음 300자): {email_draft[:300]}")
-            print(f"GPT 파싱 결과 - 이메일 초안 줄바꿈 개수: {email_draft.count(chr(10))}")
-            print(f"GPT 파싱 결과 - 이메일 초안 전체 내용:")
-            print(repr(email_draft))
-            
-            # 빈 값 체크 및 기본값 설정
-            if not summary or len(summary) < 5:
-                summary = "AI 분석 결과를 파싱할 수 없습니다. 고객 문의 내용을 확인해주세요."
-            if not action_flow or len(action_flow) < 10:
-                action_flow = "AI 분석 결과를 파싱할 수 없습니다. 단계별 조치 사항을 확인해주세요."
-            if not email_draft or len(email_draft) < 20:
-                email_draft = "AI 분석 결과를 파싱할 수 없습니다. 이메일 초안을 확인해주세요."
-            
-            result = {
-                "response_type": response_type,
-                "summary": summary,
-                "action_flow": action_flow,
-                "email_draft": email_draft,
-                "full_response": response_text
-            }
-            
-            return result
-            
-        except Exception as e:
-            print(f"GPT 파싱 오류: {e}")
-            return {
-                "response_type": "해결안",
-                "summary": "파싱 오류로 인해 요약을 생성할 수 없습니다. 고객 문의 내용을 확인해주세요.",
-                "action_flow": "파싱 오류로 인해 조치 흐름을 생성할 수 없습니다. 단계별 조치 사항을 확인해주세요.",
-                "email_draft": "파싱 오류로 인해 이메일 초안을 생성할 수 없습니다. 이메일 초안을 확인해주세요.",
-                "full_response": response_text
-            }
+        """응답 텍스트를 구조화된 형태로 파싱 (공용 파서 사용, 원문은 full_response로 함께 반환)"""
+        parsed = parse_response(response_text)
+        parsed["full_response"] = response_text
+        return parsed
     
     def generate_complete_response(self,
                                  customer_input: str,
@@ -387,20 +240,34 @@ class GPTHandler:
                                  model: str = "gpt-4o") -> Dict[str, Any]:
         """완전한 응답 생성 프로세스"""
         try:
-            # 프롬프트 조립
-            prompt = self.build_prompt(
-                customer_input=customer_input,
-                issue_type=issue_type,
-                condition_1=condition_1,
-                condition_2=condition_2
-            )
+            structured = structured_output_enabled() and supports_structured_output(model)
+            
+            # 프롬프트 조립 (구조화 출력은 형식 예시 없이 스키마로 응답 형식 지정)
+            if structured:
+                prompt = build_structured_prompt(customer_input, issue_type, condition_1, condition_2)
+            else:
+                prompt = self.build_prompt(
+                    customer_input=customer_input,
+                    issue_type=issue_type,
+                    condition_1=condition_1,
+                    condition_2=condition_2
+                )
             
             # GPT API 호출
-            api_response = self.generate_response(prompt, model)
+            api_response = self.generate_response(prompt, model, openai_response_format() if structured else None)
+            
+            if api_response["success"] and structured:
+                # 스키마로 강제된 JSON이므로 json.loads 한 번으로 파싱 (검증 실패 시 기본 응답)
+                try:
+                    parsed_response = parse_structured_response(api_response["response"])
+                    parsed_response["full_response"] = api_response["response"]
+                except ValueError as e:
+                    api_response = {"success": False, "error": f"GPT 구조화 응답 검증 실패: {e}"}
             
             if api_response["success"]:
-                # 응답 파싱
-                parsed_response = self.parse_response(api_response["response"])
+                if not structured:
+                    # 응답 파싱
+                    parsed_response = self.parse_response(api_response["response"])
                 
                 # 파싱 결과 검증
                 if not parsed_response or not isinstance(parsed_response, dict):
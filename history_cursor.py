@@ -0,0 +1,63 @@
+"""
+이력 키셋(커서) 페이지네이션 도구
+(timestamp, id) 기준 최신순 정렬에서 마지막으로 본 위치를 커서 문자열로 주고받습니다.
+"""
+import base64
+import heapq
+import json
+from typing import Dict, Any, Optional, Tuple, Iterable
+
+
+def encode_cursor(timestamp: Any, entry_id: Any) -> str:
+    """마지막 항목의 (timestamp, id)를 커서 문자열로 변환"""
+    payload = json.dumps([str(timestamp or ''), entry_id], ensure_ascii=False, default=str)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, Any]]:
+    """커서 문자열을 (timestamp, id)로 복원 (잘못된 커서는 None)"""
+    if not cursor:
+        return None
+    try:
+        timestamp, entry_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        return timestamp, entry_id
+    except Exception as e:
+        print(f"⚠️ 잘못된 페이지 커서: {e}")
+        return None
+
+
+def _sort_key(entry: Dict, id_field: str) -> Tuple[str, str]:
+    """정렬 키 (timestamp, id) - 타입이 섞여도 비교 가능하도록 id는 0으로 채운 문자열 사용"""
+    entry_id = entry.get(id_field)
+    if isinstance(entry_id, int):
+        entry_id = f"{entry_id:020d}"
+    return str(entry.get('timestamp', '') or ''), str(entry_id or '')
+
+
+def keyset_page(entries: Iterable[Dict], cursor: Optional[str], page_size: int,
+                id_field: str = 'id') -> Dict[str, Any]:
+    """
+    메모리 상의 이력에서 커서 다음 페이지를 추출 (최신순).
+    전체 정렬 대신 커서 이후 항목 중 상위 page_size+1개만 선택하므로 페이지 깊이와 무관한 비용입니다.
+    """
+    position = decode_cursor(cursor)
+    if position:
+        cursor_entry = {'timestamp': position[0], id_field: position[1]}
+        cursor_key = _sort_key(cursor_entry, id_field)
+        entries = (entry for entry in entries if _sort_key(entry, id_field) < cursor_key)
+
+    page = heapq.nlargest(page_size + 1, entries, key=lambda entry: _sort_key(entry, id_field))
+    has_more = len(page) > page_size
+    page = page[:page_size]
+
+    next_cursor = None
+    if has_more and page:
+        last = page[-1]
+        next_cursor = encode_cursor(last.get('timestamp', ''), last.get(id_field))
+
+    return {
+        "success": True,
+        "data": page,
+        "next_cursor": next_cursor,
+        "has_more": has_more
+    }
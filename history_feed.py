@@ -0,0 +1,420 @@
+"""
+최근 이력 실시간 피드
+MongoDB 변경 스트림(로컬 JSON 저장소는 이력 저널 파일)을 구독해 프로세스 메모리의 최근 이력 링 버퍼를 최신 상태로 유지합니다.
+이력 탭은 버퍼에서 바로 첫 페이지를 구성하고, 버퍼로 부족한 검색은 조건별로 캐시해 두었다가
+해당 조건에 맞는 변경이 들어올 때만 캐시를 무효화합니다.
+"""
+import bisect
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Any, Optional, Tuple
+
+from history_cursor import encode_cursor
+from history_row import HistoryRow, TABLE_FIELDS
+
+# 저널 파일이 이 크기를 넘으면 비우고 새로 시작 (구독 측은 버퍼를 다시 채움)
+JOURNAL_MAX_BYTES = 1024 * 1024
+
+_feed = None
+_feed_lock = threading.Lock()
+
+
+def matches_query(query: Optional[Dict], row: HistoryRow) -> bool:
+    """검색 조건(date_from, date_to, issue_type, user_name)에 맞는 행인지 확인 (저장소 필터와 같은 규칙)"""
+    if not query:
+        return True
+    if query.get('issue_type') and row.issue_type != query['issue_type']:
+        return False
+    if query.get('user_name') and row.user_name != query['user_name']:
+        return False
+    # timestamp는 KST ISO 문자열이므로 날짜 문자열과 바로 비교
+    if query.get('date_from') and row.timestamp < query['date_from']:
+        return False
+    if query.get('date_to') and row.timestamp > query['date_to']:
+        return False
+    return True
+
+
+def _query_key(query: Optional[Dict], page_size: int) -> str:
+    """조건별 캐시 키"""
+    return json.dumps([query or {}, page_size], sort_keys=True, default=str)
+
+
+def _sort_key(row: HistoryRow, cursor_id: Any) -> Tuple[str, str]:
+    """(timestamp, id) 정렬 키 - 저장소 커서와 같은 순서 (정수 ID는 0으로 채움)"""
+    entry_id = cursor_id if cursor_id is not None else row.id
+    if isinstance(entry_id, int):
+        entry_id = f"{entry_id:020d}"
+    return row.timestamp, str(entry_id)
+
+
+def append_journal(journal_path: str, record: Dict):
+    """이력 저널에 변경 한 줄 추가 (로컬 JSON 저장소용 변경 로그)"""
+    try:
+        if os.path.getsize(journal_path) > JOURNAL_MAX_BYTES:
+            temp_file = journal_path + '.tmp'
+            open(temp_file, 'w', encoding='utf-8').close()
+            os.replace(temp_file, journal_path)
+    except OSError:
+        pass
+    with open(journal_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        f.flush()
+
+
+class HistoryFeed:
+    """최근 이력 링 버퍼 + 조건별 페이지 캐시"""
+
+    MAX_CHANGES = 1000
+    MAX_CACHED_PAGES = 32
+
+    def __init__(self, capacity: int = 500):
+        self.capacity = capacity
+        self._lock = threading.RLock()
+        self._keys = []           # 정렬 키 (오름차순, 마지막이 최신)
+        self._rows = {}           # 정렬 키 -> (HistoryRow, 커서용 ID)
+        self._key_by_id = {}      # 행 ID -> 정렬 키
+        self._changes = deque(maxlen=self.MAX_CHANGES)   # (version, op, 값)
+        self._pages = OrderedDict()                      # 조건별 DB 조회 결과
+        self.version = 0
+        self.source = None        # 'mongodb' / 'local'
+        self.live = False         # 구독이 동작 중일 때만 버퍼/캐시 사용
+        self.complete = False     # 버퍼가 전체 이력을 담고 있는지
+        self.subscriber = None
+        self.metrics = {"feed_hits": 0, "cache_hits": 0, "misses": 0,
+                        "inserts": 0, "deletes": 0, "invalidations": 0}
+
+    def _record_change(self, op: str, value: Any = None):
+        self.version += 1
+        self._changes.append((self.version, op, value))
+
+    def _insert(self, row: HistoryRow, cursor_id: Any):
+        """버퍼에 행 추가 (같은 ID는 교체, 용량을 넘으면 가장 오래된 행 제거)"""
+        self._discard(row.id)
+        key = _sort_key(row, cursor_id)
+        bisect.insort(self._keys, key)
+        self._rows[key] = (row, cursor_id)
+        self._key_by_id[row.id] = key
+        while len(self._keys) > self.capacity:
+            oldest = self._keys.pop(0)
+            oldest_row, _ = self._rows.pop(oldest)
+            self._key_by_id.pop(oldest_row.id, None)
+            self.complete = False
+
+    def _discard(self, row_id: str) -> bool:
+        key = self._key_by_id.pop(row_id, None)
+        if key is None:
+            return False
+        index = bisect.bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            self._keys.pop(index)
+        self._rows.pop(key, None)
+        return True
+
+    def _invalidate(self, predicate):
+        """조건에 해당하는 캐시 페이지만 제거"""
+        for cache_key in [key for key, entry in self._pages.items() if predicate(entry)]:
+            del self._pages[cache_key]
+            self.metrics["invalidations"] += 1
+
+    def load(self, source: str, rows: List[Tuple[HistoryRow, Any]], complete: bool):
+        """저장소에서 읽은 최신 이력으로 버퍼를 다시 채움 (구독 시작/재개 불가 시)"""
+        with self._lock:
+            self._keys, self._rows, self._key_by_id = [], {}, {}
+            # 용량을 넘어 잘려나가면 _insert에서 False로 바뀜
+            self.complete = complete
+            for row, cursor_id in rows:
+                self._insert(row, cursor_id)
+            self.source = source
+            self.live = True
+            self._pages.clear()
+            self._record_change('reset')
+        print(f"✅ 최근 이력 피드 준비 ({source}, {len(self._keys)}건)")
+
+    def push(self, row: HistoryRow, cursor_id: Any = None):
+        """새 이력 반영 (조건에 맞는 캐시 페이지만 무효화)"""
+        with self._lock:
+            self._insert(row, cursor_id)
+            self.metrics["inserts"] += 1
+            self._record_change('insert', row)
+            self._invalidate(lambda entry: matches_query(entry['query'], row))
+
+    def remove(self, row_id: str):
+        """삭제된 이력 반영 (해당 행을 담은 캐시 페이지만 무효화)"""
+        with self._lock:
+            self._discard(row_id)
+            self.metrics["deletes"] += 1
+            self._record_change('delete', row_id)
+            self._invalidate(lambda entry: row_id in entry['ids'])
+
+    def clear(self):
+        """전체 이력 삭제 반영"""
+        with self._lock:
+            self._keys, self._rows, self._key_by_id = [], {}, {}
+            self.complete = True
+            self._pages.clear()
+            self._record_change('clear')
+
+    def mark_stale(self):
+        """구독이 끊겨 버퍼를 신뢰할 수 없음 (다시 채워질 때까지 저장소 조회)"""
+        with self._lock:
+            if self.live:
+                self.live = False
+                self._pages.clear()
+                self._record_change('reset')
+
+    def page(self, query: Optional[Dict], page_size: int) -> Optional[Dict[str, Any]]:
+        """버퍼 또는 캐시로 첫 페이지 구성 (구성할 수 없으면 None - 저장소 조회 필요)"""
+        with self._lock:
+            if not self.live:
+                self.metrics["misses"] += 1
+                return None
+
+            matched = []
+            for key in reversed(self._keys):
+                row, cursor_id = self._rows[key]
+                if matches_query(query, row):
+                    matched.append((row, cursor_id))
+                    if len(matched) > page_size:
+                        break
+
+            # 버퍼는 최신 이력의 연속 구간이므로 page_size보다 많이 맞으면 첫 페이지가 확정됨
+            if len(matched) > page_size or self.complete:
+                has_more = len(matched) > page_size
+                matched = matched[:page_size]
+                next_cursor = None
+                if has_more:
+                    last_row, last_id = matched[-1]
+                    next_cursor = encode_cursor(last_row.timestamp, last_id)
+                self.metrics["feed_hits"] += 1
+                return {
+                    "success": True,
+                    "data": [row for row, _ in matched],
+                    "next_cursor": next_cursor,
+                    "has_more": has_more,
+                    "source": self.source,
+                    "from_feed": True
+                }
+
+            entry = self._pages.get(_query_key(query, page_size))
+            if entry:
+                self._pages.move_to_end(_query_key(query, page_size))
+                self.metrics["cache_hits"] += 1
+                return dict(entry['result'], data=list(entry['result']['data']), from_feed=True)
+
+            self.metrics["misses"] += 1
+            return None
+
+    def remember_page(self, query: Optional[Dict], page_size: int, result: Dict):
+        """저장소에서 조회한 첫 페이지를 조건별로 캐시 (구독 중이고 같은 저장소일 때만)"""
+        with self._lock:
+            if not self.live or result.get('source') != self.source:
+                return
+            cache_key = _query_key(query, page_size)
+            self._pages[cache_key] = {
+                "query": query,
+                "ids": {row.id for row in result.get('data', [])},
+                "result": dict(result, data=list(result.get('data', [])))
+            }
+            self._pages.move_to_end(cache_key)
+            while len(self._pages) > self.MAX_CACHED_PAGES:
+                self._pages.popitem(last=False)
+
+    def changes_since(self, version: int) -> Optional[List[Tuple[str, Any]]]:
+        """version 이후 변경 목록 (버퍼를 다시 채웠거나 기록이 밀려났으면 None)"""
+        with self._lock:
+            if version == self.version:
+                return []
+            changes = [(op, value) for change_version, op, value in self._changes if change_version > version]
+            if len(changes) != self.version - version or any(op == 'reset' for op, _ in changes):
+                return None
+            return changes
+
+    def get_stats(self) -> Dict[str, Any]:
+        """피드 상태 지표"""
+        with self._lock:
+            return {
+                "source": self.source,
+                "live": self.live,
+                "size": len(self._keys),
+                "capacity": self.capacity,
+                "complete": self.complete,
+                "version": self.version,
+                "cached_pages": len(self._pages),
+                "subscriber": type(self.subscriber).__name__ if self.subscriber else None,
+                **self.metrics
+            }
+
+
+class ChangeStreamSubscriber:
+    """analysis_history 변경 스트림 구독 (replica set / Atlas에서만 지원)"""
+
+    RETRY_DELAY = 5.0
+    # 변경 스트림을 사용할 수 없는 배포 (단일 서버 등)
+    UNSUPPORTED_CODES = {40573}
+    # 재개 토큰이 만료되어 처음부터 다시 읽어야 하는 경우
+    RESEED_CODES = {280, 286}
+
+    def __init__(self, feed: HistoryFeed, mongo_handler):
+        self.feed = feed
+        self.mongo_handler = mongo_handler
+        self._resume_token = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="history-change-stream", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _seed(self):
+        """목록 컬럼만 프로젝션해 최신 이력으로 버퍼 채우기"""
+        result = self.mongo_handler.get_history_page(page_size=self.feed.capacity, table_only=True)
+        if not result.get('success'):
+            raise RuntimeError(result.get('error'))
+        self.feed.load('mongodb', [(row, row.id) for row in result['data']], complete=not result['has_more'])
+
+    def _apply(self, change: Dict):
+        from mongodb_handler import to_kst_isoformat
+        operation = change.get('operationType')
+        if operation in ('insert', 'replace'):
+            document = dict(change.get('fullDocument') or {})
+            document['timestamp'] = to_kst_isoformat(document.get('timestamp'))
+            row = HistoryRow.from_entry(document)
+            self.feed.push(row, row.id)
+        elif operation == 'delete':
+            self.feed.remove(str(change['documentKey']['_id']))
+        elif operation in ('drop', 'invalidate'):
+            self.feed.clear()
+            self._resume_token = None
+
+    def _run(self):
+        from pymongo.errors import OperationFailure, PyMongoError
+        pipeline = [
+            {"$match": {"operationType": {"$in": ["insert", "replace", "delete", "drop", "invalidate"]}}},
+            {"$project": dict(
+                {"operationType": 1, "documentKey": 1, "fullDocument._id": 1},
+                **{f"fullDocument.{field}": 1 for field in TABLE_FIELDS}
+            )}
+        ]
+        while not self._stop.is_set():
+            try:
+                with self.mongo_handler.history_collection.watch(
+                    pipeline, resume_after=self._resume_token, max_await_time_ms=1000
+                ) as stream:
+                    # 스트림을 먼저 연 뒤 버퍼를 채워 그 사이 저장된 이력도 놓치지 않음 (중복은 ID로 교체)
+                    if self._resume_token is None or not self.feed.live:
+                        self._seed()
+                    while not self._stop.is_set() and stream.alive:
+                        change = stream.try_next()
+                        if change is None:
+                            continue
+                        self._resume_token = stream.resume_token
+                        self._apply(change)
+                        if self._resume_token is None:
+                            break
+            except OperationFailure as e:
+                self.feed.mark_stale()
+                if e.code in self.UNSUPPORTED_CODES:
+                    print(f"⚠️ MongoDB 변경 스트림을 사용할 수 없어 이력 피드를 끕니다: {e}")
+                    return
+                if e.code in self.RESEED_CODES:
+                    self._resume_token = None
+                print(f"⚠️ 이력 변경 스트림 오류, 재연결합니다: {e}")
+                self._stop.wait(self.RETRY_DELAY)
+            except (PyMongoError, RuntimeError) as e:
+                self.feed.mark_stale()
+                print(f"⚠️ 이력 변경 스트림 중단, 재연결합니다: {e}")
+                self._stop.wait(self.RETRY_DELAY)
+
+
+class JournalTailer:
+    """로컬 JSON 저장소의 이력 저널 파일을 따라 읽는 구독자 (변경 스트림 대체)"""
+
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, feed: HistoryFeed, local_db):
+        self.feed = feed
+        self.local_db = local_db
+        self.journal_path = local_db.journal_path
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="history-journal", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _seed(self):
+        result = self.local_db.get_history_page(page_size=self.feed.capacity)
+        if not result.get('success'):
+            raise RuntimeError(result.get('error'))
+        rows = [(HistoryRow.from_entry(entry), entry.get('global_id')) for entry in result['data']]
+        self.feed.load('local', rows, complete=not result['has_more'])
+
+    def _apply(self, record: Dict):
+        if record.get('op') == 'insert':
+            entry = record.get('row') or {}
+            self.feed.push(HistoryRow.from_entry(entry), entry.get('global_id'))
+        elif record.get('op') == 'clear':
+            self.feed.clear()
+
+    def _run(self):
+        offset = None
+        inode = None
+        while not self._stop.is_set():
+            try:
+                stat = os.stat(self.journal_path) if os.path.exists(self.journal_path) else None
+                current_inode = stat.st_ino if stat else None
+                size = stat.st_size if stat else 0
+
+                if offset is not None and inode is None and current_inode is not None:
+                    # 저널 파일이 새로 생김 - 처음부터 읽음
+                    inode, offset = current_inode, 0
+                elif offset is None or current_inode != inode or size < offset:
+                    # 처음 시작 또는 저널이 비워짐 - 현재 위치부터 따라 읽고 버퍼는 저장소에서 다시 채움
+                    inode, offset = current_inode, size
+                    self._seed()
+                if size > offset:
+                    with open(self.journal_path, 'rb') as f:
+                        f.seek(offset)
+                        chunk = f.read(size - offset)
+                    # 기록 중인 마지막 줄은 다음 번에 읽음
+                    end = chunk.rfind(b"\n") + 1
+                    for line in chunk[:end].splitlines():
+                        if line.strip():
+                            self._apply(json.loads(line.decode('utf-8')))
+                    offset += end
+            except Exception as e:
+                print(f"⚠️ 이력 저널 읽기 실패: {e}")
+                self.feed.mark_stale()
+                offset = None
+            self._stop.wait(self.POLL_INTERVAL)
+
+
+def get_history_feed(capacity: int = 500) -> HistoryFeed:
+    """프로세스 공용 최근 이력 피드"""
+    global _feed
+    with _feed_lock:
+        if _feed is None:
+            _feed = HistoryFeed(capacity)
+        return _feed
+
+
+def start_history_feed(mongo_handler=None, local_db=None, capacity: int = 500) -> HistoryFeed:
+    """피드 구독 시작 (프로세스당 한 번, MongoDB 연결 시 변경 스트림 / 아니면 로컬 저널)"""
+    feed = get_history_feed(capacity)
+    with _feed_lock:
+        if feed.subscriber is None:
+            if mongo_handler is not None:
+                feed.subscriber = ChangeStreamSubscriber(feed, mongo_handler)
+            elif local_db is not None and getattr(local_db, 'journal_path', None):
+                feed.subscriber = JournalTailer(feed, local_db)
+            else:
+                return feed
+            feed.subscriber.start()
+    return feed
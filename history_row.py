@@ -0,0 +1,87 @@
+"""
+이력 목록 표시용 행 타입
+MongoDB 프로젝션 결과와 로컬 저장소 항목을 같은 형태로 맞춰 이력 탭에서 사용합니다.
+"""
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Dict, Any
+
+# 이력 목록(테이블)에 필요한 필드만
+TABLE_FIELDS = [
+    'timestamp', 'customer_name', 'issue_type', 'priority',
+    'user_name', 'user_role', 'response_type'
+]
+
+
+def format_display_date(timestamp: Any) -> str:
+    """타임스탬프를 'YYYY-MM-DD HH:MM:SS' 형식으로 변환 (로컬 저장소 항목용)"""
+    if isinstance(timestamp, datetime):
+        return timestamp.strftime('%Y-%m-%d %H:%M:%S')
+    timestamp = str(timestamp or '').strip()
+    if not timestamp:
+        return ""
+    try:
+        # ISO 형식 (마이크로초/시간대 포함, 'T' 또는 공백 구분)
+        return datetime.fromisoformat(timestamp.replace('Z', '+00:00')).strftime('%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        # 파싱이 실패한 경우 원본 문자열에서 슬라이싱
+        return timestamp.replace('T', ' ')[:19]
+
+
+def analysis_key(entry) -> str:
+    """상세보기 렌더 캐시 키 (analysis_id가 없던 이전 로컬 이력은 global_id로)"""
+    key = entry.get('analysis_id') or entry.get('_id')
+    if not key and entry.get('global_id'):
+        key = f"global-{entry['global_id']}"
+    return str(key or '')
+
+
+@dataclass
+class HistoryRow:
+    """이력 목록 한 행"""
+    id: str
+    timestamp: str
+    display_date: str
+    customer_name: str = ""
+    issue_type: str = ""
+    priority: str = ""
+    user_name: str = ""
+    user_role: str = ""
+    response_type: str = ""
+    # 상세보기 렌더 캐시 키 (MongoDB는 _id, 로컬 저장소는 저장 시 발급한 analysis_id, 없으면 global_id)
+    analysis_id: str = ""
+
+    @classmethod
+    def from_entry(cls, entry) -> "HistoryRow":
+        """MongoDB 문서/로컬 이력 항목을 행으로 변환 (display_date가 있으면 그대로 사용)"""
+        if isinstance(entry, cls):
+            return entry
+        entry_id = entry.get('_id') or entry.get('global_id') or entry.get('id') or ''
+        return cls(
+            id=str(entry_id),
+            timestamp=str(entry.get('timestamp', '') or ''),
+            display_date=entry.get('display_date') or format_display_date(entry.get('timestamp', '')),
+            customer_name=entry.get('customer_name', '') or '',
+            issue_type=entry.get('issue_type', '') or '',
+            priority=entry.get('priority', '') or '',
+            user_name=entry.get('user_name', '') or '',
+            user_role=entry.get('user_role', '') or '',
+            response_type=entry.get('response_type', '') or '',
+            analysis_id=analysis_key(entry)
+        )
+
+    def to_table_row(self, number: int) -> Dict[str, Any]:
+        """이력 탭 데이터프레임 행"""
+        return {
+            "번호": number,
+            "날짜": self.display_date,
+            "고객사명": self.customer_name,
+            "문의유형": self.issue_type,
+            "우선순위": self.priority,
+            "담당자": self.user_name,
+            "역할": self.user_role,
+            "analysis_id": self.analysis_id
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
@@ -0,0 +1,218 @@
+"""
+이력 통계 집계 카운터
+분석 결과 저장 시점에 사용자/문제 유형/응답 유형/일자별 건수를 증가시켜 두고,
+통계 조회는 이력 전체를 다시 읽지 않고 카운터만 반환합니다.
+"""
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Iterable
+
+STATS_VERSION = 1
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def _entry_response_types(entry: Dict) -> List[str]:
+    """이력 항목의 응답 유형 (최상위 필드 + Gemini 파싱 결과)"""
+    response_types = []
+    response_type = entry.get('response_type', '')
+    if response_type:
+        response_types.append(response_type)
+
+    full_result = entry.get('full_analysis_result') or {}
+    if isinstance(full_result, dict):
+        parsed_response = (full_result.get('gemini_result') or {}).get('parsed_response') or {}
+        parsed_type = parsed_response.get('response_type', '') if isinstance(parsed_response, dict) else ''
+        if parsed_type and parsed_type not in response_types:
+            response_types.append(parsed_type)
+    return response_types
+
+
+def _increment(counter: Dict[str, int], key: str, amount: int = 1):
+    """카운터 증가 (0 이하가 되면 제거)"""
+    value = counter.get(key, 0) + amount
+    if value > 0:
+        counter[key] = value
+    else:
+        counter.pop(key, None)
+
+
+class HistoryStats:
+    """
+    이력 통계 카운터 (저장소 옆 JSON 파일에 영속화).
+    같은 파일은 get_history_stats로 프로세스에서 한 인스턴스를 공유하고,
+    다른 프로세스가 파일을 고치면 수정 시각을 보고 다시 읽습니다.
+    """
+
+    def __init__(self, stats_file: Optional[str] = None):
+        """stats_file이 None이면 메모리에만 유지 (클라우드 환경)"""
+        self.stats_file = stats_file
+        self._lock = threading.RLock()
+        self._mtime = None
+        self._counters = self._load()
+
+    @property
+    def counters(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            return self._counters
+
+    def _file_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.stats_file).st_mtime_ns
+        except OSError:
+            return None
+
+    def _refresh(self):
+        """다른 프로세스가 카운터 파일을 고쳤으면 다시 로드 (_lock 안에서 호출)"""
+        if self.stats_file and self._file_mtime() != self._mtime:
+            self._counters = self._load()
+
+    def _empty(self) -> Dict[str, Any]:
+        """빈 카운터"""
+        return {
+            "version": STATS_VERSION,
+            "ready": False,
+            "total": 0,
+            "users": {},
+            "user_names": {},
+            "issue_types": {},
+            "response_types": {},
+            "days": {},
+            "per_user": {},
+            "updated_at": None
+        }
+
+    def _load(self) -> Dict[str, Any]:
+        """저장된 카운터 로드 (없거나 버전이 다르면 재집계 필요 상태)"""
+        if not self.stats_file or not os.path.exists(self.stats_file):
+            return self._empty()
+        try:
+            self._mtime = self._file_mtime()
+            with open(self.stats_file, 'r', encoding='utf-8') as f:
+                counters = json.load(f)
+            if counters.get('version') != STATS_VERSION:
+                return self._empty()
+            return counters
+        except Exception as e:
+            print(f"⚠️ 통계 카운터 로드 실패 (재집계 예정): {e}")
+            return self._empty()
+
+    def _save(self) -> bool:
+        """카운터 저장 (임시 파일 후 교체)"""
+        if not self.stats_file:
+            return True
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.stats_file)), exist_ok=True)
+            temp_file = self.stats_file + '.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self._counters, f, ensure_ascii=False)
+            os.replace(temp_file, self.stats_file)
+            self._mtime = self._file_mtime()
+            return True
+        except Exception as e:
+            print(f"⚠️ 통계 카운터 저장 실패: {e}")
+            return False
+
+    def _apply(self, entry: Dict, amount: int = 1):
+        """항목 하나를 카운터에 반영 (amount=-1이면 차감)"""
+        counters = self._counters
+        counters['total'] = max(0, counters['total'] + amount)
+
+        user_name = entry.get('user_name', '')
+        user_role = entry.get('user_role', '')
+        if user_name and user_role:
+            _increment(counters['users'], f"{user_name}_{user_role}", amount)
+        if user_name:
+            _increment(counters['user_names'], user_name, amount)
+
+        issue_type = entry.get('issue_type', '')
+        if issue_type:
+            _increment(counters['issue_types'], issue_type, amount)
+
+        response_types = _entry_response_types(entry)
+        for response_type in response_types:
+            _increment(counters['response_types'], response_type, amount)
+
+        day = str(entry.get('timestamp', '') or '')[:10]
+        if day:
+            _increment(counters['days'], day, amount)
+
+        # 사용자별 카운터 (user_id가 있는 저장소만)
+        user_id = entry.get('user_id')
+        if user_id:
+            user_counters = counters['per_user'].setdefault(
+                user_id, {"total": 0, "issue_types": {}, "response_types": {}}
+            )
+            user_counters['total'] = max(0, user_counters['total'] + amount)
+            if issue_type:
+                _increment(user_counters['issue_types'], issue_type, amount)
+            for response_type in response_types:
+                _increment(user_counters['response_types'], response_type, amount)
+            if user_counters['total'] == 0:
+                counters['per_user'].pop(user_id, None)
+
+    def is_ready(self) -> bool:
+        """카운터가 이력과 동기화되어 있는지 여부"""
+        return bool(self.counters.get('ready'))
+
+    @property
+    def total(self) -> int:
+        return self.counters.get('total', 0)
+
+    def record(self, entry: Dict) -> bool:
+        """새 이력 항목 반영"""
+        with self._lock:
+            self._refresh()
+            self._apply(entry)
+            self._counters['updated_at'] = datetime.now().isoformat()
+            return self._save()
+
+    def rebuild(self, entries: Iterable[Dict]) -> int:
+        """이력 전체로 카운터 재집계"""
+        with self._lock:
+            self._counters = self._empty()
+            for entry in entries:
+                self._apply(entry)
+            self._counters['ready'] = True
+            self._counters['updated_at'] = datetime.now().isoformat()
+            self._save()
+            print(f"✅ 통계 카운터 재집계 완료 ({self._counters['total']}건)")
+            return self._counters['total']
+
+    def forget_user(self, user_id: str):
+        """사용자별 카운터 제거 (사용자 이력 삭제 시)"""
+        with self._lock:
+            self._refresh()
+            self._counters['per_user'].pop(user_id, None)
+            self._save()
+
+    def reset(self):
+        """카운터 초기화 (전체 이력 삭제 시)"""
+        with self._lock:
+            self._counters = self._empty()
+            self._counters['ready'] = True
+            self._save()
+
+    def get_user(self, user_id: str) -> Dict[str, Any]:
+        """사용자별 카운터"""
+        return self.counters['per_user'].get(user_id, {"total": 0, "issue_types": {}, "response_types": {}})
+
+    def recent_count(self, days: int = 30) -> int:
+        """최근 N일 건수 (일자별 카운터 합산)"""
+        cutoff = (datetime.now() - timedelta(days=days)).date().isoformat()
+        return sum(count for day, count in self.counters['days'].items() if day >= cutoff)
+
+
+def get_history_stats(stats_file: Optional[str] = None) -> HistoryStats:
+    """카운터 파일별 프로세스 공용 인스턴스 (세션마다 따로 만들면 서로의 증가분을 덮어씀, None이면 새 메모리 카운터)"""
+    if not stats_file:
+        return HistoryStats(None)
+    stats_file = os.path.abspath(stats_file)
+    with _instances_lock:
+        if stats_file not in _instances:
+            _instances[stats_file] = HistoryStats(stats_file)
+        return _instances[stats_file]
@@ -0,0 +1,167 @@
+"""
+로컬 JSON 이력 → MongoDB Atlas 일괄 이관 도구
+
+사용법:
+    python migrate_to_mongodb.py --uri "mongodb+srv://..." --chunk-size 1000
+    python migrate_to_mongodb.py --dry-run
+
+같은 이력을 다시 이관해도 문서 ID가 고정되어 있어 중복 저장되지 않습니다.
+(user_data/history_*.json 사용자별 파일은 global_history.json과 같은 내용이므로 이관하지 않습니다.)
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from typing import Dict, List, Iterator
+
+from blob_store import BlobStore, BlobDecodeError
+
+DEFAULT_SOURCES = ["analysis_history.json", os.path.join("user_data", "global_history.json")]
+DEFAULT_FEEDBACK = os.path.join("user_data", "feedback_data.json")
+
+# 이력 항목에서 문의 정보로 옮길 필드
+INQUIRY_FIELDS = [
+    'timestamp', 'customer_name', 'customer_contact', 'customer_manager', 'inquiry_content',
+    'user_name', 'user_role', 'system_version', 'browser_info', 'os_info', 'error_code',
+    'priority', 'contract_type'
+]
+
+
+def _load_json_list(path: str) -> List[Dict]:
+    """JSON 배열 파일 로드 (없으면 빈 목록)"""
+    if not os.path.exists(path):
+        print(f"⚠️ 파일이 없습니다: {path}")
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data if isinstance(data, list) else []
+
+
+def _stable_id(source: str, entry: Dict) -> str:
+    """재실행 시에도 같은 값이 나오는 문서 ID (ObjectId 형식 24자리 hex)"""
+    if entry.get('analysis_id'):
+        return entry['analysis_id']
+    key = "|".join([
+        os.path.basename(source),
+        str(entry.get('global_id') or entry.get('id') or ''),
+        str(entry.get('timestamp', '')),
+        str(entry.get('customer_name', ''))
+    ])
+    return hashlib.md5(key.encode('utf-8')).hexdigest()[:24]
+
+
+def iter_history_items(source: str, failures: List[str] = None) -> Iterator[Dict]:
+    """
+    로컬 이력 파일을 save_analyses_bulk 입력 형태로 변환
+    압축 원문을 복원하지 못한 항목은 빈 필드로 올리지 않고 건너뛰며 failures에 문서 ID를 기록합니다.
+    """
+    # 로컬 저장소는 이력 파일 옆 blobs 디렉토리에 압축 사전을 둠
+    blob_store = BlobStore(dict_dir=os.path.join(os.path.dirname(os.path.abspath(source)), "blobs"))
+    for entry in _load_json_list(source):
+        try:
+            analysis_result = blob_store.unpack(entry.get('full_analysis_result') or {}, strict=True)
+        except BlobDecodeError as e:
+            document_id = _stable_id(source, entry)
+            print(f"❌ 이력 항목 원문 복원 실패 ({document_id}): {e}")
+            if failures is not None:
+                failures.append(document_id)
+            continue
+        if not analysis_result:
+            # 전체 결과가 없는 오래된 항목은 요약 필드로 최소 구성
+            analysis_result = {
+                'issue_type': entry.get('issue_type', ''),
+                'classification': {
+                    'method': entry.get('classification_method', ''),
+                    'confidence': entry.get('confidence', '')
+                },
+                'parsed_response': {
+                    'response_type': entry.get('response_type', ''),
+                    'summary': entry.get('summary', ''),
+                    'action_flow': entry.get('action_flow', ''),
+                    'email_draft': entry.get('email_draft', '')
+                }
+            }
+        yield {
+            "analysis_result": analysis_result,
+            "inquiry_data": {field: entry.get(field, '') for field in INQUIRY_FIELDS},
+            "document_id": _stable_id(source, entry)
+        }
+
+
+def iter_feedback_items(path: str) -> Iterator[Dict]:
+    """로컬 피드백 파일을 save_feedbacks_bulk 입력 형태로 변환"""
+    for feedback in _load_json_list(path):
+        key = f"{feedback.get('analysis_id')}|{feedback.get('feedback_type')}|{feedback.get('user_name')}|{feedback.get('timestamp')}"
+        item = dict(feedback)
+        item['_id'] = hashlib.md5(key.encode('utf-8')).hexdigest()
+        yield item
+
+
+def print_progress(processed: int, stats: Dict):
+    """진행 상황 출력"""
+    print(f"  ... {processed}건 처리 (저장 {stats['inserted']}, 중복 {stats['duplicates']}, 실패 {stats['failed']})")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="로컬 JSON 이력을 MongoDB로 일괄 이관")
+    parser.add_argument("--uri", default=os.getenv("MONGODB_URI"), help="MongoDB 연결 문자열 (기본값: 환경변수 MONGODB_URI)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="insert_many 한 번에 보낼 문서 수")
+    parser.add_argument("--max-retries", type=int, default=3, help="실패한 문서 재시도 횟수")
+    parser.add_argument("--source", action="append", help="이관할 이력 JSON 파일 (여러 번 지정 가능)")
+    parser.add_argument("--feedback", default=DEFAULT_FEEDBACK, help="이관할 피드백 JSON 파일")
+    parser.add_argument("--dry-run", action="store_true", help="저장하지 않고 건수만 확인")
+    args = parser.parse_args(argv)
+
+    sources = args.source or DEFAULT_SOURCES
+
+    if args.dry_run:
+        for source in sources:
+            failures = []
+            count = sum(1 for _ in iter_history_items(source, failures))
+            print(f"📋 {source}: {count}건" + (f" (원문 복원 실패 {len(failures)}건)" if failures else ""))
+        print(f"📋 {args.feedback}: {sum(1 for _ in iter_feedback_items(args.feedback))}건")
+        return 0
+
+    if not args.uri:
+        print("❌ MongoDB 연결 문자열이 없습니다. --uri 또는 환경변수 MONGODB_URI를 지정하세요.")
+        return 1
+
+    from mongodb_handler import MongoDBHandler
+    handler = MongoDBHandler(connection_string=args.uri)
+
+    failed = 0
+    for source in sources:
+        print(f"🚚 이력 이관: {source}")
+        failures = []
+        result = handler.save_analyses_bulk(
+            iter_history_items(source, failures), chunk_size=args.chunk_size,
+            max_retries=args.max_retries, progress_callback=print_progress
+        )
+        failed += result.get('failed', 0) + len(failures)
+        if failures:
+            print(f"❌ {source}: 원문 복원 실패로 {len(failures)}건을 이관하지 않았습니다.")
+        if 'error' in result:
+            print(f"❌ {source} 이관 실패: {result['error']}")
+            failed += 1
+
+    print(f"🚚 피드백 이관: {args.feedback}")
+    result = handler.save_feedbacks_bulk(
+        iter_feedback_items(args.feedback), chunk_size=args.chunk_size,
+        max_retries=args.max_retries, progress_callback=print_progress
+    )
+    failed += result.get('failed', 0)
+    if 'error' in result:
+        print(f"❌ 피드백 이관 실패: {result['error']}")
+        failed += 1
+
+    # 이관 후 통계용 일별 집계를 전체 이력 기준으로 다시 구성
+    if handler.use_daily_rollup:
+        handler.rebuild_daily_rollup()
+
+    print("✅ 이관 완료" if failed == 0 else f"⚠️ 이관 완료 (실패 {failed}건)")
+    return 0 if failed == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,397 @@
+"""
+비동기 MongoDB 접근 계층 (Motor)
+백필, 일괄 재분류, 지연 저장 스풀 처리처럼 Streamlit 화면 밖에서 도는 작업이
+이벤트 루프 하나에서 많은 요청을 동시에 보내도록 MongoDBHandler와 같은 기능을 async로 제공합니다.
+문서 구성/쿼리 조건/통계 파이프라인은 MongoDBHandler의 것을 그대로 사용합니다.
+Motor가 없거나 memory:// 연결이면 pymongo 호출을 스레드 풀에서 실행합니다.
+"""
+import asyncio
+import inspect
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Dict, List, Optional, Iterable, Callable
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from mongo_client import get_pool_settings
+from mongo_memory import MEMORY_URI_PREFIX
+from mongodb_handler import MongoDBHandler, to_datetime, rollup_updates
+
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient
+    MOTOR_AVAILABLE = True
+except ImportError:
+    AsyncIOMotorClient = None
+    MOTOR_AVAILABLE = False
+    print("⚠️ motor를 사용할 수 없습니다. 비동기 작업은 스레드 풀의 pymongo로 실행합니다.")
+
+DEFAULT_CONCURRENCY = 32
+
+
+class _ExecutorCursor:
+    """pymongo 커서를 스레드 풀에서 읽는 Motor 커서 호환 객체 (sort/skip/limit/batch_size, to_list, async for)"""
+
+    def __init__(self, executor: ThreadPoolExecutor, open_cursor: Callable):
+        self._executor = executor
+        self._open_cursor = open_cursor
+        self._chain = []
+        self._batch_size = 100
+
+    def _chained(self, method: str, *args):
+        self._chain.append((method, args))
+        return self
+
+    def sort(self, *args):
+        return self._chained("sort", *args)
+
+    def skip(self, count: int):
+        return self._chained("skip", count)
+
+    def limit(self, count: int):
+        return self._chained("limit", count)
+
+    def batch_size(self, size: int):
+        self._batch_size = max(1, size)
+        return self._chained("batch_size", size)
+
+    def _open(self):
+        cursor = self._open_cursor()
+        for method, args in self._chain:
+            cursor = getattr(cursor, method)(*args)
+        return iter(cursor)
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args))
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict]:
+        def read():
+            return list(itertools.islice(self._open(), length)) if length else list(self._open())
+        return await self._run(read)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        iterator = await self._run(self._open)
+        while True:
+            batch = await self._run(lambda: list(itertools.islice(iterator, self._batch_size)))
+            if not batch:
+                break
+            for doc in batch:
+                yield doc
+
+
+class _ExecutorCollection:
+    """pymongo 컬렉션 메서드를 스레드 풀에서 실행하는 Motor 컬렉션 호환 객체"""
+
+    def __init__(self, collection, executor: ThreadPoolExecutor):
+        self._collection = collection
+        self._executor = executor
+        self.name = collection.name
+
+    def find(self, *args, **kwargs) -> _ExecutorCursor:
+        return _ExecutorCursor(self._executor, partial(self._collection.find, *args, **kwargs))
+
+    def aggregate(self, pipeline: List[Dict], **kwargs) -> _ExecutorCursor:
+        return _ExecutorCursor(self._executor, partial(self._collection.aggregate, pipeline, **kwargs))
+
+    def __getattr__(self, method: str):
+        func = getattr(self._collection, method)
+
+        async def call(*args, **kwargs):
+            return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args, **kwargs))
+        return call
+
+
+class _BatchWriter:
+    """bulk_write 묶음을 동시에 최대 concurrency개까지 실행 (넘으면 submit이 앞 묶음을 기다림)"""
+
+    def __init__(self, collection, concurrency: int):
+        self.collection = collection
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks = set()
+        self.totals = {"modified": 0, "failed": 0}
+
+    async def _write(self, operations: List[UpdateOne]):
+        try:
+            result = await self.collection.bulk_write(operations, ordered=False)
+            self.totals["modified"] += result.modified_count
+        except Exception as e:
+            self.totals["failed"] += len(operations)
+            print(f"❌ 일괄 갱신 실패 ({len(operations)}건): {e}")
+        finally:
+            self._semaphore.release()
+
+    async def submit(self, operations: List[UpdateOne]):
+        await self._semaphore.acquire()
+        task = asyncio.ensure_future(self._write(operations))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def drain(self) -> Dict[str, int]:
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks))
+        return self.totals
+
+
+class AsyncMongoHandler:
+    """MongoDBHandler의 비동기 버전 (저장/이력/좋아요 응답/통계 + 대량 작업)"""
+
+    def __init__(self, connection_string: str = None, handler: MongoDBHandler = None,
+                 concurrency: int = DEFAULT_CONCURRENCY):
+        """
+        handler: 이미 연결된 MongoDBHandler (없으면 connection_string으로 생성 - 인덱스 확인만, 마이그레이션은
+                 backfill_timestamp_dates 등으로 직접 실행)
+        concurrency: 동시에 보낼 요청 수 (Motor 커넥션 풀 / 스레드 풀 크기)
+        """
+        self.handler = handler or MongoDBHandler(connection_string=connection_string, run_migrations=False)
+        self.concurrency = max(1, concurrency)
+        self.use_motor = MOTOR_AVAILABLE and not self.handler.connection_string.startswith(MEMORY_URI_PREFIX)
+        # 동기 분류기/스레드 풀 모드 DB 호출용
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="mongo-async")
+        self._client = None
+        self._collections = {}
+
+    def _collection(self, name: str):
+        """컬렉션 이름으로 비동기 컬렉션 조회 (Motor 클라이언트는 이벤트 루프 안에서 처음 사용할 때 생성)"""
+        if name not in self._collections:
+            if self.use_motor:
+                if self._client is None:
+                    settings = get_pool_settings()
+                    settings["maxPoolSize"] = max(self.concurrency, settings["maxPoolSize"])
+                    self._client = AsyncIOMotorClient(self.handler.connection_string, **settings)
+                self._collections[name] = self._client[self.handler.db.name][name]
+            else:
+                self._collections[name] = _ExecutorCollection(self.handler.db[name], self._executor)
+        return self._collections[name]
+
+    async def _in_thread(self, func: Callable, *args):
+        """동기 함수를 스레드 풀에서 실행"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args))
+
+    async def save_analysis(self, analysis_data: Dict, inquiry_data: Dict, document_id: str = None) -> Dict:
+        """분석 결과 저장 (MongoDBHandler.save_analysis와 같은 결과 형식)"""
+        try:
+            document = self.handler._build_document(analysis_data, inquiry_data, document_id)
+            try:
+                result = await self._collection(self.handler.history_collection.name).insert_one(document)
+            except DuplicateKeyError:
+                # 같은 ID로 이미 저장된 경우 (재시도/스풀 복구) 성공으로 처리
+                return {"success": True, "database": "mongodb", "id": str(document['_id']), "object_id": document['_id']}
+
+            if self.handler.use_daily_rollup:
+                try:
+                    await self._collection(self.handler.rollup_collection.name).bulk_write(rollup_updates([document]), ordered=False)
+                except Exception as e:
+                    print(f"⚠️ 일별 집계 갱신 실패: {e}")
+
+            return {"success": True, "database": "mongodb", "id": str(result.inserted_id), "object_id": result.inserted_id}
+
+        except Exception as e:
+            print(f"❌ MongoDB 비동기 저장 실패: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def save_many(self, items: Iterable[Dict], concurrency: int = None) -> List[Dict]:
+        """
+        분석 결과 여러 건을 동시에 저장 (items: 지연 저장 작업과 같은 analysis_result/inquiry_data/document_id)
+        입력 순서대로 save_analysis 결과 목록 반환
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+
+        async def save(item):
+            async with semaphore:
+                return await self.save_analysis(
+                    item.get('analysis_result') or {}, item.get('inquiry_data') or {}, item.get('document_id')
+                )
+
+        return await asyncio.gather(*(save(item) for item in items))
+
+    async def get_history(self, user_id: str = None, limit: int = 100, skip: int = 0, date_from: str = None,
+                          date_to: str = None, issue_type: str = None) -> List[Dict]:
+        """이력 조회 (MongoDBHandler.get_history와 같은 필터/정렬)"""
+        try:
+            query = self.handler._build_history_query(user_id, date_from, date_to, issue_type)
+            cursor = self._collection(self.handler.history_collection.name).find(query).sort("timestamp", -1).skip(skip).limit(limit)
+            return [self.handler._serialize_history_doc(doc) for doc in await cursor.to_list(length=limit or None)]
+        except Exception as e:
+            print(f"❌ MongoDB 비동기 조회 실패: {e}")
+            return []
+
+    async def get_liked_responses(self, issue_type: str = None, limit: int = 3) -> List[Dict]:
+        """좋아요를 받은 응답 조회 (MongoDBHandler와 같은 캐시 사용)"""
+        cache_key = (self.handler.db.name, issue_type, limit)
+        cached = MongoDBHandler._get_cached_liked(cache_key)
+        if cached is not None:
+            return cached
+        try:
+            cursor = self._collection(self.handler.feedback_collection.name).aggregate(
+                self.handler._liked_pipeline(issue_type, limit)
+            )
+            return MongoDBHandler._cache_liked(cache_key, await cursor.to_list(length=None))
+        except Exception as e:
+            print(f"❌ 좋아요 응답 비동기 조회 실패: {e}")
+            return []
+
+    async def get_statistics(self) -> Dict:
+        """통계 조회 (일별 집계가 있으면 집계 문서 기준)"""
+        try:
+            rollup_ready = await self._in_thread(self.handler._is_rollup_ready)
+            collection, pipeline = self.handler._statistics_pipeline(rollup_ready)
+            facet = (await self._collection(collection.name).aggregate(pipeline).to_list(length=None))[0]
+            return self.handler._format_statistics(facet, collection.name)
+        except Exception as e:
+            print(f"❌ MongoDB 비동기 통계 조회 실패: {e}")
+            return {}
+
+    async def backfill_timestamp_dates(self, batch_size: int = 1000, concurrency: int = None) -> Dict:
+        """ISO 문자열 timestamp를 BSON 날짜로 일괄 변환 (커서 한 번 순회, 묶음 갱신은 동시에)"""
+        try:
+            started = time.time()
+            collection = self._collection(self.handler.history_collection.name)
+            # 동시 갱신 수를 넘으면 앞 묶음이 끝날 때까지 커서 읽기를 멈춤
+            writer = _BatchWriter(collection, concurrency or self.concurrency)
+            unparsable = 0
+
+            operations = []
+            cursor = collection.find({"timestamp": {"$type": "string"}}, {"timestamp": 1}).batch_size(batch_size)
+            async for doc in cursor:
+                parsed = to_datetime(doc['timestamp'])
+                if not parsed:
+                    unparsable += 1
+                    continue
+                # 변환 사이에 값이 바뀐 문서는 건너뜀
+                operations.append(UpdateOne(
+                    {"_id": doc['_id'], "timestamp": doc['timestamp']},
+                    {"$set": {"timestamp": parsed}}
+                ))
+                if len(operations) >= batch_size:
+                    await writer.submit(operations)
+                    operations = []
+            if operations:
+                await writer.submit(operations)
+            totals = await writer.drain()
+
+            elapsed = time.time() - started
+            if unparsable:
+                print(f"⚠️ 날짜로 변환할 수 없는 timestamp {unparsable}건은 문자열로 유지")
+            print(f"✅ 이력 timestamp {totals['modified']}건을 날짜 타입으로 변환 ({elapsed:.1f}초)")
+            return {
+                "success": totals["failed"] == 0,
+                "converted": totals["modified"],
+                "unparsable": unparsable,
+                "failed": totals["failed"],
+                "elapsed_sec": round(elapsed, 3)
+            }
+
+        except Exception as e:
+            print(f"❌ timestamp 비동기 변환 실패: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def _classify(self, classify: Callable, text: str) -> Optional[Dict]:
+        """분류 함수 호출 (코루틴 함수는 그대로, 동기 함수는 스레드 풀에서) - 결과를 dict로 맞춤"""
+        if inspect.iscoroutinefunction(classify):
+            result = await classify(text)
+        else:
+            result = await self._in_thread(classify, text)
+        if isinstance(result, str):
+            return {"issue_type": result}
+        return result if isinstance(result, dict) and result.get('issue_type') else None
+
+    async def reclassify_history(self, classify: Callable, query: Dict = None, batch_size: int = 500,
+                                 concurrency: int = None, dry_run: bool = False,
+                                 progress_callback: Callable = None) -> Dict:
+        """
+        이력의 문제 유형 일괄 재분류.
+        classify(inquiry_content)는 문제 유형 문자열 또는 issue_type/method/confidence dict를 반환합니다 (async 함수 가능).
+        문의 batch_size건씩 분류를 동시에 실행하고, 유형이 바뀐 문서만 묶음 bulk_write로 갱신합니다.
+        분류가 끝난 묶음을 쓰는 동안 다음 묶음을 분류합니다.
+        """
+        try:
+            started = time.time()
+            concurrency = concurrency or self.concurrency
+            collection = self._collection(self.handler.history_collection.name)
+            semaphore = asyncio.Semaphore(concurrency)
+            writer = _BatchWriter(collection, concurrency)
+            stats = {"scanned": 0, "changed": 0, "modified": 0, "failed": 0, "by_type": {}}
+
+            async def classify_doc(doc):
+                async with semaphore:
+                    try:
+                        return doc, await self._classify(classify, doc.get('inquiry_content', '') or '')
+                    except Exception as e:
+                        print(f"⚠️ 재분류 실패 ({doc['_id']}): {e}")
+                        return doc, None
+
+            async def process(batch):
+                operations = []
+                for doc, result in await asyncio.gather(*(classify_doc(doc) for doc in batch)):
+                    if result is None:
+                        stats["failed"] += 1
+                        continue
+                    new_type = result['issue_type']
+                    if new_type == doc.get('issue_type'):
+                        continue
+                    stats["changed"] += 1
+                    change = f"{doc.get('issue_type', '')} → {new_type}"
+                    stats["by_type"][change] = stats["by_type"].get(change, 0) + 1
+                    # 분류 중에 다른 곳에서 유형이 바뀐 문서는 덮어쓰지 않음
+                    operations.append(UpdateOne(
+                        {"_id": doc['_id'], "issue_type": doc.get('issue_type')},
+                        {"$set": {
+                            "issue_type": new_type,
+                            "classification_method": result.get('method', ''),
+                            "confidence": result.get('confidence', ''),
+                            "updated_at": datetime.now()
+                        }}
+                    ))
+                stats["scanned"] += len(batch)
+                if operations and not dry_run:
+                    await writer.submit(operations)
+                if progress_callback:
+                    progress_callback(stats["scanned"], dict(stats))
+
+            batch = []
+            cursor = collection.find(query or {}, {"inquiry_content": 1, "issue_type": 1}).batch_size(batch_size)
+            async for doc in cursor:
+                batch.append(doc)
+                if len(batch) >= batch_size:
+                    await process(batch)
+                    batch = []
+            if batch:
+                await process(batch)
+
+            totals = await writer.drain()
+            stats["modified"] += totals["modified"]
+            stats["failed"] += totals["failed"]
+
+            if stats["modified"]:
+                # 유형별 통계/좋아요 응답이 바뀌므로 집계 재구성 및 캐시 무효화
+                if self.handler.use_daily_rollup:
+                    await self._in_thread(self.handler.rebuild_daily_rollup)
+                MongoDBHandler.invalidate_liked_cache()
+
+            elapsed = time.time() - started
+            stats.update({
+                "success": stats["failed"] == 0,
+                "dry_run": dry_run,
+                "elapsed_sec": round(elapsed, 3),
+                "docs_per_sec": round(stats["scanned"] / elapsed, 1) if elapsed > 0 else 0.0
+            })
+            print(f"✅ 재분류 완료 (검사 {stats['scanned']}건, 변경 {stats['changed']}건, 갱신 {stats['modified']}건, {stats['docs_per_sec']}건/초)")
+            return stats
+
+        except Exception as e:
+            print(f"❌ 이력 재분류 실패: {e}")
+            return {"success": False, "error": str(e)}
+
+    def close(self):
+        """Motor 클라이언트와 스레드 풀 종료 (동기 MongoDBHandler의 공용 클라이언트는 유지)"""
+        if self._client is not None:
+            self._client.close()
+        self._client = None
+        self._collections = {}
+        self._executor.shutdown(wait=False)
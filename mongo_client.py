@@ -0,0 +1,164 @@
+"""
+프로세스 공용 MongoClient 관리
+연결 문자열별로 MongoClient 하나만 만들어 모든 MongoDBHandler가 같은 커넥션 풀을 사용합니다.
+풀 크기 등은 Streamlit secrets 또는 환경변수로 조정합니다.
+연결 문자열이 memory:// 로 시작하면 오프라인 테스트/벤치마크용 인메모리 클라이언트(mongo_memory)를 사용합니다.
+"""
+import threading
+import time
+from typing import Dict, Any
+from pymongo import MongoClient
+from pymongo.monitoring import ConnectionPoolListener
+from config import get_secret
+from mongo_memory import MemoryClient, MEMORY_URI_PREFIX
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class PoolMetrics(ConnectionPoolListener):
+    """커넥션 풀 이벤트 집계 (사용 중 커넥션 수, 대기 시간)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.connections_open = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def _end_wait(self) -> float:
+        """현재 스레드의 체크아웃 대기 시간(ms)"""
+        started = getattr(self._local, 'started', None)
+        self._local.started = None
+        return (time.perf_counter() - started) * 1000 if started else 0.0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_open = max(0, self.connections_open - 1)
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self._end_wait()
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        wait_ms = self._end_wait()
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """현재 지표"""
+        with self._lock:
+            return {
+                "connections_open": self.connections_open,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "avg_wait_ms": round(self.total_wait_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait_ms, 3)
+            }
+
+
+def get_pool_settings() -> Dict[str, int]:
+    """커넥션 풀 설정 (secrets/환경변수, 없으면 기본값)"""
+    return {
+        "maxPoolSize": int(get_secret("MONGODB_MAX_POOL_SIZE", 20)),
+        "minPoolSize": int(get_secret("MONGODB_MIN_POOL_SIZE", 0)),
+        "maxIdleTimeMS": int(get_secret("MONGODB_MAX_IDLE_TIME_MS", 60000)),
+        "waitQueueTimeoutMS": int(get_secret("MONGODB_WAIT_QUEUE_TIMEOUT_MS", 10000)),
+        "serverSelectionTimeoutMS": int(get_secret("MONGODB_SERVER_SELECTION_TIMEOUT_MS", 10000))
+    }
+
+
+def get_mongo_client(connection_string: str) -> MongoClient:
+    """
+    연결 문자열별 공용 MongoClient 반환 (최초 생성 시 한 번만 ping).
+    생성/ping은 잠금 밖에서 하므로 장애 중에도 다른 연결 문자열 조회를 막지 않고,
+    ping이 실패한 클라이언트는 닫아서 세션마다 모니터 스레드가 쌓이지 않도록 합니다.
+    """
+    with _clients_lock:
+        entry = _clients.get(connection_string)
+        if entry is None and connection_string.startswith(MEMORY_URI_PREFIX):
+            entry = {"client": MemoryClient(connection_string), "metrics": PoolMetrics(), "settings": {}}
+            _clients[connection_string] = entry
+            print(f"✅ 인메모리 MongoDB 클라이언트 생성 ({connection_string})")
+        if entry is not None:
+            return entry["client"]
+
+    metrics = PoolMetrics()
+    settings = get_pool_settings()
+    client = MongoClient(connection_string, event_listeners=[metrics], **settings)
+    try:
+        client.admin.command('ping')
+    except Exception:
+        client.close()
+        raise
+
+    with _clients_lock:
+        entry = _clients.get(connection_string)
+        if entry is None:
+            entry = {"client": client, "metrics": metrics, "settings": settings}
+            _clients[connection_string] = entry
+            print(f"✅ MongoDB 공용 클라이언트 생성 (maxPoolSize={settings['maxPoolSize']}, minPoolSize={settings['minPoolSize']})")
+            return client
+    # 다른 세션이 먼저 만든 클라이언트 사용
+    client.close()
+    return entry["client"]
+
+
+def get_pool_metrics(connection_string: str = None) -> Dict[str, Any]:
+    """공용 클라이언트 커넥션 풀 지표 (연결 문자열 생략 시 전체)"""
+    with _clients_lock:
+        entries = {connection_string: _clients[connection_string]} if connection_string in _clients else (
+            {} if connection_string else dict(_clients)
+        )
+    return {
+        "clients": len(entries),
+        "pools": [dict(entry["metrics"].snapshot(), **entry["settings"]) for entry in entries.values()]
+    }
+
+
+def close_mongo_clients():
+    """프로세스 종료 시 공용 클라이언트 모두 종료"""
+    with _clients_lock:
+        for entry in _clients.values():
+            try:
+                entry["client"].close()
+            except Exception as e:
+                print(f"⚠️ MongoDB 연결 종료 실패: {e}")
+        _clients.clear()
@@ -0,0 +1,102 @@
+"""
+MongoDB 대량 작업 도구 (비동기 처리)
+
+사용법:
+    python mongo_jobs.py backfill-dates --uri "mongodb+srv://..."               # 문자열 timestamp → BSON 날짜
+    python mongo_jobs.py reclassify --classifier keyword --concurrency 64        # 문제 유형 일괄 재분류
+    python mongo_jobs.py reclassify --issue-type 기타 --dry-run                  # 변경 건수만 확인
+    python mongo_jobs.py drain-spool --spool user_data/analysis_spool.jsonl     # 지연 저장 스풀 일괄 저장 (앱 종료 후)
+
+연결 문자열은 --uri 또는 환경변수 MONGODB_URI를 사용합니다.
+"""
+import argparse
+import asyncio
+import os
+import sys
+from typing import Dict
+
+DEFAULT_SPOOL = os.path.join("user_data", "analysis_spool.jsonl")
+
+
+def load_classifier(name: str):
+    """재분류에 사용할 분류 함수 (keyword: 키워드 분류기, hybrid: 벡터+키워드+Gemini)"""
+    if name == "hybrid":
+        from classify_issue import IssueClassifier
+        return IssueClassifier().classify_issue
+    from simple_classifier import SimpleIssueClassifier
+    return SimpleIssueClassifier().classify_issue
+
+
+def print_progress(processed: int, stats: Dict):
+    """진행 상황 출력"""
+    print(f"  ... {processed}건 검사 (변경 {stats['changed']}, 실패 {stats['failed']})")
+
+
+async def run(args) -> Dict:
+    from mongo_async import AsyncMongoHandler
+    handler = AsyncMongoHandler(connection_string=args.uri, concurrency=args.concurrency)
+    try:
+        if args.command == "backfill-dates":
+            result = await handler.backfill_timestamp_dates(batch_size=args.batch_size)
+            if result.get('success'):
+                # 앱에서 같은 마이그레이션을 다시 실행하지 않도록 완료 기록
+                from mongo_schema import mark_migration_done
+                mark_migration_done(handler.handler.db, "timestamp_dates", result)
+            return result
+
+        if args.command == "reclassify":
+            query = {"issue_type": args.issue_type} if args.issue_type else None
+            result = await handler.reclassify_history(
+                load_classifier(args.classifier), query=query, batch_size=args.batch_size,
+                dry_run=args.dry_run, progress_callback=print_progress
+            )
+            for change, count in sorted(result.get('by_type', {}).items(), key=lambda item: -item[1]):
+                print(f"  {change}: {count}건")
+            return result
+
+        from write_behind import WriteBehindQueue
+        try:
+            # 실행 중인 앱이 스풀을 가지고 있으면 거부 (앱이 새로 추가한 작업을 재작성으로 잃지 않도록)
+            # 스풀 정리(재작성)는 하지 않고 완료 기록만 추가 - 다음 앱 시작 때 정리
+            spool = WriteBehindQueue(args.spool, require_lock=True, compact=False)
+        except RuntimeError as e:
+            return {"success": False, "error": f"{e} (앱을 종료한 뒤 실행하세요)"}
+        try:
+            result = await spool.drain_async(handler, concurrency=args.concurrency)
+        finally:
+            spool.stop()
+        return dict(result, success=result["failed"] == 0)
+    finally:
+        handler.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="MongoDB 이력 대량 작업 (비동기)")
+    parser.add_argument("--uri", default=os.getenv("MONGODB_URI"), help="MongoDB 연결 문자열 (기본값: 환경변수 MONGODB_URI)")
+    parser.add_argument("--concurrency", type=int, default=32, help="동시에 처리할 요청 수")
+    parser.add_argument("--batch-size", type=int, default=500, help="bulk_write 한 번에 보낼 문서 수")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("backfill-dates", help="문자열 timestamp를 BSON 날짜로 변환")
+
+    reclassify = subparsers.add_parser("reclassify", help="문제 유형 일괄 재분류")
+    reclassify.add_argument("--classifier", choices=["keyword", "hybrid"], default="keyword")
+    reclassify.add_argument("--issue-type", help="이 문제 유형으로 분류된 이력만 재분류")
+    reclassify.add_argument("--dry-run", action="store_true", help="갱신하지 않고 변경 건수만 확인")
+
+    drain = subparsers.add_parser("drain-spool", help="지연 저장 스풀의 미완료 작업을 일괄 저장")
+    drain.add_argument("--spool", default=DEFAULT_SPOOL, help="스풀 파일 경로")
+
+    args = parser.parse_args(argv)
+    if not args.uri:
+        print("❌ MongoDB 연결 문자열이 없습니다. --uri 또는 환경변수 MONGODB_URI를 지정하세요.")
+        return 1
+
+    result = asyncio.run(run(args))
+    if 'error' in result:
+        print(f"❌ 작업 실패: {result['error']}")
+    return 0 if result.get('success') else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
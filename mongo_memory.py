@@ -0,0 +1,786 @@
+"""
+MongoDB 인메모리 대체 구현 (오프라인 테스트/벤치마크용)
+MONGODB_URI를 memory://<이름> 형식으로 지정하면 get_mongo_client가 실제 서버 대신 이 클라이언트를 반환합니다.
+MongoDBHandler가 사용하는 연산만 지원합니다:
+find/sort/skip/limit, count_documents, insert/update/replace/delete, bulk_write,
+aggregate($match/$sort/$group/$facet/$lookup/$unwind/$project/$count/$out),
+쿼리 연산자($in/$or/$gte/$lt/$type/$regex 등). 데이터는 프로세스 메모리에만 유지됩니다.
+"""
+import copy
+import re
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import pytz
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError, BulkWriteError, OperationFailure
+
+MEMORY_URI_PREFIX = "memory://"
+
+_MISSING = object()
+
+# BSON 타입 비교 순서 (서로 다른 타입 정렬 시)
+_TYPE_ORDER = {"null": 1, "number": 2, "string": 3, "object": 4, "array": 5,
+               "binData": 6, "objectId": 7, "bool": 8, "date": 9, "regex": 11}
+
+# $type 연산자의 숫자 타입 코드
+_TYPE_CODES = {1: "double", 2: "string", 3: "object", 4: "array", 5: "binData", 7: "objectId",
+               8: "bool", 9: "date", 10: "null", 11: "regex", 16: "int", 18: "long"}
+
+
+def _type_name(value) -> str:
+    """$type 연산자 기준 타입 이름"""
+    if value is _MISSING:
+        return "missing"
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int" if -2 ** 31 <= value < 2 ** 31 else "long"
+    if isinstance(value, float):
+        return "double"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, datetime):
+        return "date"
+    if isinstance(value, ObjectId):
+        return "objectId"
+    if isinstance(value, (bytes, bytearray)):
+        return "binData"
+    if isinstance(value, dict):
+        return "object"
+    if isinstance(value, list):
+        return "array"
+    if isinstance(value, re.Pattern):
+        return "regex"
+    return "object"
+
+
+def _type_rank(value) -> int:
+    name = _type_name(value)
+    if name in ("int", "long", "double"):
+        return _TYPE_ORDER["number"]
+    if name == "missing":
+        return _TYPE_ORDER["null"]
+    return _TYPE_ORDER.get(name, 4)
+
+
+def _sort_value(value):
+    """타입이 섞여도 정렬 가능한 키"""
+    if value is _MISSING or value is None:
+        return (_TYPE_ORDER["null"], 0)
+    if isinstance(value, dict):
+        return (_TYPE_ORDER["object"], tuple((k, _sort_value(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return (_TYPE_ORDER["array"], tuple(_sort_value(v) for v in value))
+    if isinstance(value, ObjectId):
+        return (_TYPE_ORDER["objectId"], str(value))
+    return (_type_rank(value), value)
+
+
+def _to_bson(value):
+    """저장 시 BSON 변환 규칙 적용 (시간대 포함 datetime은 UTC naive, 밀리초 단위로 절삭)"""
+    if isinstance(value, dict):
+        return {key: _to_bson(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_bson(item) for item in value]
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(pytz.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    if isinstance(value, bytearray):
+        return bytes(value)
+    return value
+
+
+def _get_path(doc, path: str):
+    """점 표기 경로 값 (배열을 거치면 각 원소의 값 목록)"""
+    value = doc
+    for part in path.split('.'):
+        if isinstance(value, dict):
+            value = value.get(part, _MISSING)
+        elif isinstance(value, list):
+            if part.isdigit():
+                index = int(part)
+                value = value[index] if index < len(value) else _MISSING
+            else:
+                values = [item.get(part, _MISSING) for item in value if isinstance(item, dict)]
+                value = [item for item in values if item is not _MISSING] or _MISSING
+        else:
+            return _MISSING
+        if value is _MISSING:
+            return _MISSING
+    return value
+
+
+def _set_path(doc: Dict, path: str, value):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset_path(doc: Dict, path: str):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def _values_equal(value, target) -> bool:
+    if value is _MISSING:
+        return target is None
+    if isinstance(value, list) and not isinstance(target, list):
+        return any(_values_equal(item, target) for item in value)
+    if isinstance(target, re.Pattern):
+        return isinstance(value, str) and bool(target.search(value))
+    return value == target
+
+
+def _compare(value, op: str, target) -> bool:
+    """비교 연산 (서로 다른 타입은 비교하지 않음 - MongoDB 타입 브래킷)"""
+    candidates = value if isinstance(value, list) else [value]
+    for candidate in candidates:
+        if candidate is _MISSING or _type_rank(candidate) != _type_rank(target):
+            continue
+        left, right = _sort_value(candidate), _sort_value(target)
+        if ((op == "$gt" and left > right) or (op == "$gte" and left >= right)
+                or (op == "$lt" and left < right) or (op == "$lte" and left <= right)):
+            return True
+    return False
+
+
+def _matches_operator(value, op: str, arg, condition: Dict) -> bool:
+    if op == "$eq":
+        return _values_equal(value, arg)
+    if op == "$ne":
+        return not _values_equal(value, arg)
+    if op in ("$gt", "$gte", "$lt", "$lte"):
+        return _compare(value, op, arg)
+    if op == "$in":
+        return any(_values_equal(value, item) for item in arg)
+    if op == "$nin":
+        return not any(_values_equal(value, item) for item in arg)
+    if op == "$exists":
+        return (value is not _MISSING) == bool(arg)
+    if op == "$type":
+        names = arg if isinstance(arg, list) else [arg]
+        names = {_TYPE_CODES.get(name, name) for name in names}
+        actual = _type_name(value)
+        return actual in names or ("number" in names and actual in ("int", "long", "double"))
+    if op == "$regex":
+        flags = re.IGNORECASE if 'i' in condition.get("$options", "") else 0
+        pattern = arg if isinstance(arg, re.Pattern) else re.compile(arg, flags)
+        candidates = value if isinstance(value, list) else [value]
+        return any(isinstance(item, str) and pattern.search(item) for item in candidates)
+    if op == "$options":
+        return True
+    if op == "$not":
+        return not _matches_condition(value, arg)
+    raise OperationFailure(f"unknown operator: {op}", code=2)
+
+
+def _matches_condition(value, condition) -> bool:
+    if isinstance(condition, dict) and condition and all(key.startswith('$') for key in condition):
+        return all(_matches_operator(value, op, arg, condition) for op, arg in condition.items())
+    return _values_equal(value, condition)
+
+
+def match_document(doc: Dict, query: Optional[Dict]) -> bool:
+    """문서가 쿼리 조건에 맞는지 확인 (조건 값은 _to_bson으로 변환된 상태)"""
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(match_document(doc, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(match_document(doc, sub) for sub in condition):
+                return False
+        elif key == "$nor":
+            if any(match_document(doc, sub) for sub in condition):
+                return False
+        elif not _matches_condition(_get_path(doc, key), condition):
+            return False
+    return True
+
+
+def _format_date(value: datetime, date_format: str, timezone: str = None) -> str:
+    """$dateToString (저장된 날짜는 UTC 기준)"""
+    value = pytz.utc.localize(value) if value.tzinfo is None else value
+    if timezone:
+        value = value.astimezone(pytz.timezone(timezone))
+    return value.strftime(date_format.replace('%L', f"{value.microsecond // 1000:03d}"))
+
+
+def evaluate(expression, doc: Dict):
+    """집계 표현식 평가 ($필드 경로와 MongoDBHandler가 사용하는 연산자)"""
+    if isinstance(expression, str) and expression.startswith('$'):
+        return _get_path(doc, expression[1:])
+    if isinstance(expression, list):
+        return [evaluate(item, doc) for item in expression]
+    if not isinstance(expression, dict):
+        return expression
+    if len(expression) != 1 or not next(iter(expression)).startswith('$'):
+        # 객체 표현식 (예: $group의 복합 _id)
+        result = {}
+        for key, item in expression.items():
+            value = evaluate(item, doc)
+            if value is not _MISSING:
+                result[key] = value
+        return result
+
+    op, arg = next(iter(expression.items()))
+    if op == "$literal":
+        return arg
+    if op == "$cond":
+        if isinstance(arg, dict):
+            arg = [arg['if'], arg['then'], arg['else']]
+        condition = evaluate(arg[0], doc)
+        return evaluate(arg[1] if condition not in (None, False, 0, _MISSING) else arg[2], doc)
+    if op == "$ifNull":
+        for item in arg[:-1]:
+            value = evaluate(item, doc)
+            if value is not None and value is not _MISSING:
+                return value
+        return evaluate(arg[-1], doc)
+    if op == "$type":
+        return _type_name(evaluate(arg, doc))
+    if op in ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte"):
+        left, right = (evaluate(item, doc) for item in arg)
+        left = None if left is _MISSING else left
+        right = None if right is _MISSING else right
+        order = (_sort_value(left) > _sort_value(right)) - (_sort_value(left) < _sort_value(right))
+        return {"$eq": order == 0, "$ne": order != 0, "$gt": order > 0,
+                "$gte": order >= 0, "$lt": order < 0, "$lte": order <= 0}[op]
+    if op == "$substrCP":
+        text, start, length = (evaluate(item, doc) for item in arg)
+        text = "" if text in (None, _MISSING) else str(text)
+        return text[start:start + length]
+    if op == "$concat":
+        parts = [evaluate(item, doc) for item in arg]
+        return None if any(part in (None, _MISSING) for part in parts) else "".join(parts)
+    if op == "$toString":
+        value = evaluate(arg, doc)
+        return None if value in (None, _MISSING) else str(value)
+    if op == "$dateToString":
+        value = evaluate(arg['date'], doc)
+        if value in (None, _MISSING):
+            return arg.get('onNull')
+        if not isinstance(value, datetime):
+            raise OperationFailure("can't convert from BSON type string to Date", code=16006)
+        return _format_date(value, arg.get('format', "%Y-%m-%dT%H:%M:%S.%LZ"), arg.get('timezone'))
+    if op in ("$add", "$subtract", "$multiply"):
+        values = [evaluate(item, doc) for item in arg]
+        if op == "$add":
+            return sum(values)
+        if op == "$subtract":
+            return values[0] - values[1]
+        result = 1
+        for value in values:
+            result *= value
+        return result
+    raise OperationFailure(f"Unrecognized expression '{op}'", code=168)
+
+
+def project_document(doc: Dict, projection: Optional[Dict]) -> Dict:
+    """find/$project 프로젝션 (포함/제외/계산 필드)"""
+    if not projection:
+        return doc
+    include_id = projection.get('_id', 1) not in (0, False)
+    fields = {key: value for key, value in projection.items() if key != '_id'}
+    exclusion = fields and all(value in (0, False) for value in fields.values())
+
+    if exclusion or (not fields and not include_id):
+        result = copy.deepcopy(doc)
+        for key in fields:
+            _unset_path(result, key)
+        if not include_id:
+            result.pop('_id', None)
+        return result
+
+    result = {}
+    if include_id and '_id' in doc:
+        result['_id'] = doc['_id']
+    for key, value in fields.items():
+        if value in (1, True):
+            found = _get_path(doc, key)
+            if found is not _MISSING:
+                _set_path(result, key, copy.deepcopy(found))
+        else:
+            found = evaluate(value, doc)
+            if found is not _MISSING:
+                _set_path(result, key, found)
+    return result
+
+
+def _sort_documents(docs: List[Dict], sort_spec) -> List[Dict]:
+    """다중 키 정렬 (뒤 키부터 안정 정렬)"""
+    for field, direction in reversed(list(sort_spec)):
+        docs = sorted(docs, key=lambda doc: _sort_value(_get_path(doc, field)), reverse=direction < 0)
+    return docs
+
+
+def _accumulate(spec: Dict, docs: List[Dict]):
+    """$group 누산자"""
+    op, arg = next(iter(spec.items()))
+    values = [evaluate(arg, doc) for doc in docs]
+    present = [value for value in values if value not in (None, _MISSING)]
+    if op == "$sum":
+        return sum(value for value in present if isinstance(value, (int, float)) and not isinstance(value, bool))
+    if op == "$avg":
+        numbers = [value for value in present if isinstance(value, (int, float))]
+        return sum(numbers) / len(numbers) if numbers else None
+    if op == "$first":
+        return None if not values or values[0] is _MISSING else values[0]
+    if op == "$last":
+        return None if not values or values[-1] is _MISSING else values[-1]
+    if op == "$max":
+        return max(present, key=_sort_value) if present else None
+    if op == "$min":
+        return min(present, key=_sort_value) if present else None
+    if op == "$push":
+        return [value for value in values if value is not _MISSING]
+    if op == "$addToSet":
+        unique = []
+        for value in present:
+            if value not in unique:
+                unique.append(value)
+        return unique
+    raise OperationFailure(f"unknown group operator '{op}'", code=15952)
+
+
+def _group(docs: List[Dict], spec: Dict) -> List[Dict]:
+    groups = {}
+    for doc in docs:
+        key = evaluate(spec['_id'], doc)
+        key = None if key is _MISSING else key
+        groups.setdefault(repr(_sort_value(key)), (key, []))[1].append(doc)
+    results = []
+    for key, members in groups.values():
+        result = {'_id': key}
+        for field, accumulator in spec.items():
+            if field != '_id':
+                result[field] = _accumulate(accumulator, members)
+        results.append(result)
+    return results
+
+
+def _unwind(docs: List[Dict], spec) -> List[Dict]:
+    if isinstance(spec, str):
+        spec = {"path": spec}
+    path = spec['path'][1:]
+    keep_empty = spec.get('preserveNullAndEmptyArrays', False)
+    results = []
+    for doc in docs:
+        value = _get_path(doc, path)
+        if isinstance(value, list) and value:
+            for item in value:
+                unwound = copy.deepcopy(doc)
+                _set_path(unwound, path, item)
+                results.append(unwound)
+        elif isinstance(value, list) or value in (None, _MISSING):
+            if keep_empty:
+                unwound = copy.deepcopy(doc)
+                _unset_path(unwound, path)
+                results.append(unwound)
+        else:
+            results.append(doc)
+    return results
+
+
+class MemoryCursor:
+    """find 결과 커서 (반복 시점에 조회)"""
+
+    def __init__(self, collection: "MemoryCollection", query: Optional[Dict], projection: Optional[Dict]):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort = None
+        self._skip = 0
+        self._limit = 0
+        self._results = None
+
+    def sort(self, key_or_list, direction: int = 1):
+        self._sort = [(key_or_list, direction)] if isinstance(key_or_list, str) else list(key_or_list)
+        return self
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def batch_size(self, size: int):
+        # 결과를 한 번에 메모리에서 만들므로 의미 없음 (pymongo 호환용)
+        return self
+
+    def _execute(self) -> List[Dict]:
+        docs = self._collection._matching(self._query)
+        if self._sort:
+            docs = _sort_documents(docs, self._sort)
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return [project_document(copy.deepcopy(doc), self._projection) for doc in docs]
+
+    def __iter__(self):
+        if self._results is None:
+            self._results = iter(self._execute())
+        return self._results
+
+    def __next__(self):
+        return next(iter(self))
+
+    def close(self):
+        self._results = iter(())
+
+
+class MemoryCollection:
+    """인메모리 컬렉션 (문서는 _id 순서로 보관)"""
+
+    def __init__(self, database: "MemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self.full_name = f"{database.name}.{name}"
+        self._docs = {}
+        self._indexes = {"_id_": {"key": {"_id": 1}, "name": "_id_"}}
+        self._lock = database.client._lock
+
+    def _matching(self, query: Optional[Dict]) -> List[Dict]:
+        query = _to_bson(query or {})
+        with self._lock:
+            return [doc for doc in self._docs.values() if match_document(doc, query)]
+
+    def _key(self, document_id):
+        return repr(_sort_value(document_id))
+
+    def _insert(self, document: Dict):
+        if '_id' not in document:
+            document['_id'] = ObjectId()
+        key = self._key(document['_id'])
+        if key in self._docs:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error collection: {self.full_name} index: _id_ dup key: {{ _id: {document['_id']!r} }}",
+                code=11000
+            )
+        self._docs[key] = _to_bson(document)
+        self.database._created.add(self.name)
+
+    # --- 쓰기 ---
+
+    def insert_one(self, document: Dict):
+        with self._lock:
+            self._insert(document)
+        return SimpleNamespace(inserted_id=document['_id'], acknowledged=True)
+
+    def insert_many(self, documents, ordered: bool = True):
+        documents = list(documents)
+        inserted_ids, write_errors = [], []
+        with self._lock:
+            for index, document in enumerate(documents):
+                try:
+                    self._insert(document)
+                    inserted_ids.append(document['_id'])
+                except DuplicateKeyError as e:
+                    write_errors.append({"index": index, "code": 11000, "errmsg": str(e), "op": document})
+                    if ordered:
+                        break
+        if write_errors:
+            raise BulkWriteError({
+                "writeErrors": write_errors, "writeConcernErrors": [], "nInserted": len(inserted_ids),
+                "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []
+            })
+        return SimpleNamespace(inserted_ids=inserted_ids, acknowledged=True)
+
+    def _apply_update(self, doc: Dict, update: Dict, inserting: bool):
+        for op, fields in update.items():
+            if op == "$setOnInsert" and not inserting:
+                continue
+            for path, value in fields.items():
+                if op in ("$set", "$setOnInsert"):
+                    _set_path(doc, path, _to_bson(value))
+                elif op == "$inc":
+                    current = _get_path(doc, path)
+                    _set_path(doc, path, (0 if current is _MISSING else current) + value)
+                elif op == "$unset":
+                    _unset_path(doc, path)
+                elif op == "$push":
+                    current = _get_path(doc, path)
+                    _set_path(doc, path, ([] if current is _MISSING else current) + [_to_bson(value)])
+                else:
+                    raise OperationFailure(f"Unknown modifier: {op}", code=9)
+
+    def _upsert_base(self, query: Dict) -> Dict:
+        """upsert 시 쿼리의 동등 조건으로 새 문서 구성"""
+        base = {}
+        for key, condition in query.items():
+            if key.startswith('$'):
+                continue
+            if isinstance(condition, dict) and condition and all(k.startswith('$') for k in condition):
+                if "$eq" in condition:
+                    _set_path(base, key, copy.deepcopy(condition["$eq"]))
+                continue
+            _set_path(base, key, copy.deepcopy(condition))
+        return base
+
+    def _update(self, query: Dict, update: Dict, upsert: bool, many: bool, replace: bool = False):
+        matched = modified = 0
+        upserted_id = None
+        query = _to_bson(query)
+        with self._lock:
+            targets = [doc for doc in self._docs.values() if match_document(doc, query)]
+            if not many:
+                targets = targets[:1]
+            for doc in targets:
+                before = copy.deepcopy(doc)
+                if replace:
+                    document_id = doc['_id']
+                    doc.clear()
+                    doc.update(_to_bson(update))
+                    doc['_id'] = document_id
+                else:
+                    self._apply_update(doc, update, inserting=False)
+                matched += 1
+                modified += int(doc != before)
+            if not targets and upsert:
+                doc = self._upsert_base(query)
+                if replace:
+                    doc.update(copy.deepcopy(update))
+                else:
+                    self._apply_update(doc, update, inserting=True)
+                self._insert(doc)
+                upserted_id = doc['_id']
+        return SimpleNamespace(matched_count=matched, modified_count=modified,
+                               upserted_id=upserted_id, acknowledged=True)
+
+    def update_one(self, query: Dict, update: Dict, upsert: bool = False):
+        return self._update(query, update, upsert, many=False)
+
+    def update_many(self, query: Dict, update: Dict, upsert: bool = False):
+        return self._update(query, update, upsert, many=True)
+
+    def replace_one(self, query: Dict, replacement: Dict, upsert: bool = False):
+        return self._update(query, replacement, upsert, many=False, replace=True)
+
+    def _delete(self, query: Dict, many: bool):
+        deleted = 0
+        query = _to_bson(query)
+        with self._lock:
+            for key, doc in list(self._docs.items()):
+                if match_document(doc, query):
+                    del self._docs[key]
+                    deleted += 1
+                    if not many:
+                        break
+        return SimpleNamespace(deleted_count=deleted, acknowledged=True)
+
+    def delete_one(self, query: Dict):
+        return self._delete(query, many=False)
+
+    def delete_many(self, query: Dict):
+        return self._delete(query, many=True)
+
+    def bulk_write(self, requests, ordered: bool = True):
+        """UpdateOne/ReplaceOne/InsertOne/DeleteOne 요청 일괄 처리"""
+        counts = {"inserted_count": 0, "matched_count": 0, "modified_count": 0,
+                  "deleted_count": 0, "upserted_count": 0}
+        with self._lock:
+            for request in requests:
+                kind = type(request).__name__
+                if kind == "InsertOne":
+                    self._insert(request._doc)
+                    counts["inserted_count"] += 1
+                elif kind in ("UpdateOne", "UpdateMany", "ReplaceOne"):
+                    result = self._update(request._filter, request._doc, request._upsert,
+                                          many=kind == "UpdateMany", replace=kind == "ReplaceOne")
+                    counts["matched_count"] += result.matched_count
+                    counts["modified_count"] += result.modified_count
+                    counts["upserted_count"] += int(result.upserted_id is not None)
+                elif kind in ("DeleteOne", "DeleteMany"):
+                    counts["deleted_count"] += self._delete(request._filter, many=kind == "DeleteMany").deleted_count
+                else:
+                    raise OperationFailure(f"unsupported bulk operation: {kind}")
+        return SimpleNamespace(acknowledged=True, **counts)
+
+    # --- 읽기 ---
+
+    def find(self, query: Dict = None, projection: Dict = None):
+        return MemoryCursor(self, query, projection)
+
+    def find_one(self, query: Dict = None, projection: Dict = None):
+        if query is not None and not isinstance(query, dict):
+            query = {"_id": query}
+        return next(iter(self.find(query, projection).limit(1)), None)
+
+    def count_documents(self, query: Dict = None):
+        return len(self._matching(query or {}))
+
+    def estimated_document_count(self):
+        return len(self._docs)
+
+    def aggregate(self, pipeline: List[Dict]):
+        return iter(self.database._run_pipeline(self._matching({}), pipeline))
+
+    def watch(self, *args, **kwargs):
+        # 단일 서버와 같이 변경 스트림을 지원하지 않음
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+    # --- 인덱스 (정의만 보관, _id 외에는 강제하지 않음) ---
+
+    def list_indexes(self):
+        with self._lock:
+            return iter([dict(index, key=dict(index['key'])) for index in self._indexes.values()])
+
+    def create_indexes(self, models):
+        names = []
+        with self._lock:
+            for model in models:
+                document = model.document
+                keys = dict(document['key'])
+                name = document.get('name') or "_".join(f"{field}_{direction}" for field, direction in keys.items())
+                self._indexes[name] = {"key": keys, "name": name}
+                names.append(name)
+            self.database._created.add(self.name)
+        return names
+
+    def create_index(self, keys, **kwargs):
+        keys = [(keys, 1)] if isinstance(keys, str) else list(keys)
+        name = kwargs.get('name') or "_".join(f"{field}_{direction}" for field, direction in keys)
+        with self._lock:
+            self._indexes[name] = {"key": dict(keys), "name": name}
+            self.database._created.add(self.name)
+        return name
+
+    def drop(self):
+        with self._lock:
+            self._docs.clear()
+            self._indexes = {"_id_": {"key": {"_id": 1}, "name": "_id_"}}
+            self.database._created.discard(self.name)
+
+
+class MemoryDatabase:
+    """인메모리 데이터베이스 (db.컬렉션 / db['컬렉션'] 접근)"""
+
+    def __init__(self, client: "MemoryClient", name: str):
+        self.client = client
+        self.name = name
+        self._collections = {}
+        self._created = set()
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        with self.client._lock:
+            if name not in self._collections:
+                self._collections[name] = MemoryCollection(self, name)
+            return self._collections[name]
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def get_collection(self, name: str) -> MemoryCollection:
+        return self[name]
+
+    def list_collection_names(self) -> List[str]:
+        return sorted(self._created)
+
+    def create_collection(self, name: str) -> MemoryCollection:
+        self._created.add(name)
+        return self[name]
+
+    def drop_collection(self, name: str):
+        self[name].drop()
+
+    def command(self, command, *args, **kwargs) -> Dict:
+        if command in ("ping", "hello", "isMaster"):
+            return {"ok": 1.0}
+        raise OperationFailure(f"no such command: '{command}'", code=59)
+
+    def _run_pipeline(self, docs: List[Dict], pipeline: List[Dict]) -> List[Dict]:
+        """집계 파이프라인 실행"""
+        docs = [copy.deepcopy(doc) for doc in docs]
+        for stage in pipeline:
+            name, spec = next(iter(stage.items()))
+            if name == "$match":
+                spec = _to_bson(spec)
+                docs = [doc for doc in docs if match_document(doc, spec)]
+            elif name == "$sort":
+                docs = _sort_documents(docs, spec.items())
+            elif name == "$limit":
+                docs = docs[:spec]
+            elif name == "$skip":
+                docs = docs[spec:]
+            elif name == "$project":
+                docs = [project_document(doc, spec) for doc in docs]
+            elif name in ("$addFields", "$set"):
+                for doc in docs:
+                    for field, expression in spec.items():
+                        _set_path(doc, field, evaluate(expression, doc))
+            elif name == "$group":
+                docs = _group(docs, spec)
+            elif name == "$unwind":
+                docs = _unwind(docs, spec)
+            elif name == "$count":
+                docs = [{spec: len(docs)}] if docs else []
+            elif name == "$lookup":
+                foreign = self[spec['from']]._matching({})
+                for doc in docs:
+                    local_value = _get_path(doc, spec['localField'])
+                    doc[spec['as']] = [
+                        copy.deepcopy(other) for other in foreign
+                        if _values_equal(_get_path(other, spec['foreignField']),
+                                         None if local_value is _MISSING else local_value)
+                    ]
+            elif name == "$facet":
+                docs = [{field: self._run_pipeline(docs, sub_pipeline) for field, sub_pipeline in spec.items()}]
+            elif name == "$out":
+                target = self[spec if isinstance(spec, str) else spec['coll']]
+                with self.client._lock:
+                    target._docs.clear()
+                    for doc in docs:
+                        target._insert(doc)
+                docs = []
+            else:
+                raise OperationFailure(f"Unrecognized pipeline stage name: '{name}'", code=40324)
+        return docs
+
+
+class MemoryClient:
+    """인메모리 MongoClient (memory://<이름> 연결 문자열별로 하나)"""
+
+    def __init__(self, connection_string: str = MEMORY_URI_PREFIX):
+        self.connection_string = connection_string
+        self.address = ("memory", 0)
+        self._lock = threading.RLock()
+        self._databases = {}
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        with self._lock:
+            if name not in self._databases:
+                self._databases[name] = MemoryDatabase(self, name)
+            return self._databases[name]
+
+    def __getattr__(self, name: str) -> MemoryDatabase:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def get_database(self, name: str) -> MemoryDatabase:
+        return self[name]
+
+    def list_database_names(self) -> List[str]:
+        return sorted(name for name, db in self._databases.items() if db._created)
+
+    def drop_database(self, name: str):
+        with self._lock:
+            self._databases.pop(name, None)
+
+    def close(self):
+        pass
+
@@ -0,0 +1,172 @@
+"""
+MongoDB 인덱스 스키마 관리
+필요한 인덱스 목록을 한 곳에 정의하고, 프로세스당 한 번만 list_indexes로 비교해 없는 인덱스만 생성합니다.
+적용 결과와 일회성 데이터 마이그레이션 완료 여부는 schema_meta 컬렉션에 기록합니다.
+"""
+import hashlib
+import json
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Tuple, Callable
+from pymongo import IndexModel
+
+SCHEMA_META_COLLECTION = "schema_meta"
+
+# 컬렉션별 인덱스 정의 (키 순서가 의미 있음)
+INDEX_SPECS = {
+    "analysis_history": [
+        # 최신순 정렬 / 커서 페이지네이션(timestamp, _id 키셋)
+        [("timestamp", -1)],
+        [("timestamp", -1), ("_id", -1)],
+        # 사용자별 조회
+        [("user_id", 1)],
+        # 필터 + 최신순 정렬 (문제 유형 / 담당자 / 고객사)
+        [("issue_type", 1), ("timestamp", -1)],
+        [("user_name", 1), ("timestamp", -1)],
+        [("customer_name", 1), ("timestamp", -1)],
+    ],
+    "feedback": [
+        [("analysis_id", 1)],
+        [("analysis_id_str", 1)],
+        [("timestamp", -1)],
+        [("user_name", 1)],
+        [("created_at", -1)],
+        # 좋아요 목록 최신순 조회
+        [("feedback_type", 1), ("created_at", -1)],
+    ],
+}
+
+_ensured = set()
+_ensure_lock = threading.Lock()
+# 데이터 마이그레이션은 오래 걸릴 수 있어 인덱스 확인과 다른 잠금 사용
+_migration_lock = threading.Lock()
+_migrations_started = set()
+_started_lock = threading.Lock()
+
+
+def _specs_hash() -> str:
+    """인덱스 정의 해시 (정의가 바뀌면 다시 비교)"""
+    return hashlib.sha256(json.dumps(INDEX_SPECS, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def _key_tuple(keys) -> Tuple:
+    """인덱스 키를 비교 가능한 튜플로 변환"""
+    return tuple((field, int(direction)) for field, direction in keys)
+
+
+def ensure_indexes(db, force: bool = False) -> Dict[str, Any]:
+    """
+    정의된 인덱스 중 없는 것만 생성 (프로세스당 한 번).
+    인덱스를 만들면 컬렉션도 함께 생성되므로 초기화용 더미 문서는 필요 없습니다.
+    """
+    process_key = f"{id(db.client)}:{db.name}"
+    with _ensure_lock:
+        if process_key in _ensured and not force:
+            return {"success": True, "skipped": True, "created": []}
+
+        try:
+            created = []
+            applied = {}
+            for collection_name, specs in INDEX_SPECS.items():
+                collection = db[collection_name]
+                existing = {_key_tuple(index['key'].items()) for index in collection.list_indexes()}
+                missing = [IndexModel(keys) for keys in specs if _key_tuple(keys) not in existing]
+                if missing:
+                    names = collection.create_indexes(missing)
+                    created.extend(f"{collection_name}.{name}" for name in names)
+                applied[collection_name] = [
+                    "_".join(f"{field}_{direction}" for field, direction in keys) for keys in specs
+                ]
+
+            specs_hash = _specs_hash()
+            meta_collection = db[SCHEMA_META_COLLECTION]
+            meta = meta_collection.find_one({"_id": "indexes"}) or {}
+            if created or meta.get("specs_hash") != specs_hash:
+                meta_collection.replace_one(
+                    {"_id": "indexes"},
+                    {"specs_hash": specs_hash, "indexes": applied, "applied_at": datetime.now()},
+                    upsert=True
+                )
+
+            _ensured.add(process_key)
+            if created:
+                print(f"✅ MongoDB 인덱스 {len(created)}개 생성: {', '.join(created)}")
+            else:
+                print("✅ MongoDB 인덱스 확인 완료 (변경 없음)")
+            return {"success": True, "skipped": False, "created": created}
+
+        except Exception as e:
+            print(f"⚠️ 인덱스 확인/생성 실패: {e}")
+            return {"success": False, "error": str(e), "created": []}
+
+
+def run_migration_once(db, name: str, migrate: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    데이터 마이그레이션을 한 번만 실행 (schema_meta에 'migration:<name>'으로 완료 기록).
+    같은 프로세스에서는 메타 문서도 다시 조회하지 않습니다.
+    인덱스 확인(ensure_indexes)과 잠금을 공유하지 않으므로 실행 중에도 다른 세션의 초기화를 막지 않습니다.
+    """
+    process_key = f"{id(db.client)}:{db.name}:migration:{name}"
+    with _migration_lock:
+        if process_key in _ensured:
+            return {"success": True, "skipped": True}
+
+        meta_collection = db[SCHEMA_META_COLLECTION]
+        meta_id = f"migration:{name}"
+        try:
+            if meta_collection.find_one({"_id": meta_id}, {"_id": 1}):
+                _ensured.add(process_key)
+                return {"success": True, "skipped": True}
+
+            result = migrate() or {}
+            if result.get("success", True):
+                mark_migration_done(db, name, result)
+            return result
+
+        except Exception as e:
+            print(f"⚠️ MongoDB 마이그레이션 실패 ({name}): {e}")
+            return {"success": False, "error": str(e)}
+
+
+def mark_migration_done(db, name: str, result: Dict[str, Any]):
+    """마이그레이션 완료 기록 (CLI 일괄 작업으로 직접 실행한 경우에도 호출해 앱에서 다시 실행하지 않도록)"""
+    db[SCHEMA_META_COLLECTION].replace_one(
+        {"_id": f"migration:{name}"},
+        {"applied_at": datetime.now(), "result": {k: v for k, v in result.items() if k != "success"}},
+        upsert=True
+    )
+    _ensured.add(f"{id(db.client)}:{db.name}:migration:{name}")
+    print(f"✅ MongoDB 마이그레이션 완료: {name}")
+
+
+def start_migration(db, name: str, migrate: Callable[[], Dict[str, Any]]) -> bool:
+    """
+    run_migration_once를 백그라운드 스레드에서 실행 (프로세스당 한 번 시작, 요청 처리 경로를 막지 않음).
+    스레드를 새로 시작했으면 True.
+    """
+    process_key = f"{id(db.client)}:{db.name}:migration:{name}"
+    with _started_lock:
+        if process_key in _ensured or process_key in _migrations_started:
+            return False
+        _migrations_started.add(process_key)
+
+    def run():
+        result = run_migration_once(db, name, migrate)
+        if not result.get("success", True):
+            # 실패하면 다음 세션 초기화 때 다시 시도
+            with _started_lock:
+                _migrations_started.discard(process_key)
+
+    threading.Thread(target=run, name=f"mongo-migration-{name}", daemon=True).start()
+    return True
+
+
+def list_missing_indexes(db) -> Dict[str, List[str]]:
+    """정의된 인덱스 중 실제로 없는 항목 (점검용)"""
+    missing = {}
+    for collection_name, specs in INDEX_SPECS.items():
+        existing = {_key_tuple(index['key'].items()) for index in db[collection_name].list_indexes()}
+        absent = [str(keys) for keys in specs if _key_tuple(keys) not in existing]
+        if absent:
+            missing[collection_name] = absent
+    return missing
@@ -1,22 +1,102 @@
 import streamlit as st
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from pymongo import UpdateOne
+from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError, DuplicateKeyError, BulkWriteError, AutoReconnect
 import json
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterable, Callable
+from collections import Counter
 import pytz
 import os
+import threading
+import time
+from blob_store import BlobStore, compression_report
+from history_cursor import encode_cursor, decode_cursor
+from mongo_client import get_mongo_client, get_pool_metrics
+from mongo_schema import ensure_indexes, start_migration, SCHEMA_META_COLLECTION
+from config import get_secret
+from history_row import HistoryRow, TABLE_FIELDS
+from response_parser import get_parsed_response
+
+KST = pytz.timezone('Asia/Seoul')
+
+# 이력 목록 조회 시 가져올 필드 (표시용 날짜는 서버에서 KST 문자열로 변환)
+TABLE_PROJECTION = dict(
+    {field: 1 for field in TABLE_FIELDS},
+    display_date={"$dateToString": {"format": "%Y-%m-%d %H:%M:%S", "date": "$timestamp", "timezone": "Asia/Seoul"}}
+)
+
+# 집계용 일자 (BSON 날짜는 KST 기준, 마이그레이션 전 문자열은 앞 10자리)
+DAY_EXPRESSION = {"$cond": [
+    {"$eq": [{"$type": "$timestamp"}, "date"]},
+    {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp", "timezone": "Asia/Seoul"}},
+    {"$substrCP": [{"$ifNull": ["$timestamp", ""]}, 0, 10]}
+]}
+
+
+def to_datetime(value) -> Optional[datetime]:
+    """타임스탬프(ISO 문자열/datetime)를 시간대 포함 datetime으로 변환 (시간대 없는 값은 KST로 간주)"""
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    return KST.localize(parsed) if parsed.tzinfo is None else parsed
+
+
+def to_kst_isoformat(value) -> str:
+    """MongoDB에서 읽은 날짜(UTC naive)를 KST ISO 문자열로 변환"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = pytz.utc.localize(value)
+        return value.astimezone(KST).isoformat()
+    return str(value or '')
+
+
+def kst_day(value) -> str:
+    """집계용 KST 일자 (YYYY-MM-DD, MongoDB에서 읽은 시간대 없는 datetime은 UTC, 시간대 없는 문자열은 KST로 간주)"""
+    if isinstance(value, datetime) and value.tzinfo is None:
+        value = pytz.utc.localize(value)
+    parsed = to_datetime(value)
+    return parsed.astimezone(KST).date().isoformat() if parsed else str(value or '')[:10]
+
+
+def rollup_updates(documents: Iterable[Dict], sign: int = 1) -> List[UpdateOne]:
+    """이력 문서들의 일별 집계 증가 연산 (일자/담당자/문제 유형별로 묶어 한 건씩, 삭제 시 sign=-1)"""
+    counts = Counter(
+        (kst_day(doc.get('timestamp', '')), doc.get('user_name', ''), doc.get('issue_type', ''))
+        for doc in documents
+    )
+    return [
+        UpdateOne(
+            {"_id": {"day": day, "user_name": user_name, "issue_type": issue_type}},
+            {"$inc": {"count": sign * count}},
+            upsert=True
+        )
+        for (day, user_name, issue_type), count in counts.items()
+    ]
 
 # Streamlit secrets를 사용하여 환경변수 로드
 
 class MongoDBHandler:
     """MongoDB Atlas 연동 핸들러"""
     
-    def __init__(self):
-        """MongoDB 연결 초기화"""
+    # 좋아요 응답 캐시 (프로세스 공용, issue_type별)
+    LIKED_CACHE_TTL = 60
+    _liked_cache = {}
+    _liked_cache_lock = threading.Lock()
+    
+    def __init__(self, connection_string: str = None, run_migrations: bool = True):
+        """
+        MongoDB 연결 초기화 (connection_string을 주면 secrets/환경변수 대신 사용 - CLI 마이그레이션용)
+        run_migrations: 일회성 데이터 마이그레이션을 백그라운드에서 시작 (일괄 작업 CLI는 False로 직접 실행)
+        """
         try:
-            # 연결 문자열 가져오기 (Streamlit Secrets 우선, 환경변수 차선)
-            if "MONGODB_URI" in st.secrets:
+            # 연결 문자열 가져오기 (인자 > Streamlit Secrets > 환경변수)
+            if connection_string:
+                self.connection_string = connection_string
+            elif "MONGODB_URI" in st.secrets:
                 self.connection_string = st.secrets["MONGODB_URI"]
                 print("✅ MongoDB URI를 Streamlit Secrets에서 로드했습니다.")
             else:
@@ -32,7 +112,8 @@ class MongoDBHandler:
                 # 특수문자 인코딩 처리
                 self.connection_string = self.connection_string.replace('%40', '@')
                 
-            self.client = MongoClient(self.connection_string, serverSelectionTimeoutMS=10000)
+            # 프로세스 공용 클라이언트 (세션마다 커넥션 풀을 새로 만들지 않음, 최초 생성 시 연결 확인)
+            self.client = get_mongo_client(self.connection_string)
             
             # 연결 문자열에서 데이터베이스 이름 추출
             if '/sample_mflix' in self.connection_string:
@@ -48,13 +129,24 @@ class MongoDBHandler:
             self.feedback_collection = self.db.feedback
             self.analysis_collection = self.db.analysis_history  # 피드백과 연결된 분석 결과
             
-            # 연결 테스트
-            self.client.admin.command('ping')
+            # 일자/담당자/문제 유형별 사전 집계 (통계 조회용, MONGODB_DAILY_ROLLUP=false로 끔)
+            self.rollup_collection = self.db.history_daily_rollup
+            self.use_daily_rollup = str(get_secret("MONGODB_DAILY_ROLLUP", "true")).lower() == "true"
+            self._rollup_ready = None
+            
+            # 프롬프트/응답 원문 압축 저장소 (사전은 blob_dicts 컬렉션에 저장)
+            self.blob_store = BlobStore(collection=self.db.blob_dicts, binary=True)
+            
             print("✅ MongoDB Atlas 연결 성공")
             
-            # 인덱스 생성 (성능 최적화)
+            # 인덱스 확인 (프로세스 최초 1회만 DB 조회, 이후 세션은 생략)
             self._create_indexes()
             
+            # 문자열로 저장된 기존 timestamp를 BSON 날짜로 변환 (완료 여부는 schema_meta에 기록)
+            # 컬렉션 전체를 훑으므로 세션 초기화를 막지 않도록 백그라운드에서 실행
+            if run_migrations:
+                start_migration(self.db, "timestamp_dates", self.backfill_timestamp_dates)
+            
         except KeyError:
             print("❌ MONGODB_URI가 Streamlit Secrets에 설정되지 않았습니다.")
             print("💡 환경변수 MONGODB_URI를 설정하거나 Streamlit Secrets에 추가해주세요.")
@@ -69,51 +161,45 @@ class MongoDBHandler:
             print("💡 연결 문자열 형식과 인증 정보를 확인해주세요.")
             raise
     
-    def _create_indexes(self):
-        """데이터베이스 인덱스 생성"""
-        try:
-            # 타임스탬프 기반 정렬을 위한 인덱스
-            self.history_collection.create_index([("timestamp", -1)])
-            # 사용자별 조회를 위한 인덱스
-            self.history_collection.create_index([("user_id", 1)])
-            # 고객사별 조회를 위한 인덱스
-            self.history_collection.create_index([("customer_name", 1)])
-            # 문제 유형별 조회를 위한 인덱스
-            self.history_collection.create_index([("issue_type", 1)])
-            
-            # 피드백 컬렉션 초기화 및 인덱스 생성
-            self._initialize_feedback_collection()
-            
-            print("✅ MongoDB 인덱스 생성 완료")
-        except Exception as e:
-            print(f"⚠️ 인덱스 생성 실패: {e}")
+    def _create_indexes(self, force: bool = False):
+        """데이터베이스 인덱스 확인 (프로세스당 한 번, 없는 인덱스만 생성)"""
+        return ensure_indexes(self.db, force=force)
     
-    def _initialize_feedback_collection(self):
-        """피드백 컬렉션 초기화"""
+    def backfill_timestamp_dates(self, batch_size: int = 500) -> Dict:
+        """ISO 문자열 timestamp를 BSON 날짜로 일괄 변환 (날짜 범위 조회/정렬이 날짜 타입으로 동작하도록)"""
         try:
-            # 피드백 컬렉션이 존재하는지 확인
-            if "feedback" not in self.db.list_collection_names():
-                print("📝 feedback 컬렉션이 존재하지 않습니다. 생성 중...")
-                # 빈 문서를 삽입하여 컬렉션 생성
-                self.feedback_collection.insert_one({
-                    "initialized": True,
-                    "created_at": datetime.now(),
-                    "description": "피드백 컬렉션 초기화"
-                })
-                print("✅ feedback 컬렉션 생성 완료")
-            
-            # 피드백 컬렉션 인덱스 생성
-            self.feedback_collection.create_index([("analysis_id", 1)])
-            self.feedback_collection.create_index([("analysis_id_str", 1)])
-            self.feedback_collection.create_index([("feedback_type", 1)])
-            self.feedback_collection.create_index([("timestamp", -1)])
-            self.feedback_collection.create_index([("user_name", 1)])
-            self.feedback_collection.create_index([("created_at", -1)])
-            
-            print("✅ feedback 컬렉션 인덱스 생성 완료")
+            converted = 0
+            unparsable = []
+            while True:
+                query = {"timestamp": {"$type": "string"}}
+                if unparsable:
+                    query["_id"] = {"$nin": unparsable}
+                docs = list(self.history_collection.find(query, {"timestamp": 1}).limit(batch_size))
+                if not docs:
+                    break
+                
+                operations = []
+                for doc in docs:
+                    parsed = to_datetime(doc['timestamp'])
+                    if parsed:
+                        # 변환 사이에 값이 바뀐 문서는 건너뜀
+                        operations.append(UpdateOne(
+                            {"_id": doc['_id'], "timestamp": doc['timestamp']},
+                            {"$set": {"timestamp": parsed}}
+                        ))
+                    else:
+                        unparsable.append(doc['_id'])
+                if operations:
+                    converted += self.history_collection.bulk_write(operations, ordered=False).modified_count
+            
+            if unparsable:
+                print(f"⚠️ 날짜로 변환할 수 없는 timestamp {len(unparsable)}건은 문자열로 유지")
+            print(f"✅ 이력 timestamp {converted}건을 날짜 타입으로 변환")
+            return {"success": True, "converted": converted, "unparsable": len(unparsable)}
             
         except Exception as e:
-            print(f"⚠️ feedback 컬렉션 초기화 실패: {e}")
+            print(f"❌ timestamp 날짜 변환 실패: {e}")
+            return {"success": False, "error": str(e)}
     
     def is_connected(self) -> bool:
         """MongoDB 연결 상태 확인"""
@@ -151,143 +237,107 @@ class MongoDBHandler:
                 "error": str(e)
             }
     
-    def save_analysis(self, analysis_data: Dict, inquiry_data: Dict) -> Dict:
-        """분석 결과 저장"""
-        try:
-            # 저장할 데이터 구성
-            # 파싱된 데이터 추출 (여러 구조 지원)
-            parsed_data = None
-            response_type = ""
-            summary = ""
-            action_flow = ""
-            email_draft = ""
-            
-            # Gemini 응답 구조 확인
-            if 'parsed_response' in analysis_data:
-                # analysis_result에 직접 포함된 경우
-                parsed_data = analysis_data['parsed_response']
-            elif 'gemini_result' in analysis_data and 'parsed_response' in analysis_data['gemini_result']:
-                parsed_data = analysis_data['gemini_result']['parsed_response']
-                # Gemini 응답에서 raw_response가 있으면 GPT와 동일한 방식으로 파싱
-                if 'raw_response' in analysis_data['gemini_result']:
-                    try:
-                        raw_parsed = self._parse_gpt_response(analysis_data['gemini_result']['raw_response'])
-                        # raw_response 파싱 결과가 더 좋으면 사용
-                        if raw_parsed.get('summary') and raw_parsed.get('action_flow') and raw_parsed.get('email_draft'):
-                            parsed_data = raw_parsed
-                    except Exception as e:
-                        print(f"Gemini raw_response 파싱 실패: {e}")
-            elif 'gpt_result' in analysis_data and 'parsed_response' in analysis_data['gpt_result']:
-                parsed_data = analysis_data['gpt_result']['parsed_response']
-                # GPT 응답에서 raw_response가 있으면 파싱
-                if 'raw_response' in analysis_data['gpt_result']:
-                    try:
-                        raw_parsed = self._parse_gpt_response(analysis_data['gpt_result']['raw_response'])
-                        # raw_response 파싱 결과가 더 좋으면 사용
-                        if raw_parsed.get('summary') and raw_parsed.get('action_flow') and raw_parsed.get('email_draft'):
-                            parsed_data = raw_parsed
-                    except Exception as e:
-                        print(f"GPT raw_response 파싱 실패: {e}")
-            elif 'ai_result' in analysis_data:
-                ai_result = analysis_data['ai_result']
-                
-                if 'gemini_result' in ai_result and 'parsed_response' in ai_result['gemini_result']:
-                    parsed_data = ai_result['gemini_result']['parsed_response']
-                    # Gemini 응답에서 raw_response가 있으면 GPT와 동일한 방식으로 파싱
-                    if 'raw_response' in ai_result['gemini_result']:
-                        try:
-                            raw_parsed = self._parse_gpt_response(ai_result['gemini_result']['raw_response'])
-                            # raw_response 파싱 결과가 더 좋으면 사용
-                            if raw_parsed.get('summary') and raw_parsed.get('action_flow') and raw_parsed.get('email_draft'):
-                                parsed_data = raw_parsed
-                        except Exception as e:
-                            print(f"Gemini raw_response 파싱 실패: {e}")
-                elif 'gpt_result' in ai_result and 'parsed_response' in ai_result['gpt_result']:
-                    parsed_data = ai_result['gpt_result']['parsed_response']
-                    # GPT 응답에서 raw_response가 있으면 파싱
-                    if 'raw_response' in ai_result['gpt_result']:
-                        try:
-                            raw_parsed = self._parse_gpt_response(ai_result['gpt_result']['raw_response'])
-                            # raw_response 파싱 결과가 더 좋으면 사용
-                            if raw_parsed.get('summary') and raw_parsed.get('action_flow') and raw_parsed.get('email_draft'):
-                                parsed_data = raw_parsed
-                        except Exception as e:
-                            print(f"GPT raw_response 파싱 실패: {e}")
-                elif 'parsed_response' in ai_result:
-                    parsed_data = ai_result['parsed_response']
-                elif 'response' in ai_result:
-                    # 기존 GPT API 응답인 경우 파싱
-                    parsed_data = self._parse_gpt_response(ai_result['response'])
-            
-            # 파싱된 데이터에서 정보 추출
-            if parsed_data and isinstance(parsed_data, dict):
-                response_type = parsed_data.get('response_type', '')
-                summary = parsed_data.get('summary', '')
-                action_flow = parsed_data.get('action_flow', '')
-                email_draft = parsed_data.get('email_draft', '')
-                
-                # 빈 값 검증 및 기본값 설정
-                if not response_type or len(response_type.strip()) < 2:
-                    response_type = "해결안"
-                if not summary or len(summary.strip()) < 5:
-                    summary = "AI 분석 결과를 파싱할 수 없습니다. 고객 문의 내용을 확인해주세요."
-                if not action_flow or len(action_flow.strip()) < 10:
-                    action_flow = "AI 분석 결과를 파싱할 수 없습니다. 단계별 조치 사항을 확인해주세요."
-                if not email_draft or len(email_draft.strip()) < 20:
-                    email_draft = "AI 분석 결과를 파싱할 수 없습니다. 이메일 초안을 확인해주세요."
-            else:
-                # 파싱된 데이터가 없는 경우 기본값 사용
+    def _build_document(self, analysis_data: Dict, inquiry_data: Dict, document_id: str = None) -> Dict:
+        """분석 결과와 문의 정보로 저장할 이력 문서 구성"""
+        # 저장할 데이터 구성
+        response_type = ""
+        summary = ""
+        action_flow = ""
+        email_draft = ""
+        
+        # 분석 단계에서 한 번 파싱한 결과 사용 (원문만 있는 예전 구조는 공용 파서로 파싱, 캐시 사용)
+        parsed_data = get_parsed_response(analysis_data)
+        if parsed_data is None and 'ai_result' in analysis_data:
+            parsed_data = get_parsed_response(analysis_data['ai_result'])
+        
+        # 파싱된 데이터에서 정보 추출
+        if parsed_data and isinstance(parsed_data, dict):
+            response_type = parsed_data.get('response_type', '')
+            summary = parsed_data.get('summary', '')
+            action_flow = parsed_data.get('action_flow', '')
+            email_draft = parsed_data.get('email_draft', '')
+            
+            # 빈 값 검증 및 기본값 설정
+            if not response_type or len(response_type.strip()) < 2:
                 response_type = "해결안"
+            if not summary or len(summary.strip()) < 5:
                 summary = "AI 분석 결과를 파싱할 수 없습니다. 고객 문의 내용을 확인해주세요."
+            if not action_flow or len(action_flow.strip()) < 10:
                 action_flow = "AI 분석 결과를 파싱할 수 없습니다. 단계별 조치 사항을 확인해주세요."
+            if not email_draft or len(email_draft.strip()) < 20:
                 email_draft = "AI 분석 결과를 파싱할 수 없습니다. 이메일 초안을 확인해주세요."
-            
-            # 원본 AI 응답도 함께 저장 (나중에 파싱 복원을 위해)
-            original_ai_response = None
-            if 'ai_result' in analysis_data:
-                ai_result = analysis_data['ai_result']
-                if 'gemini_result' in ai_result and 'raw_response' in ai_result['gemini_result']:
-                    original_ai_response = ai_result['gemini_result']['raw_response']
-                elif 'response' in ai_result:  # openai_handler는 'response' 키 사용
-                    original_ai_response = ai_result['response']
-                elif 'gpt_result' in ai_result and 'raw_response' in ai_result['gpt_result']:
-                    original_ai_response = ai_result['gpt_result']['raw_response']
-            elif 'gemini_result' in analysis_data and 'raw_response' in analysis_data['gemini_result']:
-                original_ai_response = analysis_data['gemini_result']['raw_response']
-            elif 'response' in analysis_data:  # openai_handler는 'response' 키 사용
-                original_ai_response = analysis_data['response']
-            elif 'gpt_result' in analysis_data and 'raw_response' in analysis_data['gpt_result']:
-                original_ai_response = analysis_data['gpt_result']['raw_response']
-            
-            document = {
-                'timestamp': inquiry_data.get('timestamp', datetime.now().isoformat()),
-                'customer_name': inquiry_data.get('customer_name', ''),
-                'customer_contact': inquiry_data.get('customer_contact', ''),
-                'customer_manager': inquiry_data.get('customer_manager', ''),
-                'inquiry_content': inquiry_data.get('inquiry_content', ''),
-                'issue_type': analysis_data.get('issue_type', ''),
-                'classification_method': analysis_data.get('classification', {}).get('method', ''),
-                'confidence': analysis_data.get('classification', {}).get('confidence', ''),
-                'response_type': response_type,
-                'summary': summary,
-                'action_flow': action_flow,
-                'email_draft': email_draft,
-                'user_name': inquiry_data.get('user_name', ''),
-                'user_role': inquiry_data.get('user_role', ''),
-                'system_version': inquiry_data.get('system_version', ''),
-                'browser_info': inquiry_data.get('browser_info', ''),
-                'os_info': inquiry_data.get('os_info', ''),
-                'error_code': inquiry_data.get('error_code', ''),
-                'priority': inquiry_data.get('priority', ''),
-                'contract_type': inquiry_data.get('contract_type', ''),
-                'full_analysis_result': analysis_data,
-                'original_ai_response': original_ai_response,  # 원본 AI 응답 저장
-                'created_at': datetime.now(),
-                'updated_at': datetime.now()
-            }
+        else:
+            # 파싱된 데이터가 없는 경우 기본값 사용
+            response_type = "해결안"
+            summary = "AI 분석 결과를 파싱할 수 없습니다. 고객 문의 내용을 확인해주세요."
+            action_flow = "AI 분석 결과를 파싱할 수 없습니다. 단계별 조치 사항을 확인해주세요."
+            email_draft = "AI 분석 결과를 파싱할 수 없습니다. 이메일 초안을 확인해주세요."
+        
+        # 원본 AI 응답도 함께 저장 (나중에 파싱 복원을 위해)
+        original_ai_response = None
+        if 'ai_result' in analysis_data:
+            ai_result = analysis_data['ai_result']
+            if 'gemini_result' in ai_result and 'raw_response' in ai_result['gemini_result']:
+                original_ai_response = ai_result['gemini_result']['raw_response']
+            elif 'response' in ai_result:  # openai_handler는 'response' 키 사용
+                original_ai_response = ai_result['response']
+            elif 'gpt_result' in ai_result and 'raw_response' in ai_result['gpt_result']:
+                original_ai_response = ai_result['gpt_result']['raw_response']
+        elif 'gemini_result' in analysis_data and 'raw_response' in analysis_data['gemini_result']:
+            original_ai_response = analysis_data['gemini_result']['raw_response']
+        elif 'response' in analysis_data:  # openai_handler는 'response' 키 사용
+            original_ai_response = analysis_data['response']
+        elif 'gpt_result' in analysis_data and 'raw_response' in analysis_data['gpt_result']:
+            original_ai_response = analysis_data['gpt_result']['raw_response']
+        
+        document = {
+            'timestamp': to_datetime(inquiry_data.get('timestamp', '')) or datetime.now(KST),  # BSON 날짜로 저장
+            'customer_name': inquiry_data.get('customer_name', ''),
+            'customer_contact': inquiry_data.get('customer_contact', ''),
+            'customer_manager': inquiry_data.get('customer_manager', ''),
+            'inquiry_content': inquiry_data.get('inquiry_content', ''),
+            'issue_type': analysis_data.get('issue_type', ''),
+            'scenario_version': analysis_data.get('scenario_version', ''),
+            'classification_method': analysis_data.get('classification', {}).get('method', ''),
+            'confidence': analysis_data.get('classification', {}).get('confidence', ''),
+            'response_type': response_type,
+            'summary': summary,
+            'action_flow': action_flow,
+            'email_draft': email_draft,
+            'user_name': inquiry_data.get('user_name', ''),
+            'user_role': inquiry_data.get('user_role', ''),
+            'system_version': inquiry_data.get('system_version', ''),
+            'browser_info': inquiry_data.get('browser_info', ''),
+            'os_info': inquiry_data.get('os_info', ''),
+            'error_code': inquiry_data.get('error_code', ''),
+            'priority': inquiry_data.get('priority', ''),
+            'contract_type': inquiry_data.get('contract_type', ''),
+            'full_analysis_result': self.blob_store.pack(analysis_data),
+            'original_ai_response': self.blob_store.encode(original_ai_response),  # 원본 AI 응답 압축 저장
+            'created_at': datetime.now(),
+            'updated_at': datetime.now()
+        }
+        
+        if document_id:
+            from bson import ObjectId
+            document['_id'] = ObjectId(document_id) if ObjectId.is_valid(document_id) else document_id
+        
+        return document
+    
+    def save_analysis(self, analysis_data: Dict, inquiry_data: Dict, document_id: str = None) -> Dict:
+        """분석 결과 저장 (document_id를 주면 해당 ID로 저장 - 지연 저장 재시도 시 중복 방지)"""
+        try:
+            document = self._build_document(analysis_data, inquiry_data, document_id)
             
             # MongoDB에 저장
-            result = self.history_collection.insert_one(document)
+            try:
+                result = self.history_collection.insert_one(document)
+            except DuplicateKeyError:
+                # 같은 ID로 이미 저장된 경우 (재시도/스풀 복구) 성공으로 처리
+                print(f"✅ MongoDB에 이미 저장된 분석 결과 (ID: {document_id})")
+                return {"success": True, "database": "mongodb", "id": str(document['_id']), "object_id": document['_id']}
+            
+            self._update_daily_rollup(document)
             
             print(f"✅ MongoDB에 분석 결과 저장 완료 (ID: {result.inserted_id})")
             return {
@@ -301,143 +351,178 @@ class MongoDBHandler:
             print(f"❌ MongoDB 저장 실패: {e}")
             return {"success": False, "error": str(e)}
     
-    def _parse_gpt_response(self, response_text: str) -> dict:
-        """GPT API 응답을 파싱하여 구조화된 데이터로 변환"""
+    def _bulk_insert(self, collection, documents: Iterable[Dict], chunk_size: int = 500,
+                     max_retries: int = 3, progress_callback: Callable = None,
+                     on_inserted: Callable = None) -> Dict:
+        """
+        문서를 chunk_size 단위 unordered insert_many로 저장.
+        중복 키(이미 저장된 문서)는 건너뛰고, 그 밖에 실패한 문서만 골라 재시도합니다.
+        on_inserted는 묶음마다 새로 저장된 문서 목록으로 호출됩니다.
+        """
+        stats = {"inserted": 0, "duplicates": 0, "failed": 0}
+        started = time.time()
+        
+        def flush(chunk):
+            pending = chunk
+            inserted_docs = []
+            for attempt in range(max_retries + 1):
+                try:
+                    collection.insert_many(pending, ordered=False)
+                    stats["inserted"] += len(pending)
+                    inserted_docs.extend(pending)
+                    pending = []
+                    break
+                except BulkWriteError as e:
+                    write_errors = e.details.get('writeErrors', [])
+                    failed_indexes = {err['index'] for err in write_errors}
+                    duplicate_indexes = {err['index'] for err in write_errors if err.get('code') == 11000}
+                    stats["inserted"] += e.details.get('nInserted', 0)
+                    stats["duplicates"] += len(duplicate_indexes)
+                    inserted_docs.extend(doc for i, doc in enumerate(pending) if i not in failed_indexes)
+                    pending = [doc for i, doc in enumerate(pending) if i in failed_indexes - duplicate_indexes]
+                except (AutoReconnect, ConnectionFailure) as e:
+                    # 네트워크 오류는 묶음 전체 재시도 (이미 들어간 문서는 다음 시도에서 중복 키로 처리)
+                    print(f"⚠️ 일괄 저장 네트워크 오류, 재시도 예정: {e}")
+                if not pending:
+                    break
+                if attempt < max_retries:
+                    time.sleep(min(2 ** attempt, 30))
+            if pending:
+                stats["failed"] += len(pending)
+                print(f"❌ 일괄 저장 {len(pending)}건 최종 실패")
+            if on_inserted and inserted_docs:
+                on_inserted(inserted_docs)
+        
+        chunk = []
+        processed = 0
+        for document in documents:
+            chunk.append(document)
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                processed += len(chunk)
+                chunk = []
+                if progress_callback:
+                    progress_callback(processed, dict(stats))
+        if chunk:
+            flush(chunk)
+            processed += len(chunk)
+            if progress_callback:
+                progress_callback(processed, dict(stats))
+        
+        elapsed = time.time() - started
+        stats.update({
+            "success": stats["failed"] == 0,
+            "processed": processed,
+            "elapsed_sec": round(elapsed, 3),
+            "docs_per_sec": round(processed / elapsed, 1) if elapsed > 0 else 0.0
+        })
+        return stats
+    
+    def save_analyses_bulk(self, items: Iterable[Dict], chunk_size: int = 500, max_retries: int = 3,
+                           progress_callback: Callable = None) -> Dict:
+        """
+        분석 결과 일괄 저장 (과거 이력 이관/대량 티켓 적재용).
+        items: {"analysis_result", "inquiry_data", "document_id"(선택)} 딕셔너리 (지연 저장 작업과 같은 형태)
+        """
         try:
-            parsed = {
-                'response_type': '해결안',
-                'summary': '',
-                'action_flow': '',
-                'email_draft': '',
-                'question': ''
-            }
-            
-            # 응답 텍스트를 줄 단위로 분리
-            lines = response_text.split('\n')
-            current_section = None
-            
-            for i, line in enumerate(lines):
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                # 섹션 헤더 확인
-                if '[대응유형]' in line:
-                    response_type = line.replace('[대응유형]', '').strip()
-                    if response_type in ['해결안', '질문', '출동']:
-                        parsed['response_type'] = response_type
-                elif '[응답내용]' in line:
-                    current_section = 'content'
-                elif '- 요약:' in line:
-                    current_section = 'summary'
-                    # 요약 내용이 같은 줄에 있는 경우
-                    summary_content = line.replace('- 요약:', '').strip()
-                    if summary_content:
-                        parsed['summary'] = summary_content
-                    # 다음 줄에 요약 내용이 있는지 확인
-                    if i + 1 < len(lines):
-                        next_line = lines[i + 1].strip()
-                        if next_line and not any(keyword in next_line for keyword in ['- 조치 흐름:', '- 이메일 초안:', '[응답내용]', '[대응유형]']):
-                            if parsed['summary']:
-                                parsed['summary'] += ' ' + next_line
-                            else:
-                                parsed['summary'] = next_line
-                elif '- 조치 흐름:' in line:
-                    current_section = 'action_flow'
-                elif '- 이메일 초안:' in line:
-                    current_section = 'email_draft'
-                elif line.startswith('1.') or line.startswith('2.') or line.startswith('3.') or line.startswith('4.') or line.startswith('5.'):
-                    # 조치 흐름 항목
-                    if current_section == 'action_flow':
-                        parsed['action_flow'] += line + '\n'
-                elif current_section == 'summary':
-                    if parsed['summary']:  # 이미 내용이 있으면 공백 추가
-                        parsed['summary'] += ' ' + line
-                    else:
-                        parsed['summary'] = line
-                elif current_section == 'action_flow':
-                    # 조치 흐름에서 불필요한 텍스트 제거
-                    if not any(unwanted in line for unwanted in [
-                        '[응답내용]', '[대응유형]', '- 요약:', '- 조치 흐름:', '- 이메일 초안:',
-                        '아래 형식을 참고하여', '실무자가 이해하기 쉽도록', '자연스럽고 정확하게 응답을 생성하십시오'
-                    ]):
-                        parsed['action_flow'] += line + '\n'
-                elif current_section == 'email_draft':
-                    # 이메일 초안에서 불필요한 텍스트 제거
-                    if not any(unwanted in line for unwanted in [
-                        '[응답내용]', '[대응유형]', '- 요약:', '- 조치 흐름:', '- 이메일 초안:',
-                        '아래 형식을 참고하여', '실무자가 이해하기 쉽도록', '자연스럽고 정확하게 응답을 생성하십시오'
-                    ]):
-                        parsed['email_draft'] += line + '\n'
-            
-            # 요약에서 "- 요약:" 제거 (혹시 남아있을 경우)
-            parsed['summary'] = parsed['summary'].replace('- 요약:', '').strip()
-            
-            # 디버깅을 위한 로그 추가
-            print(f"MongoDB GPT 파싱 결과 - 요약: {parsed['summary'][:50]}...")
-            print(f"MongoDB GPT 파싱 결과 - 조치 흐름: {parsed['action_flow'][:50]}...")
-            print(f"MongoDB GPT 파싱 결과 - 이메일 초안: {parsed['email_draft'][:50]}...")
-            
-            return parsed
+            documents = (
+                self._build_document(item.get('analysis_result') or {}, item.get('inquiry_data') or {}, item.get('document_id'))
+                for item in items
+            )
+            stats = self._bulk_insert(self.history_collection, documents, chunk_size, max_retries,
+                                      progress_callback, on_inserted=self._update_daily_rollup_bulk)
+            print(f"✅ 분석 결과 일괄 저장 완료 (저장 {stats['inserted']}건, 중복 {stats['duplicates']}건, 실패 {stats['failed']}건, {stats['docs_per_sec']}건/초)")
+            return stats
+        except Exception as e:
+            print(f"❌ 분석 결과 일괄 저장 실패: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def save_feedbacks_bulk(self, feedbacks: Iterable[Dict], chunk_size: int = 500, max_retries: int = 3,
+                            progress_callback: Callable = None) -> Dict:
+        """피드백 일괄 저장 (feedbacks: analysis_id, feedback_type, user_name, user_role, timestamp, _id(선택))"""
+        try:
+            from bson import ObjectId
             
+            def build(feedback):
+                analysis_id = feedback.get('analysis_id')
+                analysis_object_id = ObjectId(str(analysis_id)) if ObjectId.is_valid(str(analysis_id)) else analysis_id
+                document = {
+                    "analysis_id": analysis_object_id,
+                    "analysis_id_str": str(analysis_id),
+                    "feedback_type": feedback.get('feedback_type', ''),
+                    "user_name": feedback.get('user_name', ''),
+                    "user_role": feedback.get('user_role', ''),
+                    "timestamp": feedback.get('timestamp') or datetime.now().isoformat(),
+                    "created_at": datetime.now()
+                }
+                if feedback.get('_id'):
+                    document['_id'] = feedback['_id']
+                return document
+            
+            stats = self._bulk_insert(self.feedback_collection, (build(f) for f in feedbacks), chunk_size, max_retries, progress_callback)
+            self.invalidate_liked_cache()
+            print(f"✅ 피드백 일괄 저장 완료 (저장 {stats['inserted']}건, 중복 {stats['duplicates']}건, 실패 {stats['failed']}건)")
+            return stats
         except Exception as e:
-            print(f"GPT 응답 파싱 오류: {e}")
-            return {
-                'response_type': '해결안',
-                'summary': '응답 파싱 중 오류가 발생했습니다.',
-                'action_flow': '응답을 확인해주세요.',
-                'email_draft': '응답을 확인해주세요.',
-                'question': ''
-            }
+            print(f"❌ 피드백 일괄 저장 실패: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def _build_history_query(self, user_id: str = None, date_from: str = None, date_to: str = None, issue_type: str = None) -> Dict:
+        """이력 조회 쿼리 조건 구성"""
+        query = {}
+        
+        # 담당자 필터링
+        if user_id:
+            query['user_name'] = user_id
+        
+        # 날짜 범위 필터링 (timestamp는 BSON 날짜, 파싱할 수 없는 값은 조건에서 제외)
+        if date_from or date_to:
+            date_query = {}
+            start_dt = to_datetime(date_from) if date_from else None
+            if start_dt:
+                date_query['$gte'] = start_dt
+            elif date_from:
+                print(f"⚠️ 시작 날짜 형식 오류로 조건에서 제외: {date_from}")
+            
+            end_dt = to_datetime(date_to) if date_to else None
+            if end_dt:
+                date_query['$lte'] = end_dt
+            elif date_to:
+                print(f"⚠️ 종료 날짜 형식 오류로 조건에서 제외: {date_to}")
+            
+            if date_query:
+                query['timestamp'] = date_query
+        
+        # 문제 유형 필터링
+        if issue_type and issue_type != "전체":
+            query['issue_type'] = issue_type
+        
+        return query
+    
+    def _serialize_history_doc(self, doc: Dict) -> Dict:
+        """조회 문서 복원 및 ObjectId/datetime 문자열 변환"""
+        doc = self.blob_store.unpack(doc)
+        doc['_id'] = str(doc['_id'])
+        # datetime 객체를 문자열로 변환 (timestamp는 기존 형식과 같은 KST ISO 문자열)
+        if 'timestamp' in doc:
+            doc['timestamp'] = to_kst_isoformat(doc['timestamp'])
+        if 'created_at' in doc:
+            doc['created_at'] = doc['created_at'].isoformat()
+        if 'updated_at' in doc:
+            doc['updated_at'] = doc['updated_at'].isoformat()
+        return doc
     
     def get_history(self, user_id: str = None, limit: int = 100, skip: int = 0, date_from: str = None, date_to: str = None, issue_type: str = None) -> List[Dict]:
         """이력 조회 (날짜 범위, 문제 유형, 담당자 필터링 지원)"""
         try:
             # 쿼리 조건 구성
-            query = {}
-            
-            # 담당자 필터링
-            if user_id:
-                query['user_name'] = user_id
-            
-            # 날짜 범위 필터링
-            if date_from or date_to:
-                date_query = {}
-                if date_from:
-                    try:
-                        start_dt = datetime.fromisoformat(date_from.replace('Z', '+00:00'))
-                        date_query['$gte'] = start_dt.isoformat()
-                    except:
-                        # 날짜 파싱 실패 시 원본 문자열로 검색
-                        date_query['$gte'] = date_from
-                
-                if date_to:
-                    try:
-                        end_dt = datetime.fromisoformat(date_to.replace('Z', '+00:00'))
-                        date_query['$lte'] = end_dt.isoformat()
-                    except:
-                        # 날짜 파싱 실패 시 원본 문자열로 검색
-                        date_query['$lte'] = date_to
-                
-                query['timestamp'] = date_query
-            
-            # 문제 유형 필터링
-            if issue_type and issue_type != "전체":
-                query['issue_type'] = issue_type
+            query = self._build_history_query(user_id, date_from, date_to, issue_type)
             
             # MongoDB에서 데이터 조회
             cursor = self.history_collection.find(query).sort("timestamp", -1).skip(skip).limit(limit)
             
             # ObjectId를 문자열로 변환
-            results = []
-            for doc in cursor:
-                doc['_id'] = str(doc['_id'])
-                # datetime 객체를 문자열로 변환
-                if 'created_at' in doc:
-                    doc['created_at'] = doc['created_at'].isoformat()
-                if 'updated_at' in doc:
-                    doc['updated_at'] = doc['updated_at'].isoformat()
-                results.append(doc)
+            results = [self._serialize_history_doc(doc) for doc in cursor]
             
             print(f"✅ MongoDB에서 {len(results)}개 이력 조회 완료 (필터: {query})")
             return results
@@ -446,18 +531,69 @@ class MongoDBHandler:
             print(f"❌ MongoDB 조회 실패: {e}")
             return []
     
+    def get_history_page(self, cursor: str = None, page_size: int = 50, user_id: str = None, date_from: str = None, date_to: str = None, issue_type: str = None, table_only: bool = False) -> Dict:
+        """
+        커서 기반 이력 페이지 조회 ((timestamp, _id) 키셋 - skip 없이 인덱스로 바로 이동)
+        table_only=True이면 목록 컬럼만 프로젝션해 HistoryRow 목록으로 반환
+        """
+        try:
+            query = self._build_history_query(user_id, date_from, date_to, issue_type)
+            
+            # 커서 이후(더 오래된) 문서만 조회
+            position = decode_cursor(cursor)
+            if position:
+                from bson import ObjectId
+                timestamp, last_id = position
+                timestamp = to_datetime(timestamp) or timestamp
+                last_id = ObjectId(last_id) if ObjectId.is_valid(last_id) else last_id
+                keyset = {'$or': [
+                    {'timestamp': {'$lt': timestamp}},
+                    {'timestamp': timestamp, '_id': {'$lt': last_id}}
+                ]}
+                query = {'$and': [query, keyset]} if query else keyset
+            
+            docs = list(
+                self.history_collection.find(query, TABLE_PROJECTION if table_only else None)
+                .sort([("timestamp", -1), ("_id", -1)])
+                .limit(page_size + 1)
+            )
+            has_more = len(docs) > page_size
+            docs = docs[:page_size]
+            
+            next_cursor = None
+            if has_more and docs:
+                next_cursor = encode_cursor(to_kst_isoformat(docs[-1].get('timestamp', '')), str(docs[-1]['_id']))
+            
+            if table_only:
+                results = [HistoryRow.from_entry(self._serialize_history_doc(doc)) for doc in docs]
+            else:
+                results = [self._serialize_history_doc(doc) for doc in docs]
+            print(f"✅ MongoDB에서 {len(results)}개 이력 페이지 조회 완료 (다음 페이지: {has_more})")
+            return {
+                "success": True,
+                "data": results,
+                "next_cursor": next_cursor,
+                "has_more": has_more
+            }
+            
+        except Exception as e:
+            print(f"❌ MongoDB 페이지 조회 실패: {e}")
+            return {"success": False, "error": str(e), "data": [], "next_cursor": None, "has_more": False}
+    
     def get_history_by_date_range(self, start_date: str, end_date: str, user_id: str = None) -> List[Dict]:
         """날짜 범위별 이력 조회"""
         try:
             # 날짜 파싱
-            start_dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-            end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+            start_dt = to_datetime(start_date)
+            end_dt = to_datetime(end_date)
+            if not start_dt or not end_dt:
+                raise ValueError(f"날짜 형식 오류: {start_date} ~ {end_date}")
             
             # 쿼리 조건 구성
             query = {
                 'timestamp': {
-                    '$gte': start_dt.isoformat(),
-                    '$lte': end_dt.isoformat()
+                    '$gte': start_dt,
+                    '$lte': end_dt
                 }
             }
             if user_id:
@@ -466,14 +602,7 @@ class MongoDBHandler:
             # MongoDB에서 데이터 조회
             cursor = self.history_collection.find(query).sort("timestamp", -1)
             
-            results = []
-            for doc in cursor:
-                doc['_id'] = str(doc['_id'])
-                if 'created_at' in doc:
-                    doc['created_at'] = doc['created_at'].isoformat()
-                if 'updated_at' in doc:
-                    doc['updated_at'] = doc['updated_at'].isoformat()
-                results.append(doc)
+            results = [self._serialize_history_doc(doc) for doc in cursor]
             
             print(f"✅ MongoDB에서 날짜 범위별 {len(results)}개 이력 조회 완료")
             return results
@@ -487,9 +616,15 @@ class MongoDBHandler:
         try:
             from bson import ObjectId
             
+            # 일별 집계에서 뺄 수 있도록 삭제 전에 집계 키 필드를 조회
+            doc = self.history_collection.find_one(
+                {"_id": ObjectId(history_id)}, {"timestamp": 1, "user_name": 1, "issue_type": 1}
+            )
             result = self.history_collection.delete_one({"_id": ObjectId(history_id)})
             
             if result.deleted_count > 0:
+                if doc:
+                    self._remove_from_daily_rollup(doc)
                 print(f"✅ MongoDB에서 이력 삭제 완료 (ID: {history_id})")
                 return {"success": True, "deleted_count": result.deleted_count}
             else:
@@ -500,6 +635,21 @@ class MongoDBHandler:
             print(f"❌ MongoDB 이력 삭제 실패: {e}")
             return {"success": False, "error": str(e)}
     
+    def get_analysis_by_id(self, analysis_id: str) -> Dict:
+        """문서 ID(_id)로 분석 결과 한 건 조회"""
+        try:
+            from bson import ObjectId
+            
+            document_id = ObjectId(str(analysis_id)) if ObjectId.is_valid(str(analysis_id)) else str(analysis_id)
+            doc = self.history_collection.find_one({"_id": document_id})
+            if doc:
+                return {"success": True, "data": self._serialize_history_doc(doc), "source": "mongodb"}
+            return {"success": False, "error": "분석 결과를 찾을 수 없습니다", "source": "mongodb"}
+            
+        except Exception as e:
+            print(f"❌ MongoDB 분석 결과 조회 실패 (ID: {analysis_id}): {e}")
+            return {"success": False, "error": str(e), "source": "mongodb"}
+    
     def get_analysis_by_criteria(self, customer_name: str = None, issue_type: str = None, user_name: str = None, date: str = None) -> Dict:
         """특정 조건에 맞는 AI 분석 결과 조회"""
         try:
@@ -516,32 +666,21 @@ class MongoDBHandler:
                 query['user_name'] = user_name.strip()
             
             if date and date.strip():
-                # 날짜 형식 변환 (YYYY-MM-DD -> YYYY-MM-DDTHH:MM:SS)
+                # 해당 일자(KST) 하루 범위로 검색
                 try:
-                    date_obj = datetime.strptime(date.strip(), '%Y-%m-%d')
-                    start_date = date_obj.replace(hour=0, minute=0, second=0, microsecond=0)
-                    end_date = date_obj.replace(hour=23, minute=59, second=59, microsecond=999999)
-                    
-                    # ISO 형식으로 변환
+                    start_date = KST.localize(datetime.strptime(date.strip(), '%Y-%m-%d'))
                     query['timestamp'] = {
-                        '$gte': start_date.isoformat(),
-                        '$lte': end_date.isoformat()
+                        '$gte': start_date,
+                        '$lt': start_date + timedelta(days=1)
                     }
                 except ValueError:
-                    # 날짜 파싱 실패 시 원본 문자열로 검색
-                    query['timestamp'] = {'$regex': date.strip()}
+                    # 날짜 파싱 실패 시 날짜 조건 없이 검색
+                    print(f"⚠️ 날짜 형식 오류로 조건에서 제외: {date}")
             
             # MongoDB에서 데이터 조회
             cursor = self.history_collection.find(query).sort("timestamp", -1).limit(1)
             
-            results = []
-            for doc in cursor:
-                doc['_id'] = str(doc['_id'])
-                if 'created_at' in doc:
-                    doc['created_at'] = doc['created_at'].isoformat()
-                if 'updated_at' in doc:
-                    doc['updated_at'] = doc['updated_at'].isoformat()
-                results.append(doc)
+            results = [self._serialize_history_doc(doc) for doc in cursor]
             
             if results:
                 print(f"✅ MongoDB에서 조건별 분석 결과 조회 완료: {len(results)}개")
@@ -566,48 +705,167 @@ class MongoDBHandler:
                 "source": "mongodb"
             }
     
+    def _update_daily_rollup(self, document: Dict):
+        """일자/담당자/문제 유형별 집계 문서 증가 (저장 시점)"""
+        if not self.use_daily_rollup:
+            return
+        try:
+            self.rollup_collection.update_one(
+                {"_id": {
+                    "day": kst_day(document.get('timestamp', '')),
+                    "user_name": document.get('user_name', ''),
+                    "issue_type": document.get('issue_type', '')
+                }},
+                {"$inc": {"count": 1}},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"⚠️ 일별 집계 갱신 실패: {e}")
+    
+    def _update_daily_rollup_bulk(self, documents: List[Dict]):
+        """일괄 저장된 문서들의 일별 집계를 한 번의 bulk_write로 증가"""
+        if not self.use_daily_rollup or not documents:
+            return
+        try:
+            self.rollup_collection.bulk_write(rollup_updates(documents), ordered=False)
+        except Exception as e:
+            print(f"⚠️ 일별 집계 일괄 갱신 실패: {e}")
+    
+    def _remove_from_daily_rollup(self, document: Dict):
+        """삭제된 문서만큼 일별 집계 감소 (0건이 된 집계 문서는 제거, 실패하면 재구성 대상으로 표시)"""
+        if not self.use_daily_rollup:
+            return
+        try:
+            self.rollup_collection.bulk_write(rollup_updates([document], sign=-1), ordered=False)
+            self.rollup_collection.delete_many({"count": {"$lte": 0}})
+        except Exception as e:
+            print(f"⚠️ 일별 집계 감소 실패, 다음 통계 조회는 이력 기준으로 집계합니다: {e}")
+            self._rollup_ready = False
+            try:
+                self.db[SCHEMA_META_COLLECTION].update_one({"_id": "daily_rollup"}, {"$set": {"ready": False}}, upsert=True)
+            except Exception as meta_error:
+                print(f"⚠️ 일별 집계 상태 기록 실패: {meta_error}")
+    
+    def _is_rollup_ready(self) -> bool:
+        """일별 집계가 전체 이력으로 한 번 이상 재구성되었는지 확인 (핸들러당 1회 조회)"""
+        if not self.use_daily_rollup:
+            return False
+        if self._rollup_ready is None:
+            meta = self.db[SCHEMA_META_COLLECTION].find_one({"_id": "daily_rollup"}) or {}
+            self._rollup_ready = bool(meta.get('ready'))
+        return self._rollup_ready
+    
+    def rebuild_daily_rollup(self) -> Dict:
+        """이력 전체로 일별 집계 컬렉션 재구성 (최초 1회 또는 불일치 시)"""
+        try:
+            self.history_collection.aggregate([
+                {"$group": {
+                    "_id": {
+                        "day": DAY_EXPRESSION,
+                        "user_name": {"$ifNull": ["$user_name", ""]},
+                        "issue_type": {"$ifNull": ["$issue_type", ""]}
+                    },
+                    "count": {"$sum": 1}
+                }},
+                {"$out": self.rollup_collection.name}
+            ])
+            rollup_docs = self.rollup_collection.count_documents({})
+            self.db[SCHEMA_META_COLLECTION].replace_one(
+                {"_id": "daily_rollup"},
+                {"ready": True, "rebuilt_at": datetime.now(), "documents": rollup_docs},
+                upsert=True
+            )
+            self._rollup_ready = True
+            print(f"✅ 일별 집계 재구성 완료 ({rollup_docs}개 문서)")
+            return {"success": True, "documents": rollup_docs}
+        except Exception as e:
+            print(f"❌ 일별 집계 재구성 실패: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def _statistics_pipeline(self, rollup_ready: bool):
+        """통계 $facet 파이프라인 (일별 집계가 준비되었으면 집계 컬렉션 기준) - (컬렉션, 파이프라인) 반환"""
+        week_ago = datetime.now() - timedelta(days=7)
+        
+        if rollup_ready:
+            # 일별 집계 문서만 읽음 (이력 크기와 무관)
+            collection = self.rollup_collection
+            count_expr = "$count"
+            user_field, issue_field, day_field = "$_id.user_name", "$_id.issue_type", "$_id.day"
+            recent_match = {"_id.day": {"$gte": week_ago.date().isoformat()}}
+        else:
+            collection = self.history_collection
+            count_expr = 1
+            user_field, issue_field = "$user_name", "$issue_type"
+            day_field = DAY_EXPRESSION
+            recent_match = {"created_at": {"$gte": week_ago}}
+        
+        return collection, [
+            {"$facet": {
+                "total": [{"$group": {"_id": None, "count": {"$sum": count_expr}}}],
+                "user_stats": [
+                    {"$group": {"_id": user_field, "count": {"$sum": count_expr}}},
+                    {"$sort": {"count": -1}}
+                ],
+                "issue_stats": [
+                    {"$group": {"_id": issue_field, "count": {"$sum": count_expr}}},
+                    {"$sort": {"count": -1}}
+                ],
+                "daily_stats": [
+                    {"$group": {"_id": day_field, "count": {"$sum": count_expr}}},
+                    {"$sort": {"_id": 1}}
+                ],
+                "recent": [
+                    {"$match": recent_match},
+                    {"$group": {"_id": None, "count": {"$sum": count_expr}}}
+                ]
+            }}
+        ]
+    
+    def _format_statistics(self, facet: Dict, collection_name: str) -> Dict:
+        """$facet 결과를 통계 응답 형태로 변환"""
+        return {
+            "total_count": facet['total'][0]['count'] if facet['total'] else 0,
+            "recent_count": facet['recent'][0]['count'] if facet['recent'] else 0,
+            "user_stats": facet['user_stats'],
+            "issue_stats": facet['issue_stats'],
+            "daily_stats": facet['daily_stats'],
+            "source": "daily_rollup" if collection_name == self.rollup_collection.name else "analysis_history"
+        }
+    
     def get_statistics(self) -> Dict:
-        """통계 정보 조회"""
+        """통계 정보 조회 (일별 집계가 있으면 집계 문서로, 없으면 이력에서 한 번의 $facet으로)"""
         try:
-            # 전체 이력 수
-            total_count = self.history_collection.count_documents({})
-            
-            # 사용자별 이력 수
-            user_stats = list(self.history_collection.aggregate([
-                {"$group": {"_id": "$user_name", "count": {"$sum": 1}}},
-                {"$sort": {"count": -1}}
-            ]))
-            
-            # 문제 유형별 통계
-            issue_stats = list(self.history_collection.aggregate([
-                {"$group": {"_id": "$issue_type", "count": {"$sum": 1}}},
-                {"$sort": {"count": -1}}
-            ]))
-            
-            # 최근 7일 이력 수
-            week_ago = datetime.now() - timedelta(days=7)
-            recent_count = self.history_collection.count_documents({
-                "created_at": {"$gte": week_ago}
-            })
-            
-            return {
-                "total_count": total_count,
-                "recent_count": recent_count,
-                "user_stats": user_stats,
-                "issue_stats": issue_stats
-            }
+            collection, pipeline = self._statistics_pipeline(self._is_rollup_ready())
+            facet = list(collection.aggregate(pipeline))[0]
+            return self._format_statistics(facet, collection.name)
             
         except Exception as e:
             print(f"❌ MongoDB 통계 조회 실패: {e}")
             return {}
     
-    def close_connection(self):
-        """MongoDB 연결 종료"""
+    def get_compression_report(self, sample_size: int = 200) -> Dict:
+        """최근 이력 문서의 원문 압축률 보고"""
         try:
-            self.client.close()
-            print("✅ MongoDB 연결 종료")
+            cursor = self.history_collection.find(
+                {},
+                {"full_analysis_result": 1, "original_ai_response": 1}
+            ).sort("timestamp", -1).limit(sample_size)
+            report = compression_report(list(cursor))
+            report["success"] = True
+            report["process_stats"] = self.blob_store.get_stats()
+            return report
         except Exception as e:
-            print(f"⚠️ MongoDB 연결 종료 실패: {e}")
+            print(f"❌ MongoDB 압축률 조회 실패: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def get_pool_metrics(self) -> Dict[str, Any]:
+        """공용 커넥션 풀 지표 (사용 중 커넥션 수, 대기 시간)"""
+        return get_pool_metrics(self.connection_string)
+    
+    def close_connection(self):
+        """MongoDB 연결 종료 (공용 클라이언트는 다른 세션이 사용 중이므로 참조만 해제)"""
+        self.client = None
+        print("✅ MongoDB 핸들러 연결 해제 (공용 클라이언트 유지)")
     
     def save_feedback(self, analysis_id, feedback_type: str, user_name: str = "", user_role: str = ""):
         """피드백 데이터를 MongoDB에 저장"""
@@ -615,11 +873,6 @@ class MongoDBHandler:
             if not self.is_connected():
                 return {"success": False, "error": "MongoDB 연결되지 않음"}
             
-            # 피드백 컬렉션이 존재하는지 확인하고 없으면 생성
-            if "feedback" not in self.db.list_collection_names():
-                print("📝 feedback 컬렉션이 존재하지 않습니다. 생성 중...")
-                self._initialize_feedback_collection()
-            
             # analysis_id가 문자열인 경우 ObjectId로 변환
             if isinstance(analysis_id, str):
                 try:
@@ -653,6 +906,7 @@ class MongoDBHandler:
             result = self.feedback_collection.insert_one(feedback_data)
             
             if result.inserted_id:
+                self.invalidate_liked_cache()
                 print(f"✅ 피드백 저장 완료 (ID: {result.inserted_id}, Analysis ID: {analysis_id})")
                 return {"success": True, "feedback_id": str(result.inserted_id)}
             else:
@@ -665,80 +919,84 @@ class MongoDBHandler:
             print(f"❌ 상세 오류: {traceback.format_exc()}")
             return {"success": False, "error": str(e)}
     
+    def _liked_pipeline(self, issue_type: str = None, limit: int = 3) -> List[Dict]:
+        """좋아요 응답 조회 파이프라인 (feedback → analysis_history $lookup)"""
+        pipeline = [
+            # 최신 좋아요부터 ((feedback_type, created_at) 인덱스 사용)
+            {"$match": {"feedback_type": "like"}},
+            {"$sort": {"created_at": -1}},
+            {"$lookup": {
+                "from": self.history_collection.name,
+                "localField": "analysis_id",
+                "foreignField": "_id",
+                "as": "analysis"
+            }},
+            {"$unwind": "$analysis"}
+        ]
+        if issue_type:
+            pipeline.append({"$match": {"analysis.issue_type": issue_type}})
+        pipeline += [
+            # 같은 분석에 여러 번 좋아요가 눌린 경우 한 번만
+            {"$group": {
+                "_id": "$analysis._id",
+                "liked_at": {"$first": "$created_at"},
+                "summary": {"$first": "$analysis.summary"},
+                "action_flow": {"$first": "$analysis.action_flow"},
+                "email_draft": {"$first": "$analysis.email_draft"}
+            }},
+            {"$sort": {"liked_at": -1}},
+            {"$limit": limit}
+        ]
+        return pipeline
+    
+    @classmethod
+    def _get_cached_liked(cls, cache_key) -> Optional[List[Dict]]:
+        """캐시된 좋아요 응답 (만료되었으면 None)"""
+        with cls._liked_cache_lock:
+            cached = cls._liked_cache.get(cache_key)
+            if cached and cached[0] > time.time():
+                return [dict(response) for response in cached[1]]
+        return None
+    
+    @classmethod
+    def _cache_liked(cls, cache_key, results: Iterable[Dict]) -> List[Dict]:
+        """집계 결과를 응답 형태로 변환해 캐시에 저장"""
+        liked_responses = [
+            {
+                'summary': result.get('summary', '') or '',
+                'action_flow': result.get('action_flow', '') or '',
+                'email_draft': result.get('email_draft', '') or ''
+            }
+            for result in results
+        ]
+        with cls._liked_cache_lock:
+            cls._liked_cache[cache_key] = (time.time() + cls.LIKED_CACHE_TTL, liked_responses)
+        return [dict(response) for response in liked_responses]
+    
     def get_liked_responses(self, issue_type: str = None, limit: int = 3):
-        """좋아요를 받은 응답들 조회 (AI 학습용)"""
+        """좋아요를 받은 응답들 조회 (AI 학습용, 단일 집계 쿼리 + 짧은 TTL 캐시)"""
+        cache_key = (self.db.name, issue_type, limit)
+        cached = self._get_cached_liked(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            if not self.is_connected():
-                return []
-            
-            # 좋아요를 받은 분석 ID들 조회 (여러 필드에서 ID 추출)
-            liked_feedbacks = list(self.feedback_collection.find(
-                {"feedback_type": "like"},
-                {"analysis_id": 1, "analysis_id_str": 1, "_id": 0}
-            ).limit(limit * 2))  # 여유분을 두고 조회
-            
-            if not liked_feedbacks:
-                return []
-            
-            # analysis_id와 analysis_id_str 모두 수집
-            liked_analysis_ids = []
-            for fb in liked_feedbacks:
-                if 'analysis_id' in fb:
-                    liked_analysis_ids.append(fb['analysis_id'])
-                if 'analysis_id_str' in fb:
-                    liked_analysis_ids.append(fb['analysis_id_str'])
-            
-            # 중복 제거
-            liked_analysis_ids = list(set(liked_analysis_ids))
-            
-            # 해당 분석 결과들 조회 (여러 필드에서 검색)
-            query = {
-                "$or": [
-                    {"_id": {"$in": liked_analysis_ids}},
-                    {"id": {"$in": liked_analysis_ids}},
-                    {"analysis_id": {"$in": liked_analysis_ids}}  # analysis_id 필드도 추가
-                ]
-            }
-            if issue_type:
-                query["issue_type"] = issue_type
-            
-            analysis_results = list(self.history_collection.find(
-                query,
-                {
-                    "_id": 1,
-                    "id": 1,
-                    "issue_type": 1,
-                    "summary": 1,
-                    "action_flow": 1,
-                    "email_draft": 1
-                }
-            ).limit(limit))
-            
-            # 결과 포맷팅
-            liked_responses = []
-            for result in analysis_results:
-                liked_responses.append({
-                    'summary': result.get('summary', ''),
-                    'action_flow': result.get('action_flow', ''),
-                    'email_draft': result.get('email_draft', '')
-                })
-            
-            return liked_responses
+            results = self.feedback_collection.aggregate(self._liked_pipeline(issue_type, limit))
+            return self._cache_liked(cache_key, results)
             
         except Exception as e:
             print(f"❌ 좋아요 응답 조회 실패: {e}")
             return []
     
+    @classmethod
+    def invalidate_liked_cache(cls):
+        """좋아요 응답 캐시 무효화 (피드백 저장 시)"""
+        with cls._liked_cache_lock:
+            cls._liked_cache.clear()
+    
     def get_feedback_stats(self, analysis_id: int = None, user_name: str = None):
-        """피드백 통계 조회"""
+        """피드백 통계 조회 (한 번의 $facet 집계)"""
         try:
-            if not self.is_connected():
-                return {"success": False, "error": "MongoDB 연결되지 않음"}
-            
-            # 피드백 컬렉션이 존재하는지 확인
-            if "feedback" not in self.db.list_collection_names():
-                return {"success": False, "error": "피드백 컬렉션이 존재하지 않습니다"}
-            
             # 필터 조건 구성
             filter_conditions = {}
             if analysis_id:
@@ -746,18 +1004,18 @@ class MongoDBHandler:
             if user_name:
                 filter_conditions["user_name"] = user_name
             
-            # 전체 피드백 수
-            total_feedback = self.feedback_collection.count_documents(filter_conditions)
-            
-            # 좋아요 수
-            like_filter = filter_conditions.copy()
-            like_filter["feedback_type"] = "like"
-            like_count = self.feedback_collection.count_documents(like_filter)
+            facet = list(self.feedback_collection.aggregate([
+                {"$match": filter_conditions},
+                {"$facet": {
+                    "total": [{"$count": "count"}],
+                    "by_type": [{"$group": {"_id": "$feedback_type", "count": {"$sum": 1}}}]
+                }}
+            ]))[0]
             
-            # 싫어요 수
-            dislike_filter = filter_conditions.copy()
-            dislike_filter["feedback_type"] = "dislike"
-            dislike_count = self.feedback_collection.count_documents(dislike_filter)
+            total_feedback = facet['total'][0]['count'] if facet['total'] else 0
+            type_counts = {item['_id']: item['count'] for item in facet['by_type']}
+            like_count = type_counts.get("like", 0)
+            dislike_count = type_counts.get("dislike", 0)
             
             # 만족도 계산
             satisfaction_rate = (like_count / total_feedback * 100) if total_feedback > 0 else 0
@@ -780,8 +1038,8 @@ class MongoDBHandler:
             if not self.is_connected():
                 return {"success": False, "error": "MongoDB 연결되지 않음"}
             
-            # 피드백 컬렉션 생성
-            self._initialize_feedback_collection()
+            # 피드백 컬렉션 생성 (인덱스 생성 시 컬렉션도 함께 생성)
+            self._create_indexes(force=True)
             
             # 컬렉션 존재 확인
             if "feedback" in self.db.list_collection_names():
@@ -1,37 +1,268 @@
+import atexit
 import json
 import os
 import hashlib
+import shutil
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 import pytz
-import streamlit as st
+from config import get_secret
+from blob_store import BlobStore, compression_report
+from history_cursor import keyset_page
+from history_stats import HistoryStats, get_history_stats
+from response_parser import get_parsed_response
+from history_feed import append_journal
+from history_row import TABLE_FIELDS, analysis_key
+
+_cloud_storage = None
+_cloud_storage_lock = threading.Lock()
 
 class CloudDataStorage:
-    """Streamlit Cloud 환경용 임시 데이터 저장소"""
+    """
+    Streamlit Cloud 환경용 임시 데이터 저장소 (메모리 한도 초과 시 오래된 조각을 압축 파일로 내림).
+    목록은 SEGMENT_ENTRIES개 단위 조각으로 나눠 보관하므로 이력이 길어져도 메모리에는 한도만큼만 남습니다.
+    저장할 목록의 앞부분이 이전에 저장(또는 로드)한 목록 그대로이면 뒤에 추가된 항목만 크기를 계산해 반영합니다.
+    세션마다 만들지 않고 get_cloud_storage로 프로세스 공용 인스턴스를 사용합니다.
+    """
+    
+    DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+    SEGMENT_ENTRIES = 100
     
-    def __init__(self):
-        self.data = {}
+    def __init__(self, max_bytes: int = None, spill_dir: str = None):
         self.timestamp = datetime.now().isoformat()
+        self.max_bytes = int(max_bytes or get_secret("CLOUD_STORAGE_MAX_BYTES", self.DEFAULT_MAX_BYTES))
+        # 기본 위치는 고정 경로 아래 프로세스별 디렉토리 (종료 시 close로 삭제)
+        self.spill_dir = spill_dir or os.path.join(tempfile.gettempdir(), "privkeeper_spill", str(os.getpid()))
+        os.makedirs(self.spill_dir, exist_ok=True)
+        
+        # 저장소에 든 이력의 통계 카운터 (저장소와 함께 세션 간 공유)
+        self.history_stats = HistoryStats(None)
+        
+        # 키별 조각 목록 (key -> {'segments', 'count', 'tail', 'wrapped'}, tail은 마지막 항목 객체)
+        self.keys = {}
+        # 최근 사용 순서의 메모리 조각 (조각 ID -> {'data', 'size', 'timestamp', 'path', 'stored_size'})
+        # path가 있으면 디스크 파일과 내용이 같아 다시 쓰지 않고 메모리에서만 내림
+        self.data = OrderedDict()
+        self.hot_bytes = 0
+        # 디스크로 내린 조각 (조각 ID -> {'path', 'size', 'stored_size', 'timestamp'})
+        self.spilled = {}
+        self._next_segment = 0
+        self._lock = threading.RLock()
+        self.metrics = {"hits": 0, "misses": 0, "spill_loads": 0, "evictions": 0, "full_rewrites": 0}
+    
+    @staticmethod
+    def _entry_size(item: Any) -> int:
+        """항목 하나의 직렬화 크기 (조각 크기는 항목 크기의 합으로 추정)"""
+        return len(json.dumps(item, ensure_ascii=False).encode('utf-8'))
+    
+    def _spill_path(self, segment_id: str) -> str:
+        """조각별 압축 파일 경로"""
+        return os.path.join(self.spill_dir, f"{segment_id}.json.z")
+    
+    def _remove_file(self, path: Optional[str]):
+        if path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def _drop_segment(self, segment_id: str):
+        """메모리/디스크에서 조각 제거"""
+        entry = self.data.pop(segment_id, None)
+        if entry:
+            self.hot_bytes -= entry['size']
+            self._remove_file(entry['path'])
+        spilled = self.spilled.pop(segment_id, None)
+        if spilled:
+            self._remove_file(spilled['path'])
+    
+    def _drop(self, key: str):
+        """키의 모든 조각 제거"""
+        meta = self.keys.pop(key, None)
+        for segment_id in (meta or {}).get('segments', []):
+            self._drop_segment(segment_id)
+    
+    def _hot_segment(self, segment_id: str) -> Optional[Dict]:
+        """조각을 메모리로 올려 반환 (디스크 파일은 남겨 두어 바뀌지 않으면 다시 쓰지 않음)"""
+        entry = self.data.get(segment_id)
+        if entry is not None:
+            self.data.move_to_end(segment_id)
+            return entry
+        spilled = self.spilled.get(segment_id)
+        if spilled is None:
+            return None
+        try:
+            with open(spilled['path'], 'rb') as f:
+                data = json.loads(zlib.decompress(f.read()).decode('utf-8'))
+        except Exception as e:
+            print(f"❌ 클라우드 저장소 디스크 로드 실패 ({segment_id}): {e}")
+            return None
+        del self.spilled[segment_id]
+        entry = dict(spilled, data=data)
+        self.data[segment_id] = entry
+        self.hot_bytes += entry['size']
+        self.metrics["spill_loads"] += 1
+        return entry
+    
+    def _evict(self):
+        """메모리 한도를 넘으면 가장 오래 사용하지 않은 조각부터 디스크로 내림"""
+        while self.hot_bytes > self.max_bytes and self.data:
+            segment_id, entry = self.data.popitem(last=False)
+            self.hot_bytes -= entry['size']
+            try:
+                if not entry['path']:
+                    path = self._spill_path(segment_id)
+                    compressed = zlib.compress(json.dumps(entry['data'], ensure_ascii=False).encode('utf-8'), 6)
+                    with open(path, 'wb') as f:
+                        f.write(compressed)
+                    entry = dict(entry, path=path, stored_size=len(compressed))
+                self.spilled[segment_id] = {
+                    'path': entry['path'],
+                    'size': entry['size'],
+                    'stored_size': entry['stored_size'],
+                    'timestamp': entry['timestamp']
+                }
+                self.metrics["evictions"] += 1
+            except Exception as e:
+                print(f"❌ 클라우드 저장소 디스크 저장 실패 ({segment_id}): {e}")
+                # 내리지 못한 데이터는 유실되지 않도록 메모리에 되돌림
+                self.data[segment_id] = entry
+                self.data.move_to_end(segment_id, last=False)
+                self.hot_bytes += entry['size']
+                break
+    
+    def _append(self, meta: Dict, items: List[Any]):
+        """항목을 마지막 조각에 이어 붙이고 가득 차면 새 조각 생성 (추가된 항목만 크기 계산)"""
+        for item in items:
+            size = self._entry_size(item)
+            entry = self._hot_segment(meta['segments'][-1]) if meta['segments'] else None
+            if entry is None or len(entry['data']) >= self.SEGMENT_ENTRIES:
+                segment_id = str(self._next_segment)
+                self._next_segment += 1
+                entry = {'data': [], 'size': 0, 'timestamp': None, 'path': None, 'stored_size': 0}
+                self.data[segment_id] = entry
+                meta['segments'].append(segment_id)
+            elif entry['path']:
+                # 내용이 바뀌므로 디스크 사본은 더 이상 유효하지 않음
+                self._remove_file(entry['path'])
+                entry['path'], entry['stored_size'] = None, 0
+            entry['data'].append(item)
+            entry['size'] += size
+            entry['timestamp'] = datetime.now().isoformat()
+            self.hot_bytes += size
     
     def save(self, key: str, data: Any) -> bool:
-        """세션 상태에 데이터 저장"""
+        """데이터 저장 (이전 목록 뒤에 항목만 추가된 경우 추가분만 반영, 아니면 전체 다시 기록)"""
         try:
-            self.data[key] = {
-                'data': data,
-                'timestamp': datetime.now().isoformat()
-            }
+            items = data if isinstance(data, list) else [data]
+            with self._lock:
+                meta = self.keys.get(key)
+                count = meta['count'] if meta else 0
+                appended = (
+                    meta is not None and not meta['wrapped'] and isinstance(data, list)
+                    and len(items) >= count and (count == 0 or items[count - 1] is meta['tail'])
+                )
+                if not appended:
+                    if meta is not None:
+                        self.metrics["full_rewrites"] += 1
+                    self._drop(key)
+                    meta = {'segments': [], 'count': 0, 'tail': None, 'wrapped': not isinstance(data, list)}
+                    self.keys[key] = meta
+                    count = 0
+                self._append(meta, items[count:])
+                meta['count'] = len(items)
+                meta['tail'] = items[-1] if items else None
+                self._evict()
             return True
         except Exception as e:
             print(f"❌ 클라우드 저장 실패: {e}")
             return False
     
     def load(self, key: str) -> Any:
-        """세션 상태에서 데이터 로드"""
-        return self.data.get(key, {}).get('data', None)
+        """데이터 로드 (디스크로 내린 조각은 읽어서 합침, 메모리는 한도 안으로 다시 정리)"""
+        with self._lock:
+            meta = self.keys.get(key)
+            if meta is None:
+                self.metrics["misses"] += 1
+                return None
+            
+            items = []
+            for segment_id in meta['segments']:
+                entry = self._hot_segment(segment_id)
+                if entry is None:
+                    self.metrics["misses"] += 1
+                    self._evict()
+                    return None
+                items.extend(entry['data'])
+            
+            # 다음 저장에서 추가분만 반영할 수 있도록 마지막 항목 객체를 기억
+            meta['tail'] = items[-1] if items else None
+            self.metrics["hits"] += 1
+            self._evict()
+            if meta['wrapped']:
+                return items[0] if items else None
+            return items
+    
+    def delete(self, key: str):
+        """키 삭제"""
+        with self._lock:
+            self._drop(key)
+    
+    def clear(self):
+        """모든 데이터 삭제"""
+        with self._lock:
+            for key in list(self.keys):
+                self._drop(key)
+            self.data.clear()
+            self.spilled.clear()
+            self.hot_bytes = 0
+            # 이전 실행에서 남은 조각 파일도 정리
+            for filename in os.listdir(self.spill_dir) if os.path.isdir(self.spill_dir) else []:
+                if filename.endswith(".json.z"):
+                    self._remove_file(os.path.join(self.spill_dir, filename))
+    
+    def close(self):
+        """모든 데이터와 조각 디렉토리 삭제 (프로세스 종료 시)"""
+        with self._lock:
+            self.clear()
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
     
     def get_all_keys(self) -> List[str]:
         """저장된 모든 키 반환"""
-        return list(self.data.keys())
+        with self._lock:
+            return list(self.keys)
+    
+    def get_memory_stats(self) -> Dict[str, Any]:
+        """메모리 사용량 지표"""
+        with self._lock:
+            return {
+                "keys": len(self.keys),
+                "hot_segments": len(self.data),
+                "hot_bytes": self.hot_bytes,
+                "max_bytes": self.max_bytes,
+                "spilled_segments": len(self.spilled),
+                "spilled_bytes": sum(entry['stored_size'] for entry in self.spilled.values()),
+                "spill_dir": self.spill_dir,
+                **self.metrics
+            }
+
+def get_cloud_storage() -> CloudDataStorage:
+    """프로세스 공용 클라우드 임시 저장소 (세션마다 만들면 세션별 데이터와 조각 디렉토리가 쌓임)"""
+    global _cloud_storage
+    with _cloud_storage_lock:
+        if _cloud_storage is None:
+            try:
+                _cloud_storage = CloudDataStorage()
+            except Exception as e:
+                print(f"⚠️ 클라우드 저장소 초기화 실패: {e}")
+                print("기본 한도로 폴백합니다.")
+                _cloud_storage = CloudDataStorage(max_bytes=CloudDataStorage.DEFAULT_MAX_BYTES)
+            atexit.register(_cloud_storage.close)
+        return _cloud_storage
 
 class MultiUserHistoryDB:
     def __init__(self, data_dir: str = "user_data"):
@@ -39,12 +270,9 @@ class MultiUserHistoryDB:
         # Streamlit Cloud 환경 감지
         self.is_cloud = self._is_streamlit_cloud()
         
-        # MongoDB 핸들러 초기화 (나중에 설정)
-        self.mongo_handler = None
-        
         if self.is_cloud:
             print("☁️ Streamlit Cloud 환경 감지 - 클라우드 저장소 확인 중...")
-            self.storage_handler = self._get_cloud_storage()
+            self.cloud_storage = get_cloud_storage()
         else:
             print("💻 로컬 환경 감지 - 파일 시스템 사용")
             # 절대 경로로 변환
@@ -53,32 +281,31 @@ class MultiUserHistoryDB:
             else:
                 self.data_dir = data_dir
             self._ensure_data_directory()
-    
-    def set_mongo_handler(self, mongo_handler):
-        """MongoDB 핸들러 설정"""
-        self.mongo_handler = mongo_handler
-        print("✅ MongoDB 핸들러가 설정되었습니다.")
+        
+        # 프롬프트/응답 원문 압축 저장소
+        self.blob_store = BlobStore(dict_dir=self._get_blob_dir())
+        
+        # 통계 카운터 (클라우드 환경은 공용 저장소와 함께 메모리에만 유지)
+        if self.is_cloud:
+            self.stats = self.cloud_storage.history_stats
+        else:
+            self.stats = get_history_stats(os.path.join(self.data_dir, "stats.json"))
+        
+        # 이력 변경 저널 (다른 세션/프로세스의 최근 이력 피드가 따라 읽음, 클라우드 환경은 사용 안 함)
+        self.journal_path = None if self.is_cloud else os.path.join(self.data_dir, "history_journal.jsonl")
     
     def _is_streamlit_cloud(self) -> bool:
         """Streamlit Cloud 환경인지 확인"""
         return os.getenv('STREAMLIT_SERVER_RUNNING') == 'true'
     
-    def _get_cloud_storage(self):
-        """클라우드 환경용 저장소 선택"""
+    def _append_journal(self, record: Dict):
+        """이력 변경 저널 기록 (실패해도 저장에는 영향 없음)"""
+        if not self.journal_path:
+            return
         try:
-            # MongoDB 우선 시도
-            if "MONGODB_URI" in st.secrets:
-                print("✅ MongoDB Atlas 연결 시도 중...")
-                from mongodb_handler import MongoDBHandler
-                return MongoDBHandler()
-            else:
-                # MongoDB 설정이 없으면 임시 저장소 사용
-                print("⚠️ MongoDB 설정이 없습니다. 임시 저장소를 사용합니다.")
-                return CloudDataStorage()
+            append_journal(self.journal_path, record)
         except Exception as e:
-            print(f"⚠️ 클라우드 저장소 초기화 실패: {e}")
-            print("임시 저장소로 폴백합니다.")
-            return CloudDataStorage()
+            print(f"⚠️ 이력 저널 기록 실패: {e}")
     
     def _ensure_data_directory(self):
         """데이터 디렉토리 생성 (로컬 환경만)"""
@@ -92,6 +319,12 @@ class MultiUserHistoryDB:
             except Exception as e:
                 print(f"⚠️ 디렉토리 생성 실패: {e}")
     
+    def _get_blob_dir(self) -> str:
+        """압축 사전 저장 디렉토리 (클라우드 환경은 임시 디렉토리)"""
+        if self.is_cloud:
+            return os.path.join(tempfile.gettempdir(), "privkeeper_blobs")
+        return os.path.join(self.data_dir, "blobs")
+    
     def _get_safe_timestamp(self) -> str:
         """안전한 타임스탬프 생성 (한국 시간대, 실패 시 UTC 사용)"""
         try:
@@ -132,7 +365,7 @@ class MultiUserHistoryDB:
     def _load_history(self, file_path: str) -> List[Dict]:
         """이력 데이터 로드"""
         if self.is_cloud:
-            # 클라우드 환경에서는 세션 상태에서 로드
+            # 클라우드 환경에서는 공용 임시 저장소에서 로드
             cloud_key = file_path
             data = self.cloud_storage.load(cloud_key)
             return data if data else []
@@ -148,7 +381,7 @@ class MultiUserHistoryDB:
     def _save_history(self, history_data: List[Dict], file_path: str) -> bool:
         """이력 데이터 저장"""
         if self.is_cloud:
-            # 클라우드 환경에서는 세션 상태에 저장
+            # 클라우드 환경에서는 공용 임시 저장소에 저장
             cloud_key = file_path
             return self.cloud_storage.save(cloud_key, history_data)
         
@@ -185,8 +418,8 @@ class MultiUserHistoryDB:
             print(f"파일 경로: {file_path}")
             return False
     
-    def save_analysis(self, analysis_result: Dict, inquiry_data: Dict):
-        """분석 결과 저장 (사용자별 + 전체)"""
+    def save_analysis(self, analysis_result: Dict, inquiry_data: Dict, analysis_id: str = None):
+        """분석 결과 저장 (사용자별 + 전체, analysis_id는 지연 저장 큐에서 발급한 ID)"""
         try:
             # 사용자 ID 생성
             user_name = inquiry_data.get('user_name', 'Unknown')
@@ -201,6 +434,25 @@ class MultiUserHistoryDB:
             global_history_file = self._get_global_history_file()
             global_history = self._load_history(global_history_file)
             
+            # 같은 analysis_id로 이미 저장된 경우 (지연 저장 재시도/스풀 복구) 중복 저장하지 않음
+            if analysis_id:
+                for entry in reversed(global_history):
+                    if entry.get('analysis_id') == analysis_id:
+                        return {
+                            "success": True,
+                            "database": "multi_user_json",
+                            "id": entry.get('id'),
+                            "user_id": user_id,
+                            "user_name": user_name
+                        }
+            
+            # 통계 카운터가 이력과 어긋나 있으면 먼저 재집계
+            if not self.stats.is_ready() or self.stats.total != len(global_history):
+                self.stats.rebuild(global_history)
+            
+            # 분석 단계에서 파싱한 결과 (원문만 있는 예전 구조는 공용 파서로 파싱)
+            parsed = get_parsed_response(analysis_result) or get_parsed_response(analysis_result.get('ai_result')) or {}
+            
             # 새로운 분석 결과 생성
             new_entry = {
                 'id': len(user_history) + 1,
@@ -213,20 +465,23 @@ class MultiUserHistoryDB:
                 'customer_manager': inquiry_data.get('customer_manager', ''),
                 'inquiry_content': inquiry_data.get('inquiry_content', ''),
                 'issue_type': analysis_result.get('issue_type', ''),
+                'scenario_version': analysis_result.get('scenario_version', ''),
                 'classification_method': analysis_result.get('classification', {}).get('method', ''),
                 'confidence': analysis_result.get('classification', {}).get('confidence', ''),
-                'response_type': analysis_result.get('gemini_result', {}).get('parsed_response', {}).get('response_type', ''),
-                'summary': analysis_result.get('gemini_result', {}).get('parsed_response', {}).get('summary', ''),
-                'action_flow': analysis_result.get('gemini_result', {}).get('parsed_response', {}).get('action_flow', ''),
-                'email_draft': analysis_result.get('gemini_result', {}).get('parsed_response', {}).get('email_draft', ''),
+                'response_type': parsed.get('response_type', ''),
+                'summary': parsed.get('summary', ''),
+                'action_flow': parsed.get('action_flow', ''),
+                'email_draft': parsed.get('email_draft', ''),
                 'system_version': inquiry_data.get('system_version', ''),
                 'browser_info': inquiry_data.get('browser_info', ''),
                 'os_info': inquiry_data.get('os_info', ''),
                 'error_code': inquiry_data.get('error_code', ''),
                 'priority': inquiry_data.get('priority', ''),
                 'contract_type': inquiry_data.get('contract_type', ''),
-                'full_analysis_result': analysis_result
+                'full_analysis_result': self.blob_store.pack(analysis_result)
             }
+            if analysis_id:
+                new_entry['analysis_id'] = analysis_id
             
             # 사용자별 이력에 추가
             user_history.append(new_entry)
@@ -241,6 +496,12 @@ class MultiUserHistoryDB:
             global_saved = self._save_history(global_history, global_history_file)
             
             if user_saved and global_saved:
+                self.stats.record(global_entry)
+                self._append_journal({
+                    "op": "insert",
+                    "row": dict({field: global_entry.get(field, '') for field in TABLE_FIELDS}, global_id=global_entry['global_id'],
+                                analysis_id=global_entry.get('analysis_id', ''))
+                })
                 print(f"✅ 분석 결과 저장 완료 (사용자: {user_name}, ID: {user_id})")
                 return {
                     "success": True, 
@@ -271,7 +532,7 @@ class MultiUserHistoryDB:
             
             # 페이징
             total_count = len(filtered_history)
-            paginated_history = filtered_history[offset:offset + limit]
+            paginated_history = self.blob_store.unpack(filtered_history[offset:offset + limit])
             
             return {
                 "success": True,
@@ -299,7 +560,7 @@ class MultiUserHistoryDB:
             
             # 페이징
             total_count = len(filtered_history)
-            paginated_history = filtered_history[offset:offset + limit]
+            paginated_history = self.blob_store.unpack(filtered_history[offset:offset + limit])
             
             return {
                 "success": True,
@@ -311,12 +572,29 @@ class MultiUserHistoryDB:
             print(f"❌ 전체 이력 조회 실패: {e}")
             return {"success": False, "error": str(e)}
     
-    def _filter_history(self, history: List[Dict], issue_type: str = None, 
-                       date_from: str = None, date_to: str = None, 
-                       keyword: str = None, user_name: str = None) -> List[Dict]:
-        """이력 필터링"""
-        filtered_history = []
-        
+    def get_history_page(self, cursor: str = None, page_size: int = 50,
+                         issue_type: str = None, date_from: str = None,
+                         date_to: str = None, keyword: str = None,
+                         user_name: str = None):
+        """전체 이력 커서 기반 페이지 조회 ((timestamp, global_id) 키셋)"""
+        try:
+            global_history_file = self._get_global_history_file()
+            history = self._load_history(global_history_file)
+            
+            # 필터링 후 커서 이후 항목만 선택 (전체 정렬 없음)
+            filtered = self._iter_filtered_history(history, issue_type, date_from, date_to, keyword, user_name)
+            page = keyset_page(filtered, cursor, page_size, id_field='global_id')
+            page['data'] = self.blob_store.unpack(page['data'])
+            return page
+            
+        except Exception as e:
+            print(f"❌ 전체 이력 페이지 조회 실패: {e}")
+            return {"success": False, "error": str(e), "data": [], "next_cursor": None, "has_more": False}
+    
+    def _iter_filtered_history(self, history: List[Dict], issue_type: str = None, 
+                               date_from: str = None, date_to: str = None, 
+                               keyword: str = None, user_name: str = None):
+        """이력 필터링 (정렬하지 않고 순회)"""
         for entry in history:
             # 문제 유형 필터
             if issue_type and entry.get('issue_type') != issue_type:
@@ -338,80 +616,62 @@ class MultiUserHistoryDB:
                 if keyword.lower() not in search_text.lower():
                     continue
             
-            filtered_history.append(entry)
+            yield entry
+    
+    def _filter_history(self, history: List[Dict], issue_type: str = None, 
+                       date_from: str = None, date_to: str = None, 
+                       keyword: str = None, user_name: str = None) -> List[Dict]:
+        """이력 필터링"""
+        filtered_history = list(self._iter_filtered_history(history, issue_type, date_from, date_to, keyword, user_name))
         
         # 최신순 정렬
         filtered_history.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
         return filtered_history
     
+    def _ensure_stats(self):
+        """통계 카운터가 준비되지 않았으면 전체 이력으로 한 번 집계"""
+        if not self.stats.is_ready():
+            self.stats.rebuild(self._load_history(self._get_global_history_file()))
+    
+    def rebuild_statistics(self):
+        """통계 카운터 재집계"""
+        try:
+            total = self.stats.rebuild(self._load_history(self._get_global_history_file()))
+            return {"success": True, "total_analyses": total}
+        except Exception as e:
+            print(f"❌ 통계 재집계 실패: {e}")
+            return {"success": False, "error": str(e)}
+    
     def get_statistics(self, user_name: str = None, user_role: str = None):
-        """통계 조회"""
+        """통계 조회 (저장 시점에 집계된 카운터 사용)"""
         try:
+            self._ensure_stats()
+            counters = self.stats.counters
+            
             if user_name and user_role:
                 # 사용자별 통계
                 user_id = self._get_user_id(user_name, user_role)
-                user_history_file = self._get_user_history_file(user_id)
-                history = self._load_history(user_history_file)
-                
-                issue_types = list(set([entry.get('issue_type', '') for entry in history if entry.get('issue_type')]))
-                response_types = list(set([entry.get('response_type', '') for entry in history if entry.get('response_type')]))
+                user_counters = self.stats.get_user(user_id)
                 
                 return {
                     "success": True,
-                    "total_analyses": len(history),
-                    "issue_types": issue_types,
-                    "response_types": response_types,
+                    "total_analyses": user_counters['total'],
+                    "issue_types": list(user_counters['issue_types']),
+                    "response_types": list(user_counters['response_types']),
                     "user_id": user_id,
                     "user_name": user_name,
                     "user_role": user_role
                 }
             else:
                 # 전체 통계
-                global_history_file = self._get_global_history_file()
-                history = self._load_history(global_history_file)
-                
-                # 사용자 정보 추출 (user_name과 user_role이 모두 있는 경우만)
-                users = []
-                for entry in history:
-                    user_name_val = entry.get('user_name', '')
-                    user_role_val = entry.get('user_role', '')
-                    if user_name_val and user_role_val:
-                        user_key = f"{user_name_val}_{user_role_val}"
-                        if user_key not in users:
-                            users.append(user_key)
-                
-                # 문제 유형 추출 (issue_type이 있는 경우만)
-                issue_types = []
-                for entry in history:
-                    issue_type = entry.get('issue_type', '')
-                    if issue_type and issue_type not in issue_types:
-                        issue_types.append(issue_type)
-                
-                # 응답 유형 추출 (response_type이 있는 경우만)
-                response_types = []
-                for entry in history:
-                    response_type = entry.get('response_type', '')
-                    if response_type and response_type not in response_types:
-                        response_types.append(response_type)
-                
-                # full_analysis_result에서 response_type 추출 시도
-                for entry in history:
-                    full_result = entry.get('full_analysis_result', {})
-                    if full_result:
-                        gemini_result = full_result.get('gemini_result', {})
-                        if gemini_result:
-                            parsed_response = gemini_result.get('parsed_response', {})
-                            if parsed_response:
-                                response_type = parsed_response.get('response_type', '')
-                                if response_type and response_type not in response_types:
-                                    response_types.append(response_type)
-                
                 return {
                     "success": True,
-                    "total_analyses": len(history),
-                    "total_users": len(users),
-                    "issue_types": issue_types,
-                    "response_types": response_types
+                    "total_analyses": counters['total'],
+                    "total_users": len(counters['users']),
+                    "issue_types": list(counters['issue_types']),
+                    "response_types": list(counters['response_types']),
+                    "issue_type_distribution": dict(counters['issue_types']),
+                    "daily_counts": dict(counters['days'])
                 }
                 
         except Exception as e:
@@ -425,14 +685,16 @@ class MultiUserHistoryDB:
             user_history_file = self._get_user_history_file(user_id)
             
             if self.is_cloud:
-                # 클라우드 환경에서는 세션 상태에서 삭제
+                # 클라우드 환경에서는 공용 임시 저장소에서 삭제
                 cloud_key = user_history_file
-                self.cloud_storage.data.pop(cloud_key, None)
+                self.cloud_storage.delete(cloud_key)
+                self.stats.forget_user(user_id)
                 print(f"✅ 사용자 이력 삭제 완료 (클라우드): {user_name} ({user_id})")
                 return {"success": True, "user_id": user_id}
             else:
                 if os.path.exists(user_history_file):
                     os.remove(user_history_file)
+                    self.stats.forget_user(user_id)
                     print(f"✅ 사용자 이력 삭제 완료: {user_name} ({user_id})")
                     return {"success": True, "user_id": user_id}
                 else:
@@ -442,6 +704,19 @@ class MultiUserHistoryDB:
             print(f"❌ 사용자 이력 삭제 실패: {e}")
             return {"success": False, "error": str(e)}
     
+    def get_analysis_by_id(self, analysis_id: str) -> Dict:
+        """분석 ID(저장 시 발급한 analysis_id, 이전 이력은 global-<번호>)로 이력 항목 한 건 조회"""
+        try:
+            for entry in self._load_history(self._get_global_history_file()):
+                if analysis_key(entry) == str(analysis_id):
+                    found = dict(entry)
+                    found['full_analysis_result'] = self.blob_store.unpack(entry.get('full_analysis_result', {}))
+                    return {"success": True, "data": found}
+            return {"success": False, "error": "분석 결과를 찾을 수 없습니다."}
+        except Exception as e:
+            print(f"❌ 분석 결과 조회 실패 (ID: {analysis_id}): {e}")
+            return {"success": False, "error": str(e)}
+    
     def get_analysis_by_customer_and_date(self, customer_name: str, inquiry_date: str):
         """고객사명과 날짜를 기준으로 분석 결과 조회"""
         try:
@@ -472,7 +747,7 @@ class MultiUserHistoryDB:
                 latest_entry = max(matching_entries, key=lambda x: x.get('timestamp', ''))
                 
                 # full_analysis_result에서 실제 AI 분석 데이터 추출
-                full_result = latest_entry.get('full_analysis_result', {})
+                full_result = self.blob_store.unpack(latest_entry.get('full_analysis_result', {}))
                 
                 # 분석 결과 데이터 구성
                 analysis_data = {
@@ -501,12 +776,33 @@ class MultiUserHistoryDB:
             print(f"❌ 분석 결과 조회 실패: {e}")
             return {"success": False, "error": str(e)}
     
+    def get_compression_report(self) -> Dict[str, Any]:
+        """전체 이력의 원문 압축률 보고"""
+        try:
+            history = self._load_history(self._get_global_history_file())
+            report = compression_report(history)
+            report["success"] = True
+            report["process_stats"] = self.blob_store.get_stats()
+            return report
+        except Exception as e:
+            print(f"❌ 압축률 조회 실패: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def get_memory_stats(self) -> Dict[str, Any]:
+        """클라우드 임시 저장소 메모리 사용량 (로컬 환경은 파일 저장이므로 해당 없음)"""
+        if not self.is_cloud:
+            return {"success": True, "storage": "local_files"}
+        stats = self.cloud_storage.get_memory_stats()
+        stats.update({"success": True, "storage": "cloud_memory"})
+        return stats
+    
     def clear_all_history(self):
         """전체 이력 삭제"""
         try:
             if self.is_cloud:
-                # 클라우드 환경에서는 세션 상태 데이터 모두 삭제
-                self.cloud_storage.data.clear()
+                # 클라우드 환경에서는 공용 임시 저장소 데이터 모두 삭제
+                self.cloud_storage.clear()
+                self.stats.reset()
                 print("✅ 전체 이력 삭제 완료 (클라우드)")
                 return {"success": True}
             else:
@@ -520,6 +816,8 @@ class MultiUserHistoryDB:
                 global_history_file = self._get_global_history_file()
                 if os.path.exists(global_history_file):
                     os.remove(global_history_file)
+                self.stats.reset()
+                self._append_journal({"op": "clear"})
                 
                 print("✅ 전체 이력 삭제 완료")
                 return {"success": True}
@@ -529,19 +827,11 @@ class MultiUserHistoryDB:
             return {"success": False, "error": str(e)}
     
     def save_feedback(self, analysis_id, feedback_type: str, user_name: str = "", user_role: str = ""):
-        """AI 응답에 대한 피드백 저장 (MongoDB 우선)"""
+        """AI 응답에 대한 피드백 저장 (로컬/클라우드 저장소)"""
         try:
             print(f"🔍 피드백 저장 시도 - Analysis ID: {analysis_id}, Type: {type(analysis_id)}")
             print(f"🔍 피드백 타입: {feedback_type}, 사용자: {user_name}, 역할: {user_role}")
             
-            # MongoDB 연결 상태 확인 및 우선 사용
-            if hasattr(self, 'mongo_handler') and self.mongo_handler and self.mongo_handler.is_connected():
-                print("📊 MongoDB를 통한 피드백 저장 시도")
-                result = self.mongo_handler.save_feedback(analysis_id, feedback_type, user_name, user_role)
-                print(f"📊 MongoDB 피드백 저장 결과: {result}")
-                return result
-            
-            # MongoDB 사용 불가시 로컬/클라우드 저장소 사용
             print("📊 로컬/클라우드 저장소를 통한 피드백 저장 시도")
             feedback_file = self._get_feedback_file()
             feedback_data = self._load_history(feedback_file)
@@ -568,13 +858,8 @@ class MultiUserHistoryDB:
             return {"success": False, "error": str(e)}
     
     def get_liked_responses(self, issue_type: str = None, limit: int = 3):
-        """좋아요를 받은 응답들 조회 (AI 학습용, MongoDB 우선)"""
+        """좋아요를 받은 응답들 조회 (AI 학습용, 로컬/클라우드 저장소)"""
         try:
-            # MongoDB 연결 상태 확인 및 우선 사용
-            if hasattr(self, 'mongo_handler') and self.mongo_handler and self.mongo_handler.is_connected():
-                return self.mongo_handler.get_liked_responses(issue_type, limit)
-            
-            # MongoDB 사용 불가시 로컬/클라우드 저장소 사용
             feedback_file = self._get_feedback_file()
             feedback_data = self._load_history(feedback_file)
             
@@ -590,7 +875,7 @@ class MultiUserHistoryDB:
             
             liked_responses = []
             for entry in global_history:
-                if entry.get('id') in liked_ids:
+                if entry.get('id') in liked_ids or entry.get('analysis_id') in liked_ids:
                     if not issue_type or entry.get('issue_type') == issue_type:
                         liked_responses.append({
                             'summary': entry.get('summary', ''),
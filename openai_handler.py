@@ -3,6 +3,17 @@ import os
 import streamlit as st
 from typing import Dict, Any, Optional
 import json
+from response_parser import (
+    build_structured_prompt, openai_response_format, parse_structured_response, structured_output_enabled
+)
+
+# json_schema 구조화 출력을 지원하는 모델 (gpt-4-turbo, gpt-3.5-turbo는 텍스트 형식 사용)
+STRUCTURED_OUTPUT_MODELS = ("gpt-4o", "gpt-4.1", "gpt-5", "o3", "o4")
+
+
+def supports_structured_output(model: str) -> bool:
+    return str(model or "").startswith(STRUCTURED_OUTPUT_MODELS)
+
 
 class OpenAIHandler:
     def __init__(self, api_key: str = None):
@@ -155,8 +166,15 @@ class OpenAIHandler:
             # 사용할 모델 결정 (파라미터 우선, 기본값 차선)
             use_model = model if model else self.model
             
-            # 프롬프트 조립
-            prompt = self.build_prompt(customer_input, issue_type, condition_1, condition_2)
+            structured = structured_output_enabled() and supports_structured_output(use_model)
+            
+            # 프롬프트 조립 (구조화 출력은 형식 예시 없이 스키마로 응답 형식 지정)
+            if structured:
+                prompt = build_structured_prompt(customer_input, issue_type, condition_1, condition_2)
+                options = {"response_format": openai_response_format()}
+            else:
+                prompt = self.build_prompt(customer_input, issue_type, condition_1, condition_2)
+                options = {}
             
             # GPT API 호출
             response = self.client.chat.completions.create(
@@ -166,22 +184,37 @@ class OpenAIHandler:
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.1,
-                max_tokens=2000
+                max_tokens=2000,
+                **options
             )
             
             # 응답 추출
             generated_text = response.choices[0].message.content
             
-            return {
+            result = {
                 "success": True,
                 "response": generated_text,
                 "model": use_model,
+                "structured": structured,
                 "usage": {
                     "prompt_tokens": response.usage.prompt_tokens,
                     "completion_tokens": response.usage.completion_tokens,
                     "total_tokens": response.usage.total_tokens
                 }
             }
+            if structured:
+                # 스키마로 강제된 JSON이므로 json.loads 한 번으로 파싱 (검증 실패 시 실패로 처리)
+                try:
+                    result["parsed_response"] = parse_structured_response(generated_text)
+                except ValueError as e:
+                    print(f"❌ GPT 구조화 응답 검증 실패: {e}")
+                    return {
+                        "success": False,
+                        "error": f"GPT 구조화 응답 검증 실패: {e}",
+                        "response": generated_text,
+                        "model": use_model
+                    }
+            return result
             
         except Exception as e:
             error_msg = f"GPT API 호출 중 오류 발생: {str(e)}"
@@ -0,0 +1,151 @@
+"""
+이력 상세보기 표시용 렌더 캐시 (SQLite)
+분석 결과를 저장할 때 상세보기 모달에 그대로 쓰는 마크다운/텍스트 조각을 미리 만들어
+분석 ID를 기본 키로 기록합니다. 상세보기를 다시 열면 키 조회 한 번으로 표시하며
+전체 이력 검색이나 AI 응답 파싱을 하지 않습니다.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from history_row import format_display_date
+from response_parser import get_parsed_response
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+# 조각 형식이 바뀌면 올려서 이전 형식 항목을 무시
+RENDER_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS render_fragments (
+    analysis_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    fragments TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+_STEP_PATTERN = re.compile(r'(\d+\.)')
+
+
+def _markdown_lines(lines) -> str:
+    """'**항목:** 값' 줄 목록을 한 마크다운 블록으로 (줄마다 강제 줄바꿈)"""
+    return "  \n".join(f"**{label}:** {value}" for label, value in lines)
+
+
+def format_action_flow(action_flow: str) -> str:
+    """조치 흐름을 번호 항목마다 한 줄로"""
+    content = ' '.join((action_flow or '').split())
+    return '\n'.join(line.strip() for line in _STEP_PATTERN.sub(r'\n\1', content).split('\n') if line.strip())
+
+
+def build_fragments(parsed: Optional[Dict[str, Any]], inquiry_data: Dict[str, Any],
+                    issue_type: str = "") -> Dict[str, Any]:
+    """상세보기 모달 조각 생성 (파싱 결과 + 문의 정보)"""
+    parsed = parsed if isinstance(parsed, dict) else {}
+    inquiry_data = inquiry_data or {}
+    return {
+        "version": RENDER_VERSION,
+        "response_type": parsed.get('response_type', ''),
+        "inquiry_left": _markdown_lines([
+            ("고객사명", inquiry_data.get('customer_name', '')),
+            ("고객 담당자", inquiry_data.get('customer_manager', '')),
+            ("문의 내용", inquiry_data.get('inquiry_content') or 'N/A'),
+            ("우선순위", inquiry_data.get('priority') or 'N/A'),
+            ("계약 유형", inquiry_data.get('contract_type') or 'N/A')
+        ]),
+        "inquiry_right": _markdown_lines([
+            ("담당자", f"{inquiry_data.get('user_name') or 'N/A'} ({inquiry_data.get('user_role') or 'N/A'})"),
+            ("문의 유형", issue_type or inquiry_data.get('issue_type') or 'N/A'),
+            ("시스템 버전", inquiry_data.get('system_version', '')),
+            ("브라우저", inquiry_data.get('browser_info', '')),
+            ("운영체제", inquiry_data.get('os_info', '')),
+            ("날짜", format_display_date(inquiry_data.get('timestamp', '')) or 'N/A')
+        ]),
+        "summary": parsed.get('summary', ''),
+        "action_flow": format_action_flow(parsed.get('action_flow', '')),
+        # text_area에서 문단이 구분되어 보이도록 줄바꿈을 두 번으로
+        "email": (parsed.get('email_draft') or '').replace('\n', '\n\n')
+    }
+
+
+def fragments_from_analysis(analysis_result: Dict[str, Any], inquiry_data: Dict[str, Any]) -> Dict[str, Any]:
+    """저장 시점 분석 결과에서 조각 생성 (핸들러가 만든 파싱 결과 사용)"""
+    parsed = get_parsed_response(analysis_result) or get_parsed_response(analysis_result.get('ai_result'))
+    return build_fragments(parsed, inquiry_data, analysis_result.get('issue_type', ''))
+
+
+def fragments_from_stored(data: Dict[str, Any]) -> Dict[str, Any]:
+    """저장소에서 조회한 분석(MongoDB 문서/로컬 이력 항목)에서 조각 생성 (캐시가 없던 이전 이력용)"""
+    parsed = {key: data.get(key, '') for key in ('response_type', 'summary', 'action_flow', 'email_draft')}
+    if not any(parsed.values()):
+        parsed = get_parsed_response(data.get('full_analysis_result') or data) or parsed
+    return build_fragments(parsed, data, data.get('issue_type', ''))
+
+
+class RenderCache:
+    """분석 ID별 상세보기 조각 저장소"""
+
+    def __init__(self, db_path: str, max_entries: int = 5000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self.metrics = {"hits": 0, "misses": 0, "writes": 0}
+
+    def get(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """분석 ID로 조각 조회 (없거나 이전 형식이면 None)"""
+        if not analysis_id:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fragments FROM render_fragments WHERE analysis_id = ? AND version = ?",
+                (str(analysis_id), RENDER_VERSION)
+            ).fetchone()
+            self.metrics["hits" if row else "misses"] += 1
+        return json.loads(row[0]) if row else None
+
+    def put(self, analysis_id: str, fragments: Dict[str, Any]) -> bool:
+        """조각 기록 (같은 ID는 덮어씀, 최대 개수를 넘으면 오래된 항목부터 삭제)"""
+        if not analysis_id:
+            return False
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO render_fragments (analysis_id, version, fragments, created_at) VALUES (?, ?, ?, ?)",
+                    (str(analysis_id), RENDER_VERSION, json.dumps(fragments, ensure_ascii=False), time.time())
+                )
+                self.metrics["writes"] += 1
+                if self.metrics["writes"] % 100 == 0:
+                    self._conn.execute(
+                        """DELETE FROM render_fragments WHERE analysis_id NOT IN
+                           (SELECT analysis_id FROM render_fragments ORDER BY created_at DESC LIMIT ?)""",
+                        (self.max_entries,)
+                    )
+            return True
+        except Exception as e:
+            print(f"⚠️ 상세보기 렌더 캐시 기록 실패: {e}")
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM render_fragments").fetchone()[0]
+        return dict(self.metrics, size=size)
+
+
+def get_render_cache(db_path: str) -> RenderCache:
+    """DB 파일별 프로세스 공용 캐시"""
+    db_path = os.path.abspath(db_path)
+    with _caches_lock:
+        if db_path not in _caches:
+            _caches[db_path] = RenderCache(db_path)
+        return _caches[db_path]
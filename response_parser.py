@@ -0,0 +1,276 @@
+"""
+AI 응답 파서 (GPT/Gemini 공용)
+구조화 출력(JSON) 응답은 스키마 하나로 검증하고 json.loads 한 번으로 읽습니다.
+텍스트 응답([대응유형]/[응답내용] 형식)은 정규식 한 번으로 섹션 단위로 나눕니다.
+같은 응답은 해시로 기억해 두어 분석 → 저장 → 표시 과정에서 다시 파싱하지 않습니다.
+"""
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, Optional
+from config import get_secret
+
+RESPONSE_TYPES = ('해결안', '질문', '출동')
+DEFAULT_RESPONSE_TYPE = '해결안'
+
+# 섹션 내용이 비었거나 너무 짧을 때 쓰는 안내 문구 (필드, 최소 길이, 문구)
+PLACEHOLDERS = (
+    ('summary', 5, "AI 분석 결과를 파싱할 수 없습니다. 고객 문의 내용을 확인해주세요."),
+    ('action_flow', 10, "AI 분석 결과를 파싱할 수 없습니다. 단계별 조치 사항을 확인해주세요."),
+    ('email_draft', 20, "AI 분석 결과를 파싱할 수 없습니다. 이메일 초안을 확인해주세요."),
+)
+
+# 섹션 헤더: 줄 맨 앞의 [대응유형]/[응답내용]/[예외 처리 기준] 또는 "요약:"/"조치 흐름:"/"이메일 초안:"
+# (기본 응답의 "[요약]" 형식, "- ", "**" 같은 마크다운 장식 허용)
+_SECTION_PATTERN = re.compile(
+    r'^[ \t]*(?:[-*•][ \t]*)?(?:\*\*)?(?:'
+    r'\[(?P<bracket>대응유형|응답내용|예외[ \t]*처리[ \t]*기준)\]'
+    r'|(?P<open>\[)?(?P<label>요약|조치[ \t]*흐름|이메일[ \t]*초안)(?(open)\]|(?:\*\*)?[ \t]*[:：])'
+    r')(?:\*\*)?[ \t]*',
+    re.MULTILINE
+)
+_RESPONSE_TYPE_PATTERN = re.compile('|'.join(RESPONSE_TYPES))
+# 응답에 그대로 따라 나온 프롬프트 지시문
+_INSTRUCTION_PATTERN = re.compile(r'아래 형식을|실무자가 이해하기|자연스럽고 정확하게|※ 각 단계는|짧고 명확하게')
+# 이메일 초안을 감싸는 구분선
+_FENCE_PATTERN = re.compile(r'^[ \t]*(?:```\w*|---+)[ \t]*$', re.MULTILINE)
+
+_SECTION_FIELDS = {'요약': 'summary', '조치흐름': 'action_flow', '이메일초안': 'email_draft'}
+# 조치 단계 앞에 모델이 직접 붙인 번호
+_STEP_NUMBER_PATTERN = re.compile(r'^\s*\d+\s*[.)]\s*')
+
+# 구조화 출력 스키마 (OpenAI json_schema / Gemini response_schema 공용)
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "response_type": {"type": "string", "enum": list(RESPONSE_TYPES)},
+        "summary": {"type": "string", "description": "고객 문의의 핵심 내용 요약 (1~2문장)"},
+        "action_flow": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "실무자가 수행할 조치 단계 (한 항목에 한 단계, 번호 없이)"
+        },
+        "email_draft": {"type": "string", "description": "고객에게 보낼 이메일 본문"}
+    },
+    "required": ["response_type", "summary", "action_flow", "email_draft"],
+    "additionalProperties": False
+}
+
+STRUCTURED_PROMPT_TEMPLATE = """[고객 문의 내용]
+{customer_input}
+
+[문제 유형]
+{issue_type}
+
+[조건 정보]
+- 조건 1: {condition_1}
+- 조건 2: {condition_2}
+
+[대응안 작성 지침]
+위 문의에 대한 대응안을 JSON으로 작성하십시오.
+- response_type: 해결안 / 질문 / 출동 중 하나
+- summary: 고객 문의의 핵심 내용을 1~2문장으로 요약
+- action_flow: 실무자가 바로 수행할 수 있는 조치 단계 (한 항목에 한 단계, 번호 없이 짧고 명확하게)
+- email_draft: 고객에게 보낼 이메일 본문 (인사말로 시작해 조치 단계를 자연스럽게 포함하고 "감사합니다."로 마무리)
+
+[예외 처리 기준]
+- 조건 정보가 불충분하거나 고객 상태가 불명확한 경우 → response_type은 질문, 추가로 확인할 내용을 안내하십시오.
+- 문제가 시나리오 DB에 존재하지 않거나 적절한 해결책이 없는 경우 → response_type은 출동, "현장 출동이 필요할 수 있습니다."로 안내하십시오.
+- 확실한 답변이 불가능한 경우에도 → "현장 확인 후 조치가 필요합니다" 또는 "엔지니어 출동을 권장합니다" 등으로 마무리하십시오."""
+
+_CACHE_SIZE = 256
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+@dataclass
+class ParsedResponse:
+    """파싱된 AI 응답"""
+    response_type: str = DEFAULT_RESPONSE_TYPE
+    summary: str = ""
+    action_flow: str = ""
+    email_draft: str = ""
+    question: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def response_hash(response_text: str) -> str:
+    """응답 원문 해시 (파싱 결과 캐시 키)"""
+    return hashlib.sha1((response_text or '').encode('utf-8')).hexdigest()
+
+
+def _clean_lines(body: str) -> str:
+    """요약/조치 흐름: 빈 줄과 지시문을 빼고 줄 단위로 정리"""
+    lines = (line.strip() for line in body.splitlines())
+    return '\n'.join(line for line in lines if line and not _INSTRUCTION_PATTERN.search(line))
+
+
+def _clean_email(body: str) -> str:
+    """이메일 초안: 원본 줄바꿈은 유지하고 구분선(```, ---)만 제거 (※ 참고 문구부터는 이메일에서 제외)"""
+    body = _FENCE_PATTERN.sub('', body).split('\n※', 1)[0]
+    lines = [line.rstrip() for line in body.splitlines()]
+    return '\n'.join(lines).strip()
+
+
+def _parse(response_text: str) -> ParsedResponse:
+    """섹션 헤더를 한 번 훑어 섹션별 본문을 나눔"""
+    parsed = ParsedResponse()
+    matches = list(_SECTION_PATTERN.finditer(response_text))
+    for index, match in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(response_text)
+        body = response_text[match.end():end]
+        if match.group('bracket'):
+            if match.group('bracket') == '대응유형':
+                found = _RESPONSE_TYPE_PATTERN.search(body)
+                if found:
+                    parsed.response_type = found.group(0)
+            continue
+        field = _SECTION_FIELDS[re.sub(r'[ \t]', '', match.group('label'))]
+        # 같은 섹션이 두 번 나오면 처음 것을 사용
+        if getattr(parsed, field):
+            continue
+        setattr(parsed, field, _clean_email(body) if field == 'email_draft' else _clean_lines(body))
+
+    for field, min_length, placeholder in PLACEHOLDERS:
+        if len(getattr(parsed, field)) < min_length:
+            setattr(parsed, field, placeholder)
+    return parsed
+
+
+def _parse_json(response_text: str) -> ParsedResponse:
+    """구조화 출력 응답 검증 (스키마와 다르면 ValueError)"""
+    data = json.loads(response_text)
+    if not isinstance(data, dict):
+        raise ValueError("응답이 JSON 객체가 아닙니다")
+    response_type = data.get('response_type')
+    if response_type not in RESPONSE_TYPES:
+        raise ValueError(f"알 수 없는 대응유형: {response_type}")
+    steps = data.get('action_flow')
+    if isinstance(steps, str):
+        steps = steps.splitlines()
+    if not isinstance(steps, list) or not all(isinstance(step, str) for step in steps):
+        raise ValueError("action_flow는 문자열 목록이어야 합니다")
+    steps = [_STEP_NUMBER_PATTERN.sub('', step).strip() for step in steps]
+    steps = [step for step in steps if step]
+
+    parsed = ParsedResponse(
+        response_type=response_type,
+        summary=data.get('summary'),
+        action_flow='\n'.join(f"{number}. {step}" for number, step in enumerate(steps, 1)),
+        email_draft=data.get('email_draft')
+    )
+    for field in ('summary', 'action_flow', 'email_draft'):
+        value = getattr(parsed, field)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"{field} 값이 비어 있습니다")
+        setattr(parsed, field, value.strip())
+    return parsed
+
+
+def _cached_parse(response_text: str, parser) -> Dict[str, Any]:
+    """해시로 캐시된 파싱 결과 (호출부에서 수정해도 되도록 매번 새 dict 반환)"""
+    key = response_hash(response_text)
+    with _cache_lock:
+        parsed = _cache.get(key)
+        if parsed is not None:
+            _cache.move_to_end(key)
+            _cache_stats["hits"] += 1
+            return parsed.to_dict()
+        _cache_stats["misses"] += 1
+
+    parsed = parser(response_text)
+    with _cache_lock:
+        _cache[key] = parsed
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return parsed.to_dict()
+
+
+def parse_structured_response(response_text: Optional[str]) -> Dict[str, Any]:
+    """구조화 출력(JSON) 응답 → {response_type, summary, action_flow, email_draft, question}
+    스키마와 맞지 않으면 ValueError (텍스트 파싱으로 대체하지 않음)"""
+    return _cached_parse(response_text or '', _parse_json)
+
+
+def parse_response(response_text: Optional[str]) -> Dict[str, Any]:
+    """AI 응답 원문 → {response_type, summary, action_flow, email_draft, question}
+    (JSON 응답이면 구조화 출력으로 읽고, 아니면 텍스트 섹션 파싱)"""
+    response_text = response_text or ''
+    if response_text.lstrip().startswith('{'):
+        try:
+            return parse_structured_response(response_text)
+        except ValueError as e:
+            print(f"⚠️ JSON 응답 검증 실패, 텍스트로 파싱: {e}")
+    try:
+        return _cached_parse(response_text, _parse)
+    except Exception as e:
+        print(f"❌ AI 응답 파싱 오류: {e}")
+        return ParsedResponse(
+            summary=response_text[:500],
+            action_flow="응답 파싱에 실패했습니다.",
+            email_draft="응답 파싱에 실패했습니다."
+        ).to_dict()
+
+
+def build_structured_prompt(customer_input: str, issue_type: str, condition_1: str = "", condition_2: str = "") -> str:
+    """구조화 출력용 프롬프트 (형식 예시 없이 필드 설명만 포함)"""
+    return STRUCTURED_PROMPT_TEMPLATE.format(
+        customer_input=customer_input, issue_type=issue_type,
+        condition_1=condition_1, condition_2=condition_2
+    )
+
+
+def openai_response_format() -> Dict[str, Any]:
+    """OpenAI Chat Completions response_format (strict json_schema)"""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": "troubleshooting_response", "strict": True, "schema": RESPONSE_SCHEMA}
+    }
+
+
+def gemini_response_schema(schema: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Gemini response_schema (OpenAPI 부분집합: 타입 대문자, additionalProperties 미지원)"""
+    schema = RESPONSE_SCHEMA if schema is None else schema
+    converted = {"type": schema["type"].upper()}
+    if "description" in schema:
+        converted["description"] = schema["description"]
+    if "enum" in schema:
+        converted["format"] = "enum"
+        converted["enum"] = list(schema["enum"])
+    if "properties" in schema:
+        converted["properties"] = {name: gemini_response_schema(value) for name, value in schema["properties"].items()}
+        converted["required"] = list(schema.get("required", []))
+    if "items" in schema:
+        converted["items"] = gemini_response_schema(schema["items"])
+    return converted
+
+
+def structured_output_enabled() -> bool:
+    """구조화 출력 사용 여부 (STRUCTURED_OUTPUT, 기본 사용)"""
+    return str(get_secret("STRUCTURED_OUTPUT", "true")).lower() == "true"
+
+
+def get_parsed_response(ai_result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """AI 결과에 이미 들어 있는 파싱 결과 (Gemini/GPT 핸들러, 시나리오 엔진, OpenAI 핸들러 결과 모두 지원)
+    파싱 결과가 없고 원문만 있는 경우에만 파싱 (캐시 사용)"""
+    if not isinstance(ai_result, dict):
+        return None
+    for source in (ai_result.get('gemini_result'), ai_result.get('gpt_result'), ai_result):
+        if isinstance(source, dict) and isinstance(source.get('parsed_response'), dict):
+            return source['parsed_response']
+    for source, key in ((ai_result.get('gemini_result'), 'raw_response'), (ai_result.get('gpt_result'), 'raw_response'),
+                        (ai_result, 'response')):
+        if isinstance(source, dict) and source.get(key):
+            return parse_response(source[key])
+    return None
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    with _cache_lock:
+        return dict(_cache_stats, size=len(_cache))
@@ -1,12 +1,50 @@
 import json
-import pandas as pd
+import os
 from typing import Dict, List, Optional, Any
+from scenario_index import ScenarioIndex
+from scenario_engine import ScenarioEngine
+from scenario_snapshot import load_snapshot, save_snapshot, scenario_version, source_signatures
+
+# Excel 시나리오표에서 읽는 열
+EXCEL_FIELDS = ["condition_1", "condition_2", "solution", "onsite_needed", "manual_ref", "frequent", "memo"]
+# 공백 정리·문자열 변환하는 텍스트 열
+TEXT_FIELDS = ["condition_1", "condition_2", "solution", "manual_ref", "memo"]
 
 class ScenarioDB:
-    def __init__(self, json_path: str = "PK P DB.json", excel_path: str = "수정된_대응_시나리오표.xlsx"):
-        """시나리오 데이터베이스 초기화"""
-        self.json_data = self._load_json_data(json_path)
-        self.excel_data = self._load_excel_data(excel_path)
+    def __init__(self, json_path: str = "PK P DB.json", excel_path: str = "수정된_대응_시나리오표.xlsx",
+                 snapshot_path: Optional[str] = None):
+        """
+        시나리오 데이터베이스 초기화 (로딩 시 문제 유형별 조건 색인을 한 번만 생성).
+        병합된 시나리오는 스냅샷으로 저장해 두고, 원본이 그대로면 Excel을 읽지 않습니다.
+        """
+        self.json_path = json_path
+        self.excel_path = excel_path
+        self.snapshot_path = snapshot_path or os.path.join(
+            os.path.dirname(os.path.abspath(json_path)), ".scenario_snapshot.pkl"
+        )
+        self.json_data = {}
+        self.excel_data = None
+        # 원본 파일이 있는데 읽지 못한 경우의 오류 (시나리오 저장소는 이때 이전 버전을 유지)
+        self.load_errors: List[str] = []
+        
+        sources = [json_path, excel_path]
+        snapshot = load_snapshot(self.snapshot_path, sources)
+        self.from_snapshot = snapshot is not None
+        if snapshot is not None:
+            scenarios_by_type = snapshot["scenarios"]
+            self.version = snapshot["scenario_version"]
+        else:
+            signatures = source_signatures(sources)
+            self.json_data = self._load_json_data(json_path)
+            self.excel_data = self._load_excel_data(excel_path)
+            scenarios_by_type = self._collect_scenarios()
+            self.version = scenario_version(scenarios_by_type)
+            # 읽지 못한 원본이 있으면 다음 실행에서 다시 시도하도록 스냅샷을 남기지 않음
+            if not self.load_errors and save_snapshot(self.snapshot_path, signatures, scenarios_by_type, self.version):
+                print(f"✅ 시나리오 스냅샷 생성: {sum(len(s) for s in scenarios_by_type.values())}건 (버전 {self.version})")
+        self.index = ScenarioIndex(scenarios_by_type)
+        # 문제 유형별 결정 그래프 (이 버전의 시나리오로 처음 사용할 때 컴파일)
+        self.engine = ScenarioEngine(self.index)
         
     def _load_json_data(self, json_path: str) -> Dict[str, List[Dict]]:
         """JSON 파일에서 시나리오 데이터 로딩"""
@@ -15,142 +53,85 @@ class ScenarioDB:
                 return json.load(f)
         except Exception as e:
             print(f"JSON 파일 로딩 실패: {e}")
+            if os.path.exists(json_path):
+                self.load_errors.append(f"{json_path}: {e}")
             return {}
     
-    def _load_excel_data(self, excel_path: str) -> pd.DataFrame:
-        """Excel 파일에서 시나리오 데이터 로딩"""
+    def _load_excel_data(self, excel_path: str):
+        """Excel 파일에서 시나리오 데이터 로딩 (스냅샷이 없을 때만 pandas/openpyxl 로딩, 실패 시 None)"""
         try:
+            import pandas as pd
             return pd.read_excel(excel_path)
         except Exception as e:
             print(f"Excel 파일 로딩 실패: {e}")
-            return pd.DataFrame()
+            if os.path.exists(excel_path):
+                self.load_errors.append(f"{excel_path}: {e}")
+            return None
     
-    def get_scenarios_by_issue_type(self, issue_type: str) -> List[Dict[str, Any]]:
-        """문제 유형별 시나리오 조회"""
-        # JSON 데이터에서 조회
-        if issue_type in self.json_data:
-            scenarios = []
-            for scenario in self.json_data[issue_type]:
-                scenarios.append({
+    @staticmethod
+    def _validate_scenario(scenario: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """텍스트 열 정리, 현장 출동 여부 Y/N 통일 (조건·해결책이 모두 빈 행은 제외)"""
+        for field in TEXT_FIELDS:
+            if field in scenario:
+                scenario[field] = str(scenario[field] or "").strip()
+        if not (scenario["condition_1"] or scenario["condition_2"] or scenario["solution"]):
+            return None
+        scenario["onsite_needed"] = "Y" if str(scenario.get("onsite_needed") or "").strip().upper() == "Y" else "N"
+        return scenario
+    
+    def _collect_scenarios(self) -> Dict[str, List[Dict[str, Any]]]:
+        """JSON과 Excel 시나리오를 문제 유형별로 병합 (같은 문제 유형은 JSON 우선)"""
+        scenarios_by_type = {}
+        
+        if self.excel_data is not None and not self.excel_data.empty and 'issue_type' in self.excel_data.columns:
+            # 빈 셀(NaN)은 빈 문자열로
+            excel_data = self.excel_data.astype(object).where(self.excel_data.notna(), "")
+            for record in excel_data.to_dict('records'):
+                scenario = {field: record.get(field, "") for field in EXCEL_FIELDS}
+                scenario["source"] = "excel"
+                scenario = self._validate_scenario(scenario)
+                if scenario and record['issue_type']:
+                    scenarios_by_type.setdefault(str(record['issue_type']).strip(), []).append(scenario)
+        
+        for issue_type, scenarios in self.json_data.items():
+            validated = [
+                self._validate_scenario({
                     "condition_1": scenario.get("condition_1", ""),
                     "condition_2": scenario.get("condition_2", ""),
                     "solution": scenario.get("solution", ""),
                     "onsite_needed": scenario.get("onsite_needed", "N"),
                     "source": "json"
                 })
-            return scenarios
-        
-        # Excel 데이터에서 조회
-        excel_scenarios = self.excel_data[self.excel_data['issue_type'] == issue_type]
-        if not excel_scenarios.empty:
-            scenarios = []
-            for _, row in excel_scenarios.iterrows():
-                scenarios.append({
-                    "condition_1": row.get("condition_1", ""),
-                    "condition_2": row.get("condition_2", ""),
-                    "solution": row.get("solution", ""),
-                    "onsite_needed": row.get("onsite_needed", "N"),
-                    "manual_ref": row.get("manual_ref", ""),
-                    "frequent": row.get("frequent", ""),
-                    "memo": row.get("memo", ""),
-                    "source": "excel"
-                })
-            return scenarios
+                for scenario in scenarios
+            ]
+            scenarios_by_type[issue_type] = [scenario for scenario in validated if scenario]
         
-        # 기본 시나리오 (기타 케이스)
-        return [{
-            "condition_1": "문제 유형이 기존 시나리오에 없는 경우인가?",
-            "condition_2": "조건 분기 정보가 충분하지 않은가?",
-            "solution": "고객의 문의 내용이 기존 대응 시나리오에 포함되지 않거나 상황이 불분명하므로, 현장 확인이 필요합니다.",
-            "onsite_needed": "Y",
-            "source": "default"
-        }]
+        return {issue_type: scenarios for issue_type, scenarios in scenarios_by_type.items() if scenarios}
+    
+    def get_scenarios_by_issue_type(self, issue_type: str) -> List[Dict[str, Any]]:
+        """문제 유형별 시나리오 조회 (없으면 기본 시나리오)"""
+        return self.index.scenarios(issue_type)
     
     def get_all_issue_types(self) -> List[str]:
         """모든 문제 유형 목록 반환"""
-        issue_types = set()
-        
-        # JSON에서 추출
-        issue_types.update(self.json_data.keys())
-        
-        # Excel에서 추출
-        if not self.excel_data.empty:
-            excel_issue_types = self.excel_data['issue_type'].unique()
-            issue_types.update(excel_issue_types)
-        
-        return sorted(list(issue_types))
+        return self.index.issue_types()
     
     def get_scenario_summary(self, issue_type: str) -> Dict[str, Any]:
         """문제 유형별 시나리오 요약 정보"""
-        scenarios = self.get_scenarios_by_issue_type(issue_type)
-        
-        if not scenarios:
-            return {
-                "issue_type": issue_type,
-                "scenario_count": 0,
-                "onsite_required": False,
-                "available_conditions": []
-            }
-        
-        onsite_required = any(scenario.get("onsite_needed", "N") == "Y" for scenario in scenarios)
-        
-        # 조건 목록 추출
-        conditions = []
-        for scenario in scenarios:
-            if scenario.get("condition_1"):
-                conditions.append(scenario["condition_1"])
-            if scenario.get("condition_2"):
-                conditions.append(scenario["condition_2"])
-        
-        return {
-            "issue_type": issue_type,
-            "scenario_count": len(scenarios),
-            "onsite_required": onsite_required,
-            "available_conditions": list(set(conditions)),
-            "scenarios": scenarios
-        }
+        return self.index.summary(issue_type)
     
     def find_best_scenario(self, issue_type: str, customer_input: str) -> Optional[Dict[str, Any]]:
-        """고객 입력에 가장 적합한 시나리오 찾기"""
-        scenarios = self.get_scenarios_by_issue_type(issue_type)
-        
-        if not scenarios:
-            return None
-        
-        # 간단한 키워드 매칭으로 가장 적합한 시나리오 선택
-        input_lower = customer_input.lower()
-        best_match = None
-        best_score = 0
-        
-        for scenario in scenarios:
-            score = 0
-            condition_1 = scenario.get("condition_1", "").lower()
-            condition_2 = scenario.get("condition_2", "").lower()
-            
-            # 조건 키워드와 입력 텍스트 매칭
-            for keyword in condition_1.split():
-                if keyword in input_lower:
-                    score += 1
-            
-            for keyword in condition_2.split():
-                if keyword in input_lower:
-                    score += 1
-            
-            if score > best_score:
-                best_score = score
-                best_match = scenario
-        
-        return best_match if best_match else scenarios[0]  # 매칭이 없으면 첫 번째 시나리오 반환
+        """고객 입력에 가장 적합한 시나리오 찾기 (조건 TF-IDF 유사도, 매칭이 없으면 첫 번째 시나리오)"""
+        scenario, _ = self.index.best(issue_type, customer_input)
+        return scenario
     
     def get_manual_reference(self, issue_type: str) -> str:
         """매뉴얼 참조 정보 조회"""
-        scenarios = self.get_scenarios_by_issue_type(issue_type)
-        
-        for scenario in scenarios:
-            if scenario.get("manual_ref"):
-                return scenario["manual_ref"]
-        
-        return ""
+        return self.index.manual_reference(issue_type)
+    
+    def route(self, issue_type: str, customer_input: str, answers: Optional[Dict[str, bool]] = None) -> Dict[str, Any]:
+        """결정 그래프로 도달 가능한 해결책 결정 (answers: 추가 질문 조건 ID → 참/거짓)"""
+        return self.engine.route(issue_type, customer_input, answers)
 
 # 사용 예시
 if __name__ == "__main__":
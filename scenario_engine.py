@@ -0,0 +1,302 @@
+"""
+시나리오 결정 그래프 실행 엔진
+문제 유형별 시나리오(condition_1 → condition_2 → solution)를 조건 노드 그래프로 한 번 컴파일해 두고,
+문의 내용(또는 추가 질문에 대한 답변)으로 각 조건을 참/거짓/미확인으로 평가해
+도달 가능한 해결책과 현장 출동 여부를 결정합니다.
+해결책이 하나로 정해지면 AI 호출 없이 바로 응답을 만들 수 있습니다.
+"""
+import re
+import threading
+from typing import Dict, List, Any, Optional
+
+from scenario_index import tokenize
+
+# 부정 표현 (조건 문장과 문의 문장의 긍정/부정 판단)
+NEGATION_MARKERS = (
+    "않", "불가", "없", "모르", "모름", "모른", "모릅", "모르겠", "몰라", "몰랐", "못", "꺼져", "꺼짐", "미접속",
+    "틀리", "틀립", "틀려", "틀렸", "다릅", "안되", "안돼", "안됨", "안됩", "안 되", "안 돼", "안 됩"
+)
+# 반의어 (조건 서술어 어간 → 같은 내용을 부정으로 말하는 표현, 모두 NEGATION_MARKERS에 포함)
+ANTONYMS = {
+    "알": ("모르", "모릅", "몰라", "몰랐"),
+    "맞": ("틀리", "틀립", "틀려", "틀렸", "다릅"),
+    "있": ("없",),
+    "켜": ("꺼",),
+    "가능": ("불가",),
+    "접속": ("미접속",)
+}
+# 조건 문장의 의문형 어미 등 내용과 관계없는 토큰
+QUESTION_TOKENS = {"는가", "인가", "한가", "은가", "였는", "였는가", "하였는가", "있는가", "경우", "경우인가", "상태", "상태인가"}
+# 서술어를 찾을 때 건너뛰는 조건 문장 끝의 보조 표현
+_AUXILIARY_WORDS = {"않는가", "않은가", "않는", "못하는가", "상태인가", "경우인가", "인가"}
+# '알고 있는가', '꺼져 있는가'처럼 연결 어미 뒤의 '있는가'도 보조 표현 ('기록이 있는가'는 서술어)
+_AUXILIARY_EXISTENCE = {"있는가", "있는"}
+# 서술어 어간을 남기고 떼어 내는 어미
+_ENDING_PATTERN = re.compile(r"(되었는가|하였는가|했는가|였는가|었는가|하는가|하는|하지|운가|는가|한가|인가|은가|인지|한|는|지|고|져)$")
+# 단어 (scenario_index.tokenize와 같은 기준)
+_WORD_PATTERN = re.compile(r"[0-9A-Za-z가-힣]+")
+# 문의 내용을 문장/절 단위로 나누는 기준
+_CLAUSE_PATTERN = re.compile(r"[.!?\n,;]|그러나|하지만|는데|지만")
+
+# 조건 내용 토큰 중 이 비율 이상이 한 절에 있으면 그 절로 조건을 평가
+MIN_OVERLAP = 0.5
+
+
+def is_negative(text: str) -> bool:
+    """부정 표현 포함 여부"""
+    return any(marker in text for marker in NEGATION_MARKERS)
+
+
+def _content_tokens(text: str) -> set:
+    """조건/문의 문장의 내용 토큰 (부정 표현·의문형 어미 제외)"""
+    return {
+        token for token in tokenize(text)
+        if token not in QUESTION_TOKENS and not is_negative(token)
+    }
+
+
+def predicate_stem(text: str) -> str:
+    """
+    조건 문장의 서술어 어간 ('비밀번호를 모르는가?' → '알', '프로토콜이 맞지 않는가?' → '맞').
+    부정 표현으로 된 서술어는 반의어의 긍정 어간으로 바꿉니다.
+    """
+    words = _WORD_PATTERN.findall(str(text or '').lower())
+    while len(words) > 1 and (words[-1] in _AUXILIARY_WORDS or
+                              (words[-1] in _AUXILIARY_EXISTENCE and words[-2].endswith(("고", "져", "어", "아")))):
+        words.pop()
+    if not words:
+        return ""
+    stem = _ENDING_PATTERN.sub("", words[-1]) or words[-1]
+    for positive, negatives in ANTONYMS.items():
+        if any(stem.startswith(negative) for negative in negatives):
+            return positive
+    return stem
+
+
+def _mentions(words: List[str], stem: str) -> bool:
+    """문의 절에 서술어(또는 그 반의어)가 있는지 (한 글자 어간은 단어 앞부분만 비교)"""
+    forms = (stem,) + ANTONYMS.get(stem, ())
+    for word in words:
+        for form in forms:
+            if (word.startswith(form) if len(form) == 1 else form in word):
+                return True
+    return False
+
+
+def split_clauses(text: str) -> List[str]:
+    """문의 내용을 절 단위로 분리"""
+    return [clause.strip() for clause in _CLAUSE_PATTERN.split(text or '') if clause.strip()]
+
+
+class ConditionNode:
+    """조건 노드 (같은 문장의 조건은 문제 유형 안에서 하나의 노드로 공유)"""
+
+    __slots__ = ("id", "text", "tokens", "stem", "negative", "children")
+
+    def __init__(self, node_id: str, text: str):
+        self.id = node_id
+        self.text = text
+        self.tokens = _content_tokens(text)
+        self.stem = predicate_stem(text)
+        self.negative = is_negative(text)
+        # 이 조건이 참일 때 이어지는 다음 조건 노드 ID 또는 해결책(branch 순번)
+        self.children: List[Any] = []
+
+    def evaluate(self, clauses: List[Dict[str, Any]]) -> Optional[bool]:
+        """
+        문의 절들로 조건 평가 (가장 많이 겹치는 절의 긍정/부정이 조건과 같으면 참, 겹치는 절이 없으면 None).
+        조건의 서술어(또는 반의어)가 없는 절은 주어만 같은 것이므로 평가에 쓰지 않습니다.
+        ('Onvif 프로토콜 확인했어요'로 '프로토콜이 맞지 않는가?'를 판단하지 않음)
+        """
+        if not self.tokens or not self.stem:
+            return None
+        best_overlap, best_clause = 0.0, None
+        for clause in clauses:
+            if not _mentions(clause["words"], self.stem):
+                continue
+            overlap = len(self.tokens & clause["tokens"]) / len(self.tokens)
+            if overlap > best_overlap:
+                best_overlap, best_clause = overlap, clause
+        if best_clause is None or best_overlap < MIN_OVERLAP:
+            return None
+        return best_clause["negative"] == self.negative
+
+
+class DecisionGraph:
+    """문제 유형 하나의 컴파일된 결정 그래프 (조건 노드 + 해결책별 조건 경로)"""
+
+    def __init__(self, issue_type: str, scenarios: List[Dict[str, Any]]):
+        self.issue_type = issue_type
+        self.scenarios = scenarios
+        self.nodes: Dict[str, ConditionNode] = {}
+        self.roots: List[str] = []
+        # 해결책별 조건 경로 (condition_1, condition_2 순서의 노드 ID)
+        self.paths: List[List[str]] = []
+
+        for position, scenario in enumerate(scenarios):
+            path = []
+            for key in ("condition_1", "condition_2"):
+                text = str(scenario.get(key) or "").strip()
+                if not text:
+                    continue
+                node_id = self._node_id(text)
+                if node_id not in self.nodes:
+                    self.nodes[node_id] = ConditionNode(node_id, text)
+                if path and node_id not in self.nodes[path[-1]].children:
+                    self.nodes[path[-1]].children.append(node_id)
+                path.append(node_id)
+            if path:
+                if path[0] not in self.roots:
+                    self.roots.append(path[0])
+                self.nodes[path[-1]].children.append(position)
+            self.paths.append(path)
+
+    @staticmethod
+    def _node_id(text: str) -> str:
+        """조건 문장으로 정한 노드 ID (공백·물음표 차이는 같은 조건)"""
+        return re.sub(r"\s+", " ", text).rstrip("?？ ").strip()
+
+    def evaluate(self, customer_input: str, answers: Optional[Dict[str, bool]] = None) -> Dict[str, Optional[bool]]:
+        """조건 노드별 평가 결과 (추가 질문 답변이 문의 내용 평가보다 우선)"""
+        clauses = [
+            {"tokens": set(tokenize(clause)), "words": _WORD_PATTERN.findall(clause.lower()), "negative": is_negative(clause)}
+            for clause in split_clauses(customer_input)
+        ]
+        results = {node_id: node.evaluate(clauses) for node_id, node in self.nodes.items()}
+        for node_id, answer in (answers or {}).items():
+            if node_id in results and answer is not None:
+                results[node_id] = bool(answer)
+        return results
+
+    def route(self, customer_input: str, answers: Optional[Dict[str, bool]] = None) -> Dict[str, Any]:
+        """
+        도달 가능한 해결책 결정.
+        경로의 조건이 모두 참이면 matched, 거짓인 조건이 있으면 제외, 나머지는 open입니다.
+        matched가 하나이거나 남은 해결책이 하나(또는 모두 같은 해결책)면 decided입니다.
+        AI 호출 없이 응답하는 deterministic은 고른 해결책이 matched(경로의 조건이 모두 참으로 확인됨)일 때만입니다.
+        """
+        results = self.evaluate(customer_input, answers)
+        solutions = []
+        for position, path in enumerate(self.paths):
+            values = [results[node_id] for node_id in path]
+            if any(value is False for value in values):
+                continue
+            scenario = self.scenarios[position]
+            solutions.append({
+                "solution": scenario.get("solution", ""),
+                "onsite_needed": scenario.get("onsite_needed", "N"),
+                "condition_1": scenario.get("condition_1", ""),
+                "condition_2": scenario.get("condition_2", ""),
+                "status": "matched" if all(values) else "open",
+                "confirmed": sum(1 for value in values if value),
+                "position": position
+            })
+        # 확인된 조건이 많은 해결책부터
+        solutions.sort(key=lambda item: (item["status"] != "matched", -item["confirmed"], item["position"]))
+
+        matched = [item for item in solutions if item["status"] == "matched"]
+        distinct = {(item["solution"], item["onsite_needed"]) for item in solutions}
+        decided = len(matched) == 1 or (bool(solutions) and len(distinct) == 1)
+        chosen = matched[0] if len(matched) == 1 else (solutions[0] if decided else None)
+
+        onsite_flags = {item["onsite_needed"] for item in solutions}
+        answered = {node_id: value for node_id, value in results.items() if value is not None}
+        return {
+            "issue_type": self.issue_type,
+            "decided": decided,
+            # 고른 경로의 조건이 모두 참으로 확인된 경우에만 AI 없이 응답 (거짓 조건으로 다른 경로를 제외한 것은 근거로 보지 않음)
+            "deterministic": bool(chosen) and chosen["status"] == "matched" and chosen["confirmed"] > 0,
+            "solution": chosen,
+            "solutions": solutions,
+            # 남은 해결책이 모두 같은 출동 여부면 해결책이 정해지지 않아도 출동 여부는 확정
+            "onsite_needed": onsite_flags.pop() if len(onsite_flags) == 1 else "",
+            "next_question": None if decided else self._next_question(solutions, results),
+            "answers": answered
+        }
+
+    def _next_question(self, solutions: List[Dict[str, Any]], results: Dict[str, Optional[bool]]) -> Optional[Dict[str, str]]:
+        """남은 해결책을 가장 많이 가르는 미확인 조건 (경로 앞쪽 조건 우선)"""
+        counts = {}
+        for item in solutions:
+            for depth, node_id in enumerate(self.paths[item["position"]]):
+                if results[node_id] is None:
+                    count, _ = counts.get(node_id, (0, depth))
+                    counts[node_id] = (count + 1, depth)
+                    break
+        if not counts:
+            return None
+        node_id = min(counts, key=lambda key: (counts[key][1], -counts[key][0]))
+        return {"id": node_id, "text": self.nodes[node_id].text}
+
+
+class ScenarioEngine:
+    """문제 유형별 결정 그래프 (처음 사용할 때 컴파일해 캐시, 시나리오 버전마다 하나)"""
+
+    def __init__(self, index):
+        self.index = index
+        self._graphs: Dict[str, DecisionGraph] = {}
+        self._lock = threading.Lock()
+
+    def graph(self, issue_type: str) -> DecisionGraph:
+        graph = self._graphs.get(issue_type)
+        if graph is None:
+            with self._lock:
+                graph = self._graphs.get(issue_type)
+                if graph is None:
+                    graph = DecisionGraph(issue_type, self.index.scenarios(issue_type))
+                    self._graphs[issue_type] = graph
+        return graph
+
+    def route(self, issue_type: str, customer_input: str, answers: Optional[Dict[str, bool]] = None) -> Dict[str, Any]:
+        return self.graph(issue_type).route(customer_input, answers)
+
+
+def hinted_conditions(decision: Dict[str, Any], scenario: Optional[Dict[str, Any]]) -> List[str]:
+    """
+    AI 프롬프트에 넣을 조건 1/2 (결정 그래프가 문의 내용으로 평가한 결과를 참고 표시).
+    AI 호출 없이 응답할 만큼 확인되지 않은 경우에도 평가 결과를 힌트로 전달합니다.
+    """
+    answers = (decision or {}).get("answers") or {}
+    conditions = []
+    for key in ("condition_1", "condition_2"):
+        text = str((scenario or {}).get(key) or "").strip()
+        value = answers.get(DecisionGraph._node_id(text)) if text else None
+        if value is not None:
+            text += " (문의 내용상 예로 추정)" if value else " (문의 내용상 아니오로 추정)"
+        conditions.append(text)
+    return conditions
+
+
+def build_ai_result(decision: Dict[str, Any], customer_input: str, manual_ref: str = "") -> Dict[str, Any]:
+    """결정된 해결책으로 AI 응답과 같은 형식([대응유형]/[응답내용])의 결과 구성 (AI 호출 없음)"""
+    chosen = decision["solution"]
+    response_type = "출동" if chosen["onsite_needed"] == "Y" else "해결안"
+    conditions = " / ".join(text for text in (chosen["condition_1"], chosen["condition_2"]) if text)
+    summary = f"{decision['issue_type']} 문의로, 대응 시나리오({conditions})에 해당합니다."
+    action_flow = f"1. {chosen['solution']}"
+    if chosen["onsite_needed"] == "Y":
+        action_flow += "\n2. 조치 후에도 해결되지 않으면 현장 방문 일정 조율"
+    if manual_ref:
+        action_flow += f"\n※ 참고 매뉴얼: {manual_ref}"
+    email_draft = (
+        "안녕하세요, PrivKeeper P 고객지원팀입니다.\n\n"
+        f"문의하신 내용({customer_input.strip()[:100]})을 확인했습니다.\n"
+        f"{chosen['solution']}\n\n"
+        + ("현장 확인이 필요하여 담당자가 방문 일정을 안내드리겠습니다.\n\n" if chosen["onsite_needed"] == "Y" else "")
+        + "추가 문의 사항이 있으시면 언제든 연락 주시기 바랍니다.\n감사합니다."
+    )
+    response = (
+        f"[대응유형] {response_type}\n\n[응답내용]\n"
+        f"- 요약: {summary}\n- 조치 흐름:\n{action_flow}\n- 이메일 초안:\n{email_draft}"
+    )
+    return {
+        "success": True,
+        "response": response,
+        "parsed_response": {
+            "response_type": response_type,
+            "summary": summary,
+            "action_flow": action_flow,
+            "email_draft": email_draft
+        },
+        "model": "scenario_engine"
+    }
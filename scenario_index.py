@@ -0,0 +1,161 @@
+"""
+시나리오 조건 색인
+로딩 시점에 문제 유형별 시나리오의 조건(condition_1 + condition_2)을 TF-IDF 벡터로 한 번만 변환해 두고,
+최적 시나리오 선택은 문의 벡터와 문제 유형별 희소 행렬의 곱 한 번으로 처리합니다.
+scikit-learn이 없으면 같은 토큰/가중치로 만든 역색인(토큰 → 시나리오별 가중치)으로 계산합니다.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Any, Optional, Tuple
+
+try:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    TfidfVectorizer = None
+    SKLEARN_AVAILABLE = False
+    print("⚠️ scikit-learn을 사용할 수 없습니다. 시나리오 색인은 역색인 방식으로 계산합니다.")
+
+_WORD_PATTERN = re.compile(r"[0-9A-Za-z가-힣]+")
+
+# 시나리오가 없는 문제 유형에 사용하는 기본 시나리오 (기타 케이스)
+DEFAULT_SCENARIO = {
+    "condition_1": "문제 유형이 기존 시나리오에 없는 경우인가?",
+    "condition_2": "조건 분기 정보가 충분하지 않은가?",
+    "solution": "고객의 문의 내용이 기존 대응 시나리오에 포함되지 않거나 상황이 불분명하므로, 현장 확인이 필요합니다.",
+    "onsite_needed": "Y",
+    "source": "default"
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """소문자 단어 + 단어별 글자 2-gram (조사가 붙은 한국어 단어도 겹치도록)"""
+    tokens = []
+    for word in _WORD_PATTERN.findall(str(text or '').lower()):
+        tokens.append(word)
+        if len(word) > 2:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def condition_text(scenario: Dict[str, Any]) -> str:
+    """색인할 조건 문장"""
+    return f"{scenario.get('condition_1', '')} {scenario.get('condition_2', '')}"
+
+
+class _InvertedTfidf:
+    """TfidfVectorizer(smooth_idf, l2 정규화)와 같은 가중치의 문제 유형별 역색인"""
+
+    def __init__(self, documents: List[str], row_ranges: Dict[str, range]):
+        token_lists = [tokenize(document) for document in documents]
+        document_frequency = Counter(token for tokens in token_lists for token in set(tokens))
+        total = len(documents)
+        self.idf = {token: math.log((1 + total) / (1 + df)) + 1 for token, df in document_frequency.items()}
+        # 문제 유형 → 토큰 → [(유형 내 순번, 가중치)]
+        self.postings = {}
+        for issue_type, rows in row_ranges.items():
+            postings = defaultdict(list)
+            for position, row in enumerate(rows):
+                for token, weight in self._weights(token_lists[row]).items():
+                    postings[token].append((position, weight))
+            self.postings[issue_type] = dict(postings)
+
+    def _weights(self, tokens: List[str]) -> Dict[str, float]:
+        counts = Counter(token for token in tokens if token in self.idf)
+        weights = {token: count * self.idf[token] for token, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        return {token: weight / norm for token, weight in weights.items()} if norm else {}
+
+    def scores(self, text: str, issue_type: str, size: int) -> List[float]:
+        """문제 유형의 각 조건과 text의 코사인 유사도"""
+        scores = [0.0] * size
+        postings = self.postings.get(issue_type, {})
+        for token, query_weight in self._weights(tokenize(text)).items():
+            for position, weight in postings.get(token, ()):
+                scores[position] += query_weight * weight
+        return scores
+
+
+class ScenarioIndex:
+    """문제 유형별 시나리오 목록과 조건 벡터 (만든 뒤에는 바꾸지 않음)"""
+
+    def __init__(self, scenarios_by_type: Dict[str, List[Dict[str, Any]]]):
+        self.scenarios_by_type = {issue_type: list(scenarios) for issue_type, scenarios in scenarios_by_type.items() if scenarios}
+
+        # 전체 조건을 한 행렬로 만들고 문제 유형별로 연속 구간(행 범위)을 기록
+        documents = []
+        self.row_ranges: Dict[str, range] = {}
+        for issue_type, scenarios in self.scenarios_by_type.items():
+            start = len(documents)
+            documents.extend(condition_text(scenario) for scenario in scenarios)
+            self.row_ranges[issue_type] = range(start, len(documents))
+
+        self.vectorizer = None
+        self.matrices = {}
+        self.inverted = None
+        if documents and SKLEARN_AVAILABLE:
+            self.vectorizer = TfidfVectorizer(analyzer=tokenize)
+            matrix = self.vectorizer.fit_transform(documents).tocsr()
+            self.matrices = {issue_type: matrix[rows.start:rows.stop] for issue_type, rows in self.row_ranges.items()}
+        elif documents:
+            self.inverted = _InvertedTfidf(documents, self.row_ranges)
+
+        # 문제 유형별로 자주 쓰는 조회 결과 미리 계산
+        self.manual_refs = {
+            issue_type: next((scenario["manual_ref"] for scenario in scenarios if scenario.get("manual_ref")), "")
+            for issue_type, scenarios in self.scenarios_by_type.items()
+        }
+        self.summaries = {issue_type: self._summarize(issue_type, scenarios) for issue_type, scenarios in self.scenarios_by_type.items()}
+
+    @staticmethod
+    def _summarize(issue_type: str, scenarios: List[Dict[str, Any]]) -> Dict[str, Any]:
+        conditions = []
+        for scenario in scenarios:
+            for key in ("condition_1", "condition_2"):
+                if scenario.get(key) and scenario[key] not in conditions:
+                    conditions.append(scenario[key])
+        return {
+            "issue_type": issue_type,
+            "scenario_count": len(scenarios),
+            "onsite_required": any(scenario.get("onsite_needed", "N") == "Y" for scenario in scenarios),
+            "available_conditions": conditions
+        }
+
+    def issue_types(self) -> List[str]:
+        return sorted(self.scenarios_by_type)
+
+    def scenarios(self, issue_type: str) -> List[Dict[str, Any]]:
+        """문제 유형별 시나리오 (없으면 기본 시나리오) - 호출자가 수정해도 색인에 영향 없도록 복사본"""
+        scenarios = self.scenarios_by_type.get(issue_type)
+        if not scenarios:
+            return [dict(DEFAULT_SCENARIO)]
+        return [dict(scenario) for scenario in scenarios]
+
+    def score(self, issue_type: str, customer_input: str) -> List[float]:
+        """문제 유형의 각 시나리오 조건과 문의 내용의 유사도 (시나리오 순서대로)"""
+        rows = self.row_ranges.get(issue_type)
+        if rows is None or not customer_input:
+            return [0.0] * len(rows or ())
+        if self.vectorizer is not None:
+            query = self.vectorizer.transform([customer_input])
+            return (self.matrices[issue_type] @ query.T).toarray().ravel().tolist()
+        return self.inverted.scores(customer_input, issue_type, len(rows))
+
+    def best(self, issue_type: str, customer_input: str) -> Tuple[Optional[Dict[str, Any]], float]:
+        """가장 유사한 시나리오와 점수 (모두 0점이면 첫 번째 시나리오, 0점)"""
+        scenarios = self.scenarios_by_type.get(issue_type)
+        if not scenarios:
+            return dict(DEFAULT_SCENARIO), 0.0
+        scores = self.score(issue_type, customer_input)
+        if max(scores) <= 0:
+            return dict(scenarios[0]), 0.0
+        best_position = max(range(len(scores)), key=lambda i: scores[i])
+        return dict(scenarios[best_position]), scores[best_position]
+
+    def summary(self, issue_type: str) -> Dict[str, Any]:
+        summary = self.summaries.get(issue_type) or self._summarize(issue_type, self.scenarios(issue_type))
+        return dict(summary, available_conditions=list(summary["available_conditions"]), scenarios=self.scenarios(issue_type))
+
+    def manual_reference(self, issue_type: str) -> str:
+        return self.manual_refs.get(issue_type, "")
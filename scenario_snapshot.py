@@ -0,0 +1,100 @@
+"""
+시나리오 스냅샷 캐시
+JSON/Excel 시나리오를 병합·검증한 결과를 pickle 파일 하나로 저장해 두고,
+원본 파일이 바뀌지 않았으면 Excel 파싱 없이 스냅샷만 읽어 바로 사용합니다.
+원본 확인은 수정 시각·크기를 먼저 비교하고, 다르면 SHA-256 해시로 내용이 실제로 바뀌었는지 확인합니다.
+"""
+import hashlib
+import json
+import os
+import pickle
+from typing import Dict, List, Any, Optional
+
+# 스냅샷 구조가 바뀌면 올려서 이전 스냅샷을 무시
+SNAPSHOT_VERSION = 2
+
+
+def file_hash(path: str) -> str:
+    """파일 내용 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scenario_version(scenarios_by_type: Dict[str, List[Dict[str, Any]]]) -> str:
+    """병합된 시나리오 내용으로 정한 버전 (내용이 같으면 프로세스·재시작과 관계없이 같은 값)"""
+    content = json.dumps(scenarios_by_type, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:12]
+
+
+def file_signature(path: str) -> Optional[Dict[str, Any]]:
+    """원본 파일 식별 정보 (없는 파일은 None)"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": file_hash(path)}
+
+
+def source_signatures(sources: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """원본 경로별 식별 정보 (원본을 읽기 전에 구해야 읽는 도중 바뀐 내용이 스냅샷에 잘못 기록되지 않음)"""
+    return {os.path.abspath(path): file_signature(path) for path in sources}
+
+
+def _same_source(saved: Optional[Dict[str, Any]], path: str) -> bool:
+    """저장된 식별 정보와 현재 파일이 같은 내용인지 (시각·크기가 같으면 해시 계산 생략)"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return saved is None
+    if saved is None:
+        return False
+    if stat.st_mtime_ns == saved["mtime_ns"] and stat.st_size == saved["size"]:
+        return True
+    # 체크아웃 등으로 시각만 바뀐 경우는 내용이 같으면 그대로 사용
+    return stat.st_size == saved["size"] and file_hash(path) == saved["sha256"]
+
+
+def load_snapshot(snapshot_path: str, sources: List[str]) -> Optional[Dict[str, Any]]:
+    """원본이 그대로면 스냅샷 반환 - scenarios(문제 유형별 시나리오), scenario_version (없거나 오래됐으면 None)"""
+    if not os.path.exists(snapshot_path):
+        return None
+    try:
+        with open(snapshot_path, 'rb') as f:
+            snapshot = pickle.load(f)
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            return None
+        saved_sources = snapshot["sources"]
+        if sorted(saved_sources) != sorted(os.path.abspath(path) for path in sources):
+            return None
+        if not all(_same_source(saved, path) for path, saved in saved_sources.items()):
+            return None
+        return snapshot
+    except Exception as e:
+        print(f"⚠️ 시나리오 스냅샷 로딩 실패, 원본에서 다시 생성합니다: {e}")
+        return None
+
+
+def save_snapshot(snapshot_path: str, signatures: Dict[str, Optional[Dict[str, Any]]],
+                  scenarios_by_type: Dict[str, List[Dict[str, Any]]], version: str) -> bool:
+    """병합된 시나리오를 원본 식별 정보(source_signatures)·시나리오 버전과 함께 저장 (임시 파일에 쓴 뒤 교체)"""
+    try:
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "sources": signatures,
+            "scenarios": scenarios_by_type,
+            "scenario_version": version
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(snapshot_path)), exist_ok=True)
+        temp_file = snapshot_path + '.tmp'
+        with open(temp_file, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, snapshot_path)
+        return True
+    except Exception as e:
+        print(f"⚠️ 시나리오 스냅샷 저장 실패: {e}")
+        return False
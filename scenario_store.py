@@ -0,0 +1,135 @@
+"""
+시나리오 핫 리로드 저장소
+원본 파일(JSON, Excel)의 수정 시각·크기를 백그라운드 스레드에서 주기적으로 확인하고,
+바뀌면 새 ScenarioDB(병합·색인)를 만든 뒤 현재 버전 참조만 교체합니다.
+요청 처리 쪽은 current()로 받은 ScenarioDB 하나를 끝까지 사용하므로 도중에 교체되어도 결과가 섞이지 않습니다.
+"""
+import os
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+
+from config import get_secret
+from scenario_db import ScenarioDB
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class ScenarioStore:
+    """버전별 시나리오 DB 보관 및 원본 변경 시 무중단 교체"""
+
+    def __init__(self, json_path: str = "PK P DB.json", excel_path: str = "수정된_대응_시나리오표.xlsx",
+                 poll_interval: float = 5.0, snapshot_path: Optional[str] = None):
+        self.json_path = json_path
+        self.excel_path = excel_path
+        self.poll_interval = poll_interval
+        self.snapshot_path = snapshot_path
+
+        # 동시에 두 번 재생성하지 않도록 (감시 스레드와 수동 reload)
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.metrics = {"reloads": 0, "reload_failures": 0, "last_reload_seconds": 0.0}
+
+        self._signature = self._stat_sources()
+        self._current = self._build()
+        self.loaded_at = time.time()
+        print(f"✅ 시나리오 로딩 완료 (버전 {self._current.version})")
+
+        self._watcher = threading.Thread(target=self._watch, name="scenario-watcher", daemon=True)
+        if poll_interval > 0:
+            self._watcher.start()
+
+    def _build(self) -> ScenarioDB:
+        return ScenarioDB(self.json_path, self.excel_path, snapshot_path=self.snapshot_path)
+
+    def _stat_sources(self) -> Tuple:
+        """원본 파일별 (수정 시각, 크기) - 없는 파일은 None"""
+        signature = []
+        for path in (self.json_path, self.excel_path):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def current(self) -> ScenarioDB:
+        """현재 버전 시나리오 DB (한 요청 안에서는 이 객체 하나를 계속 사용)"""
+        return self._current
+
+    @property
+    def version(self) -> str:
+        return self._current.version
+
+    def reload(self) -> Dict[str, Any]:
+        """원본에서 새 버전을 만들어 교체 (원본을 읽지 못했으면 기존 버전 유지)"""
+        with self._reload_lock:
+            started = time.time()
+            try:
+                signature = self._stat_sources()
+                candidate = self._build()
+                if candidate.load_errors:
+                    raise ValueError("; ".join(candidate.load_errors))
+                previous = self._current
+                self._signature = signature
+                self.metrics["last_reload_seconds"] = round(time.time() - started, 3)
+                if candidate.version == previous.version:
+                    return {"success": True, "version": previous.version, "changed": False}
+
+                # 참조 교체 한 번으로 전환 (이전 버전을 쓰던 요청은 그대로 끝까지 처리)
+                self._current = candidate
+                self.loaded_at = time.time()
+                self.metrics["reloads"] += 1
+                print(f"✅ 시나리오 갱신: {previous.version} → {candidate.version} ({self.metrics['last_reload_seconds']}초)")
+                return {"success": True, "version": candidate.version, "previous_version": previous.version, "changed": True}
+            except Exception as e:
+                self.metrics["reload_failures"] += 1
+                print(f"❌ 시나리오 갱신 실패, 기존 버전({self._current.version}) 유지: {e}")
+                return {"success": False, "version": self._current.version, "error": str(e)}
+
+    def _watch(self):
+        """원본 변경 감시 (저장 중인 파일을 읽지 않도록 두 번 연속 같은 상태일 때 재생성)"""
+        pending = None
+        while not self._stop.wait(self.poll_interval):
+            try:
+                signature = self._stat_sources()
+                if signature == self._signature:
+                    pending = None
+                elif signature != pending:
+                    pending = signature
+                else:
+                    pending = None
+                    result = self.reload()
+                    if not result['success']:
+                        # 같은 내용으로 계속 재시도하지 않도록 (파일이 다시 바뀌면 재시도)
+                        self._signature = signature
+            except Exception as e:
+                print(f"⚠️ 시나리오 변경 감시 오류: {e}")
+
+    def stop(self):
+        """감시 스레드 종료"""
+        self._stop.set()
+        if self._watcher.is_alive():
+            self._watcher.join(timeout=5)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """현재 버전과 갱신 지표"""
+        return {
+            "version": self._current.version,
+            "loaded_at": self.loaded_at,
+            "issue_types": len(self._current.get_all_issue_types()),
+            **self.metrics
+        }
+
+
+def get_scenario_store(json_path: str = "PK P DB.json", excel_path: str = "수정된_대응_시나리오표.xlsx") -> ScenarioStore:
+    """원본 파일별 프로세스 공용 시나리오 저장소 (세션마다 다시 읽거나 감시 스레드가 늘지 않도록)"""
+    key = (os.path.abspath(json_path), os.path.abspath(excel_path))
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = ScenarioStore(
+                json_path, excel_path,
+                poll_interval=float(get_secret("SCENARIO_POLL_INTERVAL", 5))
+            )
+        return _stores[key]
@@ -0,0 +1,352 @@
+"""
+SMS 발송 큐 (SQLite)
+화면에서는 발송 요청을 큐에 기록하고 바로 반환하며,
+백그라운드 디스패처가 SOLAPI send-many로 묶어 발송하고 실패하면 지수 대기 후 재시도합니다.
+발송된 메시지는 그룹별 전달 상태를 주기적으로 조회해 delivered/undeliverable로 기록합니다.
+같은 멱등 키(idempotency key)로 다시 요청하면 새로 발송하지 않고 기존 메시지 상태를 반환합니다.
+(최종 실패(failed/undeliverable)한 메시지는 다시 대기열에 넣어 재발송)
+메시지마다 발송 계정(API 키)을 기록하고, 그 계정의 핸들러로만 발송/상태 조회합니다.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Any, Optional
+
+from solapi_handler import SEND_MANY_LIMIT
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+# 메시지 상태: queued(대기) → sending(발송 중) → sent(접수) → delivered(전달) / undeliverable(전달 실패)
+#             재시도 횟수를 넘기거나 재시도할 수 없는 오류면 failed
+ACTIVE_STATUSES = ("queued", "sending")
+# 같은 멱등 키로 다시 요청하면 재발송하는 최종 실패 상태
+RETRYABLE_FINAL_STATUSES = ("failed", "undeliverable")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sms_messages (
+    id TEXT PRIMARY KEY,
+    phone_number TEXT NOT NULL,
+    message TEXT NOT NULL,
+    recipient_name TEXT NOT NULL DEFAULT '',
+    sender TEXT NOT NULL DEFAULT '',
+    sender_name TEXT NOT NULL DEFAULT 'CoreTrust',
+    account TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    message_id TEXT NOT NULL DEFAULT '',
+    group_id TEXT NOT NULL DEFAULT '',
+    status_code TEXT NOT NULL DEFAULT '',
+    last_error TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sms_status_due ON sms_messages (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_sms_group ON sms_messages (group_id, status);
+"""
+
+
+def idempotency_key(*parts: Any) -> str:
+    """요청 내용으로 정한 멱등 키 (같은 분석·수신자·내용의 중복 클릭은 한 번만 발송)"""
+    content = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:32]
+
+
+def account_key(api_key: str, api_secret: str) -> str:
+    """발송 계정 식별자 (DB에는 키/시크릿 대신 해시만 기록)"""
+    return hashlib.sha256(f"{api_key}:{api_secret}".encode('utf-8')).hexdigest()[:16]
+
+
+def is_retryable(result: Dict[str, Any]) -> bool:
+    """재시도할 오류인지 (네트워크 오류·시간 초과·429·5xx만 재시도, 번호 오류·권한 오류는 재시도하지 않음)"""
+    status_code = result.get("status_code")
+    if status_code in (None, ""):
+        return True
+    return isinstance(status_code, int) and (status_code in (408, 429) or status_code >= 500)
+
+
+class SMSQueue:
+    """SMS 발송 큐 (SQLite 저장 + 발송 디스패처 + 전달 상태 조회)"""
+
+    def __init__(self, db_path: str, max_attempts: int = 6, base_delay: float = 5.0, max_delay: float = 600.0,
+                 batch_size: int = 500, poll_interval: float = 1.0, status_interval: float = 30.0):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.batch_size = min(batch_size, SEND_MANY_LIMIT)
+        self.poll_interval = poll_interval
+        self.status_interval = status_interval
+
+        # 발송 계정 → 핸들러 (세션마다 자기 API 키의 핸들러를 연결)
+        self.handlers: Dict[str, Any] = {}
+        # 계정 기록 이전에 쌓인 메시지(account='')를 발송할 기본 계정 (secrets의 API 키)
+        self.default_account = ""
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+        self._recover()
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._last_status_check = 0.0
+        self.metrics = {"enqueued": 0, "duplicates": 0, "requeued": 0, "sent": 0, "failed": 0, "retries": 0, "requests": 0}
+
+        # 디스패처는 발송 핸들러가 연결된 뒤(attach) 시작
+        self._worker = threading.Thread(target=self._run, name="sms-dispatcher", daemon=True)
+
+    def _migrate(self):
+        """이전 버전 DB에 발송 계정 열 추가"""
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(sms_messages)").fetchall()}
+        if "account" not in columns:
+            self._conn.execute("ALTER TABLE sms_messages ADD COLUMN account TEXT NOT NULL DEFAULT ''")
+
+    def _recover(self):
+        """
+        재시작 시 발송 중(sending)으로 남은 메시지를 다시 대기 상태로.
+        응답을 받기 전에 중단된 요청이므로, 게이트웨이가 이미 접수했다면 한 번 더 발송될 수 있습니다.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE sms_messages SET status = 'queued', updated_at = ? WHERE status = 'sending'", (time.time(),)
+            )
+        if cursor.rowcount:
+            print(f"⚠️ 발송 중 중단된 SMS {cursor.rowcount}건을 다시 대기열에 넣었습니다")
+
+    def attach(self, handler, default: bool = False) -> str:
+        """
+        발송 핸들러(SOLAPIHandler) 연결 후 디스패처 시작, 발송 계정 식별자 반환 (enqueue에 전달).
+        메시지는 기록된 계정의 핸들러로만 발송하므로 다른 세션이 연결한 키로 발송되지 않습니다.
+        default: 계정이 기록되지 않은 이전 메시지를 이 핸들러로 발송
+        """
+        account = account_key(handler.api_key, handler.api_secret)
+        with self._lock:
+            self.handlers[account] = handler
+            if default:
+                self.default_account = account
+        if not self._worker.is_alive() and not self._stop.is_set():
+            self._worker.start()
+        self._wake.set()
+        return account
+
+    def _handler_for(self, account: str):
+        return self.handlers.get(account or self.default_account)
+
+    def enqueue(self, phone_number: str, message: str, recipient_name: str = "", sender: str = "",
+                sender_name: str = "CoreTrust", key: str = None, account: str = "") -> Dict[str, Any]:
+        """
+        발송 요청 등록 (DB 기록 후 즉시 반환, account는 attach가 반환한 발송 계정).
+        같은 key가 이미 있으면 기존 메시지 상태를 반환하고, 최종 실패한 메시지면 다시 대기열에 넣습니다.
+        """
+        try:
+            message_key = key or uuid.uuid4().hex
+            now = time.time()
+            with self._lock:
+                cursor = self._conn.execute(
+                    """INSERT OR IGNORE INTO sms_messages
+                       (id, phone_number, message, recipient_name, sender, sender_name, account, status, next_attempt_at, created_at, updated_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, 'queued', ?, ?, ?)""",
+                    (message_key, phone_number, message, recipient_name, sender, sender_name, account, now, now, now)
+                )
+                requeued = cursor.rowcount == 0 and self._conn.execute(
+                    f"""UPDATE sms_messages SET status = 'queued', attempts = 0, next_attempt_at = ?, message_id = '',
+                        group_id = '', status_code = '', last_error = '', account = ?, updated_at = ?
+                        WHERE id = ? AND status IN ({", ".join("?" * len(RETRYABLE_FINAL_STATUSES))})""",
+                    (now, account, now, message_key, *RETRYABLE_FINAL_STATUSES)
+                ).rowcount > 0
+            if requeued:
+                self.metrics["requeued"] += 1
+                self._wake.set()
+                return {"success": True, "id": message_key, "status": "queued", "duplicate": False, "requeued": True}
+            if cursor.rowcount == 0:
+                self.metrics["duplicates"] += 1
+                return dict(self.get_status(message_key), success=True, duplicate=True)
+
+            self.metrics["enqueued"] += 1
+            self._wake.set()
+            return {"success": True, "id": message_key, "status": "queued", "duplicate": False}
+        except Exception as e:
+            print(f"❌ SMS 발송 예약 실패: {e}")
+            return {"success": False, "error": str(e)}
+
+    def get_status(self, message_key: str) -> Optional[Dict[str, Any]]:
+        """메시지 상태 조회"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, phone_number, status, attempts, message_id, group_id, status_code, last_error, updated_at "
+                "FROM sms_messages WHERE id = ?", (message_key,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def _backoff(self, attempts: int) -> float:
+        """재시도 대기 시간 (지수 증가)"""
+        return min(self.base_delay * (2 ** max(attempts - 1, 0)), self.max_delay)
+
+    def _claim_due(self) -> List[sqlite3.Row]:
+        """발송할 차례가 된 메시지 중 핸들러가 연결된 계정의 메시지를 sending으로 바꾸고 반환"""
+        with self._lock:
+            accounts = list(self.handlers)
+            if self.default_account:
+                accounts.append("")
+            if not accounts:
+                return []
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    f"SELECT * FROM sms_messages WHERE status = 'queued' AND next_attempt_at <= ? "
+                    f"AND account IN ({', '.join('?' * len(accounts))}) "
+                    f"ORDER BY next_attempt_at LIMIT ?", (time.time(), *accounts, self.batch_size)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE sms_messages SET status = 'sending', updated_at = ? WHERE id = ?",
+                    [(time.time(), row["id"]) for row in rows]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return rows
+
+    def dispatch_once(self) -> int:
+        """대기 중인 메시지를 발송 계정·발신자별로 묶어 한 번씩 발송 (처리한 메시지 수)"""
+        rows = self._claim_due()
+        groups = {}
+        for row in rows:
+            groups.setdefault((row["account"], row["sender"], row["sender_name"]), []).append(row)
+
+        for (account, sender, sender_name), group in groups.items():
+            try:
+                result = self._handler_for(account).send_many(
+                    [{"phone_number": row["phone_number"], "message": row["message"], "recipient_name": row["recipient_name"]}
+                     for row in group],
+                    sender_name=sender_name, sender=sender or None
+                )
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+            self.metrics["requests"] += result.get("requests", 1)
+            # 요청 전체가 실패하면 결과 목록이 없으므로 메시지마다 같은 오류로 처리
+            items = result.get("results") or [{"success": False, "error": result.get("error", "알 수 없는 오류")}] * len(group)
+            group_id = (result.get("group_ids") or [""])[0]
+            self._record_results(group, items, group_id)
+        return len(rows)
+
+    def _record_results(self, rows: List[sqlite3.Row], items: List[Dict[str, Any]], group_id: str):
+        """메시지별 발송 결과 기록 (실패는 재시도 가능 여부에 따라 대기열로 되돌리거나 failed)"""
+        now = time.time()
+        updates = []
+        for row, item in zip(rows, items):
+            if item.get("success"):
+                self.metrics["sent"] += 1
+                updates.append(("sent", row["attempts"] + 1, now, item.get("message_id", ""), group_id, "", "", now, row["id"]))
+                continue
+            attempts = row["attempts"] + 1
+            error = item.get("error", "")
+            status_code = str(item.get("status_code", ""))
+            if is_retryable(item) and attempts < self.max_attempts:
+                self.metrics["retries"] += 1
+                updates.append(("queued", attempts, now + self._backoff(attempts), "", "", status_code, error, now, row["id"]))
+            else:
+                self.metrics["failed"] += 1
+                print(f"❌ SMS 발송 실패 ({row['phone_number']}, {attempts}회 시도): {error}")
+                updates.append(("failed", attempts, now, "", "", status_code, error, now, row["id"]))
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE sms_messages SET status = ?, attempts = ?, next_attempt_at = ?, message_id = ?, group_id = ?, "
+                "status_code = ?, last_error = ?, updated_at = ? WHERE id = ?", updates
+            )
+
+    def poll_delivery_once(self) -> int:
+        """접수된(sent) 메시지의 전달 상태를 그룹별로 발송 계정의 핸들러로 조회해 기록 (갱신한 메시지 수)"""
+        with self._lock:
+            groups = self._conn.execute(
+                "SELECT DISTINCT account, group_id FROM sms_messages WHERE status = 'sent' AND group_id != ''"
+            ).fetchall()
+
+        updated = 0
+        for account, group_id in groups:
+            handler = self._handler_for(account)
+            if handler is None:
+                # 이 계정으로 연결한 세션이 아직 없음
+                continue
+            result = handler.get_group_status(group_id)
+            if not result.get("success"):
+                print(f"⚠️ SMS 전달 상태 조회 실패 ({group_id}): {result.get('error')}")
+                continue
+            updates = []
+            for message_id, status in result["statuses"].items():
+                if status["delivered"] is None:
+                    continue
+                new_status = "delivered" if status["delivered"] else "undeliverable"
+                updates.append((new_status, status["status_code"], status["status_message"], time.time(), message_id))
+            with self._lock:
+                cursor = self._conn.executemany(
+                    "UPDATE sms_messages SET status = ?, status_code = ?, last_error = ?, updated_at = ? "
+                    "WHERE message_id = ? AND status = 'sent'", updates
+                )
+            updated += max(cursor.rowcount, 0)
+        return updated
+
+    def _run(self):
+        """백그라운드 디스패처 (발송 + 주기적 전달 상태 조회)"""
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                # 한 번에 batch_size건까지 발송하므로 밀린 메시지가 있으면 바로 다음 묶음 처리
+                while self.dispatch_once() >= self.batch_size:
+                    pass
+                if time.time() - self._last_status_check >= self.status_interval:
+                    self._last_status_check = time.time()
+                    self.poll_delivery_once()
+            except Exception as e:
+                print(f"❌ SMS 발송 처리 중 오류: {e}")
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """대기/발송 중인 메시지가 모두 처리될 때까지 대기 (재시도 대기 중인 메시지 포함)"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if not self.get_stats()["active"]:
+                return True
+            self._wake.set()
+            time.sleep(0.05)
+        return False
+
+    def stop(self):
+        """디스패처 종료 (미발송 메시지는 DB에 남아 다음 실행 시 발송)"""
+        self._stop.set()
+        self._wake.set()
+        if self._worker.is_alive():
+            self._worker.join(timeout=5)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """상태별 메시지 수와 발송 지표"""
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM sms_messages GROUP BY status").fetchall())
+        return {
+            "active": sum(counts.get(status, 0) for status in ACTIVE_STATUSES),
+            "by_status": counts,
+            "db_path": self.db_path,
+            **self.metrics
+        }
+
+
+def get_sms_queue(db_path: str) -> SMSQueue:
+    """DB 파일별 프로세스 공용 큐 (세션마다 디스패처가 생기지 않도록)"""
+    db_path = os.path.abspath(db_path)
+    with _queues_lock:
+        if db_path not in _queues:
+            _queues[db_path] = SMSQueue(db_path)
+        return _queues[db_path]
@@ -0,0 +1,146 @@
+"""
+SOLAPI HTTP 클라이언트
+API 키별로 한 번 만들어 두고 재사용하는 연결(keep-alive, 가능하면 HTTP/2)과
+미리 계산한 HMAC 키 상태로 요청마다의 인증/연결 비용을 줄입니다.
+httpx(+h2)가 있으면 HTTP/2를 사용하고, 없으면 requests 세션(HTTP/1.1 연결 풀)을 사용합니다.
+"""
+import hashlib
+import hmac
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTPX_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401 (httpx HTTP/2 지원 여부 확인용)
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class HmacSigner:
+    """SOLAPI v4 HMAC-SHA256 인증 헤더 생성 (시크릿 키 상태는 한 번만 계산)"""
+
+    def __init__(self, api_key: str, api_secret: str):
+        # 키 패딩까지 처리된 HMAC 상태를 만들어 두고 요청마다 copy()로 이어서 계산
+        self._base = hmac.new(api_secret.encode('utf-8'), digestmod=hashlib.sha256)
+        self._prefix = f"HMAC-SHA256 apiKey={api_key}, date="
+        self._date_second = None
+        self._date = ""
+
+    def _utc_date(self) -> str:
+        """ISO8601 UTC 시각 (초 단위라 같은 초 안에서는 다시 만들지 않음)"""
+        now = int(time.time())
+        if now != self._date_second:
+            self._date = datetime.fromtimestamp(now, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            self._date_second = now
+        return self._date
+
+    def signature(self, date: str, salt: str) -> str:
+        """signature = HMAC_SHA256(key=API_SECRET, msg=date + salt)"""
+        mac = self._base.copy()
+        mac.update((date + salt).encode('utf-8'))
+        return mac.hexdigest()
+
+    def authorization(self) -> str:
+        """Authorization 헤더 값 (요청마다 새 salt)"""
+        date = self._utc_date()
+        salt = os.urandom(16).hex()
+        return f"{self._prefix}{date}, salt={salt}, signature={self.signature(date, salt)}"
+
+
+class SolapiClient:
+    """SOLAPI 요청 클라이언트 (연결 재사용 + 인증 헤더 생성)"""
+
+    def __init__(self, api_key: str, api_secret: str, base_url: str = "https://api.solapi.com",
+                 timeout: float = 30.0, max_connections: int = 16, http2: bool = True):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.signer = HmacSigner(api_key, api_secret)
+        self.warmed_up = False
+
+        if HTTPX_AVAILABLE:
+            self.http2 = http2 and H2_AVAILABLE
+            self.transport = "httpx"
+            self._client = httpx.Client(
+                http2=self.http2, timeout=timeout,
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                                    keepalive_expiry=120)
+            )
+        else:
+            import requests
+            from requests.adapters import HTTPAdapter
+            self.http2 = False
+            self.transport = "requests"
+            self._client = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_connections)
+            self._client.mount("https://", adapter)
+            self._client.mount("http://", adapter)
+
+    def headers(self) -> Dict[str, str]:
+        """요청 헤더 (JSON + 인증)"""
+        return {"Content-Type": "application/json", "Authorization": self.signer.authorization()}
+
+    def request(self, method: str, path: str, json: Any = None, params: Optional[Dict[str, Any]] = None,
+                timeout: float = None):
+        """요청 한 번 (응답 객체는 httpx/requests 모두 status_code, text, json() 사용)"""
+        return self._client.request(
+            method, f"{self.base_url}{path}", json=json, params=params,
+            headers=self.headers(), timeout=timeout or self.timeout
+        )
+
+    def post(self, path: str, json: Any, timeout: float = None):
+        return self.request("POST", path, json=json, timeout=timeout)
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None, timeout: float = None):
+        return self.request("GET", path, params=params, timeout=timeout)
+
+    def warm_up(self, connections: int = 1) -> Dict[str, Any]:
+        """연결 미리 열기 (TCP/TLS 핸드셰이크를 첫 발송 전에 끝내 둠, 응답 코드는 무시)"""
+        started = time.perf_counter()
+        errors = []
+        
+        def open_connection():
+            try:
+                self._client.request("HEAD", f"{self.base_url}/", timeout=10)
+            except Exception as e:
+                errors.append(str(e))
+        
+        # 동시에 요청해야 연결이 connections개 열림
+        threads = [threading.Thread(target=open_connection) for _ in range(max(connections, 1))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            print(f"⚠️ SOLAPI 연결 예열 실패: {errors[0]}")
+            return {"success": False, "error": errors[0]}
+        self.warmed_up = True
+        return {"success": True, "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+                "transport": self.transport, "http2": self.http2}
+
+    def close(self):
+        self._client.close()
+
+
+def get_solapi_client(api_key: str, api_secret: str, base_url: str = "https://api.solapi.com") -> SolapiClient:
+    """API 키·주소별 프로세스 공용 클라이언트 (처음 만들 때 백그라운드에서 연결 예열)"""
+    key = (api_key, api_secret, base_url.rstrip("/"))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = SolapiClient(api_key, api_secret, base_url)
+            if api_key and api_secret:
+                threading.Thread(target=client.warm_up, name="solapi-warm-up", daemon=True).start()
+        return client
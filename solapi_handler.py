@@ -1,18 +1,75 @@
 import requests
-import hashlib
-import hmac
+import re
+import threading
 import time
 import json
 import streamlit as st
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 import os
-import secrets
+from config import get_secret
+from solapi_client import get_solapi_client
+
+# send-many 요청 한 번에 담을 수 있는 최대 메시지 수 (SOLAPI v4)
+SEND_MANY_LIMIT = 10000
+SEND_MANY_PATH = "/messages/v4/send-many/detail"
+MESSAGE_LIST_PATH = "/messages/v4/list"
+# 전달 상태 코드 (2000 접수, 3000 이통사 전송 중, 4000 수신 완료, 그 밖의 코드는 전달 실패)
+PENDING_STATUS_CODES = ("2000", "3000")
+DELIVERED_STATUS_CODE = "4000"
+# 속도 제한 대기 최대 시간 (초)
+RATE_LIMIT_TIMEOUT = 30.0
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+_handlers = {}
+_handlers_lock = threading.Lock()
+
+
+def normalize_phone(phone_number: str) -> str:
+    """전화번호에서 숫자만 남김 (010-1234-5678 → 01012345678)"""
+    return re.sub(r"[^0-9]", "", str(phone_number or ""))
+
+
+class TokenBucket:
+    """토큰 버킷 속도 제한 (초당 rate개, 최대 capacity개까지 몰아서 허용)"""
+    
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, tokens: float = 1.0, timeout: float = None) -> bool:
+        """토큰을 얻을 때까지 대기 (timeout 안에 얻지 못하면 False)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+def get_rate_limiter(api_key: str) -> TokenBucket:
+    """API 키별 프로세스 공용 속도 제한 (SOLAPI_REQUESTS_PER_SECOND, 기본 초당 5회)"""
+    with _rate_limiters_lock:
+        if api_key not in _rate_limiters:
+            _rate_limiters[api_key] = TokenBucket(float(get_secret("SOLAPI_REQUESTS_PER_SECOND", 5)))
+        return _rate_limiters[api_key]
+
 
 class SOLAPIHandler:
     """SOLAPI를 사용하여 SMS를 발송하는 핸들러"""
     
-    def __init__(self, api_key: str = None, api_secret: str = None):
+    def __init__(self, api_key: str = None, api_secret: str = None, base_url: str = None):
         """SOLAPI 핸들러 초기화"""
         # API 키 설정 (사이드바 우선, st.secrets 차선, 환경변수 마지막)
         if api_key:
@@ -48,8 +105,12 @@ class SOLAPIHandler:
                 self.api_secret = os.getenv("SOLAPI_API_SECRET", "")
         
         # SOLAPI 기본 설정
-        self.base_url = "https://api.solapi.com"
+        # SOLAPI_BASE_URL로 로컬 테스트 서버(solapi_stub.py) 지정 가능
+        self.base_url = str(base_url or get_secret("SOLAPI_BASE_URL", "https://api.solapi.com")).rstrip("/")
         self.sender = "01012345678"  # 발신자 번호 (기본값)
+        self.rate_limiter = get_rate_limiter(self.api_key)
+        # 연결 재사용 + HMAC 키 상태를 미리 계산해 둔 공용 클라이언트
+        self.client = get_solapi_client(self.api_key, self.api_secret, self.base_url)
         
         if not self.api_key or not self.api_secret:
             st.warning("⚠️ SOLAPI API 키 또는 시크릿이 설정되지 않았습니다.")
@@ -58,48 +119,63 @@ class SOLAPIHandler:
     def _generate_hmac_signature(self, date: str, salt: str) -> str:
         """HMAC-SHA256 서명 생성 (SOLAPI v4 공식 방식)"""
         # signature = HMAC_SHA256( key=API_SECRET, msg=(date + salt) )
-        message = date + salt
-        signature = hmac.new(
-            self.api_secret.encode('utf-8'),
-            message.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
-        return signature
+        return self.client.signer.signature(date, salt)
     
     def _get_auth_headers(self, method: str, path: str, body: str = "") -> Dict[str, str]:
         """인증 헤더 생성 - SOLAPI v4 HMAC-SHA256 방식"""
-        # SOLAPI v4는 반드시 HMAC-SHA256 헤더 인증 필요
-        # 쿼리 파라미터 인증은 지원하지 않음
-        
-        # UTC 시간 생성 (로컬 타임존 금지)
-        from datetime import datetime, timezone
-        date = datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
-        
-        # 랜덤 salt 생성
-        salt = secrets.token_hex(16)
-        
-        # HMAC-SHA256 서명 생성
-        signature = self._generate_hmac_signature(date, salt)
-        
+        # SOLAPI v4는 반드시 HMAC-SHA256 헤더 인증 필요 (쿼리 파라미터 인증은 지원하지 않음)
         # Authorization 헤더 형식: HMAC-SHA256 apiKey=<API_KEY>, date=<ISO8601 UTC Z>, salt=<랜덤>, signature=<HMAC_HEX>
-        auth_header = f"HMAC-SHA256 apiKey={self.api_key}, date={date}, salt={salt}, signature={signature}"
-        
-        return {
-            "Content-Type": "application/json",
-            "Authorization": auth_header
-        }
+        return self.client.headers()
     
     def _get_auth_params(self) -> Dict[str, str]:
         """인증 파라미터 생성 - SOLAPI v4에서는 사용하지 않음"""
         # SOLAPI v4는 쿼리 파라미터 인증을 지원하지 않음
         return {}
     
+    def _format_message(self, message: str, recipient_name: str = "", sender_name: str = "CoreTrust") -> str:
+        """발송할 메시지 내용 구성"""
+        if recipient_name:
+            return f"[{sender_name}]\n{recipient_name}님, {message}"
+        return f"[{sender_name}]\n{message}"
+    
     def send_sms(self, 
                  phone_number: str, 
                  message: str, 
                  recipient_name: str = "",
-                 sender_name: str = "CoreTrust") -> Dict[str, Any]:
-        """SMS 발송"""
+                 sender_name: str = "CoreTrust",
+                 sender: str = None) -> Dict[str, Any]:
+        """SMS 발송 (수신자 한 명, sender를 주면 해당 발신자 번호 사용)"""
+        result = self.send_many(
+            [{"phone_number": phone_number, "message": message, "recipient_name": recipient_name}],
+            sender_name=sender_name, sender=sender
+        )
+        if not result.get("results"):
+            return result
+        
+        item = result["results"][0]
+        if item["success"]:
+            return {
+                "success": True,
+                "message": "SMS가 성공적으로 발송되었습니다. (SOLAPI v4)",
+                "message_id": item.get("message_id", ""),
+                "recipient": item["recipient"],
+                "timestamp": result["timestamp"]
+            }
+        failure = {"success": False, "error": item.get("error", "알 수 없는 오류"), "status": "FAILED"}
+        for key in ("message", "status_code", "response"):
+            if key in item:
+                failure[key] = item[key]
+        return failure
+    
+    def send_many(self,
+                  messages: List[Dict[str, str]],
+                  sender_name: str = "CoreTrust",
+                  sender: str = None) -> Dict[str, Any]:
+        """
+        여러 수신자에게 SMS 일괄 발송.
+        messages: [{"phone_number", "message", "recipient_name"(선택)}]
+        SEND_MANY_LIMIT건씩 send-many 요청 한 번으로 보내고(요청마다 속도 제한 적용), 수신자별 결과를 모아 반환합니다.
+        """
         if not self.api_key or not self.api_secret:
             return {
                 "success": False,
@@ -108,16 +184,39 @@ class SOLAPIHandler:
             }
         
         try:
+            sender = sender or self.sender
+            payload = [
+                {
+                    "to": normalize_phone(item["phone_number"]),
+                    "from": normalize_phone(sender),
+                    "text": self._format_message(item["message"], item.get("recipient_name", ""), sender_name)
+                }
+                for item in messages
+            ]
             
-            # 메시지 내용 구성
-            if recipient_name:
-                full_message = f"[{sender_name}]\n{recipient_name}님, {message}"
-            else:
-                full_message = f"[{sender_name}]\n{message}"
+            results = []
+            group_ids = []
+            for start in range(0, len(payload), SEND_MANY_LIMIT):
+                chunk = payload[start:start + SEND_MANY_LIMIT]
+                if not self.rate_limiter.acquire(timeout=RATE_LIMIT_TIMEOUT):
+                    results.extend(self._chunk_failure(chunk, "발송 요청 속도 제한으로 대기 시간 초과"))
+                    continue
+                chunk_results, group_id = self._post_send_many(chunk)
+                results.extend(chunk_results)
+                if group_id:
+                    group_ids.append(group_id)
             
-            # 여러 SOLAPI API 형식 시도
-            return self._try_multiple_sms_apis(phone_number, full_message)
-                
+            sent = sum(1 for item in results if item["success"])
+            return {
+                "success": bool(results) and sent == len(results),
+                "total": len(results),
+                "sent": sent,
+                "failed": len(results) - sent,
+                "requests": (len(payload) + SEND_MANY_LIMIT - 1) // SEND_MANY_LIMIT,
+                "group_ids": group_ids,
+                "results": results,
+                "timestamp": datetime.now().isoformat()
+            }
         except Exception as e:
             return {
                 "success": False,
@@ -125,123 +224,107 @@ class SOLAPIHandler:
                 "message": "잠시 후 다시 시도해주세요."
             }
     
-    def _try_multiple_sms_apis(self, phone_number: str, message: str) -> Dict[str, Any]:
-        """SOLAPI v4 공식 엔드포인트만 시도 (성공 확인됨)"""
-        
-        # SOLAPI v4 공식 엔드포인트만 사용 (성공 확인됨)
-        api_formats = [
-            {
-                "name": "SOLAPI v4 (공식 엔드포인트)",
-                "path": "/messages/v4/send-many/detail",
-                "data": {
-                    "messages": [
-                        {
-                            "to": phone_number,
-                            "from": "placeholder",  # _try_single_api_format에서 실제 값으로 교체
-                            "text": message
-                        }
-                    ]
-                }
-            }
-        ]
-        
-        # 첫 번째 API 형식만 시도 (이미 성공 확인됨)
+    @staticmethod
+    def _chunk_failure(chunk: List[Dict], error: str, **extra) -> List[Dict[str, Any]]:
+        """묶음 전체 실패 결과"""
+        return [dict({"recipient": message["to"], "success": False, "error": error}, **extra) for message in chunk]
+    
+    def _post_send_many(self, chunk: List[Dict]) -> Tuple[List[Dict[str, Any]], str]:
+        """send-many 요청 한 번 (수신자별 결과, 그룹 ID)"""
         try:
-            result = self._try_single_api_format(api_formats[0])
-            return result
+            response = self.client.post(SEND_MANY_PATH, json={"messages": chunk}, timeout=30)
         except Exception as e:
-            return {
-                "success": False,
-                "error": f"SOLAPI v4 API 호출 실패: {str(e)}",
-                "message": "SOLAPI 고객센터에 문의해주세요."
-            }
+            return self._chunk_failure(chunk, f"SOLAPI v4 API 호출 실패: {str(e)}", message="잠시 후 다시 시도해주세요."), ""
+        
+        if response.status_code == 401:
+            # 권한 부족 오류
+            try:
+                error_msg = response.json().get("errorMessage", "권한이 없습니다")
+            except:
+                error_msg = "권한이 없습니다"
+            return self._chunk_failure(
+                chunk, f"SMS 발송 권한 부족: {error_msg}",
+                message="SOLAPI 대시보드에서 SMS 발송 권한을 확인해주세요.", status_code=401, response=response.text
+            ), ""
+        
+        if response.status_code != 200:
+            error_msg = f"HTTP {response.status_code}"
+            try:
+                error_msg += f" - {json.dumps(response.json(), ensure_ascii=False)}"
+            except:
+                error_msg += f" - {response.text}"
+            return self._chunk_failure(chunk, f"API 호출 실패: {error_msg}", status_code=response.status_code, response=response.text), ""
+        
+        result = response.json()
+        group_info = result.get("groupInfo", {})
+        group_id = group_info.get("_id", "")
+        registered = group_info.get("count", {}).get("registeredSuccess", 0) > 0 or result.get("status") == "SUCCESS"
+        
+        # 수신 번호별 실패/성공 항목 (같은 번호가 여러 번 있으면 순서대로 대응)
+        failed_by_to, sent_by_to = {}, {}
+        for item in result.get("failedMessageList", []):
+            failed_by_to.setdefault(item.get("to"), []).append(item)
+        for item in result.get("messageList", []):
+            sent_by_to.setdefault(item.get("to"), []).append(item)
+        
+        results = []
+        for message in chunk:
+            to = message["to"]
+            if failed_by_to.get(to):
+                failed = failed_by_to[to].pop(0)
+                error = failed.get("statusMessage") or failed.get("errorMessage") or "알 수 없는 오류"
+                results.append({"recipient": to, "success": False, "error": f"SMS 발송 실패: {error}",
+                                "status_code": failed.get("statusCode", "")})
+            elif sent_by_to.get(to):
+                sent = sent_by_to[to].pop(0)
+                results.append({"recipient": to, "success": True, "message_id": sent.get("messageId", group_id)})
+            elif registered:
+                results.append({"recipient": to, "success": True, "message_id": group_id or result.get("messageId", "")})
+            else:
+                results.append({"recipient": to, "success": False,
+                                "error": f"SMS 발송 실패: {result.get('errorMessage', '알 수 없는 오류')}"})
+        return results, group_id
     
-    def _try_single_api_format(self, api_format: Dict) -> Dict[str, Any]:
-        """단일 API 형식으로 SMS 발송 시도"""
+    def get_group_status(self, group_id: str) -> Dict[str, Any]:
+        """
+        발송 그룹의 메시지별 전달 상태 조회.
+        statuses: {messageId: {"status_code", "status_message", "delivered"(전달 완료 True, 실패 False, 진행 중 None)}}
+        """
+        if not self.api_key or not self.api_secret:
+            return {"success": False, "error": "SOLAPI API 키가 설정되지 않았습니다."}
+        
         try:
-            path = api_format["path"]
-            url = f"{self.base_url}{path}"
-            # 발신자 번호를 현재 설정된 값으로 업데이트
-            data = api_format["data"].copy()
-            if "messages" in data and len(data["messages"]) > 0:
-                data["messages"][0]["from"] = self.sender
-            
-            # HMAC-SHA256 인증 헤더 생성
-            headers = self._get_auth_headers("POST", path)
-            
-            # API 호출 - HMAC-SHA256 인증 사용
-            response = requests.post(url, headers=headers, json=data, timeout=30)
-            
-            if response.status_code == 200:
-                result = response.json()
-                
-                # SOLAPI v4 응답 구조에 따른 성공 여부 확인
-                success = False
-                message_id = ""
-                
-                # groupInfo.count.registeredSuccess 확인 (SOLAPI v4)
-                if "groupInfo" in result and "count" in result["groupInfo"]:
-                    count_info = result["groupInfo"]["count"]
-                    if count_info.get("registeredSuccess", 0) > 0:
-                        success = True
-                        message_id = result["groupInfo"].get("_id", "")
+            statuses = {}
+            params = {"groupId": group_id, "limit": 500}
+            while True:
+                if not self.rate_limiter.acquire(timeout=RATE_LIMIT_TIMEOUT):
+                    return {"success": False, "error": "상태 조회 요청 속도 제한으로 대기 시간 초과"}
+                response = self.client.get(MESSAGE_LIST_PATH, params=params, timeout=10)
+                if response.status_code != 200:
+                    return {"success": False, "error": f"HTTP {response.status_code} - {response.text}", "status_code": response.status_code}
                 
-                # 기존 status 필드 확인 (다른 API 형식)
-                elif result.get("status") == "SUCCESS":
-                    success = True
-                    message_id = result.get("messageId", "")
-                
-                if success:
-                    return {
-                        "success": True,
-                        "message": f"SMS가 성공적으로 발송되었습니다. ({api_format['name']})",
-                        "message_id": message_id,
-                        "recipient": data["messages"][0]["to"],
-                        "timestamp": datetime.now().isoformat()
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": f"SMS 발송 실패: {result.get('errorMessage', '알 수 없는 오류')}",
-                        "status": "FAILED"
+                result = response.json()
+                for message_id, message in (result.get("messageList") or {}).items():
+                    status_code = str(message.get("statusCode", ""))
+                    if status_code == DELIVERED_STATUS_CODE:
+                        delivered = True
+                    elif status_code in PENDING_STATUS_CODES:
+                        delivered = None
+                    else:
+                        delivered = False
+                    statuses[message_id] = {
+                        "status_code": status_code,
+                        "status_message": message.get("statusMessage", ""),
+                        "delivered": delivered
                     }
-            elif response.status_code == 401:
-                # 권한 부족 오류
-                try:
-                    error_data = response.json()
-                    error_msg = error_data.get("errorMessage", "권한이 없습니다")
-                except:
-                    error_msg = "권한이 없습니다"
-                
-                return {
-                    "success": False,
-                    "error": f"SMS 발송 권한 부족 ({api_format['name']}): {error_msg}",
-                    "message": "SOLAPI 대시보드에서 SMS 발송 권한을 확인해주세요.",
-                    "status_code": 401,
-                    "response": response.text
-                }
-            else:
-                error_msg = f"HTTP {response.status_code}"
-                try:
-                    error_data = response.json()
-                    error_msg += f" - {json.dumps(error_data, ensure_ascii=False)}"
-                except:
-                    error_msg += f" - {response.text}"
-                
-                return {
-                    "success": False,
-                    "error": f"API 호출 실패 ({api_format['name']}): {error_msg}",
-                    "response": response.text
-                }
                 
+                # 다음 페이지
+                if not result.get("nextKey"):
+                    break
+                params["startKey"] = result["nextKey"]
+            return {"success": True, "group_id": group_id, "statuses": statuses}
         except Exception as e:
-            return {
-                "success": False,
-                "error": f"예상치 못한 오류 ({api_format['name']}): {str(e)}",
-                "message": "잠시 후 다시 시도해주세요."
-            }
-    
-
+            return {"success": False, "error": f"전달 상태 조회 실패: {str(e)}"}
     
     def send_analysis_summary_sms(self, 
                                  phone_number: str, 
@@ -304,13 +387,7 @@ class SOLAPIHandler:
         
         try:
             # 가장 기본적인 연결 테스트 - API 키 검증
-            path = "/"
-            url = f"{self.base_url}{path}"
-            
-            headers = self._get_auth_headers("GET", path)
-            params = self._get_auth_params()
-            
-            response = requests.get(url, headers=headers, params=params, timeout=10)
+            response = self.client.get("/", params=self._get_auth_params(), timeout=10)
             
             # 200이 아니어도 API 키가 유효하다면 연결 성공으로 간주
             if response.status_code in [200, 401, 403]:
@@ -377,6 +454,14 @@ class SOLAPIHandler:
                 "error": str(e)
             }
 
+def get_solapi_handler(api_key: str, api_secret: str, base_url: str = None) -> SOLAPIHandler:
+    """API 키별 프로세스 공용 핸들러 (발송할 때마다 새로 만들지 않도록, 발신자 번호는 발송 시 지정)"""
+    with _handlers_lock:
+        key = (api_key, api_secret, base_url)
+        if key not in _handlers:
+            _handlers[key] = SOLAPIHandler(api_key, api_secret, base_url=base_url)
+        return _handlers[key]
+
 # 사용 예시
 if __name__ == "__main__":
     # 테스트용 핸들러 생성
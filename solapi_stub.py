@@ -0,0 +1,213 @@
+"""
+SOLAPI v4 로컬 테스트 서버
+send-many 발송(/messages/v4/send-many/detail)과 그룹별 메시지 조회(/messages/v4/list)만 흉내 냅니다.
+HMAC-SHA256 인증 헤더를 실제와 같은 방식으로 검증하므로, 키/시크릿이 맞지 않으면 401을 반환합니다.
+
+사용법:
+    python solapi_stub.py --port 8089 --api-key test --api-secret test
+    SOLAPI_BASE_URL=http://127.0.0.1:8089 SOLAPI_API_KEY=test SOLAPI_API_SECRET=test streamlit run app.py
+
+번호 규칙 (장애 상황 재현):
+    000으로 시작하는 번호      → 접수 거절 (failedMessageList)
+    --undeliverable 접두사 번호 → 접수 후 전달 실패 상태
+    --fail-requests N           → 처음 N번의 발송 요청은 HTTP 500
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import re
+import socket
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional
+from urllib.parse import urlparse, parse_qs
+
+_AUTH_PATTERN = re.compile(r"HMAC-SHA256 apiKey=([^,]+), date=([^,]+), salt=([^,]+), signature=([0-9a-f]+)")
+
+
+class SolapiStub:
+    """SOLAPI 로컬 테스트 서버 (스레드에서 실행)"""
+
+    def __init__(self, api_key: str = "test", api_secret: str = "test", port: int = 0,
+                 latency: float = 0.0, fail_requests: int = 0, undeliverable_prefix: str = "0100000",
+                 connect_latency: float = 0.0):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.latency = latency
+        # 새 연결마다 추가할 지연 (TCP/TLS 핸드셰이크 흉내)
+        self.connect_latency = connect_latency
+        self.fail_requests = fail_requests
+        self.undeliverable_prefix = undeliverable_prefix
+
+        self._lock = threading.Lock()
+        # 그룹 ID → {메시지 ID → 메시지}
+        self.groups: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.stats = {"requests": 0, "send_requests": 0, "messages": 0, "unauthorized": 0, "connections": 0}
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self) -> "SolapiStub":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="solapi-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _authorized(self, header: Optional[str]) -> bool:
+        """Authorization 헤더 검증 (signature = HMAC_SHA256(secret, date + salt))"""
+        match = _AUTH_PATTERN.fullmatch(header or "")
+        if not match:
+            return False
+        api_key, date, salt, signature = match.groups()
+        expected = hmac.new(self.api_secret.encode("utf-8"), (date + salt).encode("utf-8"), hashlib.sha256).hexdigest()
+        return api_key == self.api_key and hmac.compare_digest(signature, expected)
+
+    def _send_many(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """발송 요청 처리 (000 번호는 접수 거절)"""
+        group_id = "G4V" + uuid.uuid4().hex[:20].upper()
+        failed, accepted = [], []
+        with self._lock:
+            group = self.groups.setdefault(group_id, {})
+            for message in body.get("messages", []):
+                if message.get("to", "").startswith("000"):
+                    failed.append({"to": message.get("to"), "from": message.get("from"),
+                                   "statusCode": "1062", "statusMessage": "유효하지 않은 수신번호"})
+                    continue
+                message_id = "M4V" + uuid.uuid4().hex[:20].upper()
+                stored = {"messageId": message_id, "groupId": group_id, "to": message.get("to"),
+                          "from": message.get("from"), "text": message.get("text"), "statusCode": "2000",
+                          "statusMessage": "정상 접수(이통사로 접수 예정)", "accepted_at": time.time()}
+                group[message_id] = stored
+                accepted.append({k: v for k, v in stored.items() if k != "accepted_at"})
+            self.stats["messages"] += len(accepted)
+        return {
+            "groupInfo": {"_id": group_id, "count": {"total": len(failed) + len(accepted),
+                                                     "registeredSuccess": len(accepted), "registeredFailed": len(failed)}},
+            "failedMessageList": failed,
+            "messageList": accepted
+        }
+
+    def _list(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """그룹별 메시지 조회 (접수된 메시지는 조회 시점에 전달 완료/실패로 확정)"""
+        group_id = (query.get("groupId") or [""])[0]
+        with self._lock:
+            messages = self.groups.get(group_id, {})
+            for message in messages.values():
+                if message["statusCode"] == "2000":
+                    if message["to"].startswith(self.undeliverable_prefix):
+                        message["statusCode"], message["statusMessage"] = "3059", "수신번호 없음"
+                    else:
+                        message["statusCode"], message["statusMessage"] = "4000", "수신완료"
+            return {"messageList": {message_id: {k: v for k, v in message.items() if k != "accepted_at"}
+                                    for message_id, message in messages.items()}, "nextKey": None}
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                # 헤더/본문을 따로 쓰므로 Nagle 지연(keep-alive 연결에서 ~40ms) 방지
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with stub._lock:
+                    stub.stats["connections"] += 1
+                if stub.connect_latency:
+                    time.sleep(stub.connect_latency)
+
+            def _reply(self, status: int, payload: Dict[str, Any]):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _begin(self) -> bool:
+                with stub._lock:
+                    stub.stats["requests"] += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if not stub._authorized(self.headers.get("Authorization")):
+                    with stub._lock:
+                        stub.stats["unauthorized"] += 1
+                    self._reply(401, {"errorCode": "Unauthorized", "errorMessage": "권한이 없습니다"})
+                    return False
+                return True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                if not self._begin():
+                    return
+                if urlparse(self.path).path != "/messages/v4/send-many/detail":
+                    self._reply(404, {"errorCode": "NotFound", "errorMessage": self.path})
+                    return
+                with stub._lock:
+                    stub.stats["send_requests"] += 1
+                    failing = stub.stats["send_requests"] <= stub.fail_requests
+                if failing:
+                    self._reply(500, {"errorCode": "InternalError", "errorMessage": "일시적인 서버 오류"})
+                    return
+                self._reply(200, stub._send_many(json.loads(raw or b"{}")))
+
+            def do_HEAD(self):
+                # 연결 예열용 (인증 없이 200)
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_GET(self):
+                if not self._begin():
+                    return
+                parsed = urlparse(self.path)
+                if parsed.path == "/messages/v4/list":
+                    self._reply(200, stub._list(parse_qs(parsed.query)))
+                else:
+                    self._reply(404, {"errorCode": "NotFound", "errorMessage": self.path})
+
+        return Handler
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="SOLAPI v4 로컬 테스트 서버")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--api-key", default="test")
+    parser.add_argument("--api-secret", default="test")
+    parser.add_argument("--latency", type=float, default=0.0, help="요청마다 추가할 지연 (초)")
+    parser.add_argument("--connect-latency", type=float, default=0.0, help="새 연결마다 추가할 지연 (초)")
+    parser.add_argument("--fail-requests", type=int, default=0, help="처음 N번의 발송 요청은 HTTP 500")
+    parser.add_argument("--undeliverable", default="0100000", help="전달 실패로 처리할 번호 접두사")
+    args = parser.parse_args(argv)
+
+    stub = SolapiStub(args.api_key, args.api_secret, port=args.port, latency=args.latency,
+                      fail_requests=args.fail_requests, undeliverable_prefix=args.undeliverable,
+                      connect_latency=args.connect_latency)
+    print(f"✅ SOLAPI 테스트 서버 실행: {stub.base_url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
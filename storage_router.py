@@ -0,0 +1,522 @@
+"""
+저장소 라우터 (MongoDB 우선, 로컬 저장소 폴백)
+화면 코드는 저장소를 직접 고르지 않고 StorageRouter 하나로 저장/조회합니다.
+- 서킷 브레이커 + 백그라운드 ping으로 MongoDB 장애 중에는 요청마다 연결 타임아웃을 기다리지 않고 바로 로컬로 보냅니다.
+- 장애 중 로컬에만 저장된 분석/피드백은 조정 로그에 남겼다가 MongoDB가 복구되면 같은 ID로 다시 저장합니다.
+- 최근 저장한 분석은 저장소 반영 전이라도 이력 첫 페이지에 포함합니다 (read-your-writes).
+- 저장소/연산별 지연 시간(p50/p99)과 실패 수를 집계합니다.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Any, Optional, Callable
+
+from config import get_secret
+from history_feed import matches_query
+from history_row import HistoryRow
+from render_cache import fragments_from_analysis, fragments_from_stored
+from write_behind import new_analysis_id
+
+_routers = {}
+_routers_lock = threading.Lock()
+
+MONGODB = "mongodb"
+LOCAL = "local"
+
+
+class CircuitBreaker:
+    """연속 실패 시 일정 시간 요청을 막고, 이후 한 번만 시험 요청을 허용 (closed → open → half_open)"""
+
+    def __init__(self, failure_threshold: int = 2, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """요청을 보내도 되는지 (open 상태에서 reset_timeout이 지나면 시험 요청 하나만 허용)"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.time() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                return True
+            return False
+
+    def record_success(self) -> bool:
+        """성공 기록 (닫힌 상태로 바뀌었으면 True)"""
+        with self._lock:
+            recovered = self.state != "closed"
+            self.state = "closed"
+            self.failures = 0
+            return recovered
+
+    def record_failure(self, trip: bool = False):
+        """실패 기록 (trip=True이면 횟수와 관계없이 바로 open)"""
+        with self._lock:
+            self.failures += 1
+            if trip or self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"⚠️ MongoDB 서킷 열림 ({self.reset_timeout:.0f}초 동안 로컬 저장소 사용)")
+                self.state = "open"
+                self.opened_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures}
+
+
+class LatencyMetrics:
+    """저장소/연산별 호출 수, 실패 수, 최근 지연 시간(p50/p99)"""
+
+    WINDOW = 500
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ops = {}
+
+    def record(self, backend: str, op: str, elapsed_ms: float, ok: bool):
+        with self._lock:
+            entry = self._ops.get((backend, op))
+            if entry is None:
+                entry = self._ops[(backend, op)] = {"count": 0, "errors": 0, "latencies": deque(maxlen=self.WINDOW)}
+            entry["count"] += 1
+            if not ok:
+                entry["errors"] += 1
+            entry["latencies"].append(elapsed_ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """{"mongodb.save_analysis": {count, errors, p50_ms, p99_ms}, ...}"""
+        with self._lock:
+            result = {}
+            for (backend, op), entry in self._ops.items():
+                latencies = sorted(entry["latencies"])
+                result[f"{backend}.{op}"] = {
+                    "count": entry["count"],
+                    "errors": entry["errors"],
+                    "p50_ms": round(latencies[int(0.50 * (len(latencies) - 1))], 3) if latencies else 0.0,
+                    "p99_ms": round(latencies[int(0.99 * (len(latencies) - 1))], 3) if latencies else 0.0
+                }
+            return result
+
+
+class StorageRouter:
+    """MongoDB/로컬 저장소 선택, 장애 중 이중 기록과 복구 후 조정"""
+
+    RECENT_WRITES = 200
+    RECENT_WRITE_TTL = 300
+
+    def __init__(self, reconcile_path: str, failure_threshold: int = 2, reset_timeout: float = 30.0,
+                 health_interval: float = 5.0):
+        self.reconcile_path = reconcile_path
+        self.health_interval = health_interval
+        self.mongo_handler = None
+        self.local_db = None
+        self.render_cache = None
+
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.metrics = LatencyMetrics()
+        self.counters = {"fallbacks": 0, "short_circuited": 0, "reconciled": 0}
+
+        self._recent = OrderedDict()
+        self._recent_lock = threading.Lock()
+        self._reconcile_lock = threading.Lock()
+        self._reconciling = threading.Lock()
+        self._pending = OrderedDict()
+        self._stop = threading.Event()
+
+        os.makedirs(os.path.dirname(os.path.abspath(reconcile_path)), exist_ok=True)
+        self._load_reconcile_log()
+
+        # 상태 확인 스레드는 MongoDB 핸들러가 연결된 뒤(attach) 시작
+        self._monitor = threading.Thread(target=self._monitor_health, name="storage-health", daemon=True)
+
+    def attach(self, mongo_handler=None, local_db=None, render_cache=None):
+        """저장소 연결 (세션마다 호출되어도 마지막 핸들러 사용)"""
+        if mongo_handler is not None:
+            self.mongo_handler = mongo_handler
+        if local_db is not None:
+            self.local_db = local_db
+        if render_cache is not None:
+            self.render_cache = render_cache
+        if self.mongo_handler is not None and not self._monitor.is_alive() and not self._stop.is_set():
+            self._monitor.start()
+
+    # ---------- 상태 확인 ----------
+
+    def mongo_available(self) -> bool:
+        """MongoDB로 요청을 보낼 수 있는지 (서킷이 열려 있으면 False - 연결 시도 없음)"""
+        return self.mongo_handler is not None and self.breaker.snapshot()["state"] != "open"
+
+    def _ping(self) -> bool:
+        client = getattr(self.mongo_handler, 'client', None)
+        if client is None:
+            return False
+        try:
+            client.admin.command('ping')
+            return True
+        except Exception:
+            return False
+
+    def _monitor_health(self):
+        """주기적으로 ping해 서킷 상태 갱신 (요청 스레드 대신 이 스레드가 타임아웃을 기다림)"""
+        while not self._stop.wait(self.health_interval):
+            started = time.perf_counter()
+            ok = self._ping()
+            self.metrics.record(MONGODB, "ping", (time.perf_counter() - started) * 1000, ok)
+            if ok:
+                if self.breaker.record_success():
+                    print("✅ MongoDB 복구 확인 - 서킷 닫힘")
+                if self._pending:
+                    self.reconcile()
+            else:
+                self.breaker.record_failure(trip=True)
+
+    # ---------- 호출 공통 ----------
+
+    def _call(self, backend: str, op: str, func: Callable, *args, failed: Callable = None, **kwargs):
+        """저장소 호출 + 지연 시간/실패 기록 (MongoDB 실패는 서킷에 반영)"""
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+            is_failure = failed(result) if failed else False
+        except Exception as e:
+            print(f"❌ {backend} {op} 오류: {e}")
+            result, is_failure = None, True
+        self.metrics.record(backend, op, (time.perf_counter() - started) * 1000, not is_failure)
+        if backend == MONGODB:
+            if is_failure:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+        return None if is_failure else result
+
+    def _use_mongo(self) -> bool:
+        """이번 요청을 MongoDB로 보낼지 (서킷이 막으면 바로 로컬로)"""
+        if self.mongo_handler is None:
+            return False
+        if self.breaker.allow():
+            return True
+        self.counters["short_circuited"] += 1
+        return False
+
+    @staticmethod
+    def _not_success(result) -> bool:
+        return not (isinstance(result, dict) and result.get('success'))
+
+    # ---------- 조정 로그 (장애 중 로컬에만 기록된 항목) ----------
+
+    def _append_reconcile(self, record: Dict):
+        """조정 로그에 한 줄 추가 (_reconcile_lock 안에서 호출)"""
+        with open(self.reconcile_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite_reconcile(self):
+        """남은 항목만으로 조정 로그 재작성 (_reconcile_lock 안에서 호출)"""
+        temp_file = self.reconcile_path + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            for record in self._pending.values():
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.reconcile_path)
+
+    def _load_reconcile_log(self):
+        """재시작 시 아직 MongoDB에 반영되지 않은 항목 복구"""
+        if not os.path.exists(self.reconcile_path):
+            return
+        try:
+            with open(self.reconcile_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 기록 도중 중단된 마지막 줄은 무시
+                        continue
+                    if record.get('op') == 'done':
+                        self._pending.pop(record.get('id'), None)
+                    elif record.get('id'):
+                        self._pending[record['id']] = record
+            with self._reconcile_lock:
+                self._rewrite_reconcile()
+            if self._pending:
+                print(f"✅ MongoDB 반영 대기 항목 {len(self._pending)}건 복구")
+        except Exception as e:
+            print(f"❌ 조정 로그 복구 실패: {e}")
+
+    def _queue_reconcile(self, record: Dict):
+        try:
+            with self._reconcile_lock:
+                self._append_reconcile(record)
+                self._pending[record['id']] = record
+        except Exception as e:
+            print(f"⚠️ 조정 로그 기록 실패: {e}")
+
+    def reconcile(self, limit: int = 500) -> Dict[str, int]:
+        """장애 중 로컬에만 저장된 항목을 같은 ID로 MongoDB에 저장 (동시에 한 번만 실행)"""
+        if not self._reconciling.acquire(blocking=False):
+            return {"reconciled": 0, "remaining": len(self._pending)}
+        reconciled = 0
+        try:
+            for record in list(self._pending.values())[:limit]:
+                if not self.mongo_available():
+                    break
+                if record['op'] == 'analysis':
+                    result = self._call(MONGODB, "save_analysis", self.mongo_handler.save_analysis,
+                                        record['analysis_result'], record['inquiry_data'],
+                                        document_id=record['id'], failed=self._not_success)
+                else:
+                    result = self._call(MONGODB, "save_feedback", self.mongo_handler.save_feedback,
+                                        record['analysis_id'], record['feedback_type'],
+                                        record.get('user_name', ''), record.get('user_role', ''),
+                                        failed=self._not_success)
+                if result is None:
+                    break
+                reconciled += 1
+                with self._reconcile_lock:
+                    self._pending.pop(record['id'], None)
+                    self._append_reconcile({"op": "done", "id": record['id']})
+                    if not self._pending:
+                        self._rewrite_reconcile()
+            if reconciled:
+                self.counters["reconciled"] += reconciled
+                print(f"✅ 장애 중 로컬 저장 항목 {reconciled}건을 MongoDB에 반영")
+        except Exception as e:
+            print(f"❌ MongoDB 조정 실패: {e}")
+        finally:
+            self._reconciling.release()
+        return {"reconciled": reconciled, "remaining": len(self._pending)}
+
+    # ---------- read-your-writes ----------
+
+    def remember_write(self, analysis_id: str, analysis_result: Dict, inquiry_data: Dict):
+        """방금 저장(예약)한 분석을 이력 조회에 바로 보이도록 기록"""
+        parsed = analysis_result.get('parsed_response') or analysis_result.get('gemini_result', {}).get('parsed_response') or {}
+        row = HistoryRow.from_entry({
+            '_id': analysis_id,
+            'timestamp': inquiry_data.get('timestamp', ''),
+            'customer_name': inquiry_data.get('customer_name', ''),
+            'issue_type': analysis_result.get('issue_type', ''),
+            'priority': inquiry_data.get('priority', ''),
+            'user_name': inquiry_data.get('user_name', ''),
+            'user_role': inquiry_data.get('user_role', ''),
+            'response_type': parsed.get('response_type', '') if isinstance(parsed, dict) else ''
+        })
+        with self._recent_lock:
+            self._recent[analysis_id] = (time.time(), row)
+            self._recent.move_to_end(analysis_id)
+            while len(self._recent) > self.RECENT_WRITES:
+                self._recent.popitem(last=False)
+
+    def merge_recent_writes(self, query: Optional[Dict], result: Dict) -> Dict:
+        """이력 첫 페이지에 아직 보이지 않는 최근 저장 분석을 추가 (최신순 유지)"""
+        if not result.get('success'):
+            return result
+        cutoff = time.time() - self.RECENT_WRITE_TTL
+        with self._recent_lock:
+            recent = [row for written_at, row in self._recent.values() if written_at >= cutoff and matches_query(query, row)]
+        if not recent:
+            return result
+        rows = list(result.get('data') or [])
+        # 로컬 저장소 행은 ID 체계가 달라 (시각, 고객사, 담당자)로도 비교
+        seen = {row.id for row in rows} | {(row.timestamp, row.customer_name, row.user_name) for row in rows}
+        missing = [row for row in recent if row.id not in seen and (row.timestamp, row.customer_name, row.user_name) not in seen]
+        if missing:
+            rows = sorted(rows + missing, key=lambda row: row.timestamp, reverse=True)
+            result = dict(result, data=rows)
+        return result
+
+    # ---------- 상세보기 렌더 캐시 ----------
+
+    def _cache_render(self, analysis_id: str, analysis_result: Dict, inquiry_data: Dict):
+        """저장한 분석의 상세보기 조각을 미리 만들어 기록"""
+        if self.render_cache is None:
+            return
+        try:
+            self.render_cache.put(analysis_id, fragments_from_analysis(analysis_result, inquiry_data))
+        except Exception as e:
+            print(f"⚠️ 상세보기 조각 생성 실패 (ID: {analysis_id}): {e}")
+
+    def get_analysis_fragments(self, analysis_id: str = None, customer_name: str = None, issue_type: str = None,
+                               user_name: str = None, date: str = None) -> Optional[Dict]:
+        """
+        이력 상세보기 조각 조회 (없으면 None).
+        분석 ID가 있으면 렌더 캐시, 없으면 그 ID의 문서 한 건을 조회해 조각을 만들고 캐시에 기록합니다.
+        분석 ID가 없는 행만 조건 조회(같은 날 가장 최근 분석)로 표시하며, 이 결과는 캐시에 기록하지 않습니다.
+        """
+        if analysis_id:
+            if self.render_cache is not None:
+                fragments = self.render_cache.get(analysis_id)
+                if fragments is not None:
+                    return fragments
+            result = self.get_analysis_by_id(analysis_id)
+            if not result or not result.get('data'):
+                return None
+            fragments = fragments_from_stored(result['data'])
+            if self.render_cache is not None:
+                self.render_cache.put(analysis_id, fragments)
+            return fragments
+
+        result = self.get_analysis(customer_name=customer_name, issue_type=issue_type,
+                                   user_name=user_name, date=date)
+        if not result or not result.get('data'):
+            return None
+        return fragments_from_stored(result['data'])
+
+    # ---------- 저장 / 조회 API ----------
+
+    def save_analysis(self, analysis_result: Dict, inquiry_data: Dict, analysis_id: str = None) -> Dict:
+        """분석 결과 저장 (MongoDB 실패/장애 시 로컬 저장 후 복구되면 MongoDB에 반영)"""
+        analysis_id = analysis_id or new_analysis_id()
+        if self._use_mongo():
+            result = self._call(MONGODB, "save_analysis", self.mongo_handler.save_analysis,
+                                analysis_result, inquiry_data, document_id=analysis_id, failed=self._not_success)
+            if result is not None:
+                self.remember_write(analysis_id, analysis_result, inquiry_data)
+                self._cache_render(analysis_id, analysis_result, inquiry_data)
+                return result
+
+        if self.local_db is None:
+            return {"success": False, "error": "사용 가능한 저장소가 없습니다"}
+        result = self._call(LOCAL, "save_analysis", self.local_db.save_analysis,
+                            analysis_result, inquiry_data, analysis_id=analysis_id, failed=self._not_success)
+        if result is None:
+            return {"success": False, "error": "로컬 저장 실패"}
+        self.counters["fallbacks"] += 1
+        self.remember_write(analysis_id, analysis_result, inquiry_data)
+        self._cache_render(analysis_id, analysis_result, inquiry_data)
+        if self.mongo_handler is not None:
+            self._queue_reconcile({"op": "analysis", "id": analysis_id,
+                                   "analysis_result": analysis_result, "inquiry_data": inquiry_data})
+        return result
+
+    def get_history_page(self, query: Optional[Dict], cursor: str = None, source: str = None,
+                         page_size: int = 50) -> Dict:
+        """
+        이력 한 페이지 조회 (data는 HistoryRow 목록, source는 조회한 저장소).
+        다음 페이지는 첫 페이지와 같은 저장소(source)에서만 이어서 조회합니다.
+        """
+        query = query or {}
+        empty = {"success": False, "data": [], "next_cursor": None, "has_more": False}
+        if cursor and source == MONGODB and not self.mongo_available():
+            return dict(empty, source=MONGODB)
+
+        if source != LOCAL and self._use_mongo():
+            result = self._call(MONGODB, "get_history_page", self.mongo_handler.get_history_page,
+                                cursor=cursor, page_size=page_size,
+                                date_from=query.get('date_from'), date_to=query.get('date_to'),
+                                issue_type=query.get('issue_type'), user_id=query.get('user_name'),
+                                table_only=True, failed=self._not_success)
+            if result is not None:
+                result['source'] = MONGODB
+                return self.merge_recent_writes(query, result) if cursor is None else result
+            if cursor:
+                return dict(empty, source=MONGODB)
+
+        if self.local_db is None:
+            return dict(empty, source=LOCAL)
+        result = self._call(LOCAL, "get_history_page", self.local_db.get_history_page,
+                            cursor=cursor, page_size=page_size, issue_type=query.get('issue_type'),
+                            date_from=query.get('date_from'), date_to=query.get('date_to'),
+                            user_name=query.get('user_name'), failed=self._not_success)
+        if result is None:
+            return dict(empty, source=LOCAL)
+        result['data'] = [HistoryRow.from_entry(entry) for entry in result.get('data', [])]
+        result['source'] = LOCAL
+        return self.merge_recent_writes(query, result) if cursor is None else result
+
+    def get_analysis_by_id(self, analysis_id: str) -> Optional[Dict]:
+        """분석 ID로 이력 한 건 조회 (MongoDB → 로컬 저장소, 없으면 None)"""
+        if self._use_mongo():
+            # 문서가 없는 경우도 success=False이므로 예외만 장애로 봄
+            result = self._call(MONGODB, "get_analysis_by_id", self.mongo_handler.get_analysis_by_id, analysis_id)
+            if result and result.get('success'):
+                return result
+        if self.local_db is not None:
+            result = self._call(LOCAL, "get_analysis_by_id", self.local_db.get_analysis_by_id, analysis_id)
+            if result and result.get('success'):
+                return result
+        return None
+
+    def get_analysis(self, customer_name: str = None, issue_type: str = None, user_name: str = None,
+                     date: str = None) -> Optional[Dict]:
+        """이력 상세용 분석 결과 조회 (MongoDB → 로컬 저장소, 없으면 None)"""
+        if self._use_mongo():
+            # 조건에 맞는 결과가 없는 경우도 success=False이므로 예외만 장애로 봄
+            result = self._call(MONGODB, "get_analysis", self.mongo_handler.get_analysis_by_criteria,
+                                customer_name=customer_name, issue_type=issue_type, user_name=user_name, date=date)
+            if result and result.get('success'):
+                return result
+        if self.local_db is not None:
+            result = self._call(LOCAL, "get_analysis", self.local_db.get_analysis_by_customer_and_date,
+                                customer_name, date)
+            if result and result.get('success'):
+                return result
+        return None
+
+    def save_feedback(self, analysis_id, feedback_type: str, user_name: str = "", user_role: str = "") -> Dict:
+        """피드백 저장 (MongoDB 장애 시 로컬 저장 후 복구되면 MongoDB에 반영)"""
+        if self._use_mongo():
+            result = self._call(MONGODB, "save_feedback", self.mongo_handler.save_feedback,
+                                analysis_id, feedback_type, user_name, user_role, failed=self._not_success)
+            if result is not None:
+                return result
+
+        if self.local_db is None:
+            return {"success": False, "error": "사용 가능한 저장소가 없습니다"}
+        result = self._call(LOCAL, "save_feedback", self.local_db.save_feedback,
+                            analysis_id, feedback_type, user_name, user_role, failed=self._not_success)
+        if result is None:
+            return {"success": False, "error": "피드백 저장 실패"}
+        self.counters["fallbacks"] += 1
+        if self.mongo_handler is not None:
+            self._queue_reconcile({"op": "feedback", "id": f"feedback:{new_analysis_id()}",
+                                   "analysis_id": analysis_id, "feedback_type": feedback_type,
+                                   "user_name": user_name, "user_role": user_role})
+        return result
+
+    def get_liked_responses(self, issue_type: str = None, limit: int = 3) -> List[Dict]:
+        """좋아요를 받은 응답 조회 (AI 학습용)"""
+        if self._use_mongo():
+            result = self._call(MONGODB, "get_liked_responses", self.mongo_handler.get_liked_responses, issue_type, limit)
+            if result is not None:
+                return result
+        if self.local_db is None:
+            return []
+        return self._call(LOCAL, "get_liked_responses", self.local_db.get_liked_responses, issue_type, limit) or []
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """라우터 상태 (서킷, 반영 대기 수, 저장소/연산별 지연 시간)"""
+        return {
+            "mongodb_attached": self.mongo_handler is not None,
+            "circuit": self.breaker.snapshot(),
+            "pending_reconcile": len(self._pending),
+            **self.counters,
+            "operations": self.metrics.snapshot()
+        }
+
+    def stop(self):
+        """상태 확인 스레드 종료"""
+        self._stop.set()
+        if self._monitor.is_alive():
+            self._monitor.join(timeout=5)
+
+
+def get_storage_router(reconcile_path: str) -> StorageRouter:
+    """조정 로그별 프로세스 공용 라우터 (서킷/지표/조정 로그를 세션 간에 공유)"""
+    reconcile_path = os.path.abspath(reconcile_path)
+    with _routers_lock:
+        if reconcile_path not in _routers:
+            _routers[reconcile_path] = StorageRouter(
+                reconcile_path,
+                failure_threshold=int(get_secret("STORAGE_FAILURE_THRESHOLD", 2)),
+                reset_timeout=float(get_secret("STORAGE_RESET_TIMEOUT", 30)),
+                health_interval=float(get_secret("STORAGE_HEALTH_INTERVAL", 5))
+            )
+        return _routers[reconcile_path]
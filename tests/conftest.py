@@ -0,0 +1,18 @@
+"""
+테스트 공통 설정
+config 모듈은 import 시점에 st.secrets를 읽으므로, secrets.toml이 없는 환경에서는
+빈 secrets 파일을 지정해 환경변수 설정으로 동작하게 합니다.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+import streamlit as st
+
+if not any(os.path.exists(path) for path in st.config.get_option("secrets.files")):
+    _secrets_dir = tempfile.mkdtemp(prefix="privkeeper_test_secrets_")
+    _secrets_file = os.path.join(_secrets_dir, "secrets.toml")
+    open(_secrets_file, "w").close()
+    st.config.set_option("secrets.files", [_secrets_file])
+    atexit.register(shutil.rmtree, _secrets_dir, ignore_errors=True)
@@ -0,0 +1,52 @@
+"""
+압축 blob 복원 실패 처리 회귀 테스트
+사전이 없는 blob은 빈 문자열로 조용히 바뀌지 않고 오류로 드러나야 합니다.
+"""
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from blob_store import BlobStore, BlobDecodeError, DECODE_ERROR_TEXT  # noqa: E402
+import migrate_to_mongodb  # noqa: E402
+
+RESPONSE = "고객님, 문의하신 Onvif 응답 없음 문제는 프로토콜 설정을 확인해 주세요. " * 20
+
+
+def packed_with_missing_dict(tmp_path):
+    store = BlobStore(dict_dir=str(tmp_path / "blobs"), template_path="")
+    packed = store.pack({"raw_response": RESPONSE})
+    packed["raw_response"]["dict"] = "0000000000000000"
+    return store, packed
+
+
+def test_round_trip(tmp_path):
+    store = BlobStore(dict_dir=str(tmp_path / "blobs"), template_path="")
+    assert store.unpack(store.pack({"raw_response": RESPONSE}), strict=True) == {"raw_response": RESPONSE}
+
+
+def test_missing_dictionary_raises(tmp_path):
+    store, packed = packed_with_missing_dict(tmp_path)
+    with pytest.raises(BlobDecodeError):
+        store.decode(packed["raw_response"])
+    with pytest.raises(BlobDecodeError):
+        store.unpack(packed, strict=True)
+    assert store.unpack(packed) == {"raw_response": DECODE_ERROR_TEXT}
+
+
+def test_migration_skips_and_reports_undecodable_entries(tmp_path):
+    _, packed = packed_with_missing_dict(tmp_path)
+    source = tmp_path / "analysis_history.json"
+    source.write_text(json.dumps([
+        {"analysis_id": "a" * 24, "full_analysis_result": packed},
+        {"analysis_id": "b" * 24, "full_analysis_result": {"raw_response": "짧은 응답"}}
+    ], ensure_ascii=False), encoding="utf-8")
+
+    failures = []
+    items = list(migrate_to_mongodb.iter_history_items(str(source), failures))
+    assert [item["document_id"] for item in items] == ["b" * 24]
+    assert failures == ["a" * 24]
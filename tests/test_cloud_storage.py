@@ -0,0 +1,72 @@
+"""
+클라우드 임시 저장소(CloudDataStorage) 회귀 테스트
+이력이 메모리 한도보다 커져도 메모리에는 한도만큼만 남고, 저장은 추가된 항목만 계산해야 합니다.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from multi_user_database import CloudDataStorage  # noqa: E402
+
+
+def entry(i):
+    return {"id": i, "summary": f"분석 결과 {i} " + "내용 " * 50}
+
+
+def test_resident_memory_stays_within_budget_as_history_grows(tmp_path):
+    storage = CloudDataStorage(max_bytes=32 * 1024, spill_dir=str(tmp_path))
+    history = []
+    for i in range(600):
+        history = storage.load("cloud_global_history") or []
+        history.append(entry(i))
+        assert storage.save("cloud_global_history", history)
+        assert storage.hot_bytes <= storage.max_bytes
+
+    stats = storage.get_memory_stats()
+    assert stats["spilled_segments"] > 0
+    assert stats["full_rewrites"] == 0
+    assert storage.load("cloud_global_history") == [entry(i) for i in range(600)]
+
+
+def test_save_measures_only_appended_entries(tmp_path, monkeypatch):
+    storage = CloudDataStorage(max_bytes=64 * 1024, spill_dir=str(tmp_path))
+    storage.save("key", [entry(i) for i in range(500)])
+    history = storage.load("key")
+
+    measured = []
+    monkeypatch.setattr(CloudDataStorage, "_entry_size", staticmethod(lambda item: measured.append(item) or 100))
+    history.append(entry(500))
+    storage.save("key", history)
+    assert measured == [entry(500)]
+
+
+def test_rewritten_list_replaces_previous_contents(tmp_path):
+    storage = CloudDataStorage(max_bytes=16 * 1024, spill_dir=str(tmp_path))
+    storage.save("key", [entry(i) for i in range(300)])
+    storage.save("key", [entry(i) for i in range(0, 300, 2)])
+    assert storage.load("key") == [entry(i) for i in range(0, 300, 2)]
+
+    storage.clear()
+    assert storage.load("key") is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_sessions_share_one_store_and_spill_directory(monkeypatch):
+    import multi_user_database
+    from multi_user_database import MultiUserHistoryDB
+
+    monkeypatch.setenv("STREAMLIT_SERVER_RUNNING", "true")
+    monkeypatch.setattr(multi_user_database, "_cloud_storage", None)
+    first, second = MultiUserHistoryDB(), MultiUserHistoryDB()
+    assert first.cloud_storage is second.cloud_storage
+    assert first.stats is second.stats
+
+    analysis = {"issue_type": "A", "parsed_response": {"summary": "요약"}}
+    assert first.save_analysis(analysis, {"user_name": "kim", "customer_name": "고객사"})["success"]
+    assert second.get_statistics()["total_analyses"] == 1
+
+    storage = first.cloud_storage
+    storage.close()
+    assert not os.path.exists(storage.spill_dir)
@@ -0,0 +1,27 @@
+"""
+일별 집계(history_daily_rollup) 회귀 테스트 (인메모리 MongoDB 백엔드)
+이력 삭제는 저장 때 올린 KST 일자 집계를 그대로 내려야 합니다.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mongodb_handler import MongoDBHandler  # noqa: E402
+
+
+def rollup_counts(handler):
+    return {doc["_id"]["day"]: doc["count"] for doc in handler.rollup_collection.find({})}
+
+
+def test_delete_early_morning_kst_entry_decrements_its_own_day():
+    handler = MongoDBHandler(connection_string="memory://rollup-delete", run_migrations=False)
+    handler.rebuild_daily_rollup()
+
+    early = handler.save_analysis({"issue_type": "A"}, {"user_name": "kim", "timestamp": "2026-10-19T03:00:00"})
+    handler.save_analysis({"issue_type": "A"}, {"user_name": "kim", "timestamp": "2026-10-18T20:00:00"})
+    assert rollup_counts(handler) == {"2026-10-19": 1, "2026-10-18": 1}
+
+    assert handler.delete_history(early["id"])["success"]
+    assert rollup_counts(handler) == {"2026-10-18": 1}
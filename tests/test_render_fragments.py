@@ -0,0 +1,58 @@
+"""
+상세보기 렌더 조각 조회 회귀 테스트
+렌더 캐시에 없는 분석은 그 분석 ID의 문서를 읽어야 하며,
+같은 고객사/같은 날의 다른 분석 내용이 그 ID로 캐시되면 안 됩니다.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mongodb_handler import MongoDBHandler  # noqa: E402
+from multi_user_database import MultiUserHistoryDB  # noqa: E402
+from render_cache import RenderCache  # noqa: E402
+from storage_router import StorageRouter  # noqa: E402
+
+
+def analysis(summary):
+    return {"issue_type": "A", "parsed_response": {"response_type": "해결안", "summary": summary}}
+
+
+def inquiry(timestamp):
+    return {"customer_name": "고객사", "user_name": "kim", "timestamp": timestamp}
+
+
+@pytest.fixture
+def router(tmp_path):
+    router = StorageRouter(str(tmp_path / "reconcile.jsonl"))
+    yield router
+    router.stop()
+
+
+def test_mongo_cache_miss_reads_the_analysis_by_id(tmp_path, router):
+    handler = MongoDBHandler(connection_string="memory://render-fragments", run_migrations=False)
+    cache = RenderCache(str(tmp_path / "render_cache.db"))
+    router.attach(mongo_handler=handler, render_cache=cache)
+
+    older = handler.save_analysis(analysis("첫 번째 분석"), inquiry("2026-10-19T10:00:00"))
+    handler.save_analysis(analysis("두 번째 분석"), inquiry("2026-10-19T15:00:00"))
+
+    fragments = router.get_analysis_fragments(analysis_id=older["id"], customer_name="고객사",
+                                              issue_type="A", user_name="kim", date="2026-10-19")
+    assert fragments["summary"] == "첫 번째 분석"
+    assert cache.get(older["id"])["summary"] == "첫 번째 분석"
+
+
+def test_local_cache_miss_reads_the_analysis_by_id(tmp_path, router):
+    local_db = MultiUserHistoryDB(data_dir=str(tmp_path / "user_data"))
+    router.attach(local_db=local_db)
+
+    local_db.save_analysis(analysis("첫 번째 분석"), inquiry("2026-10-19T10:00:00"), analysis_id="older")
+    local_db.save_analysis(analysis("두 번째 분석"), inquiry("2026-10-19T15:00:00"), analysis_id="newer")
+
+    assert router.get_analysis_fragments(analysis_id="older", customer_name="고객사",
+                                         date="2026-10-19")["summary"] == "첫 번째 분석"
+    assert router.get_analysis_fragments(analysis_id="missing", customer_name="고객사", date="2026-10-19") is None
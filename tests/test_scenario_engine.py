@@ -0,0 +1,85 @@
+"""
+시나리오 결정 그래프 회귀 테스트 (PK P DB.json의 실제 시나리오 + 실제 문의 문장)
+AI 호출을 생략하는 deterministic 결정은 고른 경로의 조건이 모두 참으로 확인된 경우에만 나와야 합니다.
+"""
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scenario_engine import DecisionGraph, hinted_conditions, predicate_stem  # noqa: E402
+
+ONVIF = "Onvif 응답이 없습니다"
+CCTV_PASSWORD = "현재 비밀번호가 맞지 않습니다"
+TOMCAT = "PK P 웹 접속 안됨"
+
+
+@pytest.fixture(scope="module")
+def scenarios():
+    with open(os.path.join(ROOT, "PK P DB.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def route(scenarios, issue_type, text):
+    return DecisionGraph(issue_type, scenarios[issue_type]).route(text)
+
+
+def test_predicate_stem_maps_antonyms_to_positive_stem():
+    assert predicate_stem("고객이 CCTV 비밀번호를 모르는가?") == "알"
+    assert predicate_stem("고객이 CCTV 비밀번호를 알고 있는가?") == "알"
+    assert predicate_stem("프로토콜이 맞지 않는가?") == "맞"
+    assert predicate_stem("톰캣이 꺼져 있는가?") == "켜"
+    assert predicate_stem("최근 30일간 접속 이력이 있는가?") == "있"
+
+
+def test_checked_protocol_does_not_decide_protocol_mismatch(scenarios):
+    decision = route(scenarios, ONVIF, "Onvif 프로토콜 확인했어요")
+    assert decision["answers"] == {"Onvif 프로토콜을 확인하였는가": True}
+    assert not decision["deterministic"]
+    assert decision["next_question"]["text"].startswith("프로토콜이")
+
+
+def test_protocol_mismatch_is_deterministic(scenarios):
+    decision = route(scenarios, ONVIF, "Onvif 프로토콜 확인했는데 프로토콜이 맞지 않아요")
+    assert decision["deterministic"]
+    assert decision["solution"]["onsite_needed"] == "N"
+    assert decision["solution"]["solution"] == "프로토콜(HTTP/HTTPS) 일치 확인 및 재설정"
+
+
+def test_unknown_password_is_not_inverted(scenarios):
+    decision = route(scenarios, CCTV_PASSWORD, "CCTV 비밀번호를 모릅니다")
+    assert decision["answers"]["고객이 CCTV 비밀번호를 알고 있는가"] is False
+    assert decision["answers"]["고객이 CCTV 비밀번호를 모르는가"] is True
+    # 접속 가능 여부는 확인되지 않았으므로 AI 호출 생략 안 함
+    assert not decision["deterministic"]
+
+
+def test_known_password(scenarios):
+    decision = route(scenarios, CCTV_PASSWORD, "저장된 비밀번호로 CCTV 웹 접속이 안됩니다. CCTV 비밀번호는 알고 있어요")
+    assert decision["answers"]["고객이 CCTV 비밀번호를 알고 있는가"] is True
+    assert decision["answers"]["고객이 CCTV 비밀번호를 모르는가"] is False
+
+
+def test_all_conditions_confirmed_is_deterministic(scenarios):
+    decision = route(scenarios, CCTV_PASSWORD, "저장된 비밀번호로 CCTV 웹 접속 불가능하고 CCTV 비밀번호를 모르겠습니다")
+    assert decision["deterministic"]
+    assert decision["solution"]["solution"] == "사용자가 임의 변경했을 가능성. 카메라 초기화 안내"
+
+
+def test_decided_by_exclusion_only_is_not_deterministic(scenarios):
+    # 다른 경로가 거짓 조건으로 제외되어 해결책이 하나 남았지만 경로의 조건이 모두 확인되지는 않음
+    decision = route(scenarios, TOMCAT, "톰캣이 꺼져 있어요")
+    assert decision["decided"]
+    assert decision["solution"]["status"] == "open"
+    assert not decision["deterministic"]
+
+
+def test_hinted_conditions_mark_evaluated_conditions(scenarios):
+    decision = route(scenarios, ONVIF, "Onvif 프로토콜 확인했어요")
+    condition_1, condition_2 = hinted_conditions(decision, scenarios[ONVIF][0])
+    assert condition_1 == "Onvif 프로토콜을 확인하였는가? (문의 내용상 예로 추정)"
+    assert condition_2 == "프로토콜이 맞지 않는가?"
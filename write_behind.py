@@ -0,0 +1,324 @@
+"""
+분석 결과 지연 저장(write-behind) 큐
+화면 요청은 스풀 파일에 한 줄 기록하고 바로 반환하며,
+백그라운드 워커가 저장소 라우터(MongoDB, 장애 시 로컬 저장소)로 재시도하며 저장합니다.
+프로세스가 재시작되면 스풀에 남은 미완료 작업을 다시 저장합니다.
+"""
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    # Windows
+    import msvcrt
+    FCNTL_AVAILABLE = False
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def new_analysis_id() -> str:
+    """클라이언트 측 분석 ID 생성 (bson 사용 가능 시 ObjectId 문자열)"""
+    try:
+        from bson import ObjectId
+        return str(ObjectId())
+    except ImportError:
+        return uuid.uuid4().hex
+
+
+class SpoolLock:
+    """
+    스풀 파일 프로세스 간 잠금 (<스풀>.lock 파일에 OS 잠금, 프로세스가 종료되면 자동 해제).
+    잠금을 가진 프로세스만 스풀 파일을 재작성합니다.
+    """
+
+    def __init__(self, spool_path: str):
+        self.path = spool_path + ".lock"
+        self._file = None
+
+    def acquire(self) -> bool:
+        """잠금 시도 (다른 프로세스가 가지고 있으면 기다리지 않고 False)"""
+        if self._file is not None:
+            return True
+        lock_file = open(self.path, 'a+')
+        try:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        try:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+class WriteBehindQueue:
+    """분석 결과 지연 저장 큐 (JSONL 스풀 + 백그라운드 워커)"""
+
+    MAX_RESULTS = 1000
+
+    def __init__(self, spool_path: str, max_attempts: int = 5,
+                 base_delay: float = 1.0, max_delay: float = 60.0,
+                 require_lock: bool = False, compact: bool = True):
+        """
+        require_lock: 스풀 잠금을 얻지 못하면 RuntimeError (실행 중인 앱의 스풀을 CLI가 건드리지 않도록)
+        compact: 처리된 작업을 지우도록 스풀 파일 재작성 (False면 완료 기록만 추가하고 정리는 다음 앱 시작 때)
+        """
+        self.spool_path = spool_path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.storage = None
+
+        self._queue = queue.Queue()
+        self._spool_lock = threading.Lock()
+        self._pending = OrderedDict()
+        self._results = OrderedDict()
+        self._stop = threading.Event()
+        self.metrics = {"enqueued": 0, "saved_mongodb": 0, "saved_local": 0, "retries": 0, "replayed": 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(spool_path)), exist_ok=True)
+        self._spool_file_lock = SpoolLock(spool_path)
+        self.owns_spool = self._spool_file_lock.acquire()
+        if not self.owns_spool:
+            if require_lock:
+                raise RuntimeError(f"다른 프로세스가 지연 저장 스풀을 사용 중입니다: {spool_path}")
+            # 다른 프로세스(일괄 저장 CLI 등)가 처리 중인 작업은 복구하지 않고 새 작업만 추가 기록
+            print(f"⚠️ 다른 프로세스가 지연 저장 스풀을 사용 중 - 스풀 복구/정리 생략: {spool_path}")
+        self.compact = compact and self.owns_spool
+        if self.owns_spool:
+            self._replay_spool()
+
+        # 워커는 저장 대상이 연결된 뒤(attach) 시작
+        self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+
+    def attach(self, storage):
+        """저장 대상(StorageRouter) 연결 후 워커 시작 (세션마다 호출되어도 마지막 라우터 사용)"""
+        self.storage = storage
+        if not self._worker.is_alive() and not self._stop.is_set():
+            self._worker.start()
+
+    def _append_spool(self, record: Dict):
+        """스풀 파일에 한 줄 추가 후 디스크 동기화 (_spool_lock 안에서 호출)"""
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with open(self.spool_path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite_spool(self):
+        """미완료 작업만 남기고 스풀 파일 재작성 (_spool_lock 안에서 호출, 정리하지 않는 큐는 생략)"""
+        if not self.compact:
+            return
+        temp_file = self.spool_path + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            for job in self._pending.values():
+                f.write(json.dumps(job, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.spool_path)
+
+    def _replay_spool(self):
+        """재시작 시 스풀에 남은 미완료 작업 복구"""
+        if not os.path.exists(self.spool_path):
+            return
+        try:
+            with open(self.spool_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 기록 도중 중단된 마지막 줄은 무시
+                        continue
+                    if record.get('op') == 'save':
+                        self._pending[record['id']] = record
+                    elif record.get('op') == 'done':
+                        self._pending.pop(record.get('id'), None)
+
+            with self._spool_lock:
+                self._rewrite_spool()
+            for job in self._pending.values():
+                self._queue.put(job['id'])
+            if self._pending:
+                self.metrics["replayed"] = len(self._pending)
+                print(f"✅ 지연 저장 스풀에서 {len(self._pending)}건 복구")
+        except Exception as e:
+            print(f"❌ 지연 저장 스풀 복구 실패: {e}")
+
+    def enqueue(self, analysis_result: Dict, inquiry_data: Dict) -> Dict[str, Any]:
+        """저장 작업 등록 (스풀 기록 후 즉시 반환)"""
+        try:
+            analysis_id = new_analysis_id()
+            job = {
+                "op": "save",
+                "id": analysis_id,
+                "analysis_result": analysis_result,
+                "inquiry_data": inquiry_data,
+                "enqueued_at": datetime.now().isoformat()
+            }
+            with self._spool_lock:
+                self._append_spool(job)
+                self._pending[analysis_id] = job
+            self._set_result(analysis_id, {"status": "pending"})
+            if self.storage is not None:
+                # 저장 전이라도 이력 조회에 바로 보이도록
+                self.storage.remember_write(analysis_id, analysis_result, inquiry_data)
+            self._queue.put(analysis_id)
+            self.metrics["enqueued"] += 1
+            return {"success": True, "id": analysis_id, "status": "pending"}
+        except Exception as e:
+            print(f"❌ 지연 저장 등록 실패: {e}")
+            return {"success": False, "error": str(e)}
+
+    def _set_result(self, analysis_id: str, result: Dict):
+        """작업 결과 기록 (최근 MAX_RESULTS건만 유지)"""
+        self._results[analysis_id] = result
+        self._results.move_to_end(analysis_id)
+        while len(self._results) > self.MAX_RESULTS:
+            self._results.popitem(last=False)
+
+    def get_status(self, analysis_id: str) -> Optional[Dict]:
+        """작업 상태 조회 (pending / saved)"""
+        return self._results.get(analysis_id)
+
+    def _backoff(self, attempt: int) -> float:
+        """재시도 대기 시간 (지수 증가)"""
+        return min(self.base_delay * (2 ** attempt), self.max_delay)
+
+    def _persist(self, job: Dict) -> Optional[Dict]:
+        """작업 하나 저장 (라우터가 MongoDB/로컬을 고름, 둘 다 실패하면 지수 대기 후 재시도)"""
+        if self.storage is None:
+            return None
+        for attempt in range(self.max_attempts):
+            result = self.storage.save_analysis(job['analysis_result'], job['inquiry_data'], analysis_id=job['id'])
+            if result.get('success'):
+                if result.get('database') == 'mongodb':
+                    self.metrics["saved_mongodb"] += 1
+                else:
+                    self.metrics["saved_local"] += 1
+                return result
+            self.metrics["retries"] += 1
+            print(f"⚠️ 지연 저장 실패 ({attempt + 1}/{self.max_attempts}): {result.get('error')}")
+            if self._stop.wait(self._backoff(attempt)):
+                return None
+        return None
+
+    def _run(self):
+        """백그라운드 저장 워커"""
+        while not self._stop.is_set():
+            try:
+                analysis_id = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+
+            job = self._pending.get(analysis_id)
+            if job is None:
+                self._queue.task_done()
+                continue
+
+            try:
+                result = self._persist(job)
+            except Exception as e:
+                print(f"❌ 지연 저장 처리 중 오류: {e}")
+                result = None
+
+            if result:
+                self._mark_saved(analysis_id, result)
+                self._queue.task_done()
+            else:
+                # 저장소를 모두 사용할 수 없으면 잠시 후 다시 시도 (스풀에는 그대로 남음)
+                self._queue.task_done()
+                if not self._stop.wait(self.max_delay):
+                    self._queue.put(analysis_id)
+
+    def _mark_saved(self, analysis_id: str, result: Dict):
+        """저장 완료 기록 (결과 갱신, 미완료 목록에서 제거, 스풀에 done 추가)"""
+        self._set_result(analysis_id, {"status": "saved", "database": result.get('database', '')})
+        try:
+            with self._spool_lock:
+                self._pending.pop(analysis_id, None)
+                self._append_spool({"op": "done", "id": analysis_id})
+                # 밀린 작업이 없으면 스풀 파일 정리
+                if not self._pending:
+                    self._rewrite_spool()
+        except Exception as e:
+            print(f"⚠️ 지연 저장 완료 기록 실패: {e}")
+
+    async def drain_async(self, async_handler, concurrency: int = 32) -> Dict[str, int]:
+        """
+        밀린 작업 전체를 AsyncMongoHandler로 동시에 저장 (재시작 후 스풀이 많이 쌓인 경우, CLI에서 사용).
+        작업 ID로 저장하므로 워커가 같은 작업을 처리해도 중복 저장되지 않습니다.
+        """
+        jobs = list(self._pending.values())
+        results = await async_handler.save_many(
+            ({"analysis_result": job['analysis_result'], "inquiry_data": job['inquiry_data'], "document_id": job['id']}
+             for job in jobs),
+            concurrency=concurrency
+        )
+        saved = 0
+        for job, result in zip(jobs, results):
+            if result.get('success'):
+                saved += 1
+                self.metrics["saved_mongodb"] += 1
+                self._mark_saved(job['id'], result)
+        print(f"✅ 지연 저장 스풀 {saved}/{len(jobs)}건 저장")
+        return {"saved": saved, "failed": len(jobs) - saved}
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """대기 중인 작업이 모두 저장될 때까지 대기"""
+        deadline = time.time() + timeout
+        while self._pending and time.time() < deadline:
+            time.sleep(0.05)
+        return not self._pending
+
+    def stop(self):
+        """워커 종료 (미완료 작업은 스풀에 남아 다음 실행 시 복구)"""
+        self._stop.set()
+        if self._worker.is_alive():
+            self._worker.join(timeout=5)
+        self._spool_file_lock.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """큐 상태 지표"""
+        return {"pending": len(self._pending), "spool_path": self.spool_path, **self.metrics}
+
+
+def get_write_behind_queue(spool_path: str) -> WriteBehindQueue:
+    """스풀 파일별 프로세스 공용 큐 (세션마다 워커가 생기지 않도록)"""
+    spool_path = os.path.abspath(spool_path)
+    with _queues_lock:
+        if spool_path not in _queues:
+            _queues[spool_path] = WriteBehindQueue(spool_path)
+        return _queues[spool_path]